@@ -0,0 +1,145 @@
+"""
+Telemetry frames handled per CPU core: the asyncio bridge against the
+thread-based TelemetryBridge (waitress for JSON over HTTP, a socket thread
+for UDP).
+
+A separate sender process streams frames at the bridge for a fixed time
+while a consumer keeps up with them: a thread blocking in ``wait_for_seq``
+for the threaded bridges and, on the asyncio bridge's own loop, either
+``await next_frame()`` (which, like ``wait_for_seq``, may skip frames that
+arrived together) or an ``async for`` over ``stream()``, which copies out
+every single frame. The receiving process's CPU time
+(``time.process_time``) divided into the frames consumed gives frames per
+core-second, independent of how fast the sender managed to send.
+
+Usage:
+    python benchmarks/bench_async_bridge.py --seconds 3
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_decode import FIXTURE  # noqa: E402
+from gym_trackmania.bridge.async_bridge import AsyncTelemetryBridge  # noqa: E402
+from gym_trackmania.bridge.bridge import TelemetryBridge  # noqa: E402
+from gym_trackmania.shared.packet import encode_telemetry  # noqa: E402
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+
+
+def send(transport, host, port, seconds, rate):
+    """Sender process: stream frames for ``seconds``, at most ``rate`` per second."""
+    data = json.loads(FIXTURE.read_text())
+    body = json.dumps(data)
+    packet = encode_telemetry(Telemetry.from_dict(data))
+    interval = 1.0 / rate
+    deadline = time.monotonic() + seconds
+    next_send = time.monotonic()
+    if transport == "http":
+        conn = http.client.HTTPConnection(host, port)
+        send_one = lambda: (conn.request("POST", "/telemetry", body=body,  # noqa: E731
+                                         headers={"Content-Type": "application/json"}),
+                            conn.getresponse().read())
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM if transport == "udp" else socket.SOCK_STREAM)
+        sock.connect((host, port))
+        send_one = lambda: sock.sendall(packet)  # noqa: E731
+    while time.monotonic() < deadline:
+        send_one()
+        next_send += interval
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def start_sender(transport, bridge, args):
+    sender = multiprocessing.Process(target=send, args=(transport, bridge.host, bridge.port, args.seconds, args.rate))
+    sender.start()
+    return sender
+
+
+def run_threaded(transport, tmp, args):
+    bridge = TelemetryBridge(port=0, log_path=str(Path(tmp) / f"{transport}.log"), transport=transport)
+    bridge.start()
+    consumed = 0
+    done = threading.Event()
+
+    def consume():
+        nonlocal consumed
+        seq = 0
+        while not done.is_set():
+            if bridge.wait_for_seq(seq, timeout=0.1):
+                seq = bridge.latest_seq + 1
+                consumed = seq
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    cpu = time.process_time()
+    sender = start_sender(transport, bridge, args)
+    sender.join()
+    cpu = time.process_time() - cpu
+    done.set()
+    consumer.join()
+    bridge.stop()
+    return consumed, cpu
+
+
+def run_async(transport, tmp, args, use_stream=True):
+    async def main():
+        async with AsyncTelemetryBridge(port=0, log_path=str(Path(tmp) / f"async_{transport}.log"),
+                                        transport=transport) as bridge:
+            consumed = 0
+
+            async def consume():
+                nonlocal consumed
+                if use_stream:
+                    async for seq, frame in bridge.stream():
+                        consumed = seq + 1
+                else:
+                    while True:
+                        seq, frame = await bridge.next_frame(bridge.latest_seq)
+                        consumed = seq + 1
+
+            consumer = asyncio.create_task(consume())
+            cpu = time.process_time()
+            sender = start_sender(transport, bridge, args)
+            await asyncio.get_running_loop().run_in_executor(None, sender.join)
+            cpu = time.process_time() - cpu
+            consumer.cancel()
+            return consumed, cpu
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rate", type=float, default=20000.0, help="maximum frames per second sent")
+    args = parser.parse_args()
+
+    runs = [
+        ("threaded http (waitress)", run_threaded, "http"),
+        ("threaded udp", run_threaded, "udp"),
+        ("asyncio udp, next_frame", lambda *a: run_async(*a, use_stream=False), "udp"),
+        ("asyncio udp, stream", run_async, "udp"),
+        ("asyncio tcp, stream", run_async, "tcp"),
+    ]
+    print(f"{'bridge':<26} {'frames':>8} {'frames/s':>10} {'cpu s':>7} {'frames/core-s':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, run, transport in runs:
+            frames, cpu = run(transport, tmp, args)
+            print(f"{label:<26} {frames:>8} {frames / args.seconds:>10.0f} {cpu:>7.2f} "
+                  f"{frames / max(cpu, 1e-9):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Time spent sending input per env step: the old per-step key presses versus
+KeyStateController.
+
+Key events are recorded instead of sent; ``--key-latency`` models the cost of
+one synthetic key event and ``--pause`` pydirectinput's pause after each
+call. Actions follow a slowly varying random walk, like a policy's output.
+
+Usage:
+    python benchmarks/bench_controller.py --steps 500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.core.controller import RecordingController  # noqa: E402
+
+
+def random_walk_actions(steps, seed=0):
+    rng = np.random.default_rng(seed)
+    actions = np.cumsum(rng.normal(0.0, 0.1, size=(steps, 3)), axis=0)
+    actions[:, 0] = np.clip(actions[:, 0], -1.0, 1.0)
+    actions[:, 1:] = np.clip(np.abs(actions[:, 1:]), 0.0, 1.0)
+    return actions
+
+
+def legacy(actions, key_latency, pause):
+    """The previous _send_control: a full press (down, up, pause) per active key per step."""
+    step_times, presses = np.empty(len(actions)), 0
+    for i, (steer, throttle, brake) in enumerate(actions):
+        start = time.perf_counter()
+        n = int(abs(steer) > 0.5) + int(throttle > 0.5) + int(brake > 0.5)
+        for _ in range(n):
+            time.sleep(2 * key_latency + pause)
+        presses += n
+        step_times[i] = time.perf_counter() - start
+    return step_times, 2 * presses
+
+
+def controller(actions, key_latency, analog, step_interval):
+    ctrl = RecordingController(key_latency=key_latency, analog=analog)
+    ctrl.start()
+    step_times = np.empty(len(actions))
+    for i, action in enumerate(actions):
+        start = time.perf_counter()
+        ctrl.set_action(*action)
+        step_times[i] = time.perf_counter() - start
+        time.sleep(step_interval)  # the env waiting for telemetry
+    ctrl.stop()
+    return step_times, ctrl.transitions, np.array(ctrl.dispatch_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--key-latency", type=float, default=0.0005, help="seconds per synthetic key event")
+    parser.add_argument("--pause", type=float, default=0.01, help="pydirectinput pause after each call")
+    parser.add_argument("--step-interval", type=float, default=0.01, help="seconds between steps")
+    args = parser.parse_args()
+
+    actions = random_walk_actions(args.steps)
+    print(f"{'mode':<10} {'send p50 ms':>12} {'send p99 ms':>12} {'events/step':>12} {'dispatch p99 ms':>16}")
+    step_times, events = legacy(actions, args.key_latency, args.pause)
+    print(f"{'legacy':<10} {np.percentile(step_times, 50) * 1e3:>12.3f} {np.percentile(step_times, 99) * 1e3:>12.3f} "
+          f"{events / args.steps:>12.2f} {'-':>16}")
+    for mode, analog in (("digital", False), ("analog", True)):
+        step_times, events, dispatch = controller(actions, args.key_latency, analog, args.step_interval)
+        print(f"{mode:<10} {np.percentile(step_times, 50) * 1e3:>12.3f} "
+              f"{np.percentile(step_times, 99) * 1e3:>12.3f} {events / args.steps:>12.2f} "
+              f"{np.percentile(dispatch, 99) * 1e3:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
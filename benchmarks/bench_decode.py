@@ -0,0 +1,95 @@
+"""
+Frames decoded per second: the JSON/dataclass path against the binary
+frame-buffer path.
+
+The old path is what the HTTP transport and the original
+``TrackmaniaEnv._process_telemetry`` did per frame: ``json.loads``,
+``Telemetry.from_dict`` and a scalar observation builder. The new path copies
+a binary packet into a preallocated ``PACKET_DTYPE`` record and builds the
+observation with the default ``FeaturePipeline``, either one frame at a time or as a
+batch.
+
+Usage:
+    python benchmarks/bench_decode.py --frames 20000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.shared.features import DEFAULT_FEATURES, FeaturePipeline  # noqa: E402
+from gym_trackmania.shared.packet import PACKET_DTYPE, decode_into, encode_telemetry  # noqa: E402
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+
+FIXTURE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "example_telemetry.json"
+
+
+def legacy_process_telemetry(telemetry):
+    """The scalar observation builder TrackmaniaEnv used before frame buffers."""
+    def norm(x, min_val, max_val):
+        return (x - min_val) / (max_val - min_val) if max_val > min_val else 0.0
+
+    wheel_rot = np.mean([w.rotation for w in telemetry.wheel_states.values()])
+    wheel_slip = np.mean([w.slip_coef for w in telemetry.wheel_states.values()])
+    return np.array([
+        norm(telemetry.rpm or 0, 0, 10000),
+        norm(wheel_rot, 0, 3000),
+        norm(wheel_slip, 0, 1),
+        float(telemetry.on_ground),
+        float(telemetry.finished),
+        *(telemetry.orientation if telemetry.orientation else [0.0, 0.0, 0.0]),
+        norm(telemetry.side_speed or 0, -100, 100),
+        *(telemetry.velocity if telemetry.velocity else [0.0, 0.0, 0.0]),
+        float(telemetry.is_turbo),
+        norm(telemetry.speed or 0, 0, 300),
+        telemetry.checkpoints.progress if telemetry.checkpoints else 0.0
+    ], dtype=np.float32)
+
+
+def bench(label, fn, frames):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {frames / elapsed:>12.0f} frames/s {elapsed / frames * 1e6:>8.2f} us/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    body = FIXTURE.read_text()
+    packet = encode_telemetry(Telemetry.from_dict(json.loads(body)))
+    packets = np.frombuffer(packet * args.frames, dtype=np.uint8).reshape(args.frames, -1)
+
+    pipeline = FeaturePipeline(DEFAULT_FEATURES)
+    frame = np.zeros(1, dtype=PACKET_DTYPE)
+    obs = np.empty((1, pipeline.size), dtype=np.float32)
+    batch = np.zeros(args.frames, dtype=PACKET_DTYPE)
+    batch_obs = np.empty((args.frames, pipeline.size), dtype=np.float32)
+
+    def old_path():
+        for _ in range(args.frames):
+            legacy_process_telemetry(Telemetry.from_dict(json.loads(body)))
+
+    def new_path():
+        for _ in range(args.frames):
+            decode_into(packet, frame)
+            pipeline(frame, out=obs)
+
+    def new_path_batched():
+        batch.view(np.uint8).reshape(args.frames, -1)[:] = packets
+        pipeline(batch, out=batch_obs)
+
+    bench("json + from_dict + scalar obs", old_path, args.frames)
+    bench("packet -> frame -> obs", new_path, args.frames)
+    bench("packet batch -> frames -> obs", new_path_batched, args.frames)
+
+
+if __name__ == "__main__":
+    main()
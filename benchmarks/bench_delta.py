@@ -0,0 +1,93 @@
+"""
+Bytes on the wire and decode cost of delta-encoded telemetry.
+
+Replays a recorded session through the plugin's encoding, as a DeltaEncoder,
+and measures per tick of the session:
+
+* bytes sent: full packets only, deltas with every tick sent (the rate the
+  bridge requests during episodes), and deltas with unchanged ticks
+  withheld until a heartbeat is due (idle);
+* time to turn a received packet into a frame in the ring's layout: a plain
+  keyframe copy against DeltaDecoder followed by the same copy.
+
+The session is a recording given with ``--recording``, or by default the
+simulated car driving for ``--frames`` ticks followed by as many ticks in the
+main menu.
+
+Usage:
+    python benchmarks/bench_delta.py --frames 2000
+    python benchmarks/bench_delta.py --recording recordings/episode_0001
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_replay_env import record  # noqa: E402
+from gym_trackmania.bridge.recording import load_recording  # noqa: E402
+from gym_trackmania.shared.packet import (PACKET_DTYPE, PACKET_SIZE, DeltaDecoder, DeltaEncoder,  # noqa: E402
+                                          decode_into, encode_telemetry)
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+
+TICK = 0.01  # seconds between recorded frames
+
+
+def session(args):
+    if args.recording:
+        frames = load_recording(args.recording).frames
+        return [frame.tobytes() for frame in frames]
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = load_recording(record(tmp, args.frames)).frames
+        packets = [frame.tobytes() for frame in frames]
+    return packets + [encode_telemetry(Telemetry(in_main_menu=True))] * args.frames
+
+
+def encode(packets, **kwargs):
+    encoder = DeltaEncoder(**kwargs)
+    sent = [encoder.encode(packet, i * TICK) for i, packet in enumerate(packets)]
+    return [data for data in sent if data is not None]
+
+
+def decode_time(packets, repeat):
+    out = np.zeros(1, dtype=PACKET_DTYPE)
+    best = float("inf")
+    for _ in range(repeat):
+        decoder = DeltaDecoder()
+        start = time.perf_counter()
+        for data in packets:
+            frame = decoder.decode(data)
+            if frame is not None:
+                decode_into(frame, out)
+        best = min(best, time.perf_counter() - start)
+    return best / len(packets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000, help="ticks of driving, then of menu, to simulate")
+    parser.add_argument("--recording", help="episode directory to replay instead")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    packets = session(args)
+    ticks = len(packets)
+    keyframes = encode(packets, keyframe_interval=0, active=True)
+    active = encode(packets, active=True)
+    idle = encode(packets)
+
+    for name, sent in (("keyframes only", keyframes), ("delta, every tick", active), ("delta, idle", idle)):
+        nbytes = sum(len(data) for data in sent)
+        print(f"{name:18s}: {nbytes / ticks:6.1f} bytes/tick ({len(sent)} packets, "
+              f"{nbytes / (ticks * PACKET_SIZE):.0%} of full packets)")
+
+    print(f"decode keyframe   : {decode_time(keyframes, args.repeat) * 1e6:6.2f} us/packet")
+    print(f"decode delta      : {decode_time(active, args.repeat) * 1e6:6.2f} us/packet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Per-frame cost of building an observation and its reward: the feature
+pipeline against the hand-written observation code it replaces.
+
+Three paths are timed, each producing the observation, the reward and the
+done flag of one step:
+
+* the scalar path of the original ``TrackmaniaEnv`` (``legacy_process_telemetry``
+  from ``bench_decode`` over a decoded ``Telemetry``, scalar reward);
+* the fixed-layout vectorized builder that preceded the pipeline, with the
+  same scalar reward, one frame at a time;
+* ``FeaturePipeline`` and ``RewardFunction``, one frame at a time and as a
+  batch.
+
+Usage:
+    python benchmarks/bench_features.py --frames 20000 --batch 1024
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_decode import FIXTURE, legacy_process_telemetry  # noqa: E402
+from gym_trackmania.shared.features import DEFAULT_FEATURES, FeaturePipeline, RewardFunction  # noqa: E402
+from gym_trackmania.shared.packet import (FLAG_FINISHED, FLAG_IS_TURBO, FLAG_ON_GROUND, PACKET_DTYPE,  # noqa: E402
+                                          WHEEL_ROTATION, WHEEL_SLIP_COEF, frame_from_telemetry)
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+from gym_trackmania.trackmania_env import REWARD_WEIGHTS, finished  # noqa: E402
+
+_SCALE = np.array([1e-4, 1 / 12000, 1 / 4, 1, 1, 1, 1, 1, 1 / 200, 1, 1, 1, 1, 1 / 300, 1], dtype=np.float32)
+_OFFSET = np.zeros(15, dtype=np.float32)
+_OFFSET[8] = 0.5
+
+
+def previous_build_observations(frames, out):
+    """The fixed-layout builder ``shared.observation`` had before the pipeline."""
+    wheels = frames["wheels"]
+    bits = np.unpackbits(frames["flags"][:, None], axis=1, bitorder="little")
+    out[:, 0] = frames["rpm"]
+    np.add.reduce(wheels[:, :, WHEEL_ROTATION], axis=1, out=out[:, 1])
+    np.add.reduce(wheels[:, :, WHEEL_SLIP_COEF], axis=1, out=out[:, 2])
+    out[:, 3] = bits[:, FLAG_ON_GROUND.bit_length() - 1]
+    out[:, 4] = bits[:, FLAG_FINISHED.bit_length() - 1]
+    out[:, 5:8] = frames["orientation"]
+    out[:, 8] = frames["side_speed"]
+    out[:, 9:12] = frames["velocity"]
+    out[:, 12] = bits[:, FLAG_IS_TURBO.bit_length() - 1]
+    out[:, 13] = frames["speed"]
+    out[:, 14] = frames["cp_progress"]
+    out *= _SCALE
+    out += _OFFSET
+    return out
+
+
+class ScalarReward:
+    """The scalar reward and done check, by observation index."""
+    def __init__(self):
+        self.last_speed = 0.0
+        self.last_progress = 0.0
+
+    def __call__(self, obs):
+        speed, progress = obs[13], obs[14]
+        reward = max(0.0, speed - self.last_speed) * 0.5 + max(0.0, progress - self.last_progress)
+        self.last_speed, self.last_progress = speed, progress
+        return reward, obs[4] == 1.0
+
+
+def bench(label, fn, frames):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {frames / elapsed:>12.0f} frames/s {elapsed / frames * 1e6:>8.2f} us/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=1024)
+    args = parser.parse_args()
+
+    telemetry = Telemetry.from_dict(json.loads(FIXTURE.read_text()))
+    frame = np.zeros(1, dtype=PACKET_DTYPE)
+    frame_from_telemetry(telemetry, frame)
+    batch = np.repeat(frame, args.batch)
+
+    pipeline = FeaturePipeline(DEFAULT_FEATURES)
+    reward_function = RewardFunction(pipeline, REWARD_WEIGHTS)
+    obs = np.empty((1, pipeline.size), dtype=np.float32)
+    prev_obs = np.zeros_like(obs)
+    reward = np.zeros(1, dtype=np.float64)
+    batch_obs = np.empty((args.batch, pipeline.size), dtype=np.float32)
+    batch_prev = np.zeros_like(batch_obs)
+    batch_reward = np.zeros(args.batch, dtype=np.float64)
+
+    def scalar_path():
+        scalar_reward = ScalarReward()
+        for _ in range(args.frames):
+            scalar_reward(legacy_process_telemetry(telemetry))
+
+    def previous_path():
+        scalar_reward = ScalarReward()
+        for _ in range(args.frames):
+            scalar_reward(previous_build_observations(frame, obs)[0])
+
+    def pipeline_path():
+        for _ in range(args.frames):
+            pipeline(frame, out=obs)
+            reward_function(obs, prev_obs, out=reward)
+            prev_obs[:] = obs
+            finished(frame)
+
+    def pipeline_batched():
+        for _ in range(max(1, args.frames // args.batch)):
+            pipeline(batch, out=batch_obs)
+            reward_function(batch_obs, batch_prev, out=batch_reward)
+            batch_prev[:] = batch_obs
+            finished(batch)
+
+    n_batched = max(1, args.frames // args.batch) * args.batch
+    bench("scalar obs + scalar reward", scalar_path, args.frames)
+    bench("fixed-layout obs + scalar reward", previous_path, args.frames)
+    bench("pipeline obs + reward, per frame", pipeline_path, args.frames)
+    bench(f"pipeline obs + reward, batch {args.batch}", pipeline_batched, n_batched)
+
+
+if __name__ == "__main__":
+    main()
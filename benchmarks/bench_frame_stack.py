@@ -0,0 +1,79 @@
+"""
+Per-step cost of stacking the last ``k`` observations.
+
+* ``concatenate``: what generic frame-stacking wrappers do, a deque of
+  observation copies concatenated into a new array every step, plus the
+  temporal features computed from the previous frame by hand;
+* ``TemporalObservation``: the mirrored in-place buffer, with and without
+  temporal features.
+
+Usage:
+    python benchmarks/bench_frame_stack.py --steps 100000 --k 4
+"""
+import argparse
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.shared.features import FeaturePipeline  # noqa: E402
+from gym_trackmania.shared.packet import PACKET_DTYPE  # noqa: E402
+from gym_trackmania.shared.temporal import TemporalObservation  # noqa: E402
+
+
+def concatenate(obs, frames, k):
+    stack = deque([np.concatenate([obs[0], np.zeros(3, dtype=np.float32)])] * k, maxlen=k)
+    previous = None
+    start = time.perf_counter()
+    for i in range(len(obs)):
+        frame = frames[i]
+        if previous is not None:
+            p, c = previous["orientation"][[0, 2]], frame["orientation"][[0, 2]]
+            temporal = np.array([frame["speed"] - previous["speed"],
+                                 np.arctan2(p[0] * c[1] - p[1] * c[0], p @ c),
+                                 frame["wheels"][:, 1].mean()], dtype=np.float32)
+        else:
+            temporal = np.zeros(3, dtype=np.float32)
+        previous = frame
+        stack.append(np.concatenate([obs[i], temporal]))
+        np.stack(stack)
+    return time.perf_counter() - start
+
+
+def in_place(pipeline, obs, frames, k, temporal_features):
+    stack = TemporalObservation(pipeline, k, temporal_features)
+    stack.reset(obs[0], frames[0], 0.0)
+    start = time.perf_counter()
+    for i in range(len(obs)):
+        stack.push(obs[i], frames[i], i * 0.01)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = np.zeros(args.steps, dtype=PACKET_DTYPE)
+    frames["speed"] = rng.uniform(0, 300, args.steps)
+    frames["orientation"] = rng.normal(size=(args.steps, 3))
+    frames["wheels"] = rng.uniform(0, 1, frames["wheels"].shape)
+    pipeline = FeaturePipeline()
+    obs = pipeline(frames)
+
+    for name, elapsed in (
+        ("concatenate + temporal", concatenate(obs, frames, args.k)),
+        ("in place", in_place(pipeline, obs, frames, args.k, False)),
+        ("in place + temporal", in_place(pipeline, obs, frames, args.k, True)),
+    ):
+        print(f"{name:24s}: {elapsed / args.steps * 1e6:6.2f} us/step")
+
+
+if __name__ == "__main__":
+    main()
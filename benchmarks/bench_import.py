@@ -0,0 +1,70 @@
+"""
+Import and construction time of TrackmaniaEnv, as paid by unit tests,
+evaluation scripts and freshly spawned workers.
+
+Every measurement runs in a new interpreter and the median of ``--repeat``
+runs is reported:
+
+* ``numpy + gymnasium``: the floor any gymnasium env pays;
+* ``import trackmania_env``: the env module, on top of that floor;
+* ``TrackmaniaEnv()``: constructing the env with nothing injected, which
+  does no I/O until ``reset()``;
+* ``import vector_env``: the vector env, which still imports the bridge and
+  the game launcher eagerly, for reference.
+
+Heavy modules that were loaded anyway (Flask, waitress, ...) are listed.
+
+Usage:
+    python benchmarks/bench_import.py --repeat 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("flask", "waitress", "http.server", "multiprocessing.shared_memory", "pydirectinput", "psutil",
+                 "win32gui")
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import numpy, gymnasium
+base = time.perf_counter()
+{imports}
+imported = time.perf_counter()
+{construct}
+constructed = time.perf_counter()
+print(json.dumps({{
+    "base": base - start, "import": imported - base, "construct": constructed - imported,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run(imports, construct="pass", repeat=10):
+    script = SCRIPT.format(imports=imports, construct=construct, heavy=HEAVY_MODULES)
+    results = [json.loads(subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True, capture_output=True,
+                                         text=True).stdout) for _ in range(repeat)]
+    return {key: statistics.median(r[key] for r in results) for key in ("base", "import", "construct")} | \
+        {"heavy": results[0]["heavy"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    env = run("from gym_trackmania.trackmania_env import TrackmaniaEnv", "env = TrackmaniaEnv()", args.repeat)
+    vector = run("from gym_trackmania.vector_env import TrackmaniaVectorEnv", repeat=args.repeat)
+
+    print(f"numpy + gymnasium     : {env['base'] * 1e3:6.1f} ms")
+    print(f"import trackmania_env : {env['import'] * 1e3:6.1f} ms  (heavy modules loaded: {env['heavy'] or 'none'})")
+    print(f"TrackmaniaEnv()       : {env['construct'] * 1e3:6.1f} ms")
+    print(f"import vector_env     : {vector['import'] * 1e3:6.1f} ms  (heavy modules loaded: {vector['heavy'] or 'none'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Env steps per second of N worker processes choosing actions with a policy,
+each running its own forward pass ("per-worker") or all submitting to one
+InferenceServer that batches their requests ("batched"), for N = 1, 2, 4,
+8, 16, 32 (or --workers).
+
+A worker's step is an env stand-in that costs --env-ms of CPU (building the
+observation, stepping the game) followed by the policy's action for a
+TrackmaniaEnv-sized observation. The policy is an MLPPolicy with --hidden
+layers. For the batched runs, the server's batch sizes and the time
+requests spend queued before their forward pass are reported too.
+
+Usage:
+    python benchmarks/bench_inference.py --hidden 256 256 --seconds 3 --env-ms 0.2
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.shared.inference import InferenceServer, MLPPolicy  # noqa: E402
+from gym_trackmania.trackmania_env import make_pipeline  # noqa: E402
+
+ACTION_SIZE = 3
+
+
+def env_step(rng, obs, env_seconds):
+    end = time.perf_counter() + env_seconds
+    while time.perf_counter() < end:
+        pass
+    obs[:] = rng.standard_normal(obs.shape)
+    return obs
+
+
+def per_worker(worker, policy, start, end, env_seconds, results):
+    rng = np.random.default_rng(worker)
+    obs = np.zeros(policy.obs_size, dtype=np.float32)
+    while time.monotonic() < start:
+        time.sleep(0.001)
+    steps = 0
+    while time.monotonic() < end:
+        policy(env_step(rng, obs, env_seconds)[None])
+        steps += 1
+    results.put(steps)
+
+
+def batched_worker(worker, client, obs_size, start, end, env_seconds, results):
+    rng = np.random.default_rng(worker)
+    obs = np.zeros(obs_size, dtype=np.float32)
+    action = np.empty(ACTION_SIZE, dtype=np.float32)
+    while time.monotonic() < start:
+        time.sleep(0.001)
+    steps = 0
+    while time.monotonic() < end:
+        client.act(env_step(rng, obs, env_seconds), out=action)
+        steps += 1
+    client.close()
+    results.put(steps)
+
+
+def run(workers, policy, seconds, env_seconds, batched, deadline):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    start = time.monotonic() + 0.2 + 0.01 * workers
+    end = start + seconds
+    server = None
+    if batched:
+        server = InferenceServer(policy, policy.obs_size, ACTION_SIZE, workers, deadline=deadline)
+        args = [(worker, server.client(worker), policy.obs_size, start, end, env_seconds, results)
+                for worker in range(workers)]
+        target = batched_worker
+    else:
+        args = [(worker, policy, start, end, env_seconds, results) for worker in range(workers)]
+        target = per_worker
+    processes = [context.Process(target=target, args=arg, daemon=True) for arg in args]
+    try:
+        for process in processes:
+            process.start()
+        if server is not None:
+            server.start()
+            while time.monotonic() < start:
+                time.sleep(0.001)
+            server.reset_stats()
+        steps = sum(results.get(timeout=seconds + 30) for _ in processes)
+        for process in processes:
+            process.join()
+        return steps / seconds, server.stats() if server is not None else None
+    finally:
+        if server is not None:
+            server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--hidden", type=int, nargs="+", default=[256, 256])
+    parser.add_argument("--env-ms", type=float, default=0.2, help="CPU cost of a worker's env step")
+    parser.add_argument("--deadline-ms", type=float, default=2.0, help="batching window of the server")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    pipeline, _ = make_pipeline(None, None, None)
+    policy = MLPPolicy(pipeline.size, ACTION_SIZE, hidden=tuple(args.hidden))
+    env_seconds = args.env_ms * 1e-3
+    print(f"policy {pipeline.size} -> {' -> '.join(map(str, args.hidden))} -> {ACTION_SIZE}, "
+          f"env step {args.env_ms:g} ms, deadline {args.deadline_ms:g} ms")
+    print(f"{'workers':>7} {'per-worker steps/s':>19} {'batched steps/s':>16} {'speedup':>8} "
+          f"{'mean batch':>11} {'queue p50 ms':>13} {'queue p99 ms':>13}")
+    for workers in args.workers:
+        local, _ = run(workers, policy, args.seconds, env_seconds, False, 0.0)
+        batched, stats = run(workers, policy, args.seconds, env_seconds, True, args.deadline_ms * 1e-3)
+        queue = stats["queue_wait"]
+        print(f"{workers:>7} {local:>19,.0f} {batched:>16,.0f} {batched / local:>7.2f}x "
+              f"{stats['mean_batch_size']:>11.1f} {queue['p50'] * 1e3:>13.3f} {queue['p99'] * 1e3:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
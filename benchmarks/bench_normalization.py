@@ -0,0 +1,88 @@
+"""
+Per-step cost of normalizing observations and rewards with running
+statistics, next to the cost of building them.
+
+* ``pipeline obs + reward``: the baseline step, ``FeaturePipeline`` and
+  ``RewardFunction`` over one frame;
+* ``+ ObservationNormalizer``: the statistics updated with the observation
+  and the observation standardized into a second buffer, as
+  ``TrackmaniaEnv`` does, and the same frozen, as during evaluation;
+* ``+ RewardNormalizer``: the reward terms' statistics updated and the
+  terms rescaled;
+* the same updates over a batch, as ``TrackmaniaVectorEnv`` does.
+
+Usage:
+    python benchmarks/bench_normalization.py --steps 20000 --batch 16
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.shared.normalization import ObservationNormalizer, RewardNormalizer  # noqa: E402
+from gym_trackmania.shared.packet import PACKET_DTYPE  # noqa: E402
+from gym_trackmania.trackmania_env import make_pipeline  # noqa: E402
+
+
+def random_frames(n, rng):
+    frames = np.zeros(n, dtype=PACKET_DTYPE)
+    frames["rpm"] = rng.uniform(0, 10000, n)
+    frames["speed"] = rng.uniform(0, 300, n)
+    frames["side_speed"] = rng.uniform(-100, 100, n)
+    frames["velocity"] = rng.uniform(-50, 50, (n, 3))
+    frames["wheels"] = rng.uniform(0, 1, frames["wheels"].shape)
+    frames["cp_progress"] = rng.uniform(0, 1, n)
+    return frames
+
+
+def run(frames, batch, steps, obs_normalizer=None, reward_normalizer=None, reward_function=None, pipeline=None):
+    obs = np.zeros((batch, pipeline.size), dtype=np.float32)
+    prev_obs = np.zeros_like(obs)
+    normalized = np.zeros_like(obs)
+    reward = np.zeros(batch, dtype=np.float64)
+    reward_fn = reward_normalizer or reward_function
+    n = len(frames) - batch
+    start = time.perf_counter()
+    for i in range(steps):
+        offset = i % n
+        pipeline(frames[offset:offset + batch], out=obs)
+        if obs_normalizer is not None:
+            obs_normalizer(obs, out=normalized)
+        reward_fn(obs, prev_obs, out=reward)
+        prev_obs[:] = obs
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    frames = random_frames(4096, np.random.default_rng(0))
+    pipeline, reward_function = make_pipeline()
+    common = dict(pipeline=pipeline, reward_function=reward_function)
+
+    for batch in (1, args.batch):
+        baseline = run(frames, batch, args.steps, **common)
+        frozen = ObservationNormalizer(pipeline)
+        frozen(pipeline(frames))
+        frozen.frozen = True
+        for name, elapsed in (
+            ("pipeline obs + reward", baseline),
+            ("+ ObservationNormalizer", run(frames, batch, args.steps, ObservationNormalizer(pipeline), **common)),
+            ("+ frozen ObservationNormalizer", run(frames, batch, args.steps, frozen, **common)),
+            ("+ RewardNormalizer", run(frames, batch, args.steps, reward_normalizer=RewardNormalizer(reward_function),
+                                       **common)),
+            ("+ both", run(frames, batch, args.steps, ObservationNormalizer(pipeline),
+                           RewardNormalizer(reward_function), **common)),
+        ):
+            print(f"batch {batch:3d} {name:32s}: {elapsed * 1e6:7.2f} us/step  (+{(elapsed - baseline) * 1e6:5.2f})")
+
+
+if __name__ == "__main__":
+    main()
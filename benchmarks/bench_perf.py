@@ -0,0 +1,78 @@
+"""
+Cost of the latency instrumentation, and a breakdown of a headless step.
+
+Times ``LatencyHistogram.record`` on its own, then steps TrackmaniaEnv
+against a lock-step replay (as in ``bench_replay_env``) with
+instrumentation disabled and enabled, and prints the per-stage latencies
+the instrumented run collected.
+
+Usage:
+    python benchmarks/bench_perf.py --steps 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_replay_env import record  # noqa: E402
+from gym_trackmania.bridge.bridge import TelemetryBridge  # noqa: E402
+from gym_trackmania.core.replay import ReplayGameInstance, ReplayTelemetrySource  # noqa: E402
+from gym_trackmania.shared.perf import LatencyHistogram, PerfStats  # noqa: E402
+from gym_trackmania.trackmania_env import TrackmaniaEnv  # noqa: E402
+
+
+def run_env(tmp, path, steps, perf):
+    bridge = TelemetryBridge(log_path=str(Path(tmp) / "replay.log"), transport="udp")
+    source = ReplayTelemetrySource(path, bridge=bridge)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=ReplayGameInstance(source), sync_frames=1, perf=perf)
+    source.start()
+    env.reset()
+    action = np.array([0.0, 1.0, 0.0])
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.step(action)
+    elapsed = time.perf_counter() - start
+    env.close()
+    source.stop()
+    return elapsed / steps, env.get_perf_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000, help="length of the recording")
+    parser.add_argument("--steps", type=int, default=20000)
+    args = parser.parse_args()
+
+    histogram = LatencyHistogram()
+    samples = np.random.default_rng(0).lognormal(np.log(1e-4), 1.0, 200000).tolist()
+    start = time.perf_counter()
+    for sample in samples:
+        histogram.record(sample)
+    print(f"LatencyHistogram.record: {(time.perf_counter() - start) / len(samples) * 1e9:.0f} ns")
+    perf = PerfStats()
+    start = time.perf_counter()
+    for sample in samples:
+        perf.record("ingest", sample)
+    print(f"PerfStats.record:        {(time.perf_counter() - start) / len(samples) * 1e9:.0f} ns")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A track too long to finish, so no step ends an episode
+        path = record(tmp, args.frames, track_length=1e6)
+        disabled, _ = run_env(tmp, path, args.steps, perf=False)
+        enabled, stats = run_env(tmp, path, args.steps, perf=True)
+
+    print(f"step, instrumentation off: {disabled * 1e6:8.1f} us")
+    print(f"step, instrumentation on:  {enabled * 1e6:8.1f} us")
+    print(f"{'stage':<16} {'count':>8} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    for stage, s in stats.items():
+        print(f"{stage:<16} {s['count']:>8} {s['mean'] * 1e6:>9.1f} {s['p50'] * 1e6:>9.1f} "
+              f"{s['p99'] * 1e6:>9.1f} {s['max'] * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
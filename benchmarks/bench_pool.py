@@ -0,0 +1,92 @@
+"""
+Time to get game instances ready and to recover from a dead one, with the
+InstancePool against launching instances one after the other.
+
+Games are simulated by FakePlatform with a ``--boot`` second start-up, and
+navigated through the menus with the real key interval. Measured:
+
+* cold start of ``--instances`` games, sequentially (as the vector env does
+  without a pool) and concurrently by the pool;
+* recovery after killing an active game: the time until its slot is served
+  again, with a warm standby (a swap) and without one (a relaunch).
+
+Usage:
+    python benchmarks/bench_pool.py --instances 4 --boot 2
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.bridge.multiplex import MultiplexTelemetryBridge  # noqa: E402
+from gym_trackmania.core.instance import TrackmaniaGameInstance  # noqa: E402
+from gym_trackmania.core.pool import InstancePool  # noqa: E402
+from gym_trackmania.core.simulated import FakePlatform  # noqa: E402
+
+
+def make_bridge(tmp, n):
+    bridge = MultiplexTelemetryBridge(n, ports=[0] * n, log_path=str(Path(tmp) / "bridge.log"))
+    bridge.start()
+    return bridge
+
+
+def sequential_start(tmp, platform, instances):
+    bridge = make_bridge(tmp, instances)
+    start = time.perf_counter()
+    games = [TrackmaniaGameInstance(bridge.channel(i), platform=platform, address=(bridge.host, bridge.ports[i]))
+             for i in range(instances)]
+    elapsed = time.perf_counter() - start
+    for game in games:
+        game.close()
+    bridge.stop()
+    return elapsed
+
+
+def pool_recovery(tmp, platform, instances, standby):
+    bridge = make_bridge(tmp, instances + standby)
+    factory = lambda channel, address: TrackmaniaGameInstance(channel, platform=platform,  # noqa: E731
+                                                              address=address)
+    pool = InstancePool(bridge, factory, instances, standby=standby, check_interval=0.05)
+    start = time.perf_counter()
+    pool.start()
+    cold = time.perf_counter() - start
+    while pool.standby_ready < standby:
+        time.sleep(0.01)
+
+    lease = pool.leases[0]
+    dead = lease.instance
+    platform.terminate(dead.game_pid)
+    killed = time.perf_counter()
+    while lease.instance is dead:
+        time.sleep(0.001)
+    lease.press_key("up")  # blocks while the slot waits for a relaunch
+    recovery = time.perf_counter() - killed
+    pool.stop()
+    bridge.stop()
+    return cold, recovery
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, default=4)
+    parser.add_argument("--boot", type=float, default=2.0, help="seconds a game takes to reach the main menu")
+    args = parser.parse_args()
+
+    # The instances report every launch step on stdout
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        platform = FakePlatform(boot_time=args.boot)
+        sequential = sequential_start(tmp, platform, args.instances)
+        cold, swap = pool_recovery(tmp, platform, args.instances, standby=1)
+        _, relaunch = pool_recovery(tmp, platform, args.instances, standby=0)
+
+    print(f"cold start of {args.instances} instances: sequential {sequential:.2f} s, pool {cold:.2f} s")
+    print(f"recovery of a dead instance (incl. detection): standby swap {swap:.2f} s, relaunch {relaunch:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
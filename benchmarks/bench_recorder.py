@@ -0,0 +1,82 @@
+"""
+Cost of recording on the bridge's ingest path.
+
+Feeds binary packets into a TelemetryChannel at a fixed rate and times every
+``ingest_packet`` call, once without recording and once with the columnar
+recorder attached (uncompressed and compressed), then reports the call
+latency percentiles, frames written and dropped, and bytes on disk per frame.
+
+Usage:
+    python benchmarks/bench_recorder.py --rate 1000 --seconds 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.bridge.bridge import TelemetryChannel  # noqa: E402
+from gym_trackmania.bridge.recording import TelemetryEpisode  # noqa: E402
+from gym_trackmania.core.simulated import SimulatedTelemetrySource  # noqa: E402
+from gym_trackmania.shared.packet import encode_telemetry  # noqa: E402
+
+
+def packets(n):
+    """``n`` distinct packets of the simulated car accelerating."""
+    source = SimulatedTelemetrySource(address=("127.0.0.1", 0))
+    result = []
+    for seq in range(n):
+        source.press("up")
+        source._advance(0.01)
+        result.append(encode_telemetry(source.telemetry(), seq=seq))
+    return result
+
+
+def run(data, rate, path=None, compress=False):
+    channel = TelemetryChannel()
+    if path is not None:
+        channel.start_recording(path, chunk_size=4096, compress=compress)
+    period = 1.0 / rate
+    latencies = np.empty(len(data))
+    next_tick = time.perf_counter()
+    for i, packet in enumerate(data):
+        start = time.perf_counter()
+        channel.ingest_packet(packet)
+        latencies[i] = time.perf_counter() - start
+        next_tick += period
+        while time.perf_counter() < next_tick:
+            pass
+    recorder = channel.recorder
+    channel.stop_recording()
+    return latencies * 1e6, recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=1000.0, help="packets per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    data = packets(int(args.rate * args.seconds))
+    print(f"{'mode':<12} {'p50 us':>8} {'p99 us':>8} {'p99.9 us':>9} {'written':>8} {'dropped':>8} {'bytes/frame':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, path, compress in (("off", None, False),
+                                     ("npy", Path(tmp) / "npy", False),
+                                     ("npz", Path(tmp) / "npz", True)):
+            latencies, recorder = run(data, args.rate, path, compress)
+            written = dropped = 0
+            size = float("nan")
+            if recorder is not None:
+                written, dropped = recorder.frames_written, recorder.frames_dropped
+                assert len(TelemetryEpisode(path)) == written
+                size = sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / max(written, 1)
+            print(f"{mode:<12} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f} "
+                  f"{np.percentile(latencies, 99.9):>9.2f} {written:>8} {dropped:>8} {size:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Throughput of the prioritized replay buffer at training-session sizes.
+
+* ``add``: transitions inserted one at a time, as ``TrackmaniaEnv`` does,
+  with 1-step and n-step returns;
+* ``sample``: batches drawn with the sum tree, gathered from the columns,
+  then ``update_priorities`` with new TD errors, as a learner does per
+  update;
+* the same with ``alpha=0``, uniform sampling, for reference.
+
+The buffer is prefilled with ``add_batch`` before sampling. ``--path``
+keeps the columns in memory-mapped files, e.g. on an SSD.
+
+Usage:
+    python benchmarks/bench_replay_buffer.py --capacity 1000000 10000000 --batch 256
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.shared.replay_buffer import ReplayBuffer  # noqa: E402
+from gym_trackmania.trackmania_env import make_pipeline  # noqa: E402
+
+CHUNK = 65536
+
+
+def prefill(buffer, rng):
+    obs = rng.standard_normal((CHUNK,) + buffer.obs_shape).astype(np.float32)
+    actions = rng.uniform(-1, 1, (CHUNK,) + buffer.action_shape).astype(np.float32)
+    rewards = rng.standard_normal(CHUNK).astype(np.float32)
+    terminated = rng.random(CHUNK) < 0.001
+    for _ in range(0, buffer.capacity, CHUNK):
+        buffer.add_batch(obs, actions, rewards, obs, terminated)
+
+
+def bench_add(buffer, steps, rng):
+    obs = rng.standard_normal(buffer.obs_shape).astype(np.float32)
+    action = np.zeros(buffer.action_shape, dtype=np.float32)
+    start = time.perf_counter()
+    for i in range(steps):
+        buffer.add(obs, action, 1.0, obs, terminated=i % 1000 == 999)
+    return (time.perf_counter() - start) / steps
+
+
+def bench_sample(buffer, batch, updates, rng):
+    start = time.perf_counter()
+    for _ in range(updates):
+        sample = buffer.sample(batch, rng)
+        buffer.update_priorities(sample.indices, rng.random(batch))
+    return (time.perf_counter() - start) / updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=50000, help="single adds timed")
+    parser.add_argument("--updates", type=int, default=500, help="sample + update_priorities timed")
+    parser.add_argument("--path", type=Path, default=None, help="directory for memory-mapped columns")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pipeline, _ = make_pipeline()
+    obs_shape = (pipeline.size,)
+    for capacity in args.capacity:
+        mb = capacity * (2 * pipeline.size + 5) * 4 / 2 ** 20
+        print(f"capacity {capacity:,} ({obs_shape[0]} features, {mb:,.0f} MB)")
+        with tempfile.TemporaryDirectory(dir=args.path) as directory:
+            for name, kwargs in (("prioritized", {}), ("uniform", {"alpha": 0.0})):
+                path = Path(directory) / name if args.path is not None else None
+                for n_step in (3, 1):
+                    buffer = ReplayBuffer(capacity, obs_shape, n_step=n_step, path=path, **kwargs)
+                    elapsed = bench_add(buffer, args.steps, rng)
+                    print(f"  {name:11s} add, n_step={n_step}     : {elapsed * 1e6:7.2f} us  "
+                          f"({1 / elapsed:,.0f} transitions/s)")
+                start = time.perf_counter()
+                prefill(buffer, rng)
+                print(f"  {name:11s} prefill            : {time.perf_counter() - start:6.2f} s")
+                elapsed = bench_sample(buffer, args.batch, args.updates, rng)
+                print(f"  {name:11s} sample + update {args.batch}: {elapsed * 1e6:7.1f} us  "
+                      f"({args.batch / elapsed:,.0f} samples/s)")
+                del buffer
+
+
+if __name__ == "__main__":
+    main()
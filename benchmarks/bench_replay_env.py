@@ -0,0 +1,77 @@
+"""
+Headless TrackmaniaEnv throughput on a replayed recording.
+
+Records a run of the simulated car through the bridge's recording format,
+then steps TrackmaniaEnv against a lock-step ReplayGameInstance, where each
+step emits exactly one recorded frame and waits for it, so the measured rate
+is the cost of the env's own hot path.
+
+Usage:
+    python benchmarks/bench_replay_env.py --frames 2000 --steps 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.bridge.bridge import TelemetryBridge  # noqa: E402
+from gym_trackmania.core.replay import ReplayGameInstance, ReplayTelemetrySource  # noqa: E402
+from gym_trackmania.core.simulated import SimulatedTelemetrySource  # noqa: E402
+from gym_trackmania.shared.packet import encode_telemetry  # noqa: E402
+from gym_trackmania.trackmania_env import TrackmaniaEnv  # noqa: E402
+
+
+def record(tmp, frames, **kwargs):
+    """
+    Record ``frames`` 10 ms ticks of the simulated car holding the throttle, without waiting in real time.
+    Keyword arguments are passed to SimulatedTelemetrySource.
+    """
+    # Ring large enough that the recorder never falls behind the tight loop below
+    bridge = TelemetryBridge(log_path=str(Path(tmp) / "record.log"), transport="udp", history=frames + 1)
+    source = SimulatedTelemetrySource(bridge, **kwargs)
+    path = Path(tmp) / "run"
+    bridge.start_recording(path)
+    for _ in range(frames):
+        source.press("up")
+        source._advance(0.01)
+        bridge.ingest_packet(encode_telemetry(source.telemetry()))
+    bridge.stop_recording()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000, help="length of the recording")
+    parser.add_argument("--steps", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = record(tmp, args.frames)
+        bridge = TelemetryBridge(log_path=str(Path(tmp) / "replay.log"), transport="udp")
+        source = ReplayTelemetrySource(path, bridge=bridge)
+        env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=ReplayGameInstance(source), sync_frames=1)
+        source.start()
+        env.reset()
+
+        action = np.array([0.0, 1.0, 0.0])
+        latencies = np.empty(args.steps)
+        start = time.perf_counter()
+        for i in range(args.steps):
+            step_start = time.perf_counter()
+            env.step(action)
+            latencies[i] = time.perf_counter() - step_start
+        elapsed = time.perf_counter() - start
+
+    latencies *= 1e6
+    print(f"recording: {len(source.recording)} frames, replayed {source.frames_sent} frames")
+    print(f"steps/s:   {args.steps / elapsed:.0f}")
+    print(f"step us:   p50 {np.percentile(latencies, 50):.1f}  p99 {np.percentile(latencies, 99):.1f}")
+
+
+if __name__ == "__main__":
+    main()
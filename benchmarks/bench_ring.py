@@ -0,0 +1,99 @@
+"""
+TelemetryRing under a synthetic 200Hz writer thread.
+
+A writer thread pushes packets into a TelemetryBridge at ``--rate`` Hz while
+reader threads poll ``get_since`` / ``get_window`` as fast as they can. Each
+packet carries its own sequence number in ``rpm``, so readers can verify that
+every window they get is consistent (no torn or skipped frames).
+
+Usage:
+    python benchmarks/bench_ring.py --rate 200 --readers 2 --seconds 3
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.bridge.bridge import TelemetryBridge  # noqa: E402
+from gym_trackmania.shared.packet import encode_telemetry  # noqa: E402
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+
+
+def writer(bridge, rate, stop, intervals):
+    period = 1.0 / rate
+    next_time = time.monotonic()
+    last = None
+    i = 0
+    while not stop.is_set():
+        bridge.ingest_packet(encode_telemetry(Telemetry(position=[0.0, 0.0, 0.0], rpm=float(i)), seq=i))
+        now = time.monotonic()
+        if last is not None:
+            intervals.append(now - last)
+        last = now
+        i += 1
+        next_time += period
+        time.sleep(max(0.0, next_time - time.monotonic()))
+
+
+def reader(bridge, window, stop, stats):
+    last_seq = -1
+    latencies = []
+    received = 0
+    inconsistent = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        new = bridge.get_since(last_seq)
+        recent = bridge.get_window(window)
+        latencies.append(time.perf_counter() - start)
+        if len(new.seq):
+            if (new.frames["rpm"] != new.seq).any() or (new.seq[0] != last_seq + 1 and last_seq >= 0):
+                inconsistent += 1
+            received += len(new.seq)
+            last_seq = int(new.seq[-1])
+        if len(recent.seq) and (recent.frames["rpm"] != recent.seq).any():
+            inconsistent += 1
+        time.sleep(0)
+    stats.append((received, inconsistent, np.array(latencies)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200.0)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--window", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bridge = TelemetryBridge(log_path=str(Path(tmp) / "bridge.log"), transport="udp")
+        stop = threading.Event()
+        intervals, stats = [], []
+        threads = [threading.Thread(target=writer, args=(bridge, args.rate, stop, intervals))]
+        threads += [threading.Thread(target=reader, args=(bridge, args.window, stop, stats))
+                    for _ in range(args.readers)]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    written = bridge.ring.next_seq
+    intervals = np.array(intervals) * 1000.0
+    print(f"writer: {written / args.seconds:.1f} frames/s, interval p50 {np.percentile(intervals, 50):.2f} ms, "
+          f"p99 {np.percentile(intervals, 99):.2f} ms")
+    for i, (received, inconsistent, latencies) in enumerate(stats):
+        latencies = latencies * 1e6
+        print(f"reader {i}: {len(latencies) / args.seconds:.0f} reads/s, received {received}/{written} frames, "
+              f"{inconsistent} inconsistent windows, read p50 {np.percentile(latencies, 50):.1f} us, "
+              f"p99 {np.percentile(latencies, 99):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+One bridge process serving several consumer processes: frames pickled
+through pipes against a SharedTelemetryRing.
+
+A producer process (standing in for the bridge) writes decoded frames as
+fast as it can for ``--seconds``, and ``--consumers`` processes (standing in
+for env workers and learners) read every frame they can:
+
+* ``pipe``: the producer sends each frame to every consumer over its own
+  ``multiprocessing.Pipe``. Per frame and consumer that is a pickle, a copy
+  into the kernel, a copy out of it and an unpickle.
+* ``shm``: the producer copies each frame once into the shared ring; the
+  consumers read new frames through ``get_since`` views, or with ``--copy``
+  through ``copy_since``, which copies them out once and checks the slot
+  seqlocks.
+
+Each consumer checks that every frame carries its own sequence number in
+``rpm``. Reported are frames delivered per second over all consumers, the
+producer's CPU time per frame, and the copies and bytes moved per delivered
+frame.
+
+Usage:
+    python benchmarks/bench_shm_ring.py --consumers 4 --seconds 3
+"""
+import argparse
+import multiprocessing
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.bridge.shm_ring import SharedTelemetryRing  # noqa: E402
+from gym_trackmania.shared.packet import PACKET_DTYPE  # noqa: E402
+
+RING_CAPACITY = 4096
+PICKLED_SIZE = len(pickle.dumps(np.zeros(1, dtype=PACKET_DTYPE), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def produce_pipe(conns, seconds, start, results):
+    frame = np.zeros(1, dtype=PACKET_DTYPE)
+    start.wait()
+    cpu = time.process_time()
+    deadline = time.monotonic() + seconds
+    n = 0
+    while time.monotonic() < deadline:
+        frame["rpm"] = n
+        for conn in conns:
+            conn.send(frame)
+        n += 1
+    for conn in conns:
+        conn.send(None)
+    results.put(("producer", n, time.process_time() - cpu))
+
+
+def consume_pipe(conn, start, results):
+    start.wait()
+    received = errors = 0
+    while True:
+        frame = conn.recv()
+        if frame is None:
+            break
+        errors += frame["rpm"][0] != received
+        received += 1
+    results.put(("consumer", received, errors))
+
+
+def produce_shm(name, seconds, start, results):
+    ring = SharedTelemetryRing.attach(name)
+    frame = np.zeros(1, dtype=PACKET_DTYPE)
+    start.wait()
+    cpu = time.process_time()
+    deadline = time.monotonic() + seconds
+    n = 0
+    while time.monotonic() < deadline:
+        frame["rpm"] = n
+        ring.write_frame(frame[0], time.monotonic())
+        n += 1
+    results.put(("producer", n, time.process_time() - cpu))
+
+
+def consume_shm(name, copy, start, done, results):
+    ring = SharedTelemetryRing.attach(name)
+    start.wait()
+    last_seq = -1
+    received = errors = 0
+    while True:
+        finished = done.is_set()
+        window = ring.copy_since(last_seq) if copy else ring.get_since(last_seq)
+        if len(window.seq):
+            errors += int(np.count_nonzero(window.frames["rpm"] != window.seq))
+            received += len(window.seq)
+            last_seq = int(window.seq[-1])
+        elif finished:
+            break
+        else:
+            time.sleep(0)
+    results.put(("consumer", received, errors))
+
+
+def run(mode, consumers, seconds, copy=False):
+    ctx = multiprocessing.get_context("fork")
+    start = ctx.Event()
+    results = ctx.Queue()
+    ring = None
+    if mode == "pipe":
+        pipes = [ctx.Pipe(duplex=False) for _ in range(consumers)]
+        procs = [ctx.Process(target=consume_pipe, args=(recv, start, results)) for recv, _ in pipes]
+        procs.append(ctx.Process(target=produce_pipe, args=([send for _, send in pipes], seconds, start, results)))
+    else:
+        ring = SharedTelemetryRing(RING_CAPACITY)
+        done = ctx.Event()
+        procs = [ctx.Process(target=consume_shm, args=(ring.name, copy, start, done, results))
+                 for _ in range(consumers)]
+        procs.append(ctx.Process(target=produce_shm, args=(ring.name, seconds, start, results)))
+    for proc in procs:
+        proc.start()
+    start.set()
+    producer = None
+    received = errors = 0
+    for _ in range(len(procs)):
+        kind, n, value = results.get()
+        if kind == "producer":
+            producer = (n, value)
+            if ring is not None:
+                done.set()
+        else:
+            received += n
+            errors += value
+    for proc in procs:
+        proc.join()
+    if ring is not None:
+        ring.close()
+    return producer, received, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    frame_size = PACKET_DTYPE.itemsize
+    # (label, mode, copy, copies per delivered frame, bytes copied per delivered frame)
+    cases = [
+        ("pipe (pickle)", "pipe", False, 4, 2 * PICKLED_SIZE + 2 * frame_size),
+        ("shm views", "shm", False, 0, 0),
+        ("shm copy_since", "shm", True, 1, frame_size),
+    ]
+    print(f"{args.consumers} consumers, {args.seconds:.0f}s per case; a frame is {frame_size} bytes, "
+          f"{PICKLED_SIZE} pickled")
+    for label, mode, copy, copies, nbytes in cases:
+        (produced, producer_cpu), received, errors = run(mode, args.consumers, args.seconds, copy)
+        # The producer's own writes: pickling per consumer, or one decode plus the mirror copy
+        writer_copies = 0 if mode == "pipe" else 2 * frame_size * produced / max(received, 1)
+        print(f"{label:>15}: {received / args.seconds:>10.0f} frames/s delivered "
+              f"({received / max(produced * args.consumers, 1):.0%} of {produced} produced per consumer), "
+              f"producer {producer_cpu / max(produced, 1) * 1e6:.2f} us/frame, "
+              f"{copies} copies and {nbytes + writer_copies:.0f} bytes moved per delivered frame, "
+              f"{errors} errors")
+
+
+if __name__ == "__main__":
+    main()
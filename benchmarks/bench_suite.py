@@ -0,0 +1,311 @@
+"""
+End-to-end benchmark suite of the telemetry hot path, with machine-readable
+results to track regressions run over run.
+
+Sections, each a set of named metrics:
+
+* ``ingest.<transport>.<rate>hz.x<instances>``: ``loadgen.LoadGenerator``
+  plugins send to a ``TelemetryBridge`` at every combination of ``--rates``
+  and ``--instances``. Reported are the payloads offered, sent and ingested
+  per second, the loss, the latency from send to the frame landing in the
+  telemetry ring (the request round trip over HTTP) and the receiving
+  process's CPU time per frame;
+* ``parse``: ``json.loads``, ``Telemetry.from_dict`` and binary decoding of
+  one payload;
+* ``observation``: the env's ``FeaturePipeline`` and ``RewardFunction``,
+  one frame at a time and in batches;
+* ``env_step``: ``TrackmaniaEnv`` stepping frame-synchronously on a bridge
+  fed by one generated instance at ``--env-rate``, with its step rate, step
+  latency percentiles and the p99 of every instrumented stage.
+
+Metric names end in their unit: ``_per_s`` is better higher, ``_ms``,
+``_us`` and ``_pct`` better lower. ``--output`` writes the results with the
+commit and machine they were measured on; ``--baseline`` compares against a
+previous file and exits with status 1 if any metric but the maxima got
+worse by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/bench_suite.py --rates 10 100 500 --instances 1 8 32 --output results.json
+    python benchmarks/bench_suite.py --baseline results.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from loadgen import TRANSPORTS, LoadGenerator, encode_documents, split_seq, synthesize_documents  # noqa: E402
+from gym_trackmania.bridge.bridge import TelemetryBridge  # noqa: E402
+from gym_trackmania.core.backend import GameBackend  # noqa: E402
+from gym_trackmania.shared.packet import PACKET_DTYPE, decode_into  # noqa: E402
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+from gym_trackmania.trackmania_env import TrackmaniaEnv, make_pipeline  # noqa: E402
+
+RING_HISTORY = 16384        # frames the bridge keeps, so the collector never falls behind
+COLLECT_INTERVAL = 0.01     # seconds between the collector's reads of new frames
+DRAIN_TIME = 0.2            # seconds to wait for the last payloads after the generator is done
+HIGHER_IS_BETTER = ("_per_s",)
+LOWER_IS_BETTER = ("_ms", "_us", "_pct")
+NOT_COMPARED = ("_max_ms",)  # a single outlier: reported, but too noisy to flag
+
+
+class NullGame(GameBackend):
+    """A game that ignores its keys: the generated telemetry does not react to them."""
+
+    def press_key(self, key):
+        pass
+
+    def key_down(self, key):
+        pass
+
+    def key_up(self, key):
+        pass
+
+
+class FrameCollector:
+    def __init__(self, bridge, capacity):
+        """Copies the ``seq`` field and arrival time of every frame the bridge ingests, from a thread."""
+        self.bridge = bridge
+        self.seq = np.zeros(capacity, dtype=np.int64)
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self._last = -1
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._read()
+
+    def _run(self):
+        while not self._stop.wait(COLLECT_INTERVAL):
+            self._read()
+
+    def _read(self):
+        window = self.bridge.get_since(self._last)
+        n = min(len(window.seq), len(self.seq) - self.count)
+        if n <= 0:
+            return
+        self.seq[self.count:self.count + n] = window.frames["seq"][:n]
+        self.timestamp[self.count:self.count + n] = window.timestamp[:n]
+        self._last = int(window.seq[n - 1])
+        self.count += n
+
+
+def percentiles_ms(prefix, seconds):
+    seconds = np.asarray(seconds, dtype=np.float64)
+    if len(seconds) == 0:
+        return {}
+    p50, p99, p999 = np.percentile(seconds, [50, 99, 99.9]) * 1e3
+    return {f"{prefix}_p50_ms": p50, f"{prefix}_p99_ms": p99, f"{prefix}_p999_ms": p999,
+            f"{prefix}_max_ms": seconds.max() * 1e3}
+
+
+def bench_ingest(transport, rate, instances, seconds, documents, log_dir):
+    bridge = TelemetryBridge(port=0, log_path=str(log_dir / f"{transport}.log"), transport=transport,
+                             history=RING_HISTORY)
+    bridge.start()
+    generator = LoadGenerator((bridge.host, bridge.port), transport, rate, instances, seconds, documents)
+    collector = FrameCollector(bridge, generator.frames * instances)
+    try:
+        collector.start()
+        cpu = time.process_time()
+        start = time.monotonic()
+        generator.start()
+        generator.join()
+        sending = time.monotonic() - start
+        time.sleep(DRAIN_TIME)
+        collector.stop()
+        cpu = time.process_time() - cpu
+    finally:
+        bridge.stop()
+
+    sent = int(generator.sent.sum())
+    received = bridge.latest_seq + 1
+    if transport == "http":
+        latencies = generator.times[~np.isnan(generator.times)]
+    else:
+        # Frames matched to their send time by the instance and index in their sequence number
+        instance, index = split_seq(collector.seq[:collector.count])
+        valid = (instance < instances) & (index < generator.frames)
+        latencies = collector.timestamp[:collector.count][valid] - generator.times[instance[valid], index[valid]]
+        latencies = latencies[~np.isnan(latencies)]
+    metrics = {
+        "offered_per_s": rate * instances,
+        "sent_per_s": sent / sending,
+        "ingested_per_s": received / sending,
+        "loss_pct": 100.0 * (sent - received) / sent if sent else 0.0,
+        "cpu_per_frame_us": cpu / max(received, 1) * 1e6,
+    }
+    metrics.update(percentiles_ms("round_trip" if transport == "http" else "latency", latencies))
+    return metrics
+
+
+def time_per_call(fn, items, repeat=3):
+    """Best over ``repeat`` passes of the mean time of ``fn`` over ``items``, in microseconds."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, (time.perf_counter() - start) / len(items))
+    return best * 1e6
+
+
+def bench_parse(documents):
+    bodies, packets = encode_documents(documents)
+    frame = np.zeros(1, dtype=PACKET_DTYPE)
+    return {
+        "json_loads_us": time_per_call(json.loads, bodies),
+        "from_dict_us": time_per_call(Telemetry.from_dict, documents),
+        "decode_binary_us": time_per_call(lambda packet: decode_into(packet, frame), packets),
+    }
+
+
+def bench_observation(documents, batch):
+    _, packets = encode_documents(documents)
+    frames = np.zeros(len(packets), dtype=PACKET_DTYPE)
+    for i, packet in enumerate(packets):
+        decode_into(packet, frames[i:i + 1])
+    pipeline, reward_function = make_pipeline()
+    obs = np.zeros((batch, pipeline.size), dtype=np.float32)
+    prev_obs = np.zeros_like(obs)
+    reward = np.zeros(batch, dtype=np.float64)
+    singles = [frames[i:i + 1] for i in range(len(frames))]
+    batches = [frames[i:i + batch] for i in range(0, len(frames) - batch + 1, batch)]
+    return {
+        "obs_build_us": time_per_call(lambda f: pipeline(f, out=obs[:1]), singles),
+        f"obs_build_batch{batch}_per_frame_us": time_per_call(lambda f: pipeline(f, out=obs), batches) / batch,
+        "reward_us": time_per_call(lambda f: reward_function(obs[:1], prev_obs[:1], out=reward[:1]), singles),
+    }
+
+
+def bench_env_step(rate, seconds, documents, log_dir):
+    bridge = TelemetryBridge(port=0, log_path=str(log_dir / "env.log"), transport="udp")
+    bridge.start()
+    generator = LoadGenerator((bridge.host, bridge.port), "udp", rate, 1, seconds + 1.0, documents)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=NullGame(), sync_frames=1, perf=True)
+    action = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+    step_times = []
+    try:
+        generator.start()
+        bridge.wait_for_seq(0, timeout=5.0)
+        # The generated stream never goes back to the start line: skip reset()'s wait for it
+        env.start()
+        env.first_reset_done = True
+        env.episode_start_time = time.time()
+        env._finish_reset()
+        env.get_perf_stats(reset=True)
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            env.step(action)
+            step_times.append(time.perf_counter() - start)
+        stages = env.get_perf_stats()
+    finally:
+        env.close()
+        generator.join()
+        bridge.stop()
+
+    metrics = {"steps_per_s": len(step_times) / sum(step_times)}
+    metrics.update(percentiles_ms("step", step_times))
+    for stage, summary in stages.items():
+        metrics[f"{stage}_p99_ms"] = summary["p99"] * 1e3
+    return metrics
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=Path(__file__).resolve().parents[1],
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Metrics of ``results`` worse than in ``baseline`` by more than ``tolerance``, as printable lines."""
+    regressions = []
+    for section, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get(section, {}).get(name)
+            if not old or name.endswith(NOT_COMPARED):
+                continue
+            change = (value - old) / abs(old)
+            if name.endswith(HIGHER_IS_BETTER) and change < -tolerance or \
+                    name.endswith(LOWER_IS_BETTER) and change > tolerance:
+                regressions.append(f"{section} {name}: {old:.4g} -> {value:.4g} ({change:+.0%})")
+    return regressions
+
+
+def report(section, metrics):
+    print(section)
+    for name, value in metrics.items():
+        print(f"  {name:32s} {value:12.4g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=["udp"])
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 100, 500], help="Hz per instance")
+    parser.add_argument("--instances", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=2.0, help="per ingest scenario and for env_step")
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--env-rate", type=float, default=200.0, help="telemetry rate while stepping the env")
+    parser.add_argument("--output", type=Path, default=None, help="write the results as JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="compare against a previous --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    documents = synthesize_documents()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        for transport in args.transports:
+            for instances in args.instances:
+                for rate in args.rates:
+                    section = f"ingest.{transport}.{rate:g}hz.x{instances}"
+                    results[section] = bench_ingest(transport, rate, instances, args.seconds, documents, log_dir)
+                    report(section, results[section])
+        for section, metrics in (("parse", bench_parse(documents)),
+                                 ("observation", bench_observation(documents, args.batch)),
+                                 ("env_step", bench_env_step(args.env_rate, args.seconds, documents, log_dir))):
+            results[section] = metrics
+            report(section, metrics)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps({"meta": metadata(args), "results": results}, indent=2, default=str))
+        print(f"Wrote {args.output}")
+    if args.baseline is not None:
+        regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.tolerance)
+        print(f"{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        for line in regressions:
+            print("  " + line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Cost of surface-aware observations: the default pipeline against the same
+with the per-wheel ``surface`` classes and with ``surface_lookahead``
+columns from a ``SurfaceIndex``, one frame at a time and as a batch; the
+cost of raw index lookups; of building an index from recorded frames; and
+of encoding JSON telemetry, whose ground materials are looked up by name.
+
+The frames are a synthetic run over a --size meter square, each wheel on a
+material drawn at random, so the index has --size / cell-size cells a side.
+
+Usage:
+    python benchmarks/bench_surface.py --frames 20000 --batch 32 --size 1024
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench_decode import FIXTURE  # noqa: E402
+from gym_trackmania.shared.features import DEFAULT_FEATURES, FeaturePipeline, surface_lookahead_stage  # noqa: E402
+from gym_trackmania.shared.packet import (FLAG_IN_RACE, FLAG_ON_GROUND, GROUND_MATERIALS,  # noqa: E402
+                                          PACKET_DTYPE, encode_telemetry)
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+from gym_trackmania.shared.surface import SURFACE_CELL_SIZE, SurfaceIndex  # noqa: E402
+
+
+def synthetic_run(n, size, rng):
+    frames = np.zeros(n, dtype=PACKET_DTYPE)
+    frames["flags"] = FLAG_IN_RACE | FLAG_ON_GROUND
+    frames["position"][:, [0, 2]] = rng.uniform(0.0, size, (n, 2))
+    frames["velocity"] = rng.normal(0.0, 30.0, (n, 3))
+    frames["ground_material"] = rng.integers(0, len(GROUND_MATERIALS), (n, 4))
+    frames["wheels"] = rng.uniform(0.0, 1.0, frames["wheels"].shape)
+    return frames
+
+
+def bench(label, fn, count, unit="frame"):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {count / elapsed:>12.0f} {unit}s/s {elapsed / count * 1e6:>8.2f} us/{unit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--size", type=float, default=1024.0, help="edge of the driven square, in meters")
+    parser.add_argument("--cell-size", type=float, default=SURFACE_CELL_SIZE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    run = synthetic_run(args.frames, args.size, rng)
+    start = time.perf_counter()
+    index = SurfaceIndex.from_frames(run, cell_size=args.cell_size)
+    print(f"index of {args.frames} frames, {index.shape[0]}x{index.shape[1]} cells: "
+          f"built in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    pipelines = {
+        "default": FeaturePipeline(DEFAULT_FEATURES),
+        "+ surface": FeaturePipeline(list(DEFAULT_FEATURES) + ["surface"]),
+        "+ surface + lookahead": FeaturePipeline(list(DEFAULT_FEATURES) + ["surface",
+                                                                           surface_lookahead_stage(index)]),
+    }
+    frame = run[:1]
+    n_batches = max(1, args.frames // args.batch)
+    batches = [run[i * args.batch:(i + 1) * args.batch] for i in range(n_batches)]
+    for label, pipeline in pipelines.items():
+        obs = np.empty((1, pipeline.size), dtype=np.float32)
+        batch_obs = np.empty((args.batch, pipeline.size), dtype=np.float32)
+
+        def per_frame():
+            for _ in range(args.frames):
+                pipeline(frame, out=obs)
+
+        def batched():
+            for batch in batches:
+                pipeline(batch, out=batch_obs)
+
+        bench(f"{label} ({pipeline.size}), per frame", per_frame, args.frames)
+        bench(f"{label} ({pipeline.size}), batch {args.batch}", batched, n_batches * args.batch)
+
+    positions = run["position"]
+    bench("index lookup, one position", lambda: [index.lookup(positions[:1]) for _ in range(args.frames)],
+          args.frames, "lookup")
+    bench(f"index lookup, {args.frames} positions", lambda: index.lookup(positions), args.frames, "lookup")
+
+    telemetry = Telemetry.from_dict(json.loads(FIXTURE.read_text()))
+    bench("encode_telemetry", lambda: [encode_telemetry(telemetry) for _ in range(args.frames)], args.frames,
+          "packet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Centerline projections per second with the TrackModel grid index, against a
+vectorized brute-force search over every segment.
+
+The track is a synthetic winding loop; positions are scattered a few meters
+around it, like a car on the road.
+
+Usage:
+    python benchmarks/bench_track.py --length 4000 --batch 1 16 256 4096
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.shared.track import TrackModel, resample_polyline  # noqa: E402
+
+
+def winding_track(length):
+    t = np.linspace(0.0, 2.0 * np.pi, 2000)
+    points = np.stack([300.0 * np.cos(t) + 60.0 * np.cos(7 * t), 10.0 * np.sin(3 * t),
+                       200.0 * np.sin(t) + 60.0 * np.sin(5 * t)], axis=1)
+    arc = np.linalg.norm(np.diff(points, axis=0), axis=1).sum()
+    return resample_polyline(points * (length / arc), spacing=2.0)
+
+
+def brute_force(model, positions):
+    start, vec = model.centerline[:-1], np.diff(model.centerline, axis=0)
+    offset = positions[:, None, :] - start[None]
+    t = np.clip((offset * vec).sum(axis=2) / (vec ** 2).sum(axis=1), 0.0, 1.0)
+    dist = np.linalg.norm(offset - t[..., None] * vec, axis=2)
+    best = dist.argmin(axis=1)
+    return model.cumulative[best]
+
+
+def rate(fn, positions, min_time=0.5):
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        fn(positions)
+        calls += 1
+    return calls * len(positions) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--length", type=float, default=4000.0, help="track length in meters")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16, 256, 4096])
+    args = parser.parse_args()
+
+    centerline = winding_track(args.length)
+    start = time.perf_counter()
+    model = TrackModel(centerline)
+    build = time.perf_counter() - start
+    print(f"track: {model.length:.0f} m, {len(centerline)} points, index built in {build * 1e3:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    print(f"{'batch':>6} {'grid proj/s':>14} {'brute proj/s':>14}")
+    for batch in args.batch:
+        positions = centerline[rng.integers(0, len(centerline), batch)] + rng.normal(0.0, 4.0, (batch, 3))
+        grid = rate(model.project, positions)
+        brute = rate(lambda p: brute_force(model, p), positions) if batch <= 256 else float("nan")
+        print(f"{batch:>6} {grid:>14,.0f} {brute:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare telemetry ingest over HTTP/JSON against the binary UDP and TCP
+transports of TelemetryBridge.
+
+Each frame is sent and then the bridge is polled until it becomes visible
+through ``get_latest_telemetry()``, so the latency covers the whole ingest
+path (transport, parsing and storage).
+
+Usage:
+    python benchmarks/bench_transport.py --frames 2000
+"""
+import argparse
+import http.client
+import json
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.bridge.bridge import TelemetryBridge  # noqa: E402
+from gym_trackmania.shared.packet import encode_telemetry  # noqa: E402
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+
+FIXTURE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "example_telemetry.json"
+
+
+def _wait_for_new(bridge, previous):
+    while bridge.get_latest_telemetry() is previous:
+        time.sleep(0)  # yield the GIL to the ingest thread
+
+
+def run_http(bridge, payloads):
+    conn = http.client.HTTPConnection(bridge.host, bridge.port)
+    headers = {"Content-Type": "application/json"}
+    latencies = []
+    for body in payloads:
+        previous = bridge.get_latest_telemetry()
+        start = time.perf_counter()
+        conn.request("POST", "/telemetry", body=body, headers=headers)
+        conn.getresponse().read()
+        _wait_for_new(bridge, previous)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies
+
+
+def run_socket(bridge, packets, kind):
+    latencies = []
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.connect((bridge.host, bridge.port))
+        for packet in packets:
+            previous = bridge.get_latest_telemetry()
+            start = time.perf_counter()
+            sock.sendall(packet)
+            _wait_for_new(bridge, previous)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    data = json.loads(FIXTURE.read_text())
+    telemetry = Telemetry.from_dict(data)
+    payloads = [json.dumps(data) for _ in range(args.frames)]
+    packets = [encode_telemetry(telemetry, seq=i) for i in range(args.frames)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'transport':<10} {'frames/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for transport in ("http", "udp", "tcp"):
+            bridge = TelemetryBridge(port=0, log_path=str(Path(tmp) / f"{transport}.log"), transport=transport)
+            bridge.start()
+            if transport == "http":
+                latencies = run_http(bridge, payloads)
+            else:
+                kind = socket.SOCK_DGRAM if transport == "udp" else socket.SOCK_STREAM
+                latencies = run_socket(bridge, packets, kind)
+            bridge.stop()
+
+            latencies = np.array(latencies) * 1000.0
+            fps = len(latencies) / (latencies.sum() / 1000.0)
+            print(f"{transport:<10} {fps:>10.0f} {np.percentile(latencies, 50):>8.3f} "
+                  f"{np.percentile(latencies, 99):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Throughput of TrackmaniaVectorEnv as the number of instances grows, each
+instance a simulated telemetry source sending UDP to one multiplexed bridge.
+
+Reports aggregate env-steps per second and per-step latency for N = 1, 2, 4,
+8, 16 (or --num-envs), compared against N independent TrackmaniaEnv objects
+stepped one after another.
+
+Usage:
+    python benchmarks/bench_vector_env.py --rate 100 --steps 200
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.bridge.bridge import TelemetryBridge  # noqa: E402
+from gym_trackmania.bridge.multiplex import MultiplexTelemetryBridge  # noqa: E402
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource  # noqa: E402
+from gym_trackmania.trackmania_env import TrackmaniaEnv  # noqa: E402
+from gym_trackmania.vector_env import TrackmaniaVectorEnv  # noqa: E402
+
+
+def run_vector(tmp, num_envs, rate, steps):
+    bridge = MultiplexTelemetryBridge(num_envs, ports=[0] * num_envs, log_path=str(Path(tmp) / "vector.log"))
+    bridge.start()
+    sources = [SimulatedTelemetrySource(address=(bridge.host, port), rate=rate, transport="tcp") for port in bridge.ports]
+    env = TrackmaniaVectorEnv(num_envs, bridge=bridge,
+                              game_instances=[SimulatedGameInstance(source) for source in sources])
+    for source in sources:
+        source.start()
+    env.reset()
+
+    actions = np.tile([0.0, 1.0, 0.0], (num_envs, 1))
+    latencies = np.empty(steps)
+    start = time.perf_counter()
+    for i in range(steps):
+        step_start = time.perf_counter()
+        env.step(actions)
+        latencies[i] = time.perf_counter() - step_start
+    elapsed = time.perf_counter() - start
+
+    for source in sources:
+        source.stop()
+    env.close()
+    bridge.stop()
+    return num_envs * steps / elapsed, latencies * 1000.0
+
+
+def run_sequential(tmp, num_envs, rate, steps):
+    envs, sources = [], []
+    for i in range(num_envs):
+        bridge = TelemetryBridge(port=0, log_path=str(Path(tmp) / "sequential.log"), transport="udp")
+        source = SimulatedTelemetrySource(bridge, rate=rate)
+        envs.append(TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source),
+                                  sync_frames=1))
+        sources.append(source)
+    for source in sources:
+        source.start()
+    for env in envs:
+        env.reset()
+
+    action = np.array([0.0, 1.0, 0.0])
+    latencies = np.empty(steps)
+    start = time.perf_counter()
+    for i in range(steps):
+        step_start = time.perf_counter()
+        for env in envs:
+            env.step(action)
+        latencies[i] = time.perf_counter() - step_start
+    elapsed = time.perf_counter() - start
+
+    for source in sources:
+        source.stop()
+    for env in envs:
+        env.telemetry_bridge.stop()
+    return num_envs * steps / elapsed, latencies * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=100.0, help="simulated telemetry rate in Hz per instance")
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--num-envs", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'N':>4} {'env-steps/s':>12} {'step p50 ms':>12} {'step p99 ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_envs in args.num_envs:
+            for mode, run in (("vector", run_vector), ("sequential", run_sequential)):
+                throughput, latencies = run(tmp, num_envs, args.rate, args.steps)
+                print(f"{mode:<12} {num_envs:>4} {throughput:>12.1f} {np.percentile(latencies, 50):>12.2f} "
+                      f"{np.percentile(latencies, 99):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
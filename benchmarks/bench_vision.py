@@ -0,0 +1,117 @@
+"""
+Capture-to-observation throughput and memory of image observations, with
+synthetic frames, so it runs on headless Linux.
+
+* ``pipeline``: cost of one ``VisionPipeline`` call (crop, block average,
+  grayscale) on a full frame, next to the naive version that copies the
+  crop and converts it to float first;
+* ``capture``: frames per second a ``FrameCapture`` thread grabs into the
+  shared ring when unthrottled;
+* ``capture -> observation``: a capture thread at ``--rate`` and a consumer
+  turning the newest frame into a stacked observation as fast as it can,
+  as an env stepping on its own; reports observations per second and the
+  age of the frame when its observation was ready.
+
+Memory is the size of the shared ring and of the pipeline's buffers.
+
+Usage:
+    python benchmarks/bench_vision.py --shape 720 1280 --size 64 128 --seconds 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.core.capture import FrameCapture, SyntheticFrameSource  # noqa: E402
+from gym_trackmania.shared.vision import LUMA, VisionPipeline  # noqa: E402
+
+
+def naive(frame, pipeline):
+    height, width, _ = frame.shape
+    top, bottom, left, right = pipeline.crop
+    h, w = pipeline.size
+    crop = frame[int(top * height):int(bottom * height), int(left * width):int(right * width)].astype(np.float32)
+    fy, fx = crop.shape[0] // h, crop.shape[1] // w
+    gray = crop[:fy * h, :fx * w] @ np.array(LUMA, dtype=np.float32)
+    return gray.reshape(h, fy, w, fx).mean(axis=(1, 3)).round().astype(np.uint8)
+
+
+def time_calls(fn, calls):
+    fn()
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", type=int, nargs=2, default=[720, 1280], help="captured frame height, width")
+    parser.add_argument("--size", type=int, nargs=2, default=[64, 128], help="processed image height, width")
+    parser.add_argument("--stack", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=60.0, help="capture rate of the end-to-end run")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    shape = tuple(args.shape) + (3,)
+    source = SyntheticFrameSource(shape)
+    frame = np.empty(shape, dtype=np.uint8)
+    source.grab(frame, 0)
+    pipeline = VisionPipeline(size=tuple(args.size), stack=args.stack)
+    image = np.empty(pipeline.shape, dtype=np.uint8)
+    assert np.abs(pipeline(frame, out=image).astype(int) - naive(frame, pipeline)).max() <= 1
+
+    print(f"frame {shape[0]}x{shape[1]}, image {args.size[0]}x{args.size[1]} x {args.stack}")
+    print(f"  pipeline, naive          : {time_calls(lambda: naive(frame, pipeline), args.calls) * 1e3:6.2f} ms")
+    print(f"  pipeline, VisionPipeline : {time_calls(lambda: pipeline(frame, out=image), args.calls) * 1e3:6.2f} ms")
+    print(f"  grab (synthetic)         : {time_calls(lambda: source.grab(frame, 0), args.calls) * 1e3:6.2f} ms")
+
+    capture = FrameCapture(SyntheticFrameSource(shape), rate=None)
+    try:
+        capture.start()
+        time.sleep(args.seconds)
+        capture.stop()
+        print(f"  capture, unthrottled     : {capture.frames_captured / args.seconds:8.1f} frames/s")
+        ring_bytes = capture.ring.nbytes
+    finally:
+        capture.close()
+
+    capture = FrameCapture(SyntheticFrameSource(shape), rate=args.rate)
+    ring = capture.ring
+    ages = []
+    stack_image = lambda frame: pipeline(frame, out=image)  # noqa: E731
+    try:
+        capture.start()
+        observations = 0
+        last_index = 0
+        end = time.monotonic() + args.seconds
+        while time.monotonic() < end:
+            index = ring.next_index
+            if index == last_index:
+                time.sleep(0.0005)  # no new frame: what an env waiting for telemetry would do
+                continue
+            last_index = index
+            slot = (index - 1) % ring.capacity
+            grabbed = ring.timestamp[slot]
+            if ring.read(None, stack_image) is not None:
+                pipeline.push(image)
+                ages.append(time.monotonic() - grabbed)
+                observations += 1
+        capture.stop()
+        print(f"  capture -> observation   : {observations / args.seconds:8.1f} obs/s at {args.rate:g} frames/s, "
+              f"frame age p50 {np.percentile(ages, 50) * 1e3:.2f} ms, p99 {np.percentile(ages, 99) * 1e3:.2f} ms")
+    finally:
+        capture.close()
+
+    pipeline_bytes = pipeline._buffer.nbytes + pipeline._scratch.nbytes + image.nbytes
+    print(f"  memory: ring {ring_bytes / 2 ** 20:.1f} MB ({ring.capacity} frames), "
+          f"pipeline {pipeline_bytes / 2 ** 10:.1f} kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Load generator for the telemetry bridge: game instances sending what the
+plugin sends.
+
+Payloads are the documents ``plugin/telemetry/send_telemetry_data.as``
+sends: the JSON document of the HTTP transport, shaped like
+``tests/fixtures/example_telemetry.json``, and the binary packet of the UDP
+and TCP transports. They are either synthesized, a car driving laps of a
+winding track with checkpoints, gear changes and wheel slip, or replayed
+from a recording made by the bridge (``--recording``).
+
+A ``LoadGenerator`` runs in its own process and emulates ``instances``
+plugins, each with its own socket (or HTTP connection), each sending
+``rate`` payloads per second for ``seconds``. Every binary packet carries
+its instance in the top 8 bits of its sequence number and its index in the
+low 24, and its send time (``time.monotonic()``) goes into a table shared
+with the parent process, so the receiving side can match every frame in the
+telemetry ring to the moment it was sent. Over HTTP, whose documents carry
+no sequence number, the table holds the round trip of every request.
+
+Run on its own, it drives a bridge started elsewhere, e.g. a live env.
+
+Usage:
+    python benchmarks/loadgen.py --port 5000 --transport udp --rate 100 --instances 8 --seconds 10
+"""
+import argparse
+import copy
+import dataclasses
+import http.client
+import json
+import math
+import mmap
+import multiprocessing
+import socket
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gym_trackmania.shared.packet import encode_telemetry, frame_to_telemetry  # noqa: E402
+from gym_trackmania.shared.schemas import Telemetry  # noqa: E402
+
+FIXTURE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "example_telemetry.json"
+LAP_FRAMES = 2000           # payloads per synthesized lap
+LAP_LENGTH = 1200.0         # meters
+CHECKPOINTS = 6
+INSTANCE_BITS = 8           # top bits of the sequence number: the sending instance
+INDEX_MASK = (1 << (32 - INSTANCE_BITS)) - 1
+MAX_INSTANCES = 1 << INSTANCE_BITS
+SEQ_FIELD = struct.Struct("<I")  # at byte 4 of every packet
+SEQ_OFFSET = 4
+TRANSPORTS = ("udp", "tcp", "http")
+
+
+def synthesize_documents(n=LAP_FRAMES, length=LAP_LENGTH, checkpoints=CHECKPOINTS):
+    """
+    JSON documents of one lap of a winding track, ``n`` frames long, built
+    on the plugin's own document in the test fixture.
+    """
+    template = json.loads(FIXTURE.read_text())
+    template.update(in_main_menu=False, finished=False, engine_on=True, on_ground=True)
+    documents = []
+    for i in range(n):
+        u = i / n
+        # Speed in m/s dips before every checkpoint, like braking into corners
+        speed = 25.0 + 20.0 * math.cos(2 * math.pi * checkpoints * u) + 10.0 * u
+        angle = 2 * math.pi * u + 0.3 * math.sin(2 * math.pi * 3 * u)
+        heading = [math.cos(angle + math.pi / 2), 0.0, math.sin(angle + math.pi / 2)]
+        radius = length / (2 * math.pi)
+        slip = max(0.0, math.sin(2 * math.pi * checkpoints * u)) * 0.4
+        document = copy.deepcopy(template)
+        document.update(
+            position=[radius * math.cos(angle), 9.0 + math.sin(4 * math.pi * u), radius * math.sin(angle)],
+            velocity=[speed * h for h in heading],
+            orientation=heading,
+            speed=speed * 3.6,
+            side_speed=slip * 10.0,
+            rpm=min(11000.0, 3000.0 + (speed % 15.0) * 500.0),
+            gear=1 + min(4, int(speed // 12)),
+            checkpoints={"total": checkpoints, "passed": int(u * checkpoints), "progress": u},
+        )
+        for wheel in document["wheel_states"].values():
+            wheel.update(rotation=speed * 3.0, slip_coef=slip, steer_angle=0.3 * math.sin(2 * math.pi * 3 * u))
+        documents.append(document)
+    return documents
+
+
+def recorded_documents(path):
+    """JSON documents of the frames of a bridge recording, as the plugin would have sent them."""
+    from gym_trackmania.bridge.recording import load_recording
+    return [dataclasses.asdict(frame_to_telemetry(frame)) for frame in load_recording(path).frames]
+
+
+def encode_documents(documents):
+    """The HTTP bodies and binary packets of ``documents``."""
+    bodies = [json.dumps(document).encode() for document in documents]
+    packets = [encode_telemetry(Telemetry.from_dict(document)) for document in documents]
+    return bodies, packets
+
+
+def split_seq(seq):
+    """Instance and index of a load-generator sequence number; works on arrays."""
+    return seq >> (32 - INSTANCE_BITS), seq & INDEX_MASK
+
+
+def _shared_table(shape):
+    """A float64 table shared with forked children, NaN until written."""
+    table = np.frombuffer(mmap.mmap(-1, max(1, int(np.prod(shape))) * 8), dtype=np.float64)
+    table = table[:int(np.prod(shape))].reshape(shape)
+    table[:] = np.nan
+    return table
+
+
+class LoadGenerator:
+    def __init__(self, address, transport="udp", rate=100.0, instances=1, seconds=5.0, documents=None):
+        """
+        Emulated plugins sending to a bridge from a separate process.
+
+        Args:
+            address (tuple): ``(host, port)`` of the bridge.
+            transport (str, optional): "udp", "tcp" or "http", as configured
+                in the plugin. Defaults to "udp".
+            rate (float, optional): Payloads per second of every instance.
+                Defaults to 100.
+            instances (int, optional): Concurrent plugins, at most
+                MAX_INSTANCES. Defaults to 1.
+            seconds (float, optional): How long to send for. Defaults to 5.
+            documents (list, optional): JSON documents to send in a loop,
+                each instance starting at a different one. Defaults to a
+                synthesized lap.
+
+        Raises:
+            ValueError: If the transport or the number of instances is not
+                supported.
+        """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport!r}, expected one of {TRANSPORTS}")
+        if not 1 <= instances <= MAX_INSTANCES:
+            raise ValueError(f"Between 1 and {MAX_INSTANCES} instances are supported, got {instances}")
+        self.address = tuple(address)
+        self.transport = transport
+        self.rate = rate
+        self.instances = instances
+        self.seconds = seconds
+        self.frames = int(rate * seconds)
+        if self.frames > INDEX_MASK + 1:
+            raise ValueError(f"At most {INDEX_MASK + 1} payloads per instance, got {self.frames}")
+        documents = documents if documents is not None else synthesize_documents()
+        self.bodies, self.packets = encode_documents(documents)
+        # Send time of every payload (round trip over HTTP), NaN if it was not sent
+        self.times = _shared_table((instances, self.frames))
+        self._process = None
+
+    def start(self):
+        self._process = multiprocessing.get_context("fork").Process(target=self._run, daemon=True)
+        self._process.start()
+
+    def join(self, timeout=None):
+        if self._process is not None:
+            self._process.join(timeout)
+            self._process = None
+
+    @property
+    def sent(self) -> np.ndarray:
+        """Payloads sent by every instance."""
+        return np.count_nonzero(~np.isnan(self.times), axis=1)
+
+    def _connect(self):
+        if self.transport == "http":
+            return [http.client.HTTPConnection(*self.address) for _ in range(self.instances)]
+        kind = socket.SOCK_DGRAM if self.transport == "udp" else socket.SOCK_STREAM
+        connections = []
+        for _ in range(self.instances):
+            sock = socket.socket(socket.AF_INET, kind)
+            sock.connect(self.address)
+            connections.append(sock)
+        return connections
+
+    def _run(self):
+        connections = self._connect()
+        headers = {"Content-Type": "application/json"}
+        n_payloads = len(self.packets)
+        # Every instance is at its own point of the lap
+        offsets = [instance * n_payloads // self.instances for instance in range(self.instances)]
+        packets = [bytearray(packet) for packet in self.packets]
+        times = self.times
+        period = 1.0 / self.rate
+        next_tick = time.monotonic()
+        try:
+            for index in range(self.frames):
+                for instance, connection in enumerate(connections):
+                    payload = (index + offsets[instance]) % n_payloads
+                    if self.transport == "http":
+                        start = time.monotonic()
+                        connection.request("POST", "/telemetry", body=self.bodies[payload], headers=headers)
+                        connection.getresponse().read()
+                        times[instance, index] = time.monotonic() - start
+                        continue
+                    packet = packets[payload]
+                    SEQ_FIELD.pack_into(packet, SEQ_OFFSET, instance << (32 - INSTANCE_BITS) | index)
+                    times[instance, index] = time.monotonic()
+                    try:
+                        connection.send(packet)
+                    except ConnectionRefusedError:
+                        pass  # nothing listening on the UDP port (yet): the datagram is lost, as the plugin's are
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            for connection in connections:
+                connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--transport", choices=TRANSPORTS, default="udp")
+    parser.add_argument("--rate", type=float, default=100.0, help="payloads per second per instance")
+    parser.add_argument("--instances", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--recording", type=Path, default=None, help="replay this bridge recording")
+    args = parser.parse_args()
+
+    documents = recorded_documents(args.recording) if args.recording is not None else None
+    generator = LoadGenerator((args.host, args.port), args.transport, args.rate, args.instances, args.seconds,
+                              documents)
+    start = time.monotonic()
+    generator.start()
+    generator.join()
+    elapsed = time.monotonic() - start
+    sent = int(generator.sent.sum())
+    print(f"{sent} payloads from {args.instances} instances in {elapsed:.2f} s: {sent / elapsed:,.0f}/s "
+          f"(offered {args.rate * args.instances:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
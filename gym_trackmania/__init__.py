@@ -0,0 +1,27 @@
+"""
+Gymnasium environments for Trackmania.
+
+The envs are exported lazily: ``import gym_trackmania`` loads nothing else,
+and ``gym_trackmania.TrackmaniaEnv`` imports only what that env needs.
+"""
+import importlib
+
+_EXPORTS = {
+    "TrackmaniaEnv": ".trackmania_env",
+    "AsyncTrackmaniaEnv": ".async_env",
+    "TrackmaniaVectorEnv": ".vector_env",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from .trackmania_env import FIRST_RESET_TIMEOUT, RESET_TIMEOUT, STEP_INTERVAL, TrackmaniaEnv, in_race
+
+
+class AsyncTrackmaniaEnv(TrackmaniaEnv):
+    def __init__(self, telemetry_bridge, game_instance=None, sync_frames=1, **kwargs):
+        """
+        TrackmaniaEnv whose ``reset()`` and ``step()`` are coroutines.
+
+        Waiting for telemetry awaits the bridge's ``next_frame()`` instead of
+        blocking a thread, so one event loop can drive many envs at once,
+        e.g. ``await asyncio.gather(*(env.step(a) for env, a in ...))``.
+        Everything else (observations, rewards, controllers, perf stats) is
+        shared with TrackmaniaEnv.
+
+        Args:
+            telemetry_bridge (AsyncTelemetryBridge): A bridge opened on the
+                loop that runs the env.
+            game_instance (GameBackend, optional): See TrackmaniaEnv.
+            sync_frames (int, optional): Fresh frames each step waits for. If
+                0, each step sleeps STEP_INTERVAL. Defaults to 1.
+            **kwargs: Passed to TrackmaniaEnv.
+        """
+        super().__init__(telemetry_bridge=telemetry_bridge, game_instance=game_instance, sync_frames=sync_frames,
+                         **kwargs)
+
+    async def reset(self, seed=None, options=None):
+        super(TrackmaniaEnv, self).reset(seed=seed)
+        self.start()
+
+        self.episode_start_time = time.time()
+
+        if not self.first_reset_done:
+            if self.sync_frames:
+                print("[AsyncTrackmaniaEnv] First reset: waiting for the race to load to skip ghost prompt...")
+                seq, _ = await self.telemetry_bridge.next_frame(predicate=in_race, timeout=FIRST_RESET_TIMEOUT)
+                if seq < 0:
+                    print("[AsyncTrackmaniaEnv] Race not detected in time, continuing anyway.")
+            else:
+                print("[AsyncTrackmaniaEnv] First reset: waiting 15s to skip ghost prompt...")
+                await asyncio.sleep(15)
+            self._skip_ghost_prompt()
+
+        restart_seq = self._restart_race(self._reset_segment(options))
+        if self.sync_frames:
+            seq, _ = await self.telemetry_bridge.next_frame(restart_seq, predicate=self._at_start,
+                                                            timeout=RESET_TIMEOUT)
+            if seq < 0:
+                print("[AsyncTrackmaniaEnv] Restart not detected in time, continuing anyway.")
+        else:
+            await asyncio.sleep(1)
+
+        return self._finish_reset()
+
+    async def step(self, action):
+        action_seq, action_time = self._send_action(action)
+
+        if self.scheduler is not None:
+            target, timeout = self.scheduler.begin(action_seq)
+            if target is None:
+                await asyncio.sleep(timeout)
+            else:
+                await self.telemetry_bridge.next_frame(target - 1, timeout=timeout)
+        elif self.sync_frames:
+            # Wait until enough frames were produced after the action was sent
+            await self.telemetry_bridge.next_frame(action_seq + self.sync_frames - 1, timeout=self.step_timeout)
+        else:
+            await asyncio.sleep(STEP_INTERVAL)
+
+        return self._finish_step(action_seq, action_time)
@@ -0,0 +1,397 @@
+"""
+Telemetry bridge running on an asyncio event loop.
+
+``AsyncTelemetryBridge`` receives the binary ``udp`` and ``tcp`` transports
+with asyncio's datagram and stream servers, so services built on asyncio can
+consume telemetry on their own loop without a thread hop per frame:
+
+    async with AsyncTelemetryBridge(port=5000) as bridge:
+        seq, frame = await bridge.next_frame()
+        async for seq, frame in bridge.stream():
+            ...
+
+It is a ``TelemetryChannel`` like ``TelemetryBridge``, so the synchronous
+read API (``get_window()``, ``wait_for_seq()``, ...) keeps working from other
+threads, and ``start()`` / ``stop()`` run the bridge on a loop of its own in
+a background thread, making it a drop-in replacement for ``TelemetryBridge``.
+"""
+import asyncio
+import threading
+import time
+import weakref
+import numpy as np
+from .bridge import SOCKET_POLL_INTERVAL, TelemetryChannel, create_logger
+from ..shared.packet import DeltaDecoder, copy_frames, encode_rate_request, packet_length
+
+ASYNC_TRANSPORTS = ("udp", "tcp")
+
+
+class TelemetryStream:
+    def __init__(self, bridge, after_seq):
+        """
+        Asynchronous iterator over every frame a bridge receives after
+        ``after_seq``, in order, as ``(seq, frame)`` pairs. Frames are
+        copies, so they stay valid after the ring wraps around.
+
+        Frames the consumer fell too far behind to read before the ring
+        overwrote them are skipped and counted in ``dropped``. With the
+        ``tcp`` transport this does not happen: the bridge stops reading
+        from its connections while a stream lags ``max_lag`` frames behind.
+        """
+        self.bridge = bridge
+        self.last_seq = after_seq
+        self.dropped = 0
+        self._seqs = np.empty(0, dtype=np.int64)
+        self._frames = None
+        self._next = 0
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._next == len(self._seqs):
+            if self._closed:
+                raise StopAsyncIteration
+            await self._refill()
+        i = self._next
+        self._next += 1
+        self.last_seq = int(self._seqs[i])
+        self.bridge._resume_if_caught_up()
+        return self.last_seq, self._frames[i]
+
+    async def _refill(self):
+        bridge = self.bridge
+        while True:
+            window = bridge.ring.get_since(self.last_seq)
+            if len(window.seq):
+                # Copied in one go; the views would be overwritten by later frames
+                self._seqs = window.seq.copy()
+                self._frames = copy_frames(window.frames)
+                self._next = 0
+                self.dropped += int(self._seqs[0]) - self.last_seq - 1
+                return
+            await bridge._wait(None)
+            if self._closed:
+                raise StopAsyncIteration
+
+    def close(self):
+        """Stop iterating after the frames already buffered."""
+        self._closed = True
+        self.bridge._streams.discard(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, bridge):
+        self.bridge = bridge
+
+    def datagram_received(self, data, addr):
+        if packet_length(data) != len(data):
+            self.bridge.logger.error(f"Dropped telemetry datagram of {len(data)} bytes")
+            return
+        self.bridge.ingest_packet(data)
+
+
+class _StreamProtocol(asyncio.Protocol):
+    def __init__(self, bridge):
+        self.bridge = bridge
+        self.buffer = bytearray()
+        self.transport = None
+        self.decoder = DeltaDecoder()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.bridge._connections.add(self)
+        addr = transport.get_extra_info("peername")
+        self.bridge.logger.info(f"[AsyncTelemetryBridge] Telemetry stream connected from {addr[0]}:{addr[1]}")
+        if self.bridge.send_interval_ms is not None:
+            transport.write(encode_rate_request(self.bridge.send_interval_ms))
+        if self.bridge._paused:
+            transport.pause_reading()
+
+    def connection_lost(self, exc):
+        self.bridge._connections.discard(self)
+
+    def data_received(self, data):
+        self.buffer += data
+        self.ingest_buffered()
+
+    def ingest_buffered(self):
+        """
+        Ingest the complete packets received so far. Stops early when the
+        bridge pauses, keeping the rest for when it resumes, so a single
+        large read cannot overrun a lagging stream.
+        """
+        bridge = self.bridge
+        buffer = self.buffer
+        view = memoryview(buffer)
+        start = 0
+        while not bridge._paused:
+            length = packet_length(view[start:])
+            if length is None:
+                if len(buffer) - start >= 3:
+                    bridge.logger.error(f"Bad telemetry stream header {bytes(view[start:start + 3])!r}, "
+                                        "closing connection")
+                    self.transport.close()
+                    start = len(buffer)
+                break
+            if len(buffer) - start < length:
+                break
+            bridge.ingest_packet(view[start:start + length], self.decoder)
+            start += length
+        view.release()
+        del buffer[:start]
+
+
+class AsyncTelemetryBridge(TelemetryChannel):
+    def __init__(self, host="127.0.0.1", port=5000, log_path="bridge.log", transport="udp", history=1024,
+                 max_lag=None):
+        """
+        Telemetry bridge serving the binary transports on an asyncio loop.
+
+        ``open()`` starts the server on the running loop; ``start()`` instead
+        runs it on a new loop in a background thread, for synchronous users.
+        Frames can be fed from any thread with ``ingest_packet()`` /
+        ``ingest_frame()``; waiters on the loop are woken either way.
+
+        Parameters
+        ----------
+        host : str, optional
+            Defaults to "127.0.0.1".
+        port : int, optional
+            Defaults to 5000. With 0 a free port is picked, available as
+            ``self.port`` once open.
+        log_path : str, optional
+            The path to the log file. Defaults to "bridge.log".
+        transport : str, optional
+            "udp" (one binary packet per datagram) or "tcp" (a persistent
+            stream of binary packets). Defaults to "udp".
+        history : int, optional
+            Capacity of the telemetry ring. Defaults to 1024 frames.
+        max_lag : int, optional
+            With the ``tcp`` transport, stop reading from the connections
+            while a stream is this many frames behind, until it has caught
+            up halfway. Defaults to half the history.
+
+        Raises
+        ------
+        ValueError
+            If the transport is not supported.
+        """
+        if transport not in ASYNC_TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport!r}, expected one of {ASYNC_TRANSPORTS}")
+        self.host = host
+        self.port = port
+        self.log_path = log_path
+        self.transport = transport
+        self.max_lag = max_lag or history // 2
+        super().__init__(history=history, logger=create_logger(f"AsyncTelemetryBridge:{port}", log_path))
+
+        self.loop = None
+        self._loop_thread_id = None
+        self._server = None
+        self._connections = set()
+        self._waiters = []
+        self._streams = weakref.WeakSet()
+        self._paused = False
+        self._thread = None
+        self.send_interval_ms = None
+
+    # Serving on the running loop
+
+    async def open(self):
+        """Start serving on the running event loop."""
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        if self.transport == "udp":
+            self._server, _ = await self.loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self), local_addr=(self.host, self.port))
+            self.port = self._server.get_extra_info("sockname")[1]
+        else:
+            self._server = await self.loop.create_server(lambda: _StreamProtocol(self), self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"[AsyncTelemetryBridge] Started on {self.transport}://{self.host}:{self.port}")
+        return self
+
+    async def close(self):
+        """Stop serving and finish any recording in progress."""
+        if self._server is not None:
+            self._server.close()
+            for connection in list(self._connections):
+                connection.transport.close()
+            if self.transport == "tcp":
+                await self._server.wait_closed()
+            self._server = None
+        for stream in list(self._streams):
+            stream.close()
+        self._wake()
+        self.loop = None
+        self.stop_recording()
+        self.logger.info("[AsyncTelemetryBridge] Stopped")
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Synchronous wrapper, serving from a loop in a background thread
+
+    def start(self):
+        """Serve from a new event loop in a background thread."""
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.open(), loop).result()
+
+    def stop(self):
+        """Stop a bridge started with ``start()``."""
+        if self._thread is None:
+            return
+        loop = self.loop
+        asyncio.run_coroutine_threadsafe(self.close(), loop).result(timeout=SOCKET_POLL_INTERVAL * 10)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self._thread = None
+
+    # Ingest
+
+    def _store(self, telemetry):
+        super()._store(telemetry)
+        self._notify()
+
+    def ingest_packet(self, data, decoder=None):
+        super().ingest_packet(data, decoder)
+        self._notify()
+
+    def set_send_rate(self, rate=None) -> bool:
+        """
+        Like ``TelemetryBridge.set_send_rate``: with the ``tcp`` transport,
+        write the request to every connection; ``udp`` returns False.
+        """
+        if self.transport == "udp":
+            return False
+        self.send_interval_ms = None if rate is None else max(1, round(1000.0 / rate))
+        message = encode_rate_request(self.send_interval_ms)
+
+        def send():
+            for connection in list(self._connections):
+                connection.transport.write(message)
+
+        if self.loop is not None:
+            if threading.get_ident() == self._loop_thread_id:
+                send()
+            else:
+                self.loop.call_soon_threadsafe(send)
+        return True
+
+    def ingest_frame(self, frame):
+        super().ingest_frame(frame)
+        self._notify()
+
+    def _notify(self):
+        if self.loop is None:
+            return
+        if threading.get_ident() != self._loop_thread_id:
+            # Always scheduled: checking for waiters from this thread could
+            # miss one registering on the loop at the same time
+            self.loop.call_soon_threadsafe(self._wake)
+            return
+        if self._waiters:
+            self._wake()
+        if self._streams and not self._paused and self.transport == "tcp":
+            self._pause_if_lagging()
+
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _lag(self):
+        return self.ring.next_seq - 1 - min(stream.last_seq for stream in self._streams)
+
+    def _pause_if_lagging(self):
+        if self._lag() >= self.max_lag:
+            self._paused = True
+            for connection in self._connections:
+                connection.transport.pause_reading()
+
+    def _resume_if_caught_up(self):
+        if self._paused and (not self._streams or self._lag() <= self.max_lag // 2):
+            self._paused = False
+            for connection in list(self._connections):
+                connection.ingest_buffered()
+                if not self._paused:
+                    connection.transport.resume_reading()
+
+    # Waiting on the loop
+
+    async def _wait(self, timeout):
+        """Wait until the next frame arrives. Returns False on timeout."""
+        waiter = self.loop.create_future()
+        self._waiters.append(waiter)
+        if timeout is None:
+            await waiter
+            return True
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def next_frame(self, after_seq: int = -1, predicate=None, timeout: float = None):
+        """
+        Wait for the first frame newer than ``after_seq``, without blocking
+        the event loop.
+
+        Parameters
+        ----------
+        after_seq : int, optional
+            Only frames with a greater sequence number are returned. Defaults
+            to -1 (the oldest frame still in the ring).
+        predicate : callable, optional
+            Takes a ``PACKET_DTYPE`` array of frames and returns a boolean
+            array; only matching frames are returned, as in
+            ``wait_for_frame()``.
+        timeout : float, optional
+            Maximum time to wait in seconds. Waits forever if None.
+
+        Returns
+        -------
+        tuple
+            ``(seq, frame)`` with a copy of the ``PACKET_DTYPE`` record, or
+            ``(-1, None)`` on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            window = self.ring.get_since(after_seq)
+            if len(window.seq):
+                if predicate is None:
+                    return int(window.seq[0]), copy_frames(window.frames[:1])[0]
+                matches = np.flatnonzero(predicate(window.frames))
+                if len(matches):
+                    i = matches[0]
+                    return int(window.seq[i]), copy_frames(window.frames[i:i + 1])[0]
+                after_seq = int(window.seq[-1])
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return -1, None
+            await self._wait(remaining)
+
+    def stream(self, after_seq: int = None) -> TelemetryStream:
+        """
+        Iterate over every frame received after ``after_seq``, by default
+        only frames arriving from now on. See ``TelemetryStream``.
+        """
+        stream = TelemetryStream(self, self.latest_seq if after_seq is None else after_seq)
+        self._streams.add(stream)
+        return stream
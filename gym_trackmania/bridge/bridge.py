@@ -1,17 +1,385 @@
 # bridge.py
+import json
 import logging
-from flask import Flask, request
-from threading import Lock
-from shared.schemas import Telemetry
-from waitress import serve
-from threading import Lock, Thread
+import socket
+import time
+import numpy as np
+from .recording import TelemetryRecorder
+from .ring import TelemetryRing, TelemetryWindow
+from .shm_ring import SharedTelemetryRing
+from ..shared.packet import (DELTA_HEADER_SIZE, PACKET_SIZE, DeltaDecoder, encode_rate_request, encode_telemetry,
+                             frame_to_telemetry, packet_length)
+from ..shared.perf import INGEST, PARSE, MetricsServer
+from ..shared.schemas import Telemetry
+from threading import Condition, Lock, Thread
 
-class TelemetryBridge:
-    def __init__(self, host="127.0.0.1", port=5000, log_path="bridge.log"):
+TRANSPORTS = ("http", "udp", "tcp")
+SOCKET_POLL_INTERVAL = 0.5  # seconds between shutdown checks of the socket loops
+SHM_POLL_INTERVAL = 0.0002  # seconds between checks of a shared-memory reader waiting for frames
+
+def create_logger(name, log_path):
+    """Logger writing to ``log_path`` only, shared by the bridge classes."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    file_handler = logging.FileHandler(log_path)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+    logger.propagate = False
+    return logger
+
+
+def update_telemetry_config(path, **settings):
+    """
+    Merge ``settings`` into the plugin's ``TelemetryConfig.json``.
+
+    The plugin reloads its config every few seconds, so this changes e.g.
+    ``send_interval_ms`` or ``heartbeat_interval_ms`` of a running game
+    whose transport has no control channel back from the bridge.
+    """
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    config.update(settings)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=4)
+    return config
+
+
+class TelemetryChannel:
+    def __init__(self, history=1024, logger=None, ring=None):
+        """
+        Telemetry history of a single game instance.
+
+        Received telemetry is kept in a preallocated ``TelemetryRing`` of
+        ``PACKET_DTYPE`` records, so frames arriving between two reads are not
+        lost (see ``get_since()`` and ``get_window()``). Binary packets are
+        copied straight into the ring, and the Telemetry dataclass is only
+        built when ``get_latest_telemetry()`` asks for it. Only writers take
+        ``telemetry_lock``; all read methods are lock-free, and
+        ``wait_for_seq()`` / ``wait_for_frame()`` block until new frames
+        arrive instead of polling. Between ``start_recording()`` and
+        ``stop_recording()`` a background thread also records every frame to
+        disk, for offline use or for ``ReplayTelemetrySource``.
+
+        Binary packets may be keyframes or the delta packets described in
+        ``shared/packet.py``; deltas are expanded to full frames by a
+        ``DeltaDecoder`` before they reach the ring.
+
+        Setting ``perf`` to a ``PerfStats`` records how long each frame takes
+        to ingest (and, for JSON telemetry, to parse); while it is None
+        nothing is timed.
+
+        Parameters
+        ----------
+        history : int, optional
+            Capacity of the telemetry ring. Defaults to 1024 frames.
+        logger : logging.Logger, optional
+            Where parse errors are reported.
+        ring : TelemetryRing, optional
+            The ring to store frames in, e.g. a ``SharedTelemetryRing``
+            readable from other processes. By default a private ring of
+            ``history`` frames is created.
+        """
+        self.ring = TelemetryRing(capacity=history) if ring is None else ring
+        # (seq, Telemetry) of the most recently materialized frame, replaced
+        # as a whole so readers never see a mismatched pair
+        self._telemetry_cache = (-1, None)
+        self.telemetry_lock = Lock()
+        self.new_frame = Condition(self.telemetry_lock)
+        self.logger = logger or logging.getLogger(__name__)
+        self.recorder = None
+        self.perf = None
+        self.decoder = DeltaDecoder()
+
+    def set_send_rate(self, rate=None) -> bool:
+        """
+        Ask the sender to send ``rate`` frames per second, or None for the
+        rate of its own config.
+
+        Only bridges with a channel back to the plugin can do this; the
+        others return False, see ``update_telemetry_config()``.
+
+        Returns
+        -------
+        bool
+            Whether the request could be passed on.
+        """
+        return False
+
+    def _store(self, telemetry: Telemetry):
+        perf = self.perf
+        if perf is not None:
+            start = time.perf_counter()
+        packet = encode_telemetry(telemetry)
+        with self.telemetry_lock:
+            seq = self.ring.write(packet, time.monotonic())
+            self._telemetry_cache = (seq, telemetry)
+            self.new_frame.notify_all()
+        if perf is not None:
+            perf.since(INGEST, start)
+        # Formatted lazily: stringifying the dataclass per frame is expensive
+        self.logger.debug("Telemetry: %s", telemetry)
+
+    def ingest_packet(self, data, decoder=None):
+        """
+        Copy a binary telemetry packet into the telemetry ring and wake up
+        any thread waiting for new frames.
+
+        This is what the ``udp`` and ``tcp`` transports call for every packet,
+        and can be used directly to feed the bridge from a simulated source.
+        Malformed packets are logged and dropped; the socket loops keep running.
+        Deltas without a base (after a lost packet) are dropped until the next
+        keyframe, heartbeats repeat the last frame.
+
+        ``decoder`` is the DeltaDecoder of the connection the packet arrived
+        on, for transports with several concurrent senders; by default the
+        channel's own.
+        """
+        perf = self.perf
+        if perf is not None:
+            start = time.perf_counter()
+        try:
+            data = (decoder or self.decoder).decode(data)
+            if data is None:
+                return
+            with self.telemetry_lock:
+                self.ring.write(data, time.monotonic())
+                self.new_frame.notify_all()
+        except ValueError:
+            self.logger.error("Failed to parse telemetry packet:", exc_info=True)
+            return
+        if perf is not None:
+            perf.since(INGEST, start)
+
+    def ingest_frame(self, frame: np.ndarray):
+        """
+        Like ``ingest_packet`` for an already decoded ``PACKET_DTYPE`` record,
+        e.g. one played back from a recording.
+        """
+        perf = self.perf
+        if perf is not None:
+            start = time.perf_counter()
+        with self.telemetry_lock:
+            self.ring.write_frame(frame, time.monotonic())
+            self.new_frame.notify_all()
+        if perf is not None:
+            perf.since(INGEST, start)
+
+    def start_recording(self, path, **kwargs):
+        """
+        Record every frame received from now on into the episode directory
+        ``path``, from a background thread (see ``bridge.recording`` for the
+        format). Replaces any recording in progress. Keyword arguments are
+        passed to ``TelemetryRecorder``.
+        """
+        self.stop_recording()
+        self.recorder = TelemetryRecorder(self, path, **kwargs)
+        self.recorder.start()
+        self.logger.info(f"Recording telemetry to {path}")
+
+    def stop_recording(self) -> int:
+        """
+        Close the current recording.
+
+        Returns
+        -------
+        int
+            Number of frames recorded, or 0 if no recording was in progress.
+        """
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return 0
+        recorder.stop()
+        self.logger.info(f"Recorded {recorder.frames_written} frames to {recorder.path} "
+                         f"({recorder.frames_dropped} dropped)")
+        return recorder.frames_written
+
+    def get_latest_telemetry(self) -> Telemetry:
+        """
+        Retrieve the latest telemetry data.
+
+        Returns:
+            Telemetry: The most recent telemetry data received, or None if no
+            telemetry data has been received yet.
+        """
+
+        cached_seq, telemetry = self._telemetry_cache
+        if cached_seq != self.ring.next_seq - 1:
+            seq, frame = self.ring.latest()
+            # Racing readers may both decode the same frame, which is harmless
+            telemetry = frame_to_telemetry(frame)
+            self._telemetry_cache = (seq, telemetry)
+        return telemetry
+
+    @property
+    def latest_telemetry(self) -> Telemetry:
+        return self._telemetry_cache[1]
+
+    @latest_telemetry.setter
+    def latest_telemetry(self, telemetry: Telemetry):
+        self._telemetry_cache = (self.ring.next_seq - 1, telemetry)
+
+    def get_latest_frame(self, out: np.ndarray = None) -> np.ndarray:
+        """
+        Retrieve the latest telemetry as a ``PACKET_DTYPE`` record.
+
+        Parameters
+        ----------
+        out : np.ndarray, optional
+            A ``PACKET_DTYPE`` array of shape (1,) to copy the frame into, so
+            callers polling every step do not allocate. A new array is
+            returned if omitted.
+
+        Returns
+        -------
+        np.ndarray or None
+            The frame, or None if no telemetry has been received yet.
+        """
+        _, frame = self.ring.latest(out)
+        return frame
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the most recent frame, or -1 if none arrived yet."""
+        return self.ring.next_seq - 1
+
+    def wait_for_seq(self, seq: int, timeout: float = None) -> bool:
+        """
+        Block until the frame with sequence number ``seq`` has arrived.
+
+        Parameters
+        ----------
+        seq : int
+            Sequence number to wait for, e.g. ``latest_seq + k`` to wait for
+            ``k`` fresh frames.
+        timeout : float, optional
+            Maximum time to wait in seconds. Waits forever if None.
+
+        Returns
+        -------
+        bool
+            True if the frame arrived, False on timeout.
+        """
+        if self.ring.next_seq > seq:
+            return True
+        with self.new_frame:
+            return self.new_frame.wait_for(lambda: self.ring.next_seq > seq, timeout)
+
+    def wait_for_frame(self, predicate, after_seq: int = -1, timeout: float = None) -> int:
+        """
+        Block until a frame newer than ``after_seq`` satisfies ``predicate``.
+
+        Every frame that arrives is checked, not just the latest one at
+        wake-up time, so short-lived states are not missed.
+
+        Parameters
+        ----------
+        predicate : callable
+            Takes a ``PACKET_DTYPE`` array of frames and returns a boolean
+            array, e.g. ``lambda f: f["cp_passed"] == 0``.
+        after_seq : int, optional
+            Only frames with a greater sequence number are checked. Defaults
+            to -1 (every frame still in the ring).
+        timeout : float, optional
+            Maximum time to wait in seconds. Waits forever if None.
+
+        Returns
+        -------
+        int
+            Sequence number of the first matching frame, or -1 on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            window = self.ring.get_since(after_seq)
+            if len(window.seq):
+                matches = np.flatnonzero(predicate(window.frames))
+                if len(matches):
+                    return int(window.seq[matches[0]])
+                after_seq = int(window.seq[-1])
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return -1
+            self.wait_for_seq(after_seq + 1, remaining)
+
+    def get_window(self, n: int) -> TelemetryWindow:
+        """
+        The ``n`` most recent frames with their sequence numbers and arrival
+        timestamps, as zero-copy views. See ``TelemetryRing.get_window``.
+        """
+        return self.ring.get_window(n)
+
+    def get_since(self, seq: int) -> TelemetryWindow:
+        """
+        All frames newer than sequence number ``seq`` (-1 for all), as
+        zero-copy views. See ``TelemetryRing.get_since``.
+        """
+        return self.ring.get_since(seq)
+
+
+class SharedTelemetryChannel(TelemetryChannel):
+    def __init__(self, name, poll_interval=SHM_POLL_INTERVAL, logger=None):
+        """
+        Read-only TelemetryChannel over the ``SharedTelemetryRing`` of a
+        bridge running in another process.
+
+        Frames are read straight out of shared memory, so any number of env
+        workers and learners can consume one bridge without it pickling
+        frames to each of them. It can be handed to TrackmaniaEnv, or
+        anything else expecting a bridge. There is no cross-process
+        notification: ``wait_for_seq()`` and ``wait_for_frame()`` poll every
+        ``poll_interval`` seconds instead.
+
+        Parameters
+        ----------
+        name : str
+            Name of the shared segment, ``bridge.ring.name`` in the bridge
+            process.
+        poll_interval : float, optional
+            Seconds between checks while waiting for frames. Defaults to
+            SHM_POLL_INTERVAL.
+        logger : logging.Logger, optional
+            Where errors are reported.
+        """
+        super().__init__(logger=logger, ring=SharedTelemetryRing.attach(name))
+        self.poll_interval = poll_interval
+
+    def wait_for_seq(self, seq: int, timeout: float = None) -> bool:
+        ring = self.ring
+        if ring.next_seq > seq:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while ring.next_seq <= seq:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError("SharedTelemetryChannel is read-only; frames are written by the bridge process")
+
+    _store = ingest_packet = ingest_frame = _read_only
+
+
+class TelemetryBridge(TelemetryChannel):
+    def __init__(self, host="127.0.0.1", port=5000, log_path="bridge.log", transport="http",
+                 history=1024, shared_memory=None):
         """
         Initializes the TelemetryBridge instance.
 
-        This method initializes a Flask app and sets up logging to a file.
+        This method sets up logging to a file and, for the ``http`` transport,
+        initializes a Flask app. The ``udp`` and ``tcp`` transports accept the
+        fixed-layout binary packets described in ``shared/packet.py`` instead
+        of JSON documents; all transports feed ``get_latest_telemetry()`` and
+        ``get_latest_frame()``.
+
+        Received telemetry is stored and read through the TelemetryChannel
+        API, see there.
 
         Parameters
         ----------
@@ -21,29 +389,47 @@ class TelemetryBridge:
             The port to run the TelemetryBridge on. Defaults to 5000.
         log_path : str, optional
             The path to the log file. Defaults to "bridge.log".
+        transport : str, optional
+            One of "http" (JSON over HTTP POST), "udp" (one binary packet per
+            datagram) or "tcp" (a persistent stream of binary packets).
+            Defaults to "http".
+        history : int, optional
+            Capacity of the telemetry ring. Defaults to 1024 frames.
+        shared_memory : bool or str, optional
+            Keep the ring in a ``SharedTelemetryRing`` so env workers and
+            learners in other processes read frames without copies through
+            ``SharedTelemetryChannel(bridge.ring.name)``. True picks a unique
+            segment name; a string names the segment. The segment is unlinked
+            on ``stop()``. Defaults to None, a private ring.
         """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport!r}, expected one of {TRANSPORTS}")
 
-        self.app = Flask(__name__)
-
-        self.latest_telemetry = None
-        self.telemetry_lock = Lock()
+        self.transport = transport
+        self.app = None
+        if transport == "http":
+            # Only the http transport needs Flask, and it is slow to import
+            from flask import Flask
+            self.app = Flask(__name__)
 
         self.host = host
         self.port = port
         self.log_path = log_path
         self.server_thread = None
+        self._server = None
+        self._running = False
+        self.metrics_server = None
+        self.send_interval_ms = None  # requested by set_send_rate(), None for the plugin's own
+        self._connections = set()     # open tcp connections, to send control messages on
 
         # Set up logging
-        self.logger = logging.getLogger(f"TelemetryBridge:{self.port}")
-        self.logger.setLevel(logging.INFO)
-
-        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
-        file_handler = logging.FileHandler(self.log_path)
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
-
-        self.logger.propagate = False
-        self._setup_routes()
+        ring = None
+        if shared_memory:
+            ring = SharedTelemetryRing(history, name=None if shared_memory is True else shared_memory)
+        super().__init__(history=history, logger=create_logger(f"TelemetryBridge:{self.port}", self.log_path),
+                         ring=ring)
+        if self.app is not None:
+            self._setup_routes()
 
 
     def _setup_routes(self):
@@ -56,47 +442,236 @@ class TelemetryBridge:
         In case of errors during parsing, logs the error and returns an error 
         response.
         """
+        from flask import request
+
         @self.app.route("/telemetry", methods=["POST"])
         def receive_telemetry():
             try:
+                perf = self.perf
+                if perf is not None:
+                    start = time.perf_counter()
                 data = request.get_json()
                 telemetry = Telemetry.from_dict(data)
-                with self.telemetry_lock:
-                    self.latest_telemetry = telemetry
-                self.logger.debug(f"Telemetry: {telemetry}")
+                if perf is not None:
+                    perf.since(PARSE, start)
+                self._store(telemetry)
+                if self.send_interval_ms is not None:
+                    return {"status": "ok", "send_interval_ms": self.send_interval_ms}, 200
                 return {"status": "ok"}, 200
             except Exception as e:
                 self.logger.error("Failed to parse telemetry:", exc_info=True)
                 return {"error": str(e)}, 400
 
-    def get_latest_telemetry(self) -> Telemetry:
+        @self.app.route("/metrics", methods=["GET"])
+        def metrics():
+            if self.perf is None:
+                return "instrumentation disabled\n", 404, {"Content-Type": "text/plain"}
+            return self.perf.to_prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+    def _serve_udp(self):
+        # Oversized buffer so truncated or oversized datagrams are detected
+        buffer = bytearray(PACKET_SIZE * 2)
+        while self._running:
+            try:
+                nbytes, _ = self._server.recvfrom_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if packet_length(buffer) != nbytes:
+                self.logger.error(f"Dropped telemetry datagram of {nbytes} bytes")
+                continue
+            self.ingest_packet(buffer)
+
+    def _serve_tcp(self):
+        while self._running:
+            try:
+                conn, addr = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.logger.info(f"[TelemetryBridge] Telemetry stream connected from {addr[0]}:{addr[1]}")
+            with self.telemetry_lock:
+                self._connections.add(conn)
+                if self.send_interval_ms is not None:
+                    self._send_control(conn, encode_rate_request(self.send_interval_ms))
+            Thread(target=self._read_tcp_stream, args=(conn,), daemon=True).start()
+
+    def _read_tcp_stream(self, conn):
         """
-        Retrieve the latest telemetry data.
+        Read back-to-back binary packets from a persistent TCP connection
+        until the sender disconnects or the bridge is stopped.
 
-        Returns:
-            Telemetry: The most recent telemetry data received, or None if no
-            telemetry data has been received yet.
+        Every packet starts with a ``DELTA_HEADER_SIZE``-byte header giving
+        its length, which is never longer than a keyframe.
         """
+        buffer = bytearray(PACKET_SIZE)
+        view = memoryview(buffer)
+        decoder = DeltaDecoder()
+        conn.settimeout(SOCKET_POLL_INTERVAL)
+        try:
+            while self._running:
+                if not self._recv_exactly(conn, view[:DELTA_HEADER_SIZE]):
+                    return
+                length = packet_length(buffer)
+                if length is None:
+                    self.logger.error(f"Bad telemetry stream header {bytes(buffer[:DELTA_HEADER_SIZE])!r}, "
+                                      "closing connection")
+                    return
+                if not self._recv_exactly(conn, view[DELTA_HEADER_SIZE:length]):
+                    return
+                self.ingest_packet(view[:length], decoder)
+        finally:
+            with self.telemetry_lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def _recv_exactly(self, conn, view) -> bool:
+        """Fill ``view`` from ``conn``; False if it closed or the bridge stopped."""
+        received = 0
+        while received < len(view):
+            try:
+                nbytes = conn.recv_into(view[received:])
+            except socket.timeout:
+                if not self._running:
+                    return False
+                continue
+            except OSError:
+                return False
+            if nbytes == 0:
+                return False
+            received += nbytes
+        return True
+
+    def _send_control(self, conn, message):
+        try:
+            conn.sendall(message)
+        except OSError:
+            self.logger.error("Failed to send a control message to the telemetry sender", exc_info=True)
+
+    def set_send_rate(self, rate=None) -> bool:
+        """
+        Ask the plugin to send ``rate`` frames per second, or None for the
+        ``send_interval_ms`` of its config.
+
+        With the ``tcp`` transport the request is written back on every open
+        connection, and on connections opened later; with ``http`` it is
+        returned in the response to each POST. The ``udp`` transport has no
+        way back and returns False, see ``update_telemetry_config()``.
+
+        Parameters
+        ----------
+        rate : float, optional
+            Frames per second. Defaults to None.
 
+        Returns
+        -------
+        bool
+            Whether the request could be passed on.
+        """
+        if self.transport == "udp":
+            return False
+        interval_ms = None if rate is None else max(1, round(1000.0 / rate))
         with self.telemetry_lock:
-            return self.latest_telemetry
-        
+            self.send_interval_ms = interval_ms
+            connections = list(self._connections)
+        message = encode_rate_request(interval_ms)
+        for conn in connections:
+            self._send_control(conn, message)
+        self.logger.info(f"[TelemetryBridge] Requested send interval {interval_ms} ms")
+        return True
+
     def start(self):
         """
         Start the TelemetryBridge server in a separate thread.
 
         This method initializes and starts a background thread that runs the 
-        TelemetryBridge server using the Waitress WSGI server. The server listens 
-        for incoming telemetry data on the specified host and port. Logs the 
-        server start information for debugging purposes.
+        TelemetryBridge server using the Waitress WSGI server, or a plain socket
+        loop for the binary transports. The server listens for incoming 
+        telemetry data on the specified host and port. The listening socket is
+        bound before this method returns, so passing ``port=0`` picks a free
+        port which is then available as ``self.port``. Logs the server start
+        information for debugging purposes.
         """
+        self._running = True
+        if self.transport == "http":
+            from waitress import create_server
+            self._server = create_server(self.app, host=self.host, port=self.port)
+            self.port = self._server.effective_port
+            run = self._server.run
+        elif self.transport == "udp":
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._server.bind((self.host, self.port))
+            run = self._serve_udp
+        else:
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind((self.host, self.port))
+            self._server.listen()
+            run = self._serve_tcp
 
-        def run():
-            serve(self.app, host=self.host, port=self.port)
+        if self.transport != "http":
+            self._server.settimeout(SOCKET_POLL_INTERVAL)
+            self.port = self._server.getsockname()[1]
 
         self.server_thread = Thread(target=run, daemon=True)
         self.server_thread.start()
-        self.logger.info(f"[TelemetryBridge] Started on http://{self.host}:{self.port}")
+        self.logger.info(f"[TelemetryBridge] Started on {self.transport}://{self.host}:{self.port}")
+
+    def start_metrics_server(self, port=0):
+        """
+        Serve the ``perf`` statistics as Prometheus text on
+        ``http://host:port/metrics``, for any transport. The ``http``
+        transport also serves them on its own port.
+
+        Parameters
+        ----------
+        port : int, optional
+            Defaults to 0, a free port, available as
+            ``self.metrics_server.port``.
+
+        Returns
+        -------
+        MetricsServer
+            The started server.
+
+        Raises
+        ------
+        RuntimeError
+            If instrumentation is disabled (``perf`` is None).
+        """
+        if self.perf is None:
+            raise RuntimeError("Set TelemetryBridge.perf to a PerfStats to serve metrics")
+        self.stop_metrics_server()
+        self.metrics_server = MetricsServer(self.perf, host=self.host, port=port)
+        self.metrics_server.start()
+        self.logger.info(f"[TelemetryBridge] Serving metrics on http://{self.host}:{self.metrics_server.port}/metrics")
+        return self.metrics_server
+
+    def stop_metrics_server(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+    def stop(self):
+        """
+        Stop the TelemetryBridge server, close its listening socket and
+        finish any recording in progress.
+
+        The server thread exits within ``SOCKET_POLL_INTERVAL`` seconds.
+        """
+        self._running = False
+        if self._server is not None:
+            if self.transport == "http":
+                self._server.task_dispatcher.shutdown()
+            self._server.close()
+            self._server = None
+        self.stop_recording()
+        self.stop_metrics_server()
+        if isinstance(self.ring, SharedTelemetryRing):
+            self.ring.close()
+        self.logger.info("[TelemetryBridge] Stopped")
 
     @property
     def app_instance(self):
@@ -1,5 +1,5 @@
 # bridge_server.py
-from bridge import TelemetryBridge
+from gym_trackmania.bridge.bridge import TelemetryBridge
 
 bridge = TelemetryBridge()
 app = bridge.app_instance
\ No newline at end of file
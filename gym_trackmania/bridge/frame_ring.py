@@ -0,0 +1,244 @@
+"""
+Ring of captured screen frames in shared memory, tagged with telemetry.
+
+A ``core.capture.FrameCapture`` thread grabs the game's pixels straight into
+the slots of a ``SharedFrameRing``. Each frame is tagged with the sequence
+number of the newest telemetry frame at the time it was grabbed, so an env
+observing telemetry frame ``seq`` can pick the image that goes with it:
+the newest one tagged at or before ``seq``. Other processes attach to the
+ring by name, like ``SharedTelemetryRing``.
+
+Segment layout (all little-endian, 64-byte aligned sections):
+
+==========================  ==============================================
+header                      int64[8]: magic, layout version, capacity,
+                            height, width, channels, next_index
+versions                    int64[capacity], one seqlock per slot
+telemetry_seq               int64[capacity], tag of every slot
+timestamp                   float64[capacity], time.monotonic() of the grab
+frames                      uint8[capacity, height, width, channels]
+==========================  ==============================================
+
+The writer makes a slot's version odd before grabbing into it and even
+again once the frame and its tags are written, and only then publishes
+``next_index``. A reader that processes a slot and sees the same even
+version before and after has used an intact frame.
+"""
+import struct
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from .shm_ring import open_untracked, unlink_owned, unmap
+
+FRAME_MAGIC = 0x544D4652414D  # "TMFRAM"
+FRAME_LAYOUT_VERSION = 1
+
+_HEADER_WORDS = 8
+_MAGIC, _LAYOUT_VERSION, _CAPACITY, _HEIGHT, _WIDTH, _CHANNELS, _NEXT_INDEX = range(7)
+_ALIGN = 64
+
+
+def _align(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _layout(capacity, shape):
+    """Offsets and total size of a segment for ``capacity`` frames of ``shape``."""
+    versions = _align(_HEADER_WORDS * 8)
+    telemetry_seq = _align(versions + capacity * 8)
+    timestamp = _align(telemetry_seq + capacity * 8)
+    frames = _align(timestamp + capacity * 8)
+    return versions, telemetry_seq, timestamp, frames, frames + capacity * int(np.prod(shape))
+
+
+class SharedFrameRing:
+    def __init__(self, shape=None, capacity=4, name=None, create=True):
+        """
+        Fixed number of the latest captured frames, in a
+        ``multiprocessing.shared_memory`` segment.
+
+        The creating process writes, through ``begin()`` and ``publish()``;
+        other processes attach with ``create=False`` (or
+        ``SharedFrameRing.attach(name)``) and read with ``read()``.
+
+        Parameters
+        ----------
+        shape : tuple, optional
+            ``(height, width, channels)`` of a frame; required when creating.
+        capacity : int, optional
+            Number of frames kept, when creating. A few are enough: readers
+            want the newest frame, and older ones only cover for telemetry
+            arriving ahead of the pixels. Defaults to 4.
+        name : str, optional
+            Name of the segment. A unique name is generated when creating
+            without one; required when attaching.
+        create : bool, optional
+            Create the segment rather than attach to an existing one.
+            Defaults to True.
+
+        Raises
+        ------
+        ValueError
+            If the capacity is too small, the shape is missing, or an
+            attached segment is not a frame ring of this layout.
+        FileNotFoundError
+            If attaching to a segment that does not exist.
+        """
+        if create:
+            if capacity < 2:
+                raise ValueError("SharedFrameRing capacity must be at least 2")
+            if shape is None or len(shape) != 3:
+                raise ValueError(f"A frame shape (height, width, channels) is required, got {shape}")
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=_layout(capacity, shape)[-1])
+        else:
+            self.shm = open_untracked(name)
+            magic, layout_version = struct.unpack_from("<2q", self.shm.buf)
+            if magic != FRAME_MAGIC or layout_version != FRAME_LAYOUT_VERSION:
+                self.shm.close()
+                raise ValueError(f"Shared memory segment {name} is not a frame ring")
+        self.owner = create
+        buffer = self.shm.buf
+        self._header = np.ndarray(_HEADER_WORDS, dtype=np.int64, buffer=buffer)
+        if create:
+            self._header[:] = 0
+            self._header[_MAGIC] = FRAME_MAGIC
+            self._header[_LAYOUT_VERSION] = FRAME_LAYOUT_VERSION
+            self._header[_CAPACITY] = capacity
+            self._header[_HEIGHT:_CHANNELS + 1] = shape
+
+        self.capacity = capacity = int(self._header[_CAPACITY])
+        self.shape = tuple(int(n) for n in self._header[_HEIGHT:_CHANNELS + 1])
+        versions, telemetry_seq, timestamp, frames, _ = _layout(capacity, self.shape)
+        self.versions = np.ndarray(capacity, dtype=np.int64, buffer=buffer, offset=versions)
+        self.telemetry_seq = np.ndarray(capacity, dtype=np.int64, buffer=buffer, offset=telemetry_seq)
+        self.timestamp = np.ndarray(capacity, dtype=np.float64, buffer=buffer, offset=timestamp)
+        self.frames = np.ndarray((capacity,) + self.shape, dtype=np.uint8, buffer=buffer, offset=frames)
+        if create:
+            self.versions[:] = 0
+            self.telemetry_seq[:] = -1
+
+    @classmethod
+    def attach(cls, name) -> "SharedFrameRing":
+        """Attach to the ring another process created under ``name``."""
+        return cls(name=name, create=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def next_index(self) -> int:
+        """Number of frames published so far."""
+        return int(self._header[_NEXT_INDEX])
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the shared segment."""
+        return self.shm.size
+
+    def begin(self) -> int:
+        """
+        Start writing the next slot, overwriting the oldest frame. Grab into
+        ``frames[slot]``, then call ``publish(slot, ...)``.
+
+        Returns
+        -------
+        int
+            The slot to write.
+        """
+        slot = self.next_index % self.capacity
+        self.versions[slot] += 1
+        return slot
+
+    def publish(self, slot: int, telemetry_seq: int, timestamp: float):
+        """
+        Tag the frame written into ``slot`` and make it visible to readers.
+
+        Parameters
+        ----------
+        slot : int
+            The slot ``begin()`` returned.
+        telemetry_seq : int
+            Newest telemetry sequence number when the frame was grabbed, -1
+            if none had arrived.
+        timestamp : float
+            When the frame was grabbed, from ``time.monotonic()``.
+        """
+        self.telemetry_seq[slot] = telemetry_seq
+        self.timestamp[slot] = timestamp
+        self.versions[slot] += 1
+        self._header[_NEXT_INDEX] += 1
+
+    def abort(self, slot: int):
+        """
+        Give up writing ``slot``, e.g. after a failed grab. The half-written
+        frame is tagged so that no telemetry sequence number matches it.
+        """
+        self.telemetry_seq[slot] = np.iinfo(np.int64).max
+        self.versions[slot] += 1
+
+    def write(self, frame: np.ndarray, telemetry_seq: int, timestamp: float) -> int:
+        """Copy ``frame`` into the next slot and publish it; returns the slot."""
+        slot = self.begin()
+        self.frames[slot] = frame
+        self.publish(slot, telemetry_seq, timestamp)
+        return slot
+
+    def find(self, telemetry_seq: int = None) -> int:
+        """
+        Slot of the newest published frame tagged at or before
+        ``telemetry_seq`` (None for the newest frame), or -1 if there is none.
+        """
+        end = self.next_index
+        n = min(end, self.capacity)
+        if n == 0:
+            return -1
+        slots = (end - 1 - np.arange(n)) % self.capacity
+        if telemetry_seq is None:
+            return int(slots[0])
+        matching = np.flatnonzero(self.telemetry_seq[slots] <= telemetry_seq)
+        return int(slots[matching[0]]) if len(matching) else -1
+
+    def read(self, telemetry_seq, fn) -> int:
+        """
+        Call ``fn(frame)`` on the newest frame tagged at or before
+        ``telemetry_seq``, e.g. a ``VisionPipeline`` writing into a buffer
+        of its own. The frame is a view into the shared segment; ``fn`` is
+        called again on a newer match if the writer overwrote it meanwhile.
+        Between retries the thread yields, so the writer can finish.
+
+        Parameters
+        ----------
+        telemetry_seq : int or None
+            Telemetry sequence number to align with, None for the newest.
+        fn : callable
+            Called with a (height, width, channels) uint8 view.
+
+        Returns
+        -------
+        int or None
+            The tag of the frame ``fn`` last ran on, or None if no frame
+            matched and ``fn`` was not called.
+        """
+        while True:
+            slot = self.find(telemetry_seq)
+            if slot < 0:
+                return None
+            version = self.versions[slot]
+            if not version & 1:
+                tag = int(self.telemetry_seq[slot])
+                fn(self.frames[slot])
+                if self.versions[slot] == version:
+                    return tag
+            time.sleep(0)
+
+    def close(self):
+        """
+        Unlink the segment if this process created it, and unmap it. The
+        ring keeps its last frames, copied out, and existing views stay
+        readable; other processes keep the memory until they let go of it.
+        """
+        if self.owner:
+            unlink_owned(self.shm)
+            self.owner = False
+        unmap(self, ("_header", "versions", "telemetry_seq", "timestamp", "frames"))
@@ -0,0 +1,353 @@
+# multiplex.py
+import selectors
+import socket
+from threading import Condition, Thread
+import numpy as np
+from .bridge import SOCKET_POLL_INTERVAL, TelemetryChannel, create_logger
+from .shm_ring import SharedTelemetryRing
+from ..shared.packet import (DELTA_HEADER_SIZE, PACKET_DTYPE, PACKET_SIZE, DeltaDecoder, encode_rate_request,
+                             packet_length)
+
+MULTIPLEX_TRANSPORTS = ("udp", "tcp")
+
+
+class _Stream:
+    """A telemetry connection, read packet by packet without blocking the selector loop."""
+
+    def __init__(self, conn, port_index):
+        self.conn = conn
+        self.port_index = port_index
+        self.buffer = bytearray(PACKET_SIZE)
+        self.view = memoryview(self.buffer)
+        self.filled = 0                   # bytes of the current packet received so far
+        self.needed = DELTA_HEADER_SIZE   # its length, once the header is in
+        self.decoder = DeltaDecoder()     # a new connection starts from a keyframe
+
+
+class MultiplexTelemetryBridge:
+    def __init__(self, num_instances, host="127.0.0.1", base_port=5001, ports=None,
+                 log_path="bridge.log", history=1024, shared_memory=None, transport="tcp"):
+        """
+        Receives binary telemetry for several game instances on one thread.
+
+        Each instance's plugin sends to its own port; a single selector loop
+        serves all of them and routes every packet to the TelemetryChannel of
+        the instance id the port belongs to. The channels expose the same read
+        API as TelemetryBridge, so one can be handed to anything expecting a
+        bridge. ``route()`` redirects a port to another channel while running,
+        which is how an ``InstancePool`` swaps a standby game in behind a
+        channel an env is already reading.
+
+        With the ``tcp`` transport, the plugin's binary transport, every port
+        takes one telemetry stream at a time. A plugin configured with
+        ``binary_port_count`` ports tries them in turn from ``binary_port``
+        and keeps the first one that accepts it, which the bridge confirms
+        with a control message; busy ports close new connections right away.
+        So the ports must be consecutive, the default ``base_port + i``. To
+        decide which port a newly launched game gets, ``claim()`` the port
+        before launching it: until its stream connects, every other port
+        turns new connections away. The ``udp`` transport takes datagrams
+        from any sender, e.g. ``SimulatedTelemetrySource``.
+
+        Parameters
+        ----------
+        num_instances : int
+            Number of game instances.
+        host : str, optional
+            The host to listen on. Defaults to "127.0.0.1".
+        base_port : int, optional
+            Instance ``i`` listens on ``base_port + i``. Defaults to 5001.
+        ports : list of int, optional
+            Explicit port per instance, overriding ``base_port``. Use 0 to let
+            the OS pick; the bound ports are available as ``self.ports`` after
+            ``start()``.
+        log_path : str, optional
+            The path to the log file. Defaults to "bridge.log".
+        history : int, optional
+            Capacity of each channel's telemetry ring. Defaults to 1024 frames.
+        shared_memory : bool or str, optional
+            Keep every channel's ring in a ``SharedTelemetryRing``, readable
+            from other processes with ``SharedTelemetryChannel``. A string is
+            used as a prefix, instance ``i`` getting ``f"{prefix}_{i}"``; True
+            picks unique names. See ``channel(i).ring.name``. Defaults to
+            None, private rings.
+        transport : str, optional
+            "tcp" (a persistent stream of binary packets per port, what the
+            plugin sends) or "udp" (one binary packet per datagram).
+            Defaults to "tcp".
+        """
+        if transport not in MULTIPLEX_TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport!r}, expected one of {MULTIPLEX_TRANSPORTS}")
+        if ports is None:
+            ports = [base_port + i for i in range(num_instances)]
+        if len(ports) != num_instances:
+            raise ValueError(f"Expected {num_instances} ports, got {len(ports)}")
+
+        self.transport = transport
+        self.host = host
+        self.ports = list(ports)
+        self.log_path = log_path
+        self.logger = create_logger(f"MultiplexTelemetryBridge:{self.ports[0]}", log_path)
+        self.channels = []
+        for instance_id in range(num_instances):
+            ring = None
+            if shared_memory:
+                name = None if shared_memory is True else f"{shared_memory}_{instance_id}"
+                ring = SharedTelemetryRing(history, name=name)
+            self.channels.append(TelemetryChannel(history=history, logger=self.logger, ring=ring))
+        # Channel index of every port, by port index
+        self.routes = list(range(num_instances))
+        # Delta state follows the sender, i.e. the port, across re-routes
+        self.decoders = [DeltaDecoder() for _ in range(num_instances)]
+        self.send_interval_ms = None  # requested by set_send_rate(), None for the plugins' own
+
+        self.server_thread = None
+        self._selector = None
+        self._sockets = []
+        self._running = False
+        # tcp: the open stream of every port, and the port a launching game is to connect to
+        self._streams = [None] * num_instances
+        self._claimed = None
+        self._claim = Condition()
+
+    @property
+    def num_instances(self):
+        return len(self.channels)
+
+    def channel(self, instance_id: int) -> TelemetryChannel:
+        """The telemetry channel of one game instance."""
+        return self.channels[instance_id]
+
+    def route(self, port_index: int, channel_index: int):
+        """
+        Deliver the packets arriving on port ``port_index`` to channel
+        ``channel_index`` from now on. A channel should only be fed by one
+        port at a time, or the frames of two games interleave in it.
+        """
+        self.routes[port_index] = channel_index
+        self.logger.info(f"[MultiplexTelemetryBridge] Routing port {self.ports[port_index]} "
+                         f"to channel {channel_index}")
+
+    def claim(self, port_index: int, timeout: float = None) -> bool:
+        """
+        Reserve the next telemetry stream for port ``port_index``: until it
+        connects, or ``release_claim()``, the other ports turn new
+        connections away, so a game launched now ends up on this port
+        whichever free port its plugin tries first. Waits for any other
+        pending claim to end first. A no-op with the ``udp`` transport.
+
+        Returns
+        -------
+        bool
+            False if another claim was still pending after ``timeout``
+            seconds.
+        """
+        if self.transport != "tcp":
+            return True
+        with self._claim:
+            if not self._claim.wait_for(lambda: self._claimed is None, timeout):
+                return False
+            self._claimed = port_index
+        return True
+
+    def release_claim(self, port_index: int):
+        """End the claim of ``port_index`` if its stream has not connected, e.g. because the launch failed."""
+        with self._claim:
+            if self._claimed == port_index:
+                self._claimed = None
+                self._claim.notify_all()
+
+    def is_connected(self, port_index: int) -> bool:
+        """Whether a telemetry stream is open on port ``port_index`` (``tcp`` only)."""
+        return self._streams[port_index] is not None
+
+    def set_send_rate(self, rate=None) -> bool:
+        """
+        Ask every plugin to send ``rate`` frames per second, or None for the
+        ``send_interval_ms`` of its config, on their open streams and on
+        streams connecting later. Only the ``tcp`` transport has a way back
+        to the plugins; ``udp`` returns False.
+        """
+        if self.transport != "tcp":
+            return False
+        interval_ms = None if rate is None else max(1, round(1000.0 / rate))
+        message = encode_rate_request(interval_ms)
+        with self._claim:
+            self.send_interval_ms = interval_ms
+            for stream in self._streams:
+                if stream is not None:
+                    self._send_control(stream, message)
+        self.logger.info(f"[MultiplexTelemetryBridge] Requested send interval {interval_ms} ms")
+        return True
+
+    def _send_control(self, stream, message):
+        try:
+            stream.conn.send(message)
+        except OSError:
+            self.logger.error(f"Failed to send a control message on port {self.ports[stream.port_index]}",
+                              exc_info=True)
+
+    def _serve(self):
+        # Oversized buffer so truncated or oversized datagrams are detected
+        buffer = bytearray(PACKET_SIZE * 2)
+        while self._running:
+            try:
+                events = self._selector.select(SOCKET_POLL_INTERVAL)
+            except (OSError, ValueError):
+                break
+            for key, _ in events:
+                if isinstance(key.data, _Stream):
+                    self._read_stream(key.data)
+                elif self.transport == "tcp":
+                    self._accept(key.fileobj, key.data)
+                else:
+                    try:
+                        nbytes, _ = key.fileobj.recvfrom_into(buffer)
+                    except OSError:
+                        continue
+                    if packet_length(buffer) != nbytes:
+                        self.logger.error(f"Dropped telemetry datagram of {nbytes} bytes for instance {key.data}")
+                        continue
+                    self.channels[self.routes[key.data]].ingest_packet(buffer, self.decoders[key.data])
+
+    def _accept(self, listener, port_index):
+        try:
+            conn, addr = listener.accept()
+        except OSError:
+            return
+        with self._claim:
+            if self._streams[port_index] is not None or self._claimed not in (None, port_index):
+                # Busy, or held for a launching game: the plugin moves on to its next port
+                self.logger.debug(f"[MultiplexTelemetryBridge] Turned away {addr[0]}:{addr[1]} "
+                                  f"on port {self.ports[port_index]}")
+                conn.close()
+                return
+            conn.setblocking(False)
+            stream = _Stream(conn, port_index)
+            self._streams[port_index] = stream
+            self._selector.register(conn, selectors.EVENT_READ, data=stream)
+            # The first control message tells the plugin the port is its own
+            self._send_control(stream, encode_rate_request(self.send_interval_ms))
+            if self._claimed == port_index:
+                self._claimed = None
+                self._claim.notify_all()
+        self.logger.info(f"[MultiplexTelemetryBridge] Telemetry stream connected from {addr[0]}:{addr[1]} "
+                         f"on port {self.ports[port_index]}")
+
+    def _read_stream(self, stream):
+        """Read what has arrived on a stream, ingesting every packet completed."""
+        while True:
+            try:
+                nbytes = stream.conn.recv_into(stream.view[stream.filled:stream.needed])
+            except BlockingIOError:
+                return
+            except OSError:
+                nbytes = 0
+            if nbytes == 0:
+                self._close_stream(stream)
+                return
+            stream.filled += nbytes
+            if stream.filled < stream.needed:
+                continue
+            if stream.needed == DELTA_HEADER_SIZE:
+                length = packet_length(stream.buffer)
+                if length is None:
+                    self.logger.error(f"Bad telemetry stream header {bytes(stream.buffer[:DELTA_HEADER_SIZE])!r} "
+                                      f"on port {self.ports[stream.port_index]}, closing connection")
+                    self._close_stream(stream)
+                    return
+                stream.needed = length
+                if length > DELTA_HEADER_SIZE:
+                    continue
+            self.channels[self.routes[stream.port_index]].ingest_packet(stream.view[:stream.needed],
+                                                                         stream.decoder)
+            stream.filled = 0
+            stream.needed = DELTA_HEADER_SIZE
+
+    def _close_stream(self, stream):
+        with self._claim:
+            if self._streams[stream.port_index] is stream:
+                self._streams[stream.port_index] = None
+        try:
+            self._selector.unregister(stream.conn)
+        except (KeyError, ValueError):
+            pass
+        stream.conn.close()
+        self.logger.info(f"[MultiplexTelemetryBridge] Telemetry stream on port {self.ports[stream.port_index]} "
+                         "closed")
+
+    def start(self):
+        """
+        Bind one socket per instance, listening for a stream (``tcp``) or
+        receiving datagrams (``udp``), and start the selector thread.
+
+        Sockets are bound before this method returns.
+        """
+        self._selector = selectors.DefaultSelector()
+        for instance_id, port in enumerate(self.ports):
+            if self.transport == "tcp":
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind((self.host, port))
+                sock.listen()
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.bind((self.host, port))
+            sock.setblocking(False)
+            self.ports[instance_id] = sock.getsockname()[1]
+            self._selector.register(sock, selectors.EVENT_READ, data=instance_id)
+            self._sockets.append(sock)
+
+        self._running = True
+        self.server_thread = Thread(target=self._serve, daemon=True)
+        self.server_thread.start()
+        self.logger.info(f"[MultiplexTelemetryBridge] Started {self.num_instances} instances on "
+                         f"{self.transport}://{self.host}:{','.join(map(str, self.ports))}")
+
+    def stop(self):
+        """Stop the selector thread, close all sockets and finish any recordings."""
+        self._running = False
+        if self.server_thread is not None:
+            self.server_thread.join()
+            self.server_thread = None
+        for stream in self._streams:
+            if stream is not None:
+                stream.conn.close()
+        self._streams = [None] * self.num_instances
+        for sock in self._sockets:
+            sock.close()
+        self._sockets = []
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        for channel in self.channels:
+            channel.stop_recording()
+            if isinstance(channel.ring, SharedTelemetryRing):
+                channel.ring.close()
+        self.logger.info("[MultiplexTelemetryBridge] Stopped")
+
+    def gather_latest(self, frames: np.ndarray, seqs: np.ndarray, timestamps: np.ndarray):
+        """
+        Copy every channel's most recent frame into batch buffers. Only the
+        first ``len(frames)`` channels are read, e.g. an InstancePool's
+        active slots without its standbys.
+
+        Parameters
+        ----------
+        frames : np.ndarray
+            ``PACKET_DTYPE`` array of shape (N,).
+        seqs : np.ndarray
+            int64 array of shape (N,); -1 where no telemetry arrived yet.
+        timestamps : np.ndarray
+            float64 array of shape (N,) of arrival times.
+        """
+        for i, channel in enumerate(self.channels[:len(frames)]):
+            window = channel.get_window(1)
+            if len(window.seq):
+                frames[i] = window.frames[0]
+                seqs[i] = window.seq[0]
+                timestamps[i] = window.timestamp[0]
+            else:
+                frames[i] = np.zeros((), dtype=PACKET_DTYPE)
+                seqs[i] = -1
+                timestamps[i] = np.nan
@@ -0,0 +1,330 @@
+"""
+Columnar on-disk telemetry recordings written by the bridge.
+
+A recording is an episode directory holding the frames received between
+``start_recording()`` and ``stop_recording()``, split into chunks of up to
+``chunk_size`` frames with one array per column:
+
+    episode/
+        meta.json               chunk lengths, column dtypes, vocabularies
+        chunk_00000/            uncompressed chunk, one .npy file per column
+            bridge_seq.npy
+            timestamp.npy
+            position.npy
+            ...
+        chunk_00001.npz         compressed chunk (``compress=True``)
+
+The columns are ``bridge_seq`` (the bridge's sequence number), ``timestamp``
+(``time.monotonic()`` at arrival) and every ``PACKET_DTYPE`` field except the
+constant ``magic`` and ``version``. String fields such as ``ground_material``
+are stored as their uint8 vocabulary codes; the vocabularies are saved in
+``meta.json`` so a recording stays readable if they change.
+
+Uncompressed chunks are memory-mapped by the reader, so columns are read
+without copying. A directory of episode directories is a dataset.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple
+import numpy as np
+from ..shared.packet import (FALLING_STATES, GROUND_MATERIALS, PACKET_DTYPE, PACKET_MAGIC, PACKET_VERSION,
+                             REACTOR_BOOST_LEVELS, REACTOR_BOOST_TYPES, UNKNOWN_CODE, VEHICLE_TYPES)
+
+RECORDING_FORMAT = "trackmania-telemetry"
+RECORDING_VERSION = 2
+META_FILE = "meta.json"
+CHUNK_SIZE = 65536           # frames per chunk, ~11 minutes at 100 Hz
+FLUSH_INTERVAL = 0.1         # seconds between polls of the telemetry ring
+
+VOCABULARIES = {
+    "vehicle_type": VEHICLE_TYPES,
+    "reactor_boost_level": REACTOR_BOOST_LEVELS,
+    "reactor_boost_type": REACTOR_BOOST_TYPES,
+    "ground_material": GROUND_MATERIALS,
+    "falling_state": FALLING_STATES,
+}
+
+_CONSTANT_FIELDS = ("magic", "version")
+_RECORD_DTYPE = np.dtype(
+    [("bridge_seq", "<i8"), ("timestamp", "<f8")]
+    + [(name, PACKET_DTYPE.fields[name][0]) for name in PACKET_DTYPE.names if name not in _CONSTANT_FIELDS]
+)
+COLUMNS = _RECORD_DTYPE.names
+
+
+class TelemetryRecording(NamedTuple):
+    """Frames of a recording, oldest first."""
+    timestamp: np.ndarray  # float64, arrival time of each frame
+    frames: np.ndarray     # PACKET_DTYPE records
+
+    def __len__(self):
+        return len(self.frames)
+
+
+def _chunk_name(index):
+    return f"chunk_{index:05d}"
+
+
+class TelemetryRecorder:
+    def __init__(self, channel, path, chunk_size=CHUNK_SIZE, compress=False, flush_interval=FLUSH_INTERVAL):
+        """
+        Records every frame a TelemetryChannel receives, from a background
+        thread.
+
+        The ingest path does no extra work: the writer thread periodically
+        copies the frames that arrived since its last poll out of the
+        channel's telemetry ring and writes them out a chunk at a time. If it
+        falls more than the ring's capacity behind, the overwritten frames are
+        counted in ``frames_dropped`` rather than stalling the bridge.
+
+        Parameters
+        ----------
+        channel : TelemetryChannel
+            The channel to record.
+        path : str or Path
+            Episode directory to create.
+        chunk_size : int, optional
+            Frames per chunk. Defaults to CHUNK_SIZE.
+        compress : bool, optional
+            Write chunks as compressed ``.npz`` files. They are smaller but
+            are decompressed into memory when read. Defaults to False.
+        flush_interval : float, optional
+            Seconds between polls of the ring. Must be short enough for the
+            ring to hold the frames received in that time. Defaults to
+            FLUSH_INTERVAL.
+
+        Raises
+        ------
+        FileExistsError
+            If ``path`` already exists.
+        """
+        self.channel = channel
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.chunk_lengths = []
+
+        self.path.mkdir(parents=True)
+        self._buffer = np.zeros(chunk_size, dtype=_RECORD_DTYPE)
+        self._buffered = 0
+        self._last_seq = channel.latest_seq
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._write_meta()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write out everything received so far and stop the writer thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+        self._write_chunk()
+
+    def _drain(self):
+        ring = self.channel.ring
+        window = ring.get_since(self._last_seq)
+        n = len(window.seq)
+        if n == 0:
+            return
+        first = int(window.seq[0])
+        staged = np.empty(n, dtype=_RECORD_DTYPE)
+        staged["bridge_seq"] = window.seq
+        staged["timestamp"] = window.timestamp
+        for name in COLUMNS[2:]:
+            staged[name] = window.frames[name]
+
+        # Frames the writer overwrote while they were being copied are torn
+        oldest_intact = ring.next_seq - ring.capacity + 1
+        torn = max(0, min(n, oldest_intact - first))
+        self.frames_dropped += (first - self._last_seq - 1) + torn
+        self._last_seq = first + n - 1
+        self._append(staged[torn:])
+
+    def _append(self, records):
+        while len(records):
+            n = min(len(records), self.chunk_size - self._buffered)
+            self._buffer[self._buffered:self._buffered + n] = records[:n]
+            self._buffered += n
+            records = records[n:]
+            if self._buffered == self.chunk_size:
+                self._write_chunk()
+
+    def _write_chunk(self):
+        if self._buffered == 0:
+            return
+        records = self._buffer[:self._buffered]
+        name = _chunk_name(len(self.chunk_lengths))
+        if self.compress:
+            np.savez_compressed(self.path / name, **{column: records[column] for column in COLUMNS})
+        else:
+            chunk_dir = self.path / name
+            chunk_dir.mkdir()
+            for column in COLUMNS:
+                np.save(chunk_dir / f"{column}.npy", np.ascontiguousarray(records[column]))
+        self.chunk_lengths.append(self._buffered)
+        self.frames_written += self._buffered
+        self._buffered = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "format": RECORDING_FORMAT,
+            "version": RECORDING_VERSION,
+            "compressed": self.compress,
+            "chunks": self.chunk_lengths,
+            "frames_dropped": self.frames_dropped,
+            "columns": {name: [_RECORD_DTYPE.fields[name][0].base.str, list(_RECORD_DTYPE.fields[name][0].shape)]
+                        for name in COLUMNS},
+            "vocabularies": {name: list(vocabulary) for name, vocabulary in VOCABULARIES.items()},
+        }
+        # Written to a temporary file first so readers never see half a file
+        tmp = self.path / (META_FILE + ".tmp")
+        tmp.write_text(json.dumps(meta, indent=1))
+        os.replace(tmp, self.path / META_FILE)
+
+
+class TelemetryEpisode:
+    def __init__(self, path, mmap=True):
+        """
+        Read-only view of an episode directory written by TelemetryRecorder.
+
+        Parameters
+        ----------
+        path : str or Path
+            The episode directory.
+        mmap : bool, optional
+            Memory-map uncompressed chunks instead of reading them into
+            memory. Defaults to True.
+
+        Raises
+        ------
+        ValueError
+            If ``path`` is not a recording of a supported version.
+        """
+        self.path = Path(path)
+        try:
+            self.meta = json.loads((self.path / META_FILE).read_text())
+        except (OSError, ValueError) as e:
+            raise ValueError(f"{path} is not a telemetry recording") from e
+        if self.meta.get("format") != RECORDING_FORMAT or self.meta.get("version") != RECORDING_VERSION:
+            raise ValueError(f"Unsupported telemetry recording {self.meta.get('format')} "
+                             f"version {self.meta.get('version')}")
+        self.vocabularies = {name: tuple(v) for name, v in self.meta["vocabularies"].items()}
+        self.chunks = [self._load_chunk(i, mmap) for i in range(len(self.meta["chunks"]))]
+
+    def _load_chunk(self, index, mmap):
+        name = _chunk_name(index)
+        if self.meta["compressed"]:
+            with np.load(self.path / f"{name}.npz") as npz:
+                return {column: npz[column] for column in self.meta["columns"]}
+        return {column: np.load(self.path / name / f"{column}.npy", mmap_mode="r" if mmap else None)
+                for column in self.meta["columns"]}
+
+    def __len__(self):
+        return sum(self.meta["chunks"])
+
+    @property
+    def columns(self):
+        return tuple(self.meta["columns"])
+
+    def column(self, name) -> np.ndarray:
+        """
+        One column for the whole episode.
+
+        Zero-copy (a view of the memory-mapped file) when the episode has a
+        single chunk; otherwise the chunks are concatenated.
+        """
+        parts = [chunk[name] for chunk in self.chunks]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            dtype, shape = self.meta["columns"][name]
+            return np.empty((0, *shape), dtype=dtype)
+        return np.concatenate(parts)
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.column(name)
+
+    def decode(self, name) -> np.ndarray:
+        """
+        Strings of a dictionary-encoded column, e.g. ``decode("ground_material")``.
+
+        Unknown codes become "Unknown_<code>", and UNKNOWN_CODE becomes "".
+        """
+        vocabulary = self.vocabularies[name]
+        table = np.array(list(vocabulary) + [f"Unknown_{code}" for code in range(len(vocabulary), 256)],
+                         dtype=object)
+        table[UNKNOWN_CODE] = ""
+        return table[self.column(name)]
+
+    def frames(self) -> np.ndarray:
+        """The episode as ``PACKET_DTYPE`` records (a copy)."""
+        frames = np.zeros(len(self), dtype=PACKET_DTYPE)
+        frames["magic"] = PACKET_MAGIC
+        frames["version"] = PACKET_VERSION
+        for name in PACKET_DTYPE.names:
+            if name not in _CONSTANT_FIELDS:
+                frames[name] = self.column(name)
+        return frames
+
+
+class TelemetryDataset:
+    def __init__(self, root, mmap=True):
+        """
+        All episodes under ``root``, in name order.
+
+        ``root`` may itself be an episode directory. Directories that are not
+        recordings are skipped.
+        """
+        root = Path(root)
+        if (root / META_FILE).exists():
+            paths = [root]
+        else:
+            paths = sorted(p for p in root.iterdir() if (p / META_FILE).exists())
+        self.episodes = [TelemetryEpisode(path, mmap=mmap) for path in paths]
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def __iter__(self):
+        return iter(self.episodes)
+
+    def iter_column(self, name):
+        """Zero-copy chunks of one column across all episodes, in order."""
+        for episode in self.episodes:
+            for chunk in episode.chunks:
+                yield chunk[name]
+
+    def column(self, name) -> np.ndarray:
+        """One column across all episodes, concatenated; empty, of the recorder's dtype, without episodes."""
+        if not self.episodes:
+            dtype = _RECORD_DTYPE.fields[name][0]
+            return np.empty((0, *dtype.shape), dtype=dtype.base)
+        return np.concatenate([episode.column(name) for episode in self.episodes])
+
+
+def load_recording(path, mmap=True) -> TelemetryRecording:
+    """
+    Frames of an episode as PACKET_DTYPE records, for replaying it.
+
+    Raises
+    ------
+    ValueError
+        If ``path`` is not a recording of a supported version.
+    """
+    episode = TelemetryEpisode(path, mmap=mmap)
+    return TelemetryRecording(np.asarray(episode.column("timestamp")), episode.frames())
@@ -0,0 +1,147 @@
+# ring.py
+from typing import NamedTuple
+import numpy as np
+from ..shared.packet import PACKET_DTYPE, decode_into
+
+
+class TelemetryWindow(NamedTuple):
+    """Consecutive frames from a TelemetryRing, as views into the ring."""
+    seq: np.ndarray        # int64, monotonic sequence numbers assigned by the ring
+    timestamp: np.ndarray  # float64, time.monotonic() at arrival
+    frames: np.ndarray     # PACKET_DTYPE records
+
+
+class TelemetryRing:
+    def __init__(self, capacity=1024):
+        """
+        Fixed-capacity history of the most recent telemetry frames.
+
+        The ring has a single writer and any number of readers. Readers never
+        take a lock: the writer fills a slot completely and only then publishes
+        it by advancing ``next_seq``, which readers sample once per call. A
+        frame stays intact while fewer than ``capacity - 1`` newer frames have
+        been written, so windows are limited to ``capacity - 1`` frames.
+
+        Every frame is stored twice, at ``slot`` and ``slot + capacity``, so
+        any window of up to ``capacity`` frames is one contiguous slice and can
+        be returned as a view without copying.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            Number of frames kept. Defaults to 1024.
+        """
+        if capacity < 2:
+            raise ValueError("TelemetryRing capacity must be at least 2")
+        self.capacity = capacity
+        self.frames = np.zeros(2 * capacity, dtype=PACKET_DTYPE)
+        self.seq = np.full(2 * capacity, -1, dtype=np.int64)
+        self.timestamp = np.zeros(2 * capacity, dtype=np.float64)
+        self.next_seq = 0
+
+    def write(self, data, timestamp: float) -> int:
+        """
+        Decode a binary packet into the next slot and publish it.
+
+        Must only be called from one thread at a time.
+
+        Parameters
+        ----------
+        data : bytes-like
+            A binary telemetry packet.
+        timestamp : float
+            Arrival time, from ``time.monotonic()``.
+
+        Returns
+        -------
+        int
+            The sequence number assigned to the frame.
+
+        Raises
+        ------
+        ValueError
+            If the packet is malformed. Nothing is published in that case.
+        """
+        seq = self.next_seq
+        slot = seq % self.capacity
+        decode_into(data, self.frames[slot:slot + 1])
+        return self._publish(seq, slot, timestamp)
+
+    def write_frame(self, frame: np.ndarray, timestamp: float) -> int:
+        """
+        Copy an already decoded ``PACKET_DTYPE`` record into the next slot
+        and publish it. See ``write``.
+        """
+        seq = self.next_seq
+        slot = seq % self.capacity
+        self.frames[slot] = frame
+        return self._publish(seq, slot, timestamp)
+
+    def _publish(self, seq, slot, timestamp):
+        mirror = slot + self.capacity
+        self.frames[mirror] = self.frames[slot]
+        self.seq[slot] = self.seq[mirror] = seq
+        self.timestamp[slot] = self.timestamp[mirror] = timestamp
+        self.next_seq = seq + 1
+        return seq
+
+    def __len__(self):
+        return min(self.next_seq, self.capacity - 1)
+
+    def is_intact(self, seq: int) -> bool:
+        """Whether the frame with sequence number ``seq`` has not been overwritten yet."""
+        return self.next_seq - self.capacity < seq < self.next_seq
+
+    def _window(self, head, n):
+        start = (head - n) % self.capacity
+        end = start + n
+        return TelemetryWindow(self.seq[start:end], self.timestamp[start:end], self.frames[start:end])
+
+    def get_window(self, n: int) -> TelemetryWindow:
+        """
+        The ``n`` most recent frames, oldest first.
+
+        Fewer frames are returned if the ring holds fewer. The arrays are
+        views into the ring and are overwritten once the writer wraps around;
+        copy them, or check ``is_intact(window.seq[0])`` after use, when they
+        need to outlive roughly ``capacity - n`` further frames.
+        """
+        head = self.next_seq
+        n = max(0, min(n, head, self.capacity - 1))
+        return self._window(head, n)
+
+    def get_since(self, seq: int) -> TelemetryWindow:
+        """
+        All frames with a sequence number greater than ``seq``, oldest first.
+
+        Pass -1 to get everything in the ring. If the reader fell more than
+        ``capacity - 1`` frames behind, the oldest frames are gone and the
+        window starts later than ``seq + 1``. Same aliasing rules as
+        ``get_window``.
+        """
+        head = self.next_seq
+        n = max(0, min(head - seq - 1, head, self.capacity - 1))
+        return self._window(head, n)
+
+    def latest(self, out: np.ndarray = None):
+        """
+        Copy the most recent frame into ``out``.
+
+        Returns
+        -------
+        tuple of (int, np.ndarray)
+            The frame's sequence number and ``out`` (a new array if omitted),
+            or (-1, None) if nothing has been written yet.
+        """
+        if out is None:
+            out = np.empty(1, dtype=PACKET_DTYPE)
+        while True:
+            seq = self.next_seq - 1
+            if seq < 0:
+                return -1, None
+            slot = seq % self.capacity
+            out[0] = self.frames[slot]
+            # The writer only reuses this slot after capacity - 1 more frames;
+            # if that happened during the copy, read the new latest frame instead.
+            if self.is_intact(seq):
+                return seq, out
@@ -0,0 +1,266 @@
+"""
+Telemetry ring in shared memory, for consumers in other processes.
+
+A ``TelemetryBridge`` created with ``shared_memory`` decodes frames into a
+``SharedTelemetryRing`` instead of a private ``TelemetryRing``. Env workers
+and learner processes on the same node attach to it by name with
+``bridge.bridge.SharedTelemetryChannel`` and read frames straight out of the
+shared segment, instead of receiving them pickled through pipes.
+
+Segment layout (all little-endian, 8-byte aligned):
+
+==========================  ==============================================
+header                      int64[8]: magic, layout version, capacity,
+                            next_seq
+versions                    int64[capacity], one seqlock per slot
+seq                         int64[2 * capacity]
+timestamp                   float64[2 * capacity]
+frames                      PACKET_DTYPE[2 * capacity]
+==========================  ==============================================
+
+As in ``TelemetryRing``, every slot is mirrored at ``slot + capacity`` so
+windows are contiguous views. The writer makes a slot's version odd before
+touching the slot and even again once both copies are written, and only then
+publishes ``next_seq``. A reader that copies a slot and sees the same even
+version before and after has an intact frame.
+"""
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from .ring import TelemetryRing, TelemetryWindow
+from ..shared.packet import PACKET_DTYPE, copy_frames, decode_into
+
+SHM_MAGIC = 0x544D52494E47  # "TMRING"
+SHM_LAYOUT_VERSION = 1
+
+_HEADER_WORDS = 8
+_MAGIC, _LAYOUT_VERSION, _CAPACITY, _NEXT_SEQ = range(4)
+
+# Keeps one thread's register/unregister pair from interleaving with another's
+_TRACKER_LOCK = threading.Lock()
+
+
+def _layout(capacity):
+    """Offsets and total size of a segment for ``capacity`` frames."""
+    versions = _HEADER_WORDS * 8
+    seq = versions + capacity * 8
+    timestamp = seq + 2 * capacity * 8
+    frames = timestamp + 2 * capacity * 8
+    return versions, seq, timestamp, frames, frames + 2 * capacity * PACKET_DTYPE.itemsize
+
+
+def open_untracked(name) -> shared_memory.SharedMemory:
+    """
+    Open an existing segment without leaving it on the resource tracker.
+    Only the creator owns the segment: a reader's tracker would unlink it
+    when the reader exits. Before Python 3.13, which can open a segment
+    untracked, every open registers it, and the name is unregistered again.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no segment ``name``.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _TRACKER_LOCK:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def unlink_owned(shm):
+    """
+    Unlink a segment this process created, if it still exists.
+
+    A reader sharing the creator's resource tracker (the creator itself, or
+    a forked or spawned child) took the name off it when attaching, and the
+    tracker complains about unregistering a name it does not hold, so the
+    name is registered again first.
+    """
+    with _TRACKER_LOCK:
+        resource_tracker.register(shm._name, "shared_memory")
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def unmap(ring, arrays):
+    """
+    Replace the ``arrays`` attributes of ``ring`` by copies, so its last
+    contents stay readable, and close its mapping of ``ring.shm``. Views
+    handed out earlier keep the mapping alive until they are gone.
+    """
+    if ring.shm.buf is None:
+        return
+    for attr in arrays:
+        setattr(ring, attr, getattr(ring, attr).copy())
+    try:
+        ring.shm.close()
+    except BufferError:
+        pass
+
+
+class SharedTelemetryRing(TelemetryRing):
+    def __init__(self, capacity=1024, name=None, create=True):
+        """
+        A TelemetryRing stored in a ``multiprocessing.shared_memory`` segment.
+
+        The creating process is the single writer; other processes attach
+        with ``create=False`` (or ``SharedTelemetryRing.attach(name)``) and
+        only read. ``get_window()`` and ``get_since()`` return zero-copy
+        views into the segment as usual; ``latest()`` and ``copy_since()``
+        copy frames out and check the slot seqlocks, retrying or dropping
+        frames the writer overwrote during the copy.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            Number of frames kept, when creating. Defaults to 1024.
+        name : str, optional
+            Name of the segment. A unique name is generated when creating
+            without one; required when attaching.
+        create : bool, optional
+            Create the segment rather than attach to an existing one.
+            Defaults to True.
+
+        Raises
+        ------
+        ValueError
+            If the capacity is too small, or an attached segment is not a
+            telemetry ring of this layout.
+        FileNotFoundError
+            If attaching to a segment that does not exist.
+        """
+        if create:
+            if capacity < 2:
+                raise ValueError("TelemetryRing capacity must be at least 2")
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=_layout(capacity)[-1])
+        else:
+            self.shm = open_untracked(name)
+            magic, layout_version = struct.unpack_from("<2q", self.shm.buf)
+            if magic != SHM_MAGIC or layout_version != SHM_LAYOUT_VERSION:
+                self.shm.close()
+                raise ValueError(f"Shared memory segment {name} is not a telemetry ring")
+        self.owner = create
+        buffer = self.shm.buf
+        self._header = np.ndarray(_HEADER_WORDS, dtype=np.int64, buffer=buffer)
+        if create:
+            self._header[:] = 0
+            self._header[_MAGIC] = SHM_MAGIC
+            self._header[_LAYOUT_VERSION] = SHM_LAYOUT_VERSION
+            self._header[_CAPACITY] = capacity
+
+        self.capacity = capacity = int(self._header[_CAPACITY])
+        versions, seq, timestamp, frames, _ = _layout(capacity)
+        self.versions = np.ndarray(capacity, dtype=np.int64, buffer=buffer, offset=versions)
+        self.seq = np.ndarray(2 * capacity, dtype=np.int64, buffer=buffer, offset=seq)
+        self.timestamp = np.ndarray(2 * capacity, dtype=np.float64, buffer=buffer, offset=timestamp)
+        self.frames = np.ndarray(2 * capacity, dtype=PACKET_DTYPE, buffer=buffer, offset=frames)
+        if create:
+            self.versions[:] = 0
+            self.seq[:] = -1
+
+    @classmethod
+    def attach(cls, name) -> "SharedTelemetryRing":
+        """Attach to the ring another process created under ``name``."""
+        return cls(name=name, create=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def next_seq(self) -> int:
+        return int(self._header[_NEXT_SEQ])
+
+    @next_seq.setter
+    def next_seq(self, value):
+        self._header[_NEXT_SEQ] = value
+
+    def write(self, data, timestamp: float) -> int:
+        seq = self.next_seq
+        slot = seq % self.capacity
+        self.versions[slot] += 1
+        try:
+            decode_into(data, self.frames[slot:slot + 1])
+        except ValueError:
+            # Nothing was written; the version moves on by two so readers retry
+            self.versions[slot] += 1
+            raise
+        return self._publish(seq, slot, timestamp)
+
+    def write_frame(self, frame: np.ndarray, timestamp: float) -> int:
+        seq = self.next_seq
+        slot = seq % self.capacity
+        self.versions[slot] += 1
+        self.frames[slot] = frame
+        return self._publish(seq, slot, timestamp)
+
+    def _publish(self, seq, slot, timestamp):
+        mirror = slot + self.capacity
+        self.frames[mirror] = self.frames[slot]
+        self.seq[slot] = self.seq[mirror] = seq
+        self.timestamp[slot] = self.timestamp[mirror] = timestamp
+        self.versions[slot] += 1
+        self.next_seq = seq + 1
+        return seq
+
+    def latest(self, out: np.ndarray = None):
+        """
+        Copy the most recent frame into ``out``, checking the slot's
+        seqlock and yielding between retries. See ``TelemetryRing.latest``.
+        """
+        if out is None:
+            out = np.empty(1, dtype=PACKET_DTYPE)
+        while True:
+            seq = self.next_seq - 1
+            if seq < 0:
+                return -1, None
+            slot = seq % self.capacity
+            version = self.versions[slot]
+            if not version & 1:
+                out[0] = self.frames[slot]
+                if self.versions[slot] == version and self.seq[slot] == seq:
+                    return seq, out
+            # The writer may be a thread of this process: let it finish
+            time.sleep(0)
+
+    def copy_since(self, seq: int) -> TelemetryWindow:
+        """
+        Copies of all frames newer than ``seq`` (-1 for all), checking the
+        slot seqlocks. Frames the writer overwrote during the copy are
+        dropped from the start of the window, like frames that were already
+        gone.
+        """
+        window = self.get_since(seq)
+        n = len(window.seq)
+        if n == 0:
+            return window
+        slots = (window.seq[0] + np.arange(n)) % self.capacity
+        before = self.versions[slots]
+        copied = TelemetryWindow(window.seq.copy(), window.timestamp.copy(), copy_frames(window.frames))
+        after = self.versions[slots]
+        expected = copied.seq[0] + np.arange(n)
+        torn = np.flatnonzero((before != after) | (before & 1 != 0) | (copied.seq != expected))
+        if len(torn):
+            # Only the oldest frames can be overwritten, so keep what follows the last torn one
+            start = torn[-1] + 1
+            copied = TelemetryWindow(copied.seq[start:], copied.timestamp[start:], copied.frames[start:])
+        return copied
+
+    def close(self):
+        """
+        Unlink the segment if this process created it, and unmap it. The
+        ring keeps its last frames, copied out, and existing views stay
+        readable; other processes keep the memory until they let go of it.
+        """
+        if self.owner:
+            unlink_owned(self.shm)
+            self.owner = False
+        unmap(self, ("_header", "versions", "seq", "timestamp", "frames"))
+
@@ -0,0 +1,57 @@
+from abc import ABC, abstractmethod
+
+RESPAWN_KEY = "enter"   # the game's default binding: back to the last checkpoint passed
+
+
+class GameBackend(ABC):
+    """
+    What the environments need from a running game: a way to tap menu keys,
+    to hold and release driving keys (see ``KeyStateController``), and a hook
+    called once per step after the action has been sent.
+
+    ``TrackmaniaGameInstance`` drives the real game on Windows;
+    ``SimulatedGameInstance`` and ``ReplayGameInstance`` run anywhere.
+    """
+
+    @abstractmethod
+    def press_key(self, key):
+        """Press and release ``key`` (a pydirectinput key name)."""
+
+    @abstractmethod
+    def key_down(self, key):
+        """Start holding ``key``."""
+
+    @abstractmethod
+    def key_up(self, key):
+        """Release ``key``."""
+
+    def advance(self):
+        """
+        Called by the env after each action is sent, before it waits for
+        telemetry. Real-time backends have nothing to do; lock-step backends
+        produce the next telemetry frames here.
+        """
+
+    def is_alive(self) -> bool:
+        """Whether the game is still running, for health checks."""
+        return True
+
+    @property
+    def shares_input(self) -> bool:
+        """
+        Whether the game's key input is machine-wide, like the real game's:
+        keys held for it reach every game on the machine, so at most one
+        such game can be driven at a time.
+        """
+        return False
+
+    def needs_reset(self) -> bool:
+        """
+        Whether the game was replaced since the last call, e.g. by an
+        ``InstancePool`` swapping in a standby for a dead instance. The env
+        then truncates the episode and redoes its first reset.
+        """
+        return False
+
+    def close(self):
+        """Release any resources held by the backend."""
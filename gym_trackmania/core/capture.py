@@ -0,0 +1,210 @@
+"""
+Screen capture of the game into a SharedFrameRing.
+
+A ``FrameCapture`` thread grabs frames from a ``FrameSource`` straight into
+the slots of a ``bridge.frame_ring.SharedFrameRing`` at a fixed rate, and
+tags each one with the telemetry sequence number that was newest when it
+was grabbed. ``WindowFrameSource`` grabs the client area of the game window
+with ``mss``;
+``SyntheticFrameSource`` draws frames without a screen, for tests and
+benchmarks on headless machines.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+from ..bridge.frame_ring import SharedFrameRing
+
+CAPTURE_RATE = 60.0           # frames grabbed per second
+FRAME_RING_CAPACITY = 4       # frames kept in the ring
+SYNTHETIC_SHAPE = (720, 1280, 3)
+
+# Imported by the first WindowFrameSource: optional, and not needed headless
+mss = win32gui = None
+
+
+def _import_capture_modules() -> bool:
+    global mss, win32gui
+    if win32gui is None:
+        try:
+            import mss
+            import win32gui
+        except ImportError:
+            return False
+    return True
+
+
+class FrameSource(ABC):
+    """Produces RGB frames of a fixed ``shape``, (height, width, 3)."""
+
+    shape: tuple
+
+    @abstractmethod
+    def grab(self, out: np.ndarray, telemetry_seq: int) -> bool:
+        """
+        Grab the current frame into ``out``, a uint8 array of ``shape``.
+
+        ``telemetry_seq`` is the newest telemetry sequence number, which a
+        synthetic source may draw; a real one shows that state anyway.
+        Returns False if no frame could be grabbed.
+        """
+
+    def close(self):
+        """Release any resources held by the source."""
+
+
+class SyntheticFrameSource(FrameSource):
+    def __init__(self, shape=SYNTHETIC_SHAPE):
+        """
+        Frames drawn from a fixed pattern, ``base``, brightened by the
+        telemetry sequence number (modulo 256) of every grab, so the frame an
+        observation used can be told apart. Costs one full-frame write per
+        grab, like copying a screenshot.
+
+        Args:
+            shape (tuple, optional): (height, width, 3) of the frames.
+                Defaults to SYNTHETIC_SHAPE, 720p.
+        """
+        self.shape = tuple(shape)
+        height, width, channels = self.shape
+        y, x, c = np.ogrid[:height, :width, :channels]
+        self.base = ((x + 2 * y + 85 * c) % 256).astype(np.uint8)
+        self.grabs = 0
+
+    def grab(self, out, telemetry_seq):
+        np.add(self.base, np.uint8(telemetry_seq % 256), out=out)
+        self.grabs += 1
+        return True
+
+
+class WindowFrameSource(FrameSource):
+    def __init__(self, window):
+        """
+        Grabs the client area of the game window with ``mss``: the rendered
+        game, without the title bar and borders of the window rectangle.
+
+        The frame size is fixed when the source is created; move or resize
+        the window and the grab follows its position but keeps the size.
+
+        Args:
+            window: The game window, as found by the platform
+                (``TrackmaniaGameInstance.game_window``), or its handle.
+
+        Raises:
+            RuntimeError: If ``mss`` or pywin32 is not installed.
+        """
+        if not _import_capture_modules():
+            raise RuntimeError("Capturing the game window requires mss and pywin32; use SyntheticFrameSource to "
+                               "run headless")
+        self.window = window
+        self.hwnd = getattr(window, "_hWnd", window)
+        _, _, width, height = self._client_rect()
+        self.shape = (height, width, 3)
+        self._grabber = None
+
+    def _client_rect(self):
+        """Screen position and size of the client area, (left, top, width, height)."""
+        _, _, width, height = win32gui.GetClientRect(self.hwnd)
+        left, top = win32gui.ClientToScreen(self.hwnd, (0, 0))
+        return left, top, width, height
+
+    def grab(self, out, telemetry_seq):
+        # mss handles are per thread: created by the capture thread on its first grab
+        if self._grabber is None:
+            self._grabber = mss.mss()
+        height, width, _ = self.shape
+        try:
+            left, top, _, _ = self._client_rect()
+            shot = self._grabber.grab({"left": left, "top": top, "width": width, "height": height})
+        except (win32gui.error, mss.exception.ScreenShotError):
+            return False
+        # BGRA to RGB in the one copy into the ring
+        out[...] = np.frombuffer(shot.raw, dtype=np.uint8).reshape(height, width, 4)[..., 2::-1]
+        return True
+
+    def close(self):
+        if self._grabber is not None:
+            self._grabber.close()
+            self._grabber = None
+
+
+class FrameCapture:
+    def __init__(self, source, telemetry_bridge=None, rate=CAPTURE_RATE, capacity=FRAME_RING_CAPACITY, name=None):
+        """
+        Grabs frames from ``source`` into a new SharedFrameRing, ``ring``,
+        from a background thread.
+
+        Every frame is tagged with the bridge's ``latest_seq`` read just
+        before the grab, which envs use to pair it with the telemetry frame
+        they observe. Other processes attach to the ring by ``ring.name``.
+
+        Args:
+            source (FrameSource): Where frames come from.
+            telemetry_bridge (TelemetryBridge, optional): Provides the
+                telemetry sequence numbers. Defaults to None, tagging every
+                frame -1.
+            rate (float, optional): Frames grabbed per second; None grabs as
+                fast as the source allows. Defaults to CAPTURE_RATE.
+            capacity (int, optional): Frames kept in the ring. Defaults to
+                FRAME_RING_CAPACITY.
+            name (str, optional): Name of the shared memory segment.
+                Defaults to a generated one.
+        """
+        self.source = source
+        self.bridge = telemetry_bridge
+        self.rate = rate
+        self.ring = SharedFrameRing(source.shape, capacity=capacity, name=name)
+        self.frames_captured = 0
+        self.frames_failed = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def capture(self) -> bool:
+        """Grab one frame into the ring; False if the source had none."""
+        ring = self.ring
+        telemetry_seq = self.bridge.latest_seq if self.bridge is not None else -1
+        slot = ring.begin()
+        if not self.source.grab(ring.frames[slot], telemetry_seq):
+            ring.abort(slot)
+            self.frames_failed += 1
+            return False
+        ring.publish(slot, telemetry_seq, time.monotonic())
+        self.frames_captured += 1
+        return True
+
+    def _run(self):
+        period = 1.0 / self.rate if self.rate else 0.0
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            self.capture()
+            if not period:
+                continue
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_tick = time.monotonic()  # fell behind: do not try to catch up
+
+    def close(self):
+        """Stop capturing, release the source and unlink the ring."""
+        self.stop()
+        self.source.close()
+        self.ring.close()
@@ -0,0 +1,185 @@
+import queue
+import threading
+import time
+from collections import deque
+from ..shared.perf import ACTION_DISPATCH
+
+PWM_PERIOD = 0.05       # seconds per duty cycle of a partially pressed key
+MIN_DUTY = 0.1          # duties closer than this to 0 or 1 are rounded to off / fully held
+DIGITAL_THRESHOLD = 0.5
+LATENCY_HISTORY = 4096  # dispatch latencies kept for inspection
+
+# Action component -> key, in action order: [steer, throttle, brake]
+STEER_LEFT_KEY = "left"
+STEER_RIGHT_KEY = "right"
+THROTTLE_KEY = "up"
+BRAKE_KEY = "down"
+ACTION_KEYS = (STEER_LEFT_KEY, STEER_RIGHT_KEY, THROTTLE_KEY, BRAKE_KEY)
+
+_ACTION = 0
+_STOP = 1
+
+
+class KeyStateController:
+    def __init__(self, backend, analog=True, pwm_period=PWM_PERIOD):
+        """
+        Turns continuous ``[steer, throttle, brake]`` actions into held keys.
+
+        Key state persists across steps: a key is pressed down when it should
+        become held and released when it should not, so an unchanged action
+        emits no input at all. With ``analog`` enabled a component between 0
+        and 1 is emulated by pulse-width modulation, holding the key for that
+        fraction of every ``pwm_period``; otherwise a component is either
+        fully held or released at DIGITAL_THRESHOLD, like the discrete key
+        presses used before.
+
+        ``set_action()`` only enqueues the action. A dispatch thread applies
+        it and toggles partially pressed keys on time, so the caller never
+        blocks on input. The time from ``set_action()`` until the keys are
+        pressed is kept in ``dispatch_latencies``, and recorded into
+        ``perf`` if it is set to a ``PerfStats``.
+
+        Args:
+            backend (GameBackend): Receives the ``key_down``/``key_up`` calls.
+            analog (bool, optional): Duty-cycle partially pressed keys.
+                Defaults to True.
+            pwm_period (float, optional): Seconds per duty cycle. Defaults to
+                PWM_PERIOD.
+        """
+        self.backend = backend
+        self.analog = analog
+        self.pwm_period = pwm_period
+        self.held = set()
+        self.transitions = 0
+        self.dispatch_latencies = deque(maxlen=LATENCY_HISTORY)
+        self.perf = None
+        self._duties = dict.fromkeys(ACTION_KEYS, 0.0)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Release all keys and stop the dispatch thread."""
+        if self._thread is not None:
+            self._queue.put((_STOP, None, time.perf_counter()))
+            self._thread.join()
+            self._thread = None
+
+    def set_action(self, steer, throttle, brake):
+        """Hold the keys for an action until the next one. Never blocks."""
+        self._queue.put((_ACTION, (steer, throttle, brake), time.perf_counter()))
+
+    def release_all(self):
+        self.set_action(0.0, 0.0, 0.0)
+
+    def _duty(self, value):
+        if not self.analog:
+            return 1.0 if value > DIGITAL_THRESHOLD else 0.0
+        if value < MIN_DUTY:
+            return 0.0
+        if value > 1.0 - MIN_DUTY:
+            return 1.0
+        return float(value)
+
+    def _set_duties(self, steer, throttle, brake):
+        self._duties[STEER_LEFT_KEY] = self._duty(-steer)
+        self._duties[STEER_RIGHT_KEY] = self._duty(steer)
+        self._duties[THROTTLE_KEY] = self._duty(throttle)
+        self._duties[BRAKE_KEY] = self._duty(brake)
+
+    def _apply(self, now):
+        """
+        Bring the held keys in line with the duties at time ``now``.
+
+        Returns:
+            float: When the next duty-cycle edge is due, or None if no key is
+            partially pressed.
+        """
+        phase = now % self.pwm_period
+        next_edge = None
+        for key, duty in self._duties.items():
+            if duty <= 0.0 or duty >= 1.0:
+                should_hold = duty >= 1.0
+            else:
+                on_time = duty * self.pwm_period
+                should_hold = phase < on_time
+                edge = now + (on_time - phase if should_hold else self.pwm_period - phase)
+                next_edge = edge if next_edge is None else min(next_edge, edge)
+            if should_hold and key not in self.held:
+                self._key_down(key)
+                self.held.add(key)
+                self.transitions += 1
+            elif not should_hold and key in self.held:
+                self._key_up(key)
+                self.held.discard(key)
+                self.transitions += 1
+        return next_edge
+
+    def _run(self):
+        next_edge = None
+        while True:
+            timeout = None if next_edge is None else max(0.0, next_edge - time.perf_counter())
+            try:
+                command = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                next_edge = self._apply(time.perf_counter())
+                continue
+
+            # Only the most recent action matters; skip any that piled up
+            enqueued = [command[2]]
+            while command[0] != _STOP:
+                self._set_duties(*command[1])
+                try:
+                    command = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                enqueued.append(command[2])
+
+            if command[0] == _STOP:
+                self._set_duties(0.0, 0.0, 0.0)
+                self._apply(time.perf_counter())
+                return
+            next_edge = self._apply(time.perf_counter())
+            dispatched = time.perf_counter()
+            self.dispatch_latencies.extend(dispatched - t for t in enqueued)
+            perf = self.perf
+            if perf is not None:
+                for t in enqueued:
+                    perf.record(ACTION_DISPATCH, dispatched - t)
+
+    def _key_down(self, key):
+        self.backend.key_down(key)
+
+    def _key_up(self, key):
+        self.backend.key_up(key)
+
+
+class RecordingController(KeyStateController):
+    def __init__(self, key_latency=0.0, **kwargs):
+        """
+        KeyStateController that records key transitions instead of sending
+        them, to test input timing without a game.
+
+        Args:
+            key_latency (float, optional): Seconds each simulated key event
+                takes, to model a slow input API. Defaults to 0.
+            **kwargs: Passed to KeyStateController.
+        """
+        super().__init__(backend=None, **kwargs)
+        self.key_latency = key_latency
+        # (time.perf_counter(), key, is_down)
+        self.events = []
+
+    def _record(self, key, is_down):
+        if self.key_latency:
+            time.sleep(self.key_latency)
+        self.events.append((time.perf_counter(), key, is_down))
+
+    def _key_down(self, key):
+        self._record(key, True)
+
+    def _key_up(self, key):
+        self._record(key, False)
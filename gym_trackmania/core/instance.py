@@ -1,13 +1,43 @@
-import subprocess
 import time
-import pydirectinput
-import pygetwindow as gw
-import psutil
-import win32gui
-import win32process
-
-class TrackmaniaGameInstance:
-    def __init__(self, telemetry_bridge, title_keyword="Trackmania"):
+from .backend import GameBackend
+from .platform import POLL_INTERVAL, WindowsPlatform
+from ..shared.packet import FLAG_IN_MAIN_MENU, FLAG_IN_RACE
+
+LAUNCH_TIMEOUT = 60       # max seconds for the game process to appear
+WINDOW_TIMEOUT = 60       # max seconds for its window to appear
+MENU_TIMEOUT = 300        # max seconds to reach the main menu
+MENU_SETTLE = 5.0         # seconds the main menu must stay up before it takes navigation keys
+RACE_TIMEOUT = 60         # max seconds for the track to load once navigated to
+KEY_INTERVAL = 0.2        # seconds between menu key presses
+NAVIGATION_KEYS = (
+    "enter",      # "Play"
+    #"pageup",     # "Local"
+    "right",
+    "right",
+    "enter",      # "Play a track"
+    "enter",      # "My Local Tracks"
+    "right",
+    "enter",      # "Downloaded"
+    "enter",      # Launch first track
+)
+
+
+def in_main_menu(frames):
+    return (frames["flags"] & FLAG_IN_MAIN_MENU) != 0
+
+
+def not_in_main_menu(frames):
+    return (frames["flags"] & FLAG_IN_MAIN_MENU) == 0
+
+
+def race_loaded(frames):
+    return (frames["flags"] & FLAG_IN_RACE) != 0
+
+
+class TrackmaniaGameInstance(GameBackend):
+    def __init__(self, telemetry_bridge, title_keyword="Trackmania", platform=None, address=None,
+                 key_interval=KEY_INTERVAL, launch_timeout=LAUNCH_TIMEOUT, window_timeout=WINDOW_TIMEOUT,
+                 menu_timeout=MENU_TIMEOUT, race_timeout=RACE_TIMEOUT, menu_settle=MENU_SETTLE):
         """
         Initializes the TrackmaniaGameInstance instance.
 
@@ -15,166 +45,156 @@ class TrackmaniaGameInstance:
         It will then wait for the game window to appear, and navigate to the downloaded
         track menu. If any of these steps fail, it will raise an exception.
 
+        Every wait ends as soon as its event is observed: the new process and
+        its window are polled every POLL_INTERVAL, and the main menu and the
+        loaded race are detected from the telemetry frames themselves.
+
         Args:
             telemetry_bridge (TelemetryBridge): The TelemetryBridge instance to use.
             title_keyword (str, optional): The keyword to look for in the game window
                 title. Defaults to "Trackmania".
+            platform (GamePlatform, optional): Starts the process and sends
+                keys. Defaults to a WindowsPlatform.
+            address (tuple, optional): ``(host, port)`` the instance's
+                telemetry is expected on, passed to the platform.
+            key_interval (float, optional): Seconds between menu key presses.
+                Defaults to KEY_INTERVAL.
+            launch_timeout, window_timeout, menu_timeout, race_timeout (float,
+                optional): Maximum seconds for the process, its window, the
+                main menu and the loaded race to appear.
+            menu_settle (float, optional): Seconds the main menu must be
+                shown without a break before navigating: it ignores keys
+                while it animates in. Defaults to MENU_SETTLE.
 
         Raises:
+            RuntimeError: If the Windows-only dependencies are not installed.
             Exception: If any step in the initialization fails.
         """
+        if platform is None:
+            platform = WindowsPlatform(title_keyword)
+        self.platform = platform
         self.bridge = telemetry_bridge
+        self.address = address
+        self.key_interval = key_interval
         self.game_pid = None
         self.game_window = None
         self.title_keyword = title_keyword
 
         try:
-            self._launch_game_via_uplay()
-            self._find_trackmania_process()
-            time.sleep(5)  # Give time for window to appear
-            self._find_game_window_by_pid()
-            self._wait_for_main_menu()
+            # Frames already in the channel belong to a previous instance
+            after_seq = self.bridge.latest_seq
+            self.game_pid = self.platform.launch(address, launch_timeout)
+            self._find_game_window(window_timeout)
+            after_seq = self._wait_for_main_menu(after_seq, menu_timeout)
+            self._wait_for_menu_to_settle(after_seq, menu_settle, menu_timeout)
             self._navigate_to_downloaded_track()
+            self._wait_for_race(after_seq, race_timeout)
 
         except Exception as e:
             print("[TrackmaniaEnv] Failed to initialize:", e)
+            if self.game_pid is not None:
+                self.platform.terminate(self.game_pid)
             raise
 
-    def _launch_game_via_uplay(self):
-        print("[TrackmaniaEnv] Launching game via uplay://...")
-        subprocess.Popen(["cmd", "/c", "start", "uplay://launch/5595/0"])
-        time.sleep(5)
-
-    def _find_trackmania_process(self, timeout=60):
-        """Find the Trackmania.exe process and store its PID.
-
-        This function waits up to ``timeout`` seconds for the process to appear.
-        If the process is not found, a :py:class:`TimeoutError` is raised.
-
-        The process is found by iterating over all processes and checking if the
-        name contains "trackmania". If no such process is found, this function
-        falls back to checking all window titles and looking for a window with
-        a title that contains "trackmania". The first matching window's PID is
-        used as a fallback.
-        """
-        print("[TrackmaniaEnv] Looking for Trackmania.exe process...")
-        end_time = time.time() + timeout
-        while time.time() < end_time:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] and "trackmania" in proc.info['name'].lower():
-                    self.game_pid = proc.info['pid']
-                    print(f"[TrackmaniaEnv] Found Trackmania PID: {self.game_pid}")
-                    return
-
-            # --- fallback: check window title ---
-            import win32gui
-            def callback(hwnd, pid_list):
-                title = win32gui.GetWindowText(hwnd)
-                if "trackmania" in title.lower():
-                    _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                    pid_list.append(pid)
-
-            pid_guess = []
-            win32gui.EnumWindows(callback, pid_guess)
-            if pid_guess:
-                self.game_pid = pid_guess[0]
-                print(f"[TrackmaniaEnv] Fallback window-based PID: {self.game_pid}")
-                return
-
-            time.sleep(1)
-        raise TimeoutError("Trackmania.exe process not found.")
-
-    def _find_game_window_by_pid(self, timeout=60):
+    def _find_game_window(self, timeout):
         """
-        Find the game window by iterating over all windows and checking if the
-        window title contains "Trackmania" and the PID matches the Trackmania
-        process.
+        Wait for the visible window of the launched process.
 
         Args:
-            timeout (int, optional): Timeout in seconds. Defaults to 60.
+            timeout (float): Timeout in seconds.
 
         Raises:
             TimeoutError: If no visible Trackmania window is found after the
                 given timeout.
         """
         print("[TrackmaniaEnv] Scanning windows for Trackmania...")
-
         end_time = time.time() + timeout
-
-        def is_trackmania_window(hwnd, target_pid):
-            if not win32gui.IsWindowVisible(hwnd):
-                return False
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            title = win32gui.GetWindowText(hwnd)
-            return pid == target_pid and title and "trackmania" in title.lower()
-
-        # STEP 1: Get correct Trackmania PID
-        trackmania_pid = None
-        for proc in psutil.process_iter(['pid', 'name']):
-            if proc.info['name'] and "trackmania.exe" == proc.info['name'].lower():
-                trackmania_pid = proc.info['pid']
-                print(f"[TrackmaniaEnv] Found Trackmania PID: {trackmania_pid}")
-                break
-
-        if not trackmania_pid:
-            raise RuntimeError("Could not find Trackmania.exe running.")
-
-        # STEP 2: Wait for window to appear
         while time.time() < end_time:
-            hwnds = []
-            win32gui.EnumWindows(lambda hwnd, result: result.append(hwnd)
-                                if is_trackmania_window(hwnd, trackmania_pid) else None, hwnds)
-
-            if hwnds:
-                hwnd = hwnds[0]
-                title = win32gui.GetWindowText(hwnd)
-                print(f"[TrackmaniaEnv] Game window found: '{title}'")
-                self.game_window = gw.Window(hwnd)
+            self.game_window = self.platform.find_window(self.game_pid)
+            if self.game_window is not None:
                 return
-
-            time.sleep(1)
-
+            time.sleep(POLL_INTERVAL)
         raise TimeoutError("No visible Trackmania window found.")
 
-    def _wait_for_main_menu(self, timeout=300):
+    def _wait_for_main_menu(self, after_seq, timeout) -> int:
         """
         Wait for the main menu to appear in the game.
 
-        Monitor telemetry for the main menu state and wait until it is detected.
-        If the main menu is not detected within the specified timeout, raise a
+        Monitor telemetry for the main menu state and wait until it is detected,
+        pressing enter every ``key_interval`` to skip the intro cutscenes. If
+        the main menu is not detected within the specified timeout, raise a
         `TimeoutError`.
 
+        :param after_seq: Only telemetry frames after this sequence number count.
         :param timeout: Time in seconds to wait for the main menu to appear.
+        :return: Sequence number of the first main menu frame.
         :raises TimeoutError: Main menu not detected in time.
         """
         print("[TrackmaniaEnv] Waiting for main menu via telemetry...")
         end_time = time.time() + timeout
         while time.time() < end_time:
-            telemetry = self.bridge.get_latest_telemetry()
-            if telemetry and telemetry.in_main_menu:
+            seq = self.bridge.wait_for_frame(in_main_menu, after_seq=after_seq, timeout=self.key_interval)
+            if seq >= 0:
                 print("[TrackmaniaEnv] Main menu detected.")
-                time.sleep(5)
-                return
+                return seq
+            after_seq = self.bridge.latest_seq
             self.press_key("enter")  # Skip cutscene
-            time.sleep(0.2)
         raise TimeoutError("Main menu not detected in time.")
-    
+
+    def _wait_for_menu_to_settle(self, menu_seq, settle, timeout):
+        """
+        Wait until the main menu has been shown for ``settle`` seconds in a
+        row. A frame outside the menu, such as a late cutscene, starts the
+        wait over from the next main menu frame.
+
+        :param menu_seq: Sequence number of the first main menu frame.
+        :param settle: Seconds the menu must stay up.
+        :param timeout: Time in seconds to wait for the menu to settle.
+        :raises TimeoutError: Main menu not settled in time.
+        """
+        end_time = time.time() + timeout
+        settled_at = time.time() + settle
+        while True:
+            now = time.time()
+            if now >= settled_at:
+                return
+            if now >= end_time:
+                raise TimeoutError("Main menu did not settle in time.")
+            seq = self.bridge.wait_for_frame(not_in_main_menu, after_seq=menu_seq,
+                                             timeout=min(settled_at, end_time) - now)
+            if seq >= 0:
+                menu_seq = self._wait_for_main_menu(seq, end_time - time.time())
+                settled_at = time.time() + settle
+
+    def _wait_for_race(self, after_seq, timeout):
+        seq = self.bridge.wait_for_frame(race_loaded, after_seq=after_seq, timeout=timeout)
+        if seq < 0:
+            raise TimeoutError("Race not loaded in time.")
+        print("[TrackmaniaEnv] Race loaded.")
+
     def press_key(self, key):
-        pydirectinput.press(key)
-        
+        self.platform.press_key(self.game_window, key)
+
+    def key_down(self, key):
+        self.platform.key_down(self.game_window, key)
+
+    def key_up(self, key):
+        self.platform.key_up(self.game_window, key)
+
+    def is_alive(self) -> bool:
+        return self.platform.is_alive(self.game_pid)
+
+    @property
+    def shares_input(self) -> bool:
+        return self.platform.global_input
+
+    def close(self):
+        """Terminate the game process."""
+        if self.game_pid is not None:
+            self.platform.terminate(self.game_pid)
+
     def _navigate_to_downloaded_track(self):
         print("[TrackmaniaEnv] Navigating to track...")
-        steps = [
-            "enter",      # "Play"
-            #"pageup",     # "Local"
-            "right",      
-            "right",      
-            "enter",      # "Play a track"
-            "enter",      # "My Local Tracks"
-            "right",      
-            "enter",      # "Downloaded"
-            "enter",      # Launch first track
-        ]
-        for key in steps:
+        for key in NAVIGATION_KEYS:
+            time.sleep(self.key_interval)
             self.press_key(key)
-            time.sleep(0.2)
\ No newline at end of file
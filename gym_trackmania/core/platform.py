@@ -0,0 +1,204 @@
+import json
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from ..bridge.bridge import update_telemetry_config
+
+# Windows-only, imported by the first WindowsPlatform: slow to load, and
+# missing elsewhere, where FakePlatform still works
+pydirectinput = gw = psutil = win32gui = win32process = None
+
+LAUNCH_URI = "uplay://launch/5595/0"
+POLL_INTERVAL = 0.25  # seconds between checks for a new process or window
+
+
+def _import_windows_modules() -> bool:
+    """Import the Windows-only dependencies; False if they are not installed."""
+    global pydirectinput, gw, psutil, win32gui, win32process
+    if win32gui is None:
+        try:
+            import pydirectinput
+            import pygetwindow as gw
+            import psutil
+            import win32gui
+            import win32process
+        except ImportError:
+            return False
+    return True
+
+
+class GamePlatform(ABC):
+    """
+    Operating-system side of running game instances: starting and stopping
+    game processes, finding their windows and sending keys to a window.
+
+    ``TrackmaniaGameInstance`` drives the game through a platform, so the
+    launch and menu sequence, and the ``InstancePool`` built on it, can be
+    exercised without Windows using ``FakePlatform``.
+
+    ``global_input`` tells whether keys go to the whole machine rather than
+    to one game, in which case only one game can be driven at a time.
+    """
+
+    global_input = False
+
+    @abstractmethod
+    def launch(self, address, timeout) -> int:
+        """
+        Start a new game process and return its PID, waiting up to
+        ``timeout`` seconds for it to appear. Concurrent calls must each
+        return a different process.
+
+        ``address`` is the ``(host, port)`` its telemetry plugin should send
+        to.
+        """
+
+    @abstractmethod
+    def find_window(self, pid):
+        """The visible game window of process ``pid``, or None if it has none yet."""
+
+    @abstractmethod
+    def is_alive(self, pid) -> bool:
+        """Whether process ``pid`` is still running."""
+
+    @abstractmethod
+    def terminate(self, pid):
+        """Stop process ``pid`` if it is still running."""
+
+    @abstractmethod
+    def press_key(self, window, key):
+        """Press and release ``key`` (a pydirectinput key name) in ``window``."""
+
+    @abstractmethod
+    def key_down(self, window, key):
+        """Start holding ``key`` in ``window``."""
+
+    @abstractmethod
+    def key_up(self, window, key):
+        """Release ``key`` in ``window``."""
+
+
+class WindowsPlatform(GamePlatform):
+    # pydirectinput sets the machine's keyboard state, which the foreground window reads
+    global_input = True
+
+    def __init__(self, title_keyword="Trackmania", config_path=None):
+        """
+        Runs Trackmania through Uplay with pywin32, psutil and pydirectinput.
+
+        Keys are injected with ``SendInput`` and reach the foreground window,
+        so the target window is activated first. Held keys stay held for
+        whichever window is in front: one machine (or Windows session) can
+        only drive one game. Several games can be launched, e.g. for
+        recording, but the envs refuse to drive more than one of them.
+
+        Args:
+            title_keyword (str, optional): The keyword to look for in the game
+                window title. Defaults to "Trackmania".
+            config_path (str, optional): The plugin's ``TelemetryConfig.json``.
+                If set, every launch makes the plugin stream over ``tcp`` to
+                the launch address, widening its port range to cover it.
+                Defaults to None, the config is left as it is.
+
+        Raises:
+            RuntimeError: If the Windows-only dependencies are not installed.
+        """
+        if not _import_windows_modules():
+            raise RuntimeError("TrackmaniaGameInstance requires Windows with pydirectinput, pygetwindow, "
+                               "psutil and pywin32 installed; use ReplayGameInstance to run headless")
+        self.title_keyword = title_keyword.lower()
+        self.config_path = config_path
+        # Launches are serialized so each one claims the process it started
+        self._launch_lock = threading.Lock()
+
+    def _game_pids(self):
+        """PIDs of all running game processes, by process name or, failing that, by window title."""
+        pids = {proc.info['pid'] for proc in psutil.process_iter(['pid', 'name'])
+                if proc.info['name'] and "trackmania" in proc.info['name'].lower()}
+        if pids:
+            return pids
+
+        def callback(hwnd, pid_list):
+            if self.title_keyword in win32gui.GetWindowText(hwnd).lower():
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                pid_list.append(pid)
+
+        pid_guess = []
+        win32gui.EnumWindows(callback, pid_guess)
+        return set(pid_guess)
+
+    def _cover_address(self, address):
+        """Point the plugin at ``address``, keeping the ports other games already use in its range."""
+        host, port = address
+        try:
+            with open(self.config_path) as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            config = {}
+        first = int(config.get("binary_port", port))
+        last = max(first + int(config.get("binary_port_count", 1)) - 1, port)
+        first = min(first, port)
+        update_telemetry_config(self.config_path, transport="tcp", binary_host=host, binary_port=first,
+                                binary_port_count=last - first + 1)
+
+    def launch(self, address, timeout) -> int:
+        # The plugin tries every port of its range; which one the game gets is
+        # up to the bridge (see MultiplexTelemetryBridge.claim)
+        with self._launch_lock:
+            if address is not None and self.config_path is not None:
+                self._cover_address(address)
+            known = self._game_pids()
+            print("[TrackmaniaEnv] Launching game via uplay://...")
+            subprocess.Popen(["cmd", "/c", "start", LAUNCH_URI])
+            end_time = time.time() + timeout
+            while time.time() < end_time:
+                new = self._game_pids() - known
+                if new:
+                    pid = min(new)
+                    print(f"[TrackmaniaEnv] Found Trackmania PID: {pid}")
+                    return pid
+                time.sleep(POLL_INTERVAL)
+        raise TimeoutError("Trackmania.exe process not found.")
+
+    def find_window(self, pid):
+        def is_trackmania_window(hwnd):
+            if not win32gui.IsWindowVisible(hwnd):
+                return False
+            _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
+            title = win32gui.GetWindowText(hwnd)
+            return window_pid == pid and title and self.title_keyword in title.lower()
+
+        hwnds = []
+        win32gui.EnumWindows(lambda hwnd, result: result.append(hwnd) if is_trackmania_window(hwnd) else None,
+                             hwnds)
+        if not hwnds:
+            return None
+        print(f"[TrackmaniaEnv] Game window found: '{win32gui.GetWindowText(hwnds[0])}'")
+        return gw.Window(hwnds[0])
+
+    def is_alive(self, pid) -> bool:
+        return psutil.pid_exists(pid)
+
+    def terminate(self, pid):
+        try:
+            psutil.Process(pid).terminate()
+        except psutil.NoSuchProcess:
+            pass
+
+    def _focus(self, window):
+        if window is not None and not window.isActive:
+            window.activate()
+
+    def press_key(self, window, key):
+        self._focus(window)
+        pydirectinput.press(key)
+
+    def key_down(self, window, key):
+        self._focus(window)
+        # Skip pydirectinput's built-in pause; KeyStateController paces input
+        pydirectinput.keyDown(key, _pause=False)
+
+    def key_up(self, window, key):
+        self._focus(window)
+        pydirectinput.keyUp(key, _pause=False)
@@ -0,0 +1,300 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .backend import GameBackend
+
+STALE_TIMEOUT = 2.0        # seconds without telemetry before an instance counts as dead
+CHECK_INTERVAL = 0.25      # seconds between health checks
+LAUNCH_ATTEMPTS = 3        # consecutive failed launches on a port before giving up on it
+
+
+class PooledInstance(GameBackend):
+    def __init__(self, slot):
+        """
+        The game behind one active slot of an InstancePool, handed to an env
+        in place of a game instance. It forwards to whichever instance
+        currently serves the slot, so the pool can swap a dead instance for
+        a standby without the env noticing more than ``needs_reset()``.
+
+        While the slot has no instance, e.g. when an instance died with no
+        standby ready, calls wait until its replacement is up.
+
+        Args:
+            slot (int): Index of the active slot, and of the bridge channel
+                its telemetry arrives on.
+        """
+        self.slot = slot
+        self.instance = None
+        self.replacements = 0
+        self.vacated_at = None  # when the slot lost its instance, while it has none
+        self._replaced = False
+        self._ready = threading.Event()
+
+    def _set(self, instance, replaced):
+        self.instance = instance
+        if instance is None:
+            self._ready.clear()
+            return
+        self._replaced = self._replaced or replaced
+        self.replacements += replaced
+        self._ready.set()
+
+    def _current(self):
+        instance = self.instance
+        if instance is None:
+            self._ready.wait()
+            instance = self.instance
+        return instance
+
+    def press_key(self, key):
+        self._current().press_key(key)
+
+    def key_down(self, key):
+        self._current().key_down(key)
+
+    def key_up(self, key):
+        self._current().key_up(key)
+
+    def advance(self):
+        self._current().advance()
+
+    def is_alive(self) -> bool:
+        instance = self.instance
+        return instance is not None and instance.is_alive()
+
+    @property
+    def shares_input(self) -> bool:
+        instance = self.instance
+        return instance is not None and instance.shares_input
+
+    def needs_reset(self) -> bool:
+        replaced, self._replaced = self._replaced, False
+        return replaced
+
+
+class InstancePool:
+    def __init__(self, bridge, factory, size, standby=1, stale_timeout=STALE_TIMEOUT,
+                 check_interval=CHECK_INTERVAL, launch_attempts=LAUNCH_ATTEMPTS):
+        """
+        Keeps ``size`` game instances running for envs, plus ``standby``
+        warm spares that are launched, navigated to the track and streaming
+        telemetry, ready to take over.
+
+        Every instance reports telemetry on its own port of a
+        MultiplexTelemetryBridge with ``size + standby`` ports. Active slot
+        ``i`` is read through ``bridge.channel(i)``. A monitor thread checks
+        every instance: a process that exited, or one that sent no telemetry
+        for ``stale_timeout`` seconds, is dead. A dead active instance is
+        replaced by a standby by re-routing the standby's port to the slot's
+        channel, so envs keep the same channel and ``PooledInstance``. The
+        dead instance is terminated and relaunched in the background as the
+        new standby. All launches, including the initial ones, run
+        concurrently, up to the point where a game connects its telemetry:
+        each launch ``claim()``s its port first, so games connect one at a
+        time and every one lands on the port it was launched for.
+
+        The real game's key input is machine-wide (see
+        ``WindowsPlatform``): a standby navigating its menus on the same
+        machine would type into the active game. Pool real games only with
+        ``size=1, standby=0``, or with a platform whose input is per game.
+
+        Args:
+            bridge (MultiplexTelemetryBridge): A started bridge with
+                ``size + standby`` instances.
+            factory (callable): ``factory(channel, address)`` launches one
+                game whose telemetry goes to ``address`` and arrives on
+                ``channel``, blocks until it is in a race and returns it as a
+                GameBackend; raises if it fails, e.g.
+                ``lambda channel, address: TrackmaniaGameInstance(channel,
+                address=address)``.
+            size (int): Number of active slots.
+            standby (int, optional): Number of warm spares. Defaults to 1.
+            stale_timeout (float, optional): Defaults to STALE_TIMEOUT.
+            check_interval (float, optional): Defaults to CHECK_INTERVAL.
+            launch_attempts (int, optional): Consecutive failed launches on a
+                port before it is given up. Defaults to LAUNCH_ATTEMPTS.
+        """
+        if bridge.num_instances != size + standby:
+            raise ValueError(f"Bridge has {bridge.num_instances} instances, expected {size + standby}")
+        self.bridge = bridge
+        self.factory = factory
+        self.size = size
+        self.stale_timeout = stale_timeout
+        self.check_interval = check_interval
+        self.launch_attempts = launch_attempts
+        self.leases = [PooledInstance(slot) for slot in range(size)]
+
+        n_ports = size + standby
+        self._instances = [None] * n_ports          # instance running on each port
+        self._ready_at = [0.0] * n_ports            # when it became ready, or took over a slot
+        self._slot_port = list(range(size))         # port serving each active slot
+        self._standby = deque()                     # ports of ready spares
+        self._errors = {}                           # port -> exception of its last failed launch
+        self._lock = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=n_ports, thread_name_prefix="InstancePool")
+        self._monitor = None
+        self._stopping = threading.Event()
+
+        self.launches = 0
+        self.failures = 0
+        self.swaps = 0
+        self.recovery_times = []  # seconds from detecting a dead instance to a live one serving its slot
+
+    def start(self, timeout=None):
+        """
+        Launch every instance concurrently and return once all active slots
+        are served. Spares keep warming up in the background.
+
+        Raises:
+            TimeoutError: If the active slots are not all served in time.
+            RuntimeError: If an active slot's port gave up launching.
+        """
+        for port in range(len(self._instances)):
+            self._launch(port)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while not all(lease.instance is not None for lease in self.leases):
+                for port in self._slot_port:
+                    if port in self._errors:
+                        raise RuntimeError(f"Could not launch an instance on port {self.bridge.ports[port]}") \
+                            from self._errors[port]
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Instance pool not ready in time.")
+                self._lock.wait(remaining)
+        self._monitor = threading.Thread(target=self._run, daemon=True, name="InstancePoolMonitor")
+        self._monitor.start()
+        return self
+
+    def stop(self):
+        """Stop monitoring and terminate every instance."""
+        self._stopping.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for instance in self._instances:
+            if instance is not None:
+                instance.close()
+
+    def channel(self, slot):
+        """The telemetry channel of active slot ``slot``."""
+        return self.bridge.channel(slot)
+
+    @property
+    def standby_ready(self) -> int:
+        return len(self._standby)
+
+    def stats(self) -> dict:
+        return {
+            "launches": self.launches,
+            "failures": self.failures,
+            "swaps": self.swaps,
+            "standby_ready": self.standby_ready,
+            "recovery_times": list(self.recovery_times),
+        }
+
+    # Launching
+
+    def _launch(self, port):
+        self._executor.submit(self._launch_instance, port)
+
+    def _launch_instance(self, port):
+        channel = self.bridge.channel(self.bridge.routes[port])
+        address = (self.bridge.host, self.bridge.ports[port])
+        for _ in range(self.launch_attempts):
+            if self._stopping.is_set():
+                return
+            with self._lock:
+                self.launches += 1
+            # One game connects at a time, so the one launched here takes this port
+            self.bridge.claim(port)
+            try:
+                instance = self.factory(channel, address)
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                error = e
+                continue
+            finally:
+                self.bridge.release_claim(port)
+            self._ready(port, instance)
+            return
+        self.bridge.logger.error(f"[InstancePool] Giving up launching on port {address[1]}: {error!r}")
+        with self._lock:
+            self._errors[port] = error
+            self._lock.notify_all()
+
+    def _ready(self, port, instance):
+        with self._lock:
+            self._errors.pop(port, None)
+            if self._stopping.is_set():
+                instance.close()
+                return
+            self._instances[port] = instance
+            self._ready_at[port] = time.monotonic()
+            if port in self._slot_port:
+                # Relaunched into a slot that had no standby to take over
+                lease = self.leases[self._slot_port.index(port)]
+                if lease.vacated_at is not None:
+                    self.recovery_times.append(time.monotonic() - lease.vacated_at)
+                lease._set(instance, replaced=lease.vacated_at is not None)
+                lease.vacated_at = None
+            else:
+                self._standby.append(port)
+            self._lock.notify_all()
+
+    # Health checks
+
+    def _healthy(self, port) -> bool:
+        instance = self._instances[port]
+        if not instance.is_alive():
+            return False
+        window = self.bridge.channel(self.bridge.routes[port]).get_window(1)
+        last_frame = float(window.timestamp[0]) if len(window.seq) else 0.0
+        return time.monotonic() - max(last_frame, self._ready_at[port]) < self.stale_timeout
+
+    def _run(self):
+        while not self._stopping.wait(self.check_interval):
+            for slot, lease in enumerate(self.leases):
+                port = self._slot_port[slot]
+                if self._instances[port] is not None and not self._healthy(port):
+                    self._replace(slot)
+            for port in list(self._standby):
+                if not self._healthy(port):
+                    self.bridge.logger.error(f"[InstancePool] Standby on port {self.bridge.ports[port]} died")
+                    with self._lock:
+                        self._standby.remove(port)
+                        dead, self._instances[port] = self._instances[port], None
+                    dead.close()
+                    self._launch(port)
+
+    def _replace(self, slot):
+        """Swap the dead instance of ``slot`` for a standby and relaunch it."""
+        detected = time.monotonic()
+        lease = self.leases[slot]
+        with self._lock:
+            dead_port = self._slot_port[slot]
+            dead, self._instances[dead_port] = self._instances[dead_port], None
+            if self._standby:
+                port = self._standby.popleft()
+                spare_channel = self.bridge.routes[port]
+                # The standby now feeds the env's channel; the dead port warms
+                # up its replacement on the standby's former channel
+                self.bridge.route(port, slot)
+                self.bridge.route(dead_port, spare_channel)
+                self._slot_port[slot] = port
+                self._ready_at[port] = time.monotonic()
+                lease._set(self._instances[port], replaced=True)
+                self.swaps += 1
+                self.recovery_times.append(time.monotonic() - detected)
+            else:
+                # Nothing to swap in: the slot waits for the relaunch
+                lease._set(None, replaced=True)
+                lease.vacated_at = detected
+        action = "relaunching" if lease.vacated_at is not None else "swapped in a standby"
+        self.bridge.logger.error(f"[InstancePool] Instance on port {self.bridge.ports[dead_port]} of slot {slot} "
+                                 f"died; {action}")
+        dead.close()
+        self._launch(dead_port)
@@ -0,0 +1,168 @@
+import math
+import os
+import socket
+import threading
+import time
+from collections import Counter
+import numpy as np
+from ..bridge.recording import TelemetryRecording, load_recording
+from .backend import RESPAWN_KEY, GameBackend
+from ..shared.packet import FLAG_IN_RACE
+
+AS_FAST_AS_POSSIBLE = math.inf
+
+
+class ReplayTelemetrySource:
+    def __init__(self, recording, bridge=None, address=None, rate=None, loop=True):
+        """
+        Plays back a telemetry recording written by the bridge.
+
+        Playback starts at the first in-race frame. With ``rate=None`` no
+        thread is started and frames are only produced by ``advance()``, so
+        a consumer stepping in lock-step sees exactly the same frames on
+        every run; otherwise a background thread emits frames at ``rate`` Hz.
+
+        Args:
+            recording (str, Path or TelemetryRecording): The recording, or the
+                path to one.
+            bridge (TelemetryChannel, optional): The bridge to feed directly.
+            rate (float, optional): Playback rate in Hz, or
+                AS_FAST_AS_POSSIBLE. Defaults to None, lock-step playback.
+            address (tuple, optional): ``(host, port)`` to send UDP packets
+                to instead of feeding ``bridge``.
+            loop (bool, optional): At the end of the recording, jump back to
+                the race start. Otherwise the last frame is repeated.
+                Defaults to True.
+
+        Raises:
+            ValueError: If the recording is empty, or not exactly one of
+                ``bridge`` and ``address`` is given.
+        """
+        if (bridge is None) == (address is None):
+            raise ValueError("Pass exactly one of bridge or address")
+        if isinstance(recording, (str, os.PathLike)):
+            recording = load_recording(recording)
+        if len(recording) == 0:
+            raise ValueError("Cannot replay an empty recording")
+        self.recording: TelemetryRecording = recording
+        self.bridge = bridge
+        self.address = address
+        self.rate = rate
+        self.loop = loop
+
+        in_race = np.flatnonzero(recording.frames["flags"] & FLAG_IN_RACE)
+        self.start_index = int(in_race[0]) if len(in_race) else 0
+        self.position = self.start_index
+        # First frame of the checkpoint segment every frame is in, where a respawn rewinds to
+        checkpoint = recording.frames["cp_passed"]
+        self._segment_start = np.zeros(len(recording), dtype=np.int64)
+        changes = np.flatnonzero(np.diff(checkpoint) != 0) + 1
+        self._segment_start[changes] = changes
+        np.maximum.accumulate(self._segment_start, out=self._segment_start)
+        np.maximum(self._segment_start, self.start_index, out=self._segment_start)
+        self.frames_sent = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._sock = None
+
+    def start(self):
+        """Start playback, emitting the first frame right away."""
+        if self.address is not None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.rate is None:
+            self.advance()
+        else:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def restart(self):
+        """Rewind to the race start, like the in-game restart key."""
+        with self._lock:
+            self.position = self.start_index
+        if self.rate is None:
+            self.advance()
+
+    def respawn(self):
+        """Rewind to where the last checkpoint was passed, like the in-game respawn key."""
+        with self._lock:
+            last = max(self.position - 1, self.start_index)
+            self.position = int(self._segment_start[last])
+        if self.rate is None:
+            self.advance()
+
+    def advance(self, n=1):
+        """Emit the next ``n`` frames from the calling thread."""
+        for _ in range(n):
+            self._emit()
+
+    def _emit(self):
+        with self._lock:
+            index = self.position
+            self.position += 1
+            if self.position == len(self.recording):
+                self.position = self.start_index if self.loop else index
+            if self._sock is not None:
+                self._sock.sendto(self.recording.frames[index:index + 1].tobytes(), self.address)
+            else:
+                self.bridge.ingest_frame(self.recording.frames[index])
+            self.frames_sent += 1
+
+    def _run(self):
+        period = 1.0 / self.rate
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            self._emit()
+            if period:
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+
+
+class ReplayGameInstance(GameBackend):
+    def __init__(self, source, frames_per_step=1):
+        """
+        Game backend replaying recorded telemetry instead of running the game.
+
+        Actions do not influence the replayed telemetry; only the restart
+        and respawn keys do, by rewinding the recording to the race start or
+        to the last checkpoint passed. With a lock-step source, every
+        env step advances the recording by ``frames_per_step`` frames, so the
+        env runs as fast as it can build observations.
+
+        Args:
+            source (ReplayTelemetrySource): The replay to control.
+            frames_per_step (int, optional): Frames emitted per env step in
+                lock-step playback. Defaults to 1.
+        """
+        self.source = source
+        self.frames_per_step = frames_per_step
+        self.key_presses = Counter()
+
+    def press_key(self, key):
+        self.key_presses[key] += 1
+        if key == "backspace":
+            self.source.restart()
+        elif key == RESPAWN_KEY:
+            self.source.respawn()
+
+    def key_down(self, key):
+        pass
+
+    def key_up(self, key):
+        pass
+
+    def advance(self):
+        if self.source.rate is None:
+            self.source.advance(self.frames_per_step)
@@ -0,0 +1,175 @@
+"""
+Real-time control schedule of an env, on a monotonic deadline timer.
+
+Without a scheduler, a step sleeps STEP_INTERVAL after sending its action,
+so the control period is the sleep plus however long the agent took to pick
+the action, and drifts against the telemetry clock. A ``ControlScheduler``
+gives every step a deadline instead:
+
+* time mode (``action_repeat=0``): steps end on a fixed grid of deadlines
+  ``period`` apart, whatever the agent's decision cost;
+* frame mode (``action_repeat=k``): an action is applied for ``k``
+  telemetry frames; the step ends once the ``k``-th frame after the
+  previous step's target arrives, or at the step's deadline, ``period``
+  after the previous step ended, if telemetry stalls.
+
+The agent is late when its action comes after the step's deadline, or, in
+frame mode, after the frame the step was due to end at. Then:
+
+* ``late="skip"`` keeps the schedule: the missed deadlines (or frames) are
+  dropped and the step ends at the next one, so steps stay in phase with
+  the wall clock (or the telemetry), possibly shorter than a period;
+* ``late="hold"`` restarts the schedule from the late action, which is held
+  for a full period (or ``k`` frames), as the previous one was held while
+  the agent was deciding.
+
+Missed deadlines, the ticks overrun by late agents, and the jitter of the
+step ends are kept as metrics, see ``stats()``. The clock can be replaced,
+e.g. by a simulated telemetry clock in tests.
+"""
+import time
+from ..shared.perf import LatencyHistogram
+
+CONTROL_PERIOD = 0.05  # seconds per step, the env's ~20Hz control rate
+SKIP = "skip"
+HOLD = "hold"
+LATE_POLICIES = (SKIP, HOLD)
+
+
+class ControlScheduler:
+    def __init__(self, period=CONTROL_PERIOD, action_repeat=0, late=SKIP, clock=time.monotonic):
+        """
+        Args:
+            period (float, optional): Seconds per step in time mode; in frame
+                mode, the longest a step waits for its frames after the
+                previous one ended. Defaults to CONTROL_PERIOD.
+            action_repeat (int, optional): Telemetry frames every action is
+                applied for; 0 for time mode. Defaults to 0.
+            late (str, optional): What to do when the agent is late, SKIP or
+                HOLD. Defaults to SKIP.
+            clock (callable, optional): Monotonic clock in seconds, the one
+                telemetry timestamps are taken with. Defaults to
+                ``time.monotonic``.
+
+        Raises:
+            ValueError: If the period is not positive, the action repeat is
+                negative or the late policy is unknown.
+        """
+        if period <= 0:
+            raise ValueError(f"period must be positive, got {period}")
+        if action_repeat < 0:
+            raise ValueError(f"action_repeat must not be negative, got {action_repeat}")
+        if late not in LATE_POLICIES:
+            raise ValueError(f"Unknown late policy {late!r}, expected one of {LATE_POLICIES}")
+        self.period = period
+        self.action_repeat = action_repeat
+        self.late = late
+        self.clock = clock
+        self.deadline = None  # clock time the current step ends by
+        self.target = None    # sequence number the current step ends at, in frame mode
+        self._last_seq = -1
+        self.last_step_late = False
+
+        self.steps = 0
+        self.late_steps = 0        # the action came after its deadline (or frame)
+        self.missed_deadlines = 0  # late steps, and steps whose frames did not arrive in time
+        self.overrun = 0           # periods (frames in frame mode) the late actions came after their deadlines
+        self.frames = 0            # telemetry frames observed over all steps
+        self.jitter = LatencyHistogram()
+
+    def reset(self, seq: int = -1):
+        """Start the schedule, at the end of an env reset that observed frame ``seq``."""
+        self.deadline = self.clock() + self.period
+        self.target = seq + self.action_repeat if self.action_repeat else None
+        self._last_seq = seq
+        self.last_step_late = False
+
+    def begin(self, action_seq: int) -> tuple:
+        """
+        Schedule the step whose action was just sent, after frame
+        ``action_seq``.
+
+        Returns:
+            tuple: The sequence number to wait for (None in time mode) and
+            the seconds left until the step's deadline.
+        """
+        if self.deadline is None:
+            self.reset(action_seq)
+        now = self.clock()
+        period, k = self.period, self.action_repeat
+        late = False
+        if now > self.deadline:
+            late = True
+            ticks = int((now - self.deadline) // period) + 1
+            if not k:
+                self.overrun += ticks
+            if self.late == SKIP:
+                self.deadline += ticks * period
+            else:
+                self.deadline = now + period
+        if k:
+            if action_seq >= self.target:
+                late = True
+                frames = action_seq - self.target + 1
+                self.overrun += frames
+                if self.late == SKIP:
+                    self.target += -(-frames // k) * k
+            if late and self.late == HOLD:
+                self.target = action_seq + k
+                self.deadline = now + period
+        if late:
+            self.late_steps += 1
+        self.last_step_late = late
+        return self.target, max(0.0, self.deadline - self.clock())
+
+    def end(self, obs_seq: int, obs_timestamp: float = None) -> bool:
+        """
+        Record the end of the step, once its observation, of frame
+        ``obs_seq`` received at ``obs_timestamp``, is built. The jitter is
+        the time from the step's deadline, or in frame mode from the arrival
+        of the observed frame, until now.
+
+        Returns:
+            bool: Whether the step missed its deadline.
+        """
+        now = self.clock()
+        missed = self.last_step_late
+        if self.action_repeat:
+            if obs_seq >= self.target:
+                self.jitter.record(max(0.0, now - (obs_timestamp if obs_timestamp is not None else now)))
+                self.target += self.action_repeat
+            else:
+                # Telemetry stalled: the next step counts its frames from what did arrive
+                missed = True
+                self.jitter.record(max(0.0, now - self.deadline))
+                self.target = max(obs_seq, self._last_seq) + self.action_repeat
+            self.frames += max(0, obs_seq - self._last_seq)
+            self.deadline = now + self.period
+        else:
+            self.jitter.record(max(0.0, now - self.deadline))
+            self.frames += max(0, obs_seq - self._last_seq)
+            self.deadline += self.period
+        self._last_seq = max(obs_seq, self._last_seq)
+        self.steps += 1
+        if missed:
+            self.missed_deadlines += 1
+        return missed
+
+    def stats(self) -> dict:
+        """
+        Step counts since the scheduler was created or ``reset_stats()``,
+        the mean number of telemetry frames per step, and the jitter summary
+        in seconds (see ``LatencyHistogram.summary``).
+        """
+        return {
+            "steps": self.steps,
+            "late_steps": self.late_steps,
+            "missed_deadlines": self.missed_deadlines,
+            "overrun": self.overrun,
+            "frames_per_step": self.frames / self.steps if self.steps else 0.0,
+            "jitter": self.jitter.summary(),
+        }
+
+    def reset_stats(self):
+        self.steps = self.late_steps = self.missed_deadlines = self.overrun = self.frames = 0
+        self.jitter.reset()
@@ -0,0 +1,371 @@
+import itertools
+import select
+import socket
+import threading
+import time
+from .backend import RESPAWN_KEY, GameBackend
+from .instance import NAVIGATION_KEYS
+from .platform import GamePlatform
+from ..shared.packet import CONTROL_SIZE, DeltaEncoder, decode_rate_request, encode_telemetry
+from ..shared.schemas import CheckpointStatus, Telemetry, WheelState
+
+TRACK_LENGTH = 400.0    # meters driven from start to finish
+TOTAL_CHECKPOINTS = 4
+MAX_SPEED = 80.0        # m/s
+BOOT_TIME = 0.5         # seconds a fake game takes to reach the main menu
+WINDOW_TIME = 0.1       # seconds until a fake game's window appears
+ACCELERATION = 20.0     # m/s^2 while throttle is held
+DRAG = 5.0              # m/s^2 when coasting
+THROTTLE_HOLD = 0.1     # seconds a single key press keeps the throttle down
+
+
+class SimulatedTelemetrySource:
+    def __init__(self, bridge=None, rate=100.0, in_race=True, address=None, track_length=TRACK_LENGTH,
+                 delta=False, transport="udp", port_count=1):
+        """
+        Stand-in for the game and the telemetry plugin.
+
+        Drives a car down a straight track with simple longitudinal dynamics
+        and emits one binary packet per tick from a background thread, at
+        ``rate`` Hz. Packets are either pushed into ``bridge.ingest_packet``
+        directly, or sent to ``address`` as UDP datagrams or, like the
+        plugin's binary transport, over a TCP stream.
+
+        Over TCP the source behaves like the plugin: it tries the
+        ``port_count`` ports from ``address``'s in turn until one accepts it,
+        which the bridge confirms with a control message, keeps that port for
+        good once confirmed, follows the send rate the bridge requests and
+        starts every connection with a keyframe.
+
+        Args:
+            bridge (TelemetryBridge, optional): The bridge to feed directly.
+            rate (float, optional): Telemetry rate in Hz. Defaults to 100.
+            in_race (bool, optional): Start in a race rather than in the main
+                menu. Defaults to True.
+            address (tuple, optional): ``(host, port)`` to send UDP packets
+                to instead of feeding ``bridge``.
+            track_length (float, optional): Distance to the finish line in
+                meters. Defaults to TRACK_LENGTH.
+            delta (bool, optional): Send keyframes and deltas through a
+                DeltaEncoder, available as ``self.encoder``, like the plugin
+                with delta encoding enabled. Unchanged states are then only
+                sent as heartbeats unless ``encoder.active`` is set. Defaults
+                to False, a full packet per tick.
+            transport (str, optional): "udp" or "tcp", how packets are sent
+                to ``address``. Defaults to "udp".
+            port_count (int, optional): Consecutive ports a TCP source tries,
+                the plugin's ``binary_port_count``. Defaults to 1.
+        """
+        if (bridge is None) == (address is None):
+            raise ValueError("Pass exactly one of bridge or address")
+        if transport not in ("udp", "tcp"):
+            raise ValueError(f"Unknown transport {transport!r}, expected 'udp' or 'tcp'")
+        self.bridge = bridge
+        self.address = address
+        self.rate = rate
+        self.in_race = in_race
+        self.track_length = track_length
+        self.distance = 0.0
+        self.speed = 0.0
+        self.throttle_until = 0.0
+        self.throttle_held = False
+        self.frames_sent = 0
+        self.encoder = DeltaEncoder() if delta else None
+        self.transport = transport
+        self.port_count = port_count
+        self.port = None                  # port the TCP stream is connected to, once the bridge confirmed it
+        self.requested_interval_ms = None  # send interval the bridge asked for, None for ``rate``
+        self._port_offset = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def restart(self):
+        """Respawn the car at the start line, like the in-game restart key."""
+        with self._lock:
+            self.in_race = True
+            self.distance = 0.0
+            self.speed = 0.0
+            self.throttle_until = 0.0
+            self.throttle_held = False
+
+    def respawn(self):
+        """Put the car back at the last checkpoint passed, like the in-game respawn key."""
+        with self._lock:
+            if not self.in_race:
+                return
+            passed = int(self.distance / self.track_length * TOTAL_CHECKPOINTS)
+            self.distance = min(passed, TOTAL_CHECKPOINTS - 1) * self.track_length / TOTAL_CHECKPOINTS
+            self.speed = 0.0
+
+    def press(self, key):
+        if key == "up":
+            with self._lock:
+                self.throttle_until = time.monotonic() + THROTTLE_HOLD
+
+    def hold(self, key, down):
+        if key == "up":
+            with self._lock:
+                self.throttle_held = down
+
+    def _advance(self, dt):
+        with self._lock:
+            if not self.in_race:
+                return
+            if self.throttle_held or time.monotonic() < self.throttle_until:
+                self.speed = min(MAX_SPEED, self.speed + ACCELERATION * dt)
+            else:
+                self.speed = max(0.0, self.speed - DRAG * dt)
+            self.distance = min(self.track_length, self.distance + self.speed * dt)
+
+    def telemetry(self) -> Telemetry:
+        """The current simulated state as a Telemetry object."""
+        with self._lock:
+            if not self.in_race:
+                return Telemetry(in_main_menu=True)
+            progress = self.distance / self.track_length
+            passed = int(progress * TOTAL_CHECKPOINTS)
+            wheel = WheelState(0.0, self.speed * 3.0, 0.0, 0.0, 0.0, 0.0, 0.0, "Asphalt", "RestingGround", 0.0)
+            return Telemetry(
+                position=[self.distance, 0.0, 0.0],
+                velocity=[self.speed, 0.0, 0.0],
+                orientation=[1.0, 0.0, 0.0],
+                speed=self.speed * 3.6,
+                side_speed=0.0,
+                rpm=min(10000.0, 1000.0 + self.speed * 100.0),
+                vehicle_type="CarSport",
+                gear=1 + int(self.speed // 20),
+                engine_on=True,
+                on_ground=True,
+                checkpoints=CheckpointStatus(TOTAL_CHECKPOINTS, passed, passed / TOTAL_CHECKPOINTS),
+                wheel_states={k: wheel for k in ("front_left", "front_right", "rear_left", "rear_right")},
+                in_main_menu=False,
+                finished=self.distance >= self.track_length,
+            )
+
+    def _connect(self):
+        """Open a TCP stream to the port being tried; None if it refused."""
+        host, base_port = self.address
+        try:
+            sock = socket.create_connection((host, base_port + self._port_offset), timeout=1.0)
+        except OSError:
+            self._next_port()
+            return None
+        if self.encoder is not None:
+            self.encoder.reset()
+        return sock
+
+    def _next_port(self):
+        # Until the bridge has confirmed a port, a refused or dropped connection means it is not ours
+        if self.port is None:
+            self._port_offset = (self._port_offset + 1) % self.port_count
+
+    def _read_control(self, sock) -> bool:
+        """Apply the control messages the bridge wrote back; False if the connection was closed."""
+        try:
+            while select.select([sock], [], [], 0)[0]:
+                data = sock.recv(CONTROL_SIZE, socket.MSG_PEEK)
+                if len(data) == 0:
+                    return False
+                if len(data) < CONTROL_SIZE:
+                    return True
+                self.requested_interval_ms = decode_rate_request(sock.recv(CONTROL_SIZE))
+                self.port = self.address[1] + self._port_offset
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def _run(self):
+        sock = None
+        if self.address is not None and self.transport == "udp":
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            period = self.requested_interval_ms / 1000.0 if self.requested_interval_ms else 1.0 / self.rate
+            if self.transport == "tcp" and sock is not None and not self._read_control(sock):
+                sock.close()
+                sock = None
+                self._next_port()
+            self._advance(period)
+            packet = encode_telemetry(self.telemetry(), seq=self.frames_sent)
+            if self.transport == "tcp" and sock is None:
+                sock = self._connect()
+            if self.encoder is not None and (sock is not None or self.bridge is not None):
+                packet = self.encoder.encode(packet, time.monotonic())
+            if packet is not None:
+                if self.transport == "tcp" and sock is not None:
+                    try:
+                        sock.sendall(packet)
+                    except OSError:
+                        sock.close()
+                        sock = None
+                        self._next_port()
+                    else:
+                        self.frames_sent += 1
+                elif sock is not None:
+                    sock.sendto(packet, self.address)
+                    self.frames_sent += 1
+                elif self.bridge is not None:
+                    self.bridge.ingest_packet(packet)
+                    self.frames_sent += 1
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+        if sock is not None:
+            sock.close()
+
+
+class SimulatedGameInstance(GameBackend):
+    def __init__(self, source):
+        """
+        Drop-in replacement for TrackmaniaGameInstance backed by a
+        SimulatedTelemetrySource, for running TrackmaniaEnv without the game.
+
+        Args:
+            source (SimulatedTelemetrySource): The simulated car to control.
+        """
+        self.source = source
+        self.keys_pressed = []
+
+    def press_key(self, key):
+        self.keys_pressed.append(key)
+        if key == "backspace":
+            self.source.restart()
+        elif key == RESPAWN_KEY:
+            self.source.respawn()
+        else:
+            self.source.press(key)
+
+    def key_down(self, key):
+        self.source.hold(key, True)
+
+    def key_up(self, key):
+        self.source.hold(key, False)
+
+
+class FakeGameProcess:
+    def __init__(self, pid, address, rate=100.0, boot_time=BOOT_TIME, window_time=WINDOW_TIME,
+                 menu_keys=len(NAVIGATION_KEYS), transport="tcp"):
+        """
+        A game process simulated by FakePlatform: its window appears after
+        ``window_time`` seconds, after ``boot_time`` seconds it reaches the
+        main menu and starts sending telemetry to ``address`` over
+        ``transport``, and once ``menu_keys`` keys were pressed in the menus
+        it loads the track and drives like a SimulatedTelemetrySource. With
+        ``boot_time`` None it never boots.
+        """
+        self.pid = pid
+        self.source = SimulatedTelemetrySource(address=address, rate=rate, in_race=False, transport=transport)
+        self.launched = time.monotonic()
+        self.window_time = window_time
+        self.menu_keys = menu_keys
+        self.alive = True
+        self.booted = False
+        self.keys_pressed = []
+        self._boot_timer = None
+        if boot_time is not None:
+            self._boot_timer = threading.Timer(boot_time, self._boot)
+            self._boot_timer.daemon = True
+            self._boot_timer.start()
+
+    def _boot(self):
+        if self.alive:
+            self.booted = True
+            self.source.start()
+
+    @property
+    def has_window(self):
+        return self.alive and time.monotonic() - self.launched >= self.window_time
+
+    def press_key(self, key):
+        if not self.booted:
+            return
+        self.keys_pressed.append(key)
+        if not self.source.in_race:
+            if len(self.keys_pressed) >= self.menu_keys:
+                self.source.restart()
+        elif key == "backspace":
+            self.source.restart()
+        else:
+            self.source.press(key)
+
+    def hang(self):
+        """Keep running but stop sending telemetry, like a frozen game."""
+        if self._boot_timer is not None:
+            self._boot_timer.cancel()
+        self.source.stop()
+
+    def kill(self):
+        self.alive = False
+        self.hang()
+
+
+class FakePlatform(GamePlatform):
+    def __init__(self, rate=100.0, boot_time=BOOT_TIME, window_time=WINDOW_TIME, fail_launches=0, transport="tcp"):
+        """
+        GamePlatform whose game processes are FakeGameProcess objects, for
+        exercising TrackmaniaGameInstance and InstancePool on any OS.
+
+        Args:
+            rate (float, optional): Telemetry rate of every game in Hz.
+                Defaults to 100.
+            boot_time (float, optional): Seconds from launch to the main
+                menu. Defaults to BOOT_TIME.
+            window_time (float, optional): Seconds from launch to the window
+                appearing. Defaults to WINDOW_TIME.
+            fail_launches (int, optional): Number of launches, from the
+                first, whose process never boots.
+            transport (str, optional): How the games send telemetry, "tcp"
+                like the plugin or "udp". Defaults to "tcp".
+        """
+        self.rate = rate
+        self.boot_time = boot_time
+        self.window_time = window_time
+        self.fail_launches = fail_launches
+        self.transport = transport
+        self.processes = {}
+        self.launches = 0
+        self._pids = itertools.count(1000)
+        self._lock = threading.Lock()
+
+    def launch(self, address, timeout) -> int:
+        with self._lock:
+            pid = next(self._pids)
+            self.launches += 1
+            boots = self.launches > self.fail_launches
+        process = FakeGameProcess(pid, address, rate=self.rate,
+                                  boot_time=self.boot_time if boots else None,
+                                  window_time=self.window_time, transport=self.transport)
+        self.processes[pid] = process
+        return pid
+
+    def find_window(self, pid):
+        process = self.processes[pid]
+        return process if process.has_window else None
+
+    def is_alive(self, pid) -> bool:
+        return self.processes[pid].alive
+
+    def terminate(self, pid):
+        self.processes[pid].kill()
+
+    def press_key(self, window, key):
+        window.press_key(key)
+
+    def key_down(self, window, key):
+        window.source.hold(key, True)
+
+    def key_up(self, window, key):
+        window.source.hold(key, False)
@@ -0,0 +1,423 @@
+"""
+Declarative observation and reward pipelines over ``PACKET_DTYPE`` frames.
+
+An observation is a list of named feature stages from the ``FEATURES``
+registry (or ``FeatureStage`` objects built elsewhere, such as
+``track_progress_stage``). A ``FeaturePipeline`` lays the stages out side by
+side and compiles them into one function over a batch of frames: every
+stage writes its raw values into its columns of a preallocated output
+buffer, and the normalization of all stages is then applied as a single
+affine transform, ``out = raw * scale + offset``. The observation space is
+derived from the stages' bounds.
+
+Stages that only copy or sum float32 packet fields, or test a flag, can
+declare so (``words`` and ``flag``). For a single frame, where the cost of a
+step is the per-call overhead of numpy rather than the work, the pipeline
+computes all such stages at once, normalized, with one matrix-vector
+product over the frame's words and one table lookup on its flags.
+
+Reward terms work the same way: ``REWARD_TERMS`` maps names to vectorized
+functions of the current and previous observation batches, looked up by
+feature name rather than by index, and a ``RewardFunction`` sums a weighted
+selection of them.
+"""
+from typing import Callable, NamedTuple
+import numpy as np
+from gymnasium import spaces
+from .packet import (FLAG_FINISHED, FLAG_IS_TURBO, FLAG_ON_GROUND, PACKET_DTYPE, WHEEL_NAMES, WHEEL_ROTATION,
+                     WHEEL_SLIP_COEF)
+from .surface import N_SURFACES, SURFACE_ONE_HOT
+
+# Normalization ranges, (min, max)
+RPM_RANGE = (0.0, 10000.0)
+WHEEL_ROTATION_RANGE = (0.0, 3000.0)
+WHEEL_SLIP_RANGE = (0.0, 1.0)
+SIDE_SPEED_RANGE = (-100.0, 100.0)
+SPEED_RANGE = (0.0, 300.0)
+VERTICAL_SPEED_RANGE = (-100.0, 100.0)
+GEAR_RANGE = (0.0, 7.0)
+LOOKAHEAD_HORIZONS = (0.5, 1.0)  # seconds ahead of the car the surface is looked up at
+
+N_WHEELS = len(WHEEL_NAMES)
+
+
+class FeatureStage(NamedTuple):
+    """One named group of observation columns."""
+    name: str
+    size: int
+    fn: Callable      # fn(frames, out) writes raw values into out, shape (N, size)
+    scale: float      # normalization: value = raw * scale + offset (scalars or per column)
+    offset: float
+    low: float        # bounds of the normalized value (scalars or per column)
+    high: float
+    words: np.ndarray = None  # or: the float32 packet words summed into each column, shape (size, k)
+    flag: int = None          # or: the single column is flags & flag
+
+
+def _field_words(field) -> np.ndarray:
+    """Indices of the 4-byte words of a float32 ``PACKET_DTYPE`` field, in the field's shape."""
+    dtype, offset = PACKET_DTYPE.fields[field][:2]
+    if dtype.base != np.float32 or offset % 4:
+        raise ValueError(f"Packet field {field} is not made of float32 words")
+    return (offset // 4 + np.arange(max(1, dtype.itemsize // 4))).reshape(dtype.shape)
+
+
+FEATURES = {}
+
+
+def register_feature(name, size=1, value_range=None, low=-np.inf, high=np.inf, words=None, flag=None):
+    """
+    Register a feature stage under ``name``.
+
+    If ``value_range`` is given, raw values in that range are normalized to
+    [0, 1]; otherwise they are passed through with the given bounds.
+    ``words`` or ``flag`` declare what the decorated function computes (see
+    ``FeatureStage``), for the single-frame path.
+    """
+    if words is not None:
+        words = np.asarray(words).reshape(size, -1)
+    def decorator(fn):
+        if value_range is not None:
+            lo, hi = value_range
+            stage = FeatureStage(name, size, fn, 1.0 / (hi - lo), -lo / (hi - lo), 0.0, 1.0, words, flag)
+        else:
+            stage = FeatureStage(name, size, fn, 1.0, 0.0, low, high, words, flag)
+        FEATURES[name] = stage
+        return fn
+    return decorator
+
+
+def _flag_feature(name, flag):
+    # flags & flag is either 0 or flag, which the normalization maps to 0 or 1
+    @register_feature(name, value_range=(0, flag), flag=flag)
+    def _flag(frames, out):
+        out[:, 0] = frames["flags"] & flag
+
+
+@register_feature("rpm", value_range=RPM_RANGE, words=_field_words("rpm"))
+def _rpm(frames, out):
+    out[:, 0] = frames["rpm"]
+
+
+# Mean over the wheels: the sum, normalized over a range N_WHEELS times wider
+@register_feature("wheel_rotation", value_range=(WHEEL_ROTATION_RANGE[0], WHEEL_ROTATION_RANGE[1] * N_WHEELS),
+                  words=_field_words("wheels")[:, WHEEL_ROTATION])
+def _wheel_rotation(frames, out):
+    np.add.reduce(frames["wheels"][:, :, WHEEL_ROTATION], axis=1, out=out[:, 0])
+
+
+@register_feature("wheel_slip", value_range=(WHEEL_SLIP_RANGE[0], WHEEL_SLIP_RANGE[1] * N_WHEELS),
+                  words=_field_words("wheels")[:, WHEEL_SLIP_COEF])
+def _wheel_slip(frames, out):
+    np.add.reduce(frames["wheels"][:, :, WHEEL_SLIP_COEF], axis=1, out=out[:, 0])
+
+
+@register_feature("wheel_slip_per_wheel", size=N_WHEELS, value_range=WHEEL_SLIP_RANGE,
+                  words=_field_words("wheels")[:, WHEEL_SLIP_COEF])
+def _wheel_slip_per_wheel(frames, out):
+    out[:] = frames["wheels"][:, :, WHEEL_SLIP_COEF]
+
+
+_flag_feature("on_ground", FLAG_ON_GROUND)
+_flag_feature("finished", FLAG_FINISHED)
+_flag_feature("is_turbo", FLAG_IS_TURBO)
+
+
+# The plugin sends the direction of travel (normalized world velocity)
+@register_feature("orientation", size=3, low=-1.0, high=1.0, words=_field_words("orientation"))
+def _orientation(frames, out):
+    out[:] = frames["orientation"]
+
+
+@register_feature("side_speed", value_range=SIDE_SPEED_RANGE, words=_field_words("side_speed"))
+def _side_speed(frames, out):
+    out[:, 0] = frames["side_speed"]
+
+
+@register_feature("velocity", size=3, words=_field_words("velocity"))
+def _velocity(frames, out):
+    out[:] = frames["velocity"]
+
+
+@register_feature("speed", value_range=SPEED_RANGE, words=_field_words("speed"))
+def _speed(frames, out):
+    out[:, 0] = frames["speed"]
+
+
+@register_feature("progress", low=0.0, high=1.0, words=_field_words("cp_progress"))
+def _progress(frames, out):
+    out[:, 0] = frames["cp_progress"]
+
+
+# Forward, lateral and vertical speed. The plugin already reports the first
+# two in the car frame (FrontSpeed and side speed); orientation is the
+# direction of travel, not of the car, so it cannot rotate world velocity.
+@register_feature("car_velocity", size=3)
+def _car_velocity(frames, out):
+    out[:, 0] = frames["speed"]
+    out[:, 0] *= 1.0 / SPEED_RANGE[1]
+    out[:, 1] = frames["side_speed"]
+    out[:, 1] *= 1.0 / SIDE_SPEED_RANGE[1]
+    out[:, 2] = frames["velocity"][:, 1]
+    out[:, 2] *= 1.0 / VERTICAL_SPEED_RANGE[1]
+
+
+@register_feature("gear", value_range=GEAR_RANGE)
+def _gear(frames, out):
+    out[:, 0] = frames["gear"]
+
+
+# Fraction of the wheels on every surface class (see shared.surface), from one table lookup per wheel
+@register_feature("surface", size=N_SURFACES, value_range=(0, N_WHEELS))
+def _surface(frames, out):
+    np.add.reduce(SURFACE_ONE_HOT[frames["ground_material"]], axis=1, out=out)
+
+
+def track_progress_stage(track_model) -> FeatureStage:
+    """Continuous progress along the centerline of a ``TrackModel``, in [0, 1]."""
+    def _track_progress(frames, out):
+        out[:, 0] = track_model.progress(frames["position"])
+    return FeatureStage("track_progress", 1, _track_progress, 1.0, 0.0, 0.0, 1.0)
+
+
+def surface_lookahead_stage(surface_index, horizons=LOOKAHEAD_HORIZONS) -> FeatureStage:
+    """
+    The surface class (one-hot) and mean slip, icing and wetness that a
+    ``SurfaceIndex`` holds under the car's position projected ``horizons``
+    seconds ahead along its velocity, one group of columns per horizon.
+    """
+    horizons = np.asarray(horizons, dtype=np.float32)[:, None]
+
+    def _surface_lookahead(frames, out):
+        ahead = frames["position"][:, None, :] + frames["velocity"][:, None, :] * horizons
+        out[:] = surface_index.lookup(ahead).reshape(len(frames), -1)
+    return FeatureStage("surface_lookahead", len(horizons) * surface_index.width, _surface_lookahead,
+                        1.0, 0.0, 0.0, 1.0)
+
+
+# The observation TrackmaniaEnv has always produced, in this order
+DEFAULT_FEATURES = (
+    "rpm", "wheel_rotation", "wheel_slip", "on_ground", "finished", "orientation",
+    "side_speed", "velocity", "is_turbo", "speed", "progress",
+)
+
+
+class FeaturePipeline:
+    def __init__(self, stages=DEFAULT_FEATURES):
+        """
+        Args:
+            stages (iterable): Registered feature names or FeatureStage
+                objects, in observation order.
+
+        Raises:
+            KeyError: If a feature name is not registered.
+            ValueError: If a feature appears twice.
+        """
+        self.stages = tuple(FEATURES[stage] if isinstance(stage, str) else stage for stage in stages)
+        self.names = tuple(stage.name for stage in self.stages)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Duplicate features in {self.names}")
+
+        self.slices = {}
+        start = 0
+        for stage in self.stages:
+            self.slices[stage.name] = slice(start, start + stage.size)
+            start += stage.size
+        self.size = start
+
+        def per_column(field):
+            return np.concatenate([np.broadcast_to(np.asarray(getattr(s, field), dtype=np.float32), (s.size,))
+                                   for s in self.stages])
+        self._scale = per_column("scale")
+        self._offset = per_column("offset")
+        self.low = per_column("low")
+        self.high = per_column("high")
+        self._normalize = bool((self._scale != 1.0).any() or (self._offset != 0.0).any())
+        self._steps = tuple((stage.fn, self.slices[stage.name]) for stage in self.stages)
+        self._single = self._compile_single()
+        # (buffer, column views of it) for the last output buffer, reused while callers pass the same one
+        self._cached = (None, (), ())
+
+    def _compile_single(self):
+        """
+        The single-frame form of the stages declaring ``words`` or ``flag``:
+        the words read, the normalized matrix over them and the normalized
+        column values for each flags byte; and the remaining steps, with the
+        normalization of the stages that have one.
+        """
+        read = np.unique(np.concatenate([stage.words.ravel() for stage in self.stages if stage.words is not None]
+                                        + [np.zeros(0, dtype=np.int64)]))
+        weights = np.zeros((self.size, len(read)), dtype=np.float32)
+        flag_table = np.zeros((256, self.size), dtype=np.float32)
+        steps = []
+        for stage in self.stages:
+            columns = self.slices[stage.name]
+            scale, offset = self._scale[columns], self._offset[columns]
+            if stage.words is not None:
+                rows = np.repeat(np.arange(columns.start, columns.stop), stage.words.shape[1])
+                np.add.at(weights, (rows, np.searchsorted(read, stage.words.ravel())), scale[rows - columns.start])
+                flag_table[:, columns] = offset
+            elif stage.flag is not None:
+                flag_table[:, columns.start] = (np.arange(256) & stage.flag) * scale[0] + offset[0]
+            else:
+                normalizes = bool((scale != 1.0).any() or (offset != 0.0).any())
+                steps.append((stage.fn, columns, scale if normalizes else None, offset))
+        return read, weights, flag_table, tuple(steps)
+
+    @property
+    def observation_space(self) -> spaces.Box:
+        return spaces.Box(low=self.low, high=self.high, dtype=np.float32)
+
+    def __contains__(self, name):
+        return name in self.slices
+
+    def index(self, name) -> int:
+        """Column of a single-column feature."""
+        s = self.slices[name]
+        if s.stop - s.start != 1:
+            raise ValueError(f"Feature {name} has {s.stop - s.start} columns")
+        return s.start
+
+    def view(self, obs: np.ndarray, name) -> np.ndarray:
+        """The columns of feature ``name`` in a (..., size) observation array."""
+        return obs[..., self.slices[name]]
+
+    def __call__(self, frames: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Build observations for a batch of frames.
+
+        Args:
+            frames (np.ndarray): ``PACKET_DTYPE`` array of shape (N,).
+            out (np.ndarray, optional): float32 array of shape (N, size) to
+                write into. A new array is allocated if omitted.
+
+        Returns:
+            np.ndarray: ``out``, filled with one observation per frame.
+        """
+        if out is None:
+            out = np.empty((len(frames), self.size), dtype=np.float32)
+        # One read of the cache, which another thread may replace meanwhile
+        cached, views, single_views = self._cached
+        if out is not cached:
+            views = tuple((fn, out[:, columns]) for fn, columns in self._steps)
+            single_views = tuple((fn, out[:, columns], scale, offset) for fn, columns, scale, offset in self._single[3])
+            self._cached = (out, views, single_views)
+        if len(frames) == 1 and out.flags.c_contiguous:
+            read, weights, flag_table, _ = self._single
+            np.dot(weights, frames.view(np.float32)[read], out=out[0])
+            out[0] += flag_table[frames["flags"][0]]
+            for fn, view, scale, offset in single_views:
+                fn(frames, view)
+                if scale is not None:
+                    view *= scale
+                    view += offset
+            return out
+        for fn, view in views:
+            fn(frames, view)
+        if self._normalize:
+            out *= self._scale
+            out += self._offset
+        return out
+
+
+class RewardTerm(NamedTuple):
+    name: str
+    requires: tuple   # features the term reads
+    build: Callable   # build(pipeline) -> fn(obs, prev_obs) returning an (N,) array
+
+
+REWARD_TERMS = {}
+
+
+def register_reward_term(name, requires):
+    """
+    Register a reward term reading the features ``requires``.
+
+    The decorated function is called once per pipeline, so it can resolve
+    feature columns up front, and returns the function computing the term.
+    """
+    def decorator(build):
+        REWARD_TERMS[name] = RewardTerm(name, tuple(requires), build)
+        return build
+    return decorator
+
+
+def _gain(feature):
+    def build(pipeline):
+        column = pipeline.index(feature)
+
+        def gain(obs, prev_obs):
+            delta = obs[:, column] - prev_obs[:, column]
+            return np.maximum(delta, 0.0, out=delta)
+        return gain
+    return build
+
+
+register_reward_term("speed_gain", requires=("speed",))(_gain("speed"))
+register_reward_term("progress", requires=("progress",))(_gain("progress"))
+register_reward_term("track_progress", requires=("track_progress",))(_gain("track_progress"))
+
+
+def _level(feature):
+    def build(pipeline):
+        column = pipeline.index(feature)
+        return lambda obs, prev_obs: obs[:, column]
+    return build
+
+
+register_reward_term("speed", requires=("speed",))(_level("speed"))
+register_reward_term("wheel_slip", requires=("wheel_slip",))(_level("wheel_slip"))
+
+
+class RewardFunction:
+    def __init__(self, pipeline: FeaturePipeline, weights: dict):
+        """
+        Weighted sum of reward terms over batches of observations.
+
+        Args:
+            pipeline (FeaturePipeline): Layout of the observations.
+            weights (dict): Registered term name -> weight.
+
+        Raises:
+            KeyError: If a term is not registered.
+            ValueError: If the pipeline lacks a feature a term needs.
+        """
+        self.pipeline = pipeline
+        self.weights = {name: float(weight) for name, weight in weights.items()}
+        self.names = tuple(self.weights)
+        terms = [REWARD_TERMS[name] for name in self.weights]
+        for term in terms:
+            missing = [feature for feature in term.requires if feature not in pipeline]
+            if missing:
+                raise ValueError(f"Reward term {term.name} needs features {missing} missing from the observation")
+        self._terms = tuple((term.build(pipeline), self.weights[term.name]) for term in terms)
+
+    def __call__(self, obs: np.ndarray, prev_obs: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Rewards for the transitions ``prev_obs`` -> ``obs``, both (N, size).
+
+        Returns:
+            np.ndarray: float64 array of shape (N,), ``out`` if given.
+        """
+        if out is None:
+            out = np.zeros(len(obs), dtype=np.float64)
+        else:
+            out[:] = 0.0
+        for fn, weight in self._terms:
+            value = fn(obs, prev_obs)
+            out += value if weight == 1.0 else value * weight
+        return out
+
+    def terms(self, obs: np.ndarray, prev_obs: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Unweighted value of every term for the transitions ``prev_obs`` -> ``obs``.
+
+        Returns:
+            np.ndarray: float64 array of shape (N, len(names)), columns in
+            ``names`` order, ``out`` if given.
+        """
+        if out is None:
+            out = np.empty((len(obs), len(self._terms)), dtype=np.float64)
+        for column, (fn, _) in enumerate(self._terms):
+            out[:, column] = fn(obs, prev_obs)
+        return out
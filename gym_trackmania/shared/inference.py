@@ -0,0 +1,351 @@
+"""
+Batched policy inference for many env workers.
+
+Instead of every env worker running its own forward pass each step, workers
+hand their observation to an ``InferenceServer`` through an
+``InferenceClient`` and wait for the action. The server collects the
+requests that arrive within ``deadline`` seconds of the first one (or until
+every worker is waiting), runs one vectorized forward pass over the batch
+and scatters the actions back.
+
+Observations and actions travel through slots in a
+``multiprocessing.shared_memory`` segment, one per worker, so workers can
+be threads or processes; semaphores only carry the wake-ups. Segment layout
+(all little-endian, 64-byte aligned sections):
+
+==========================  ==============================================
+header                      int64[8]: magic, layout version, workers,
+                            observation size, action size
+request_seq                 int64[workers], last request of every worker
+response_seq                int64[workers], last request answered
+submit_time                 float64[workers], time.monotonic() of the
+                            request
+obs                         float32[workers, observation size]
+actions                     float32[workers, action size]
+==========================  ==============================================
+
+A worker writes its observation, then bumps its ``request_seq`` and
+releases the server's semaphore. The server answers every slot whose
+``request_seq`` is ahead of its ``response_seq``, writes the actions, then
+sets ``response_seq`` and releases the workers' semaphores. A worker whose
+request timed out ignores the late answer and waits for the one to its next
+request.
+
+``MLPPolicy`` is a NumPy MLP standing in for a trained policy in tests and
+benchmarks; any callable mapping an (n, observation size) batch to (n,
+action size) actions can be served.
+"""
+import multiprocessing
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from ..bridge.shm_ring import open_untracked, unlink_owned
+from .perf import LatencyHistogram
+
+INFERENCE_MAGIC = 0x544D494E4652  # "TMINFR"
+INFERENCE_LAYOUT_VERSION = 1
+BATCH_DEADLINE = 0.002  # seconds the server waits for more requests after the first
+ACT_TIMEOUT = 1.0       # seconds a worker waits for its action
+
+_HEADER_WORDS = 8
+_MAGIC, _LAYOUT_VERSION, _WORKERS, _OBS_SIZE, _ACTION_SIZE = range(5)
+_ALIGN = 64
+
+
+def _align(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _layout(workers, obs_size, action_size):
+    """Offsets and total size of a segment for ``workers`` slots."""
+    request_seq = _align(_HEADER_WORDS * 8)
+    response_seq = _align(request_seq + workers * 8)
+    submit_time = _align(response_seq + workers * 8)
+    obs = _align(submit_time + workers * 8)
+    actions = _align(obs + workers * obs_size * 4)
+    return request_seq, response_seq, submit_time, obs, actions, actions + workers * action_size * 4
+
+
+class _Slots:
+    """Views of the slots of an inference segment."""
+
+    def __init__(self, buffer, workers, obs_size, action_size):
+        request_seq, response_seq, submit_time, obs, actions, _ = _layout(workers, obs_size, action_size)
+        self.request_seq = np.ndarray(workers, dtype=np.int64, buffer=buffer, offset=request_seq)
+        self.response_seq = np.ndarray(workers, dtype=np.int64, buffer=buffer, offset=response_seq)
+        self.submit_time = np.ndarray(workers, dtype=np.float64, buffer=buffer, offset=submit_time)
+        self.obs = np.ndarray((workers, obs_size), dtype=np.float32, buffer=buffer, offset=obs)
+        self.actions = np.ndarray((workers, action_size), dtype=np.float32, buffer=buffer, offset=actions)
+
+
+class MLPPolicy:
+    def __init__(self, obs_size, action_size=3, hidden=(64, 64), action_space=None, seed=0):
+        """
+        Randomly initialized tanh MLP, batched over its first axis.
+
+        Args:
+            obs_size (int): Size of an observation.
+            action_size (int, optional): Size of an action. Defaults to 3.
+            hidden (tuple, optional): Sizes of the hidden layers. Defaults to
+                (64, 64).
+            action_space (gymnasium.spaces.Box, optional): Bounds the tanh
+                output is scaled to. Defaults to [-1, 1].
+            seed (int, optional): Seed of the weights. Defaults to 0.
+        """
+        rng = np.random.default_rng(seed)
+        sizes = (obs_size,) + tuple(hidden) + (action_size,)
+        self.weights = [(rng.standard_normal((n_in, n_out)) / np.sqrt(n_in)).astype(np.float32)
+                        for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+        self.biases = [np.zeros(n_out, dtype=np.float32) for n_out in sizes[1:]]
+        self.obs_size = obs_size
+        self.action_size = action_size
+        if action_space is None:
+            self._scale, self._offset = None, None
+        else:
+            low = np.asarray(action_space.low, dtype=np.float32)
+            high = np.asarray(action_space.high, dtype=np.float32)
+            self._scale, self._offset = (high - low) / 2, (high + low) / 2
+
+    def __call__(self, obs: np.ndarray) -> np.ndarray:
+        """Actions of an (n, obs_size) batch of observations, shape (n, action_size)."""
+        x = np.asarray(obs, dtype=np.float32)
+        for weight, bias in zip(self.weights, self.biases):
+            x = x @ weight
+            x += bias
+            np.tanh(x, out=x)
+        if self._scale is not None:
+            x *= self._scale
+            x += self._offset
+        return x
+
+
+class InferenceClient:
+    def __init__(self, name, worker, requests, ready):
+        """
+        One worker's end of an InferenceServer; get it from
+        ``InferenceServer.client()``.
+
+        Clients can be passed to worker processes as ``Process`` arguments:
+        they attach to the server's segment in the process that first uses
+        them.
+        """
+        self.name = name
+        self.worker = worker
+        self._requests = requests
+        self._ready = ready
+        self._shm = None
+        self._slots = None
+        self._seq = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_shm=None, _slots=None, _seq=None)
+        return state
+
+    def _attach(self):
+        self._shm = open_untracked(self.name)
+        magic, layout_version, workers, obs_size, action_size = struct.unpack_from("<5q", self._shm.buf)
+        if magic != INFERENCE_MAGIC or layout_version != INFERENCE_LAYOUT_VERSION:
+            self._shm.close()
+            raise ValueError(f"Shared memory segment {self.name} is not an inference server")
+        self._slots = _Slots(self._shm.buf, workers, obs_size, action_size)
+        self._seq = int(self._slots.request_seq[self.worker])
+
+    def act(self, obs: np.ndarray, timeout: float = ACT_TIMEOUT, out: np.ndarray = None) -> np.ndarray:
+        """
+        Submit an observation and wait for its action.
+
+        Args:
+            obs (np.ndarray): Observation, shape (observation size,).
+            timeout (float, optional): Maximum seconds to wait. Defaults to
+                ACT_TIMEOUT.
+            out (np.ndarray, optional): Buffer of the action size to copy the
+                action into. Defaults to a new array.
+
+        Returns:
+            np.ndarray: The action, ``out`` if given.
+
+        Raises:
+            TimeoutError: If the server did not answer in time.
+        """
+        if self._slots is None:
+            self._attach()
+        slots, worker = self._slots, self.worker
+        slots.obs[worker] = obs
+        slots.submit_time[worker] = time.monotonic()
+        self._seq += 1
+        slots.request_seq[worker] = self._seq
+        self._requests.release()
+
+        end = time.monotonic() + timeout
+        # Late answers to requests that timed out left tokens on the semaphore
+        while slots.response_seq[worker] != self._seq:
+            remaining = end - time.monotonic()
+            if remaining <= 0 or not self._ready.acquire(timeout=remaining):
+                if slots.response_seq[worker] == self._seq:
+                    break
+                raise TimeoutError(f"No action for worker {worker} within {timeout} s")
+        if out is None:
+            return slots.actions[worker].copy()
+        out[...] = slots.actions[worker]
+        return out
+
+    def close(self):
+        if self._shm is not None:
+            self._slots = None
+            self._shm.close()
+            self._shm = None
+
+
+class InferenceServer:
+    def __init__(self, policy, obs_size, action_size, workers, deadline=BATCH_DEADLINE, max_batch=None, name=None):
+        """
+        Serves a policy to ``workers`` env workers in batches.
+
+        Args:
+            policy (callable): Maps an (n, obs_size) float32 batch to (n,
+                action_size) actions, e.g. an MLPPolicy.
+            obs_size (int): Size of an observation.
+            action_size (int): Size of an action.
+            workers (int): Number of clients.
+            deadline (float, optional): Seconds to wait for more requests
+                after the first of a batch. Defaults to BATCH_DEADLINE.
+            max_batch (int, optional): Largest batch; the batch is served as
+                soon as this many requests are in. Defaults to ``workers``.
+            name (str, optional): Name of the shared memory segment. Defaults
+                to a generated one.
+
+        Raises:
+            ValueError: If ``workers`` is not positive.
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be positive, got {workers}")
+        self.policy = policy
+        self.obs_size = obs_size
+        self.action_size = action_size
+        self.workers = workers
+        self.deadline = deadline
+        self.max_batch = min(max_batch or workers, workers)
+
+        self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                              size=_layout(workers, obs_size, action_size)[-1])
+        header = np.ndarray(_HEADER_WORDS, dtype=np.int64, buffer=self.shm.buf)
+        header[:] = 0
+        header[[_MAGIC, _LAYOUT_VERSION, _WORKERS, _OBS_SIZE, _ACTION_SIZE]] = (
+            INFERENCE_MAGIC, INFERENCE_LAYOUT_VERSION, workers, obs_size, action_size)
+        self._slots = _Slots(self.shm.buf, workers, obs_size, action_size)
+        self._slots.request_seq[:] = 0
+        self._slots.response_seq[:] = 0
+        self._requests = multiprocessing.Semaphore(0)
+        self._ready = [multiprocessing.Semaphore(0) for _ in range(workers)]
+
+        # Stats, written by the serving thread only
+        self.batch_sizes = np.zeros(workers + 1, dtype=np.int64)
+        self.queue_wait = LatencyHistogram()
+        self.forward = LatencyHistogram()
+
+        self._running = False
+        self._thread = None
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def client(self, worker: int) -> InferenceClient:
+        """The client of worker ``worker``, between 0 and ``workers - 1``."""
+        if not 0 <= worker < self.workers:
+            raise ValueError(f"Worker {worker} out of range for {self.workers} workers")
+        return InferenceClient(self.name, worker, self._requests, self._ready[worker])
+
+    def serve_batch(self, timeout: float = None) -> int:
+        """
+        Wait up to ``timeout`` seconds (None: forever) for a request, collect
+        a batch and answer it.
+
+        Returns:
+            int: Number of requests answered.
+        """
+        if not self._requests.acquire(timeout=timeout):
+            return 0
+        collected = 1
+        end = time.monotonic() + self.deadline
+        while collected < self.max_batch:
+            remaining = end - time.monotonic()
+            if remaining <= 0 or not self._requests.acquire(timeout=remaining):
+                break
+            collected += 1
+
+        slots = self._slots
+        # A worker may have written its request but not released the semaphore
+        # yet: it is answered now, and its token wakes the server for nothing
+        seqs = slots.request_seq.copy()
+        pending = np.flatnonzero(seqs != slots.response_seq)
+        n = len(pending)
+        if n == 0:
+            return 0
+        if n > self.max_batch:
+            # The requests left over may have had their tokens taken: give them back
+            for _ in range(n - self.max_batch):
+                self._requests.release()
+            pending = pending[:self.max_batch]
+            n = self.max_batch
+        start = time.monotonic()
+        for submitted in slots.submit_time[pending].tolist():
+            self.queue_wait.record(start - submitted)
+        slots.actions[pending] = self.policy(slots.obs[pending])
+        self.forward.record(time.monotonic() - start)
+        slots.response_seq[pending] = seqs[pending]
+        for worker in pending.tolist():
+            self._ready[worker].release()
+        self.batch_sizes[n] += 1
+        return n
+
+    def start(self):
+        """Serve in a background thread until ``stop()``."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="InferenceServer")
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            self.serve_batch(timeout=0.1)
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        """
+        Batch sizes and latencies since the start or the last
+        ``reset_stats()``: ``queue_wait`` is from a request to the start of
+        its batch's forward pass, ``forward`` the pass itself, in seconds.
+        """
+        batches = int(self.batch_sizes.sum())
+        requests = int(self.batch_sizes @ np.arange(self.workers + 1))
+        sizes = np.flatnonzero(self.batch_sizes)
+        return {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "max_batch_size": int(sizes[-1]) if len(sizes) else 0,
+            "batch_sizes": {int(size): int(self.batch_sizes[size]) for size in sizes},
+            "queue_wait": self.queue_wait.summary(),
+            "forward": self.forward.summary(),
+        }
+
+    def reset_stats(self):
+        self.batch_sizes[:] = 0
+        self.queue_wait.reset()
+        self.forward.reset()
+
+    def close(self):
+        """
+        Stop serving and unlink the segment. The memory stays mapped until
+        every client lets go of it, but nothing answers them any more.
+        """
+        self.stop()
+        unlink_owned(self.shm)
@@ -0,0 +1,307 @@
+"""
+Online normalization of observations and reward terms.
+
+``FeaturePipeline`` maps every feature into a fixed range chosen by hand,
+which real telemetry leaves all the time, and passes velocity through raw.
+The normalizers here instead standardize with statistics gathered while
+training:
+
+* ``RunningMoments`` keeps the count, mean and sum of squared deviations of
+  a stream of vectors. A single sample is added with Welford's update and a
+  batch with the parallel merge of Chan et al., which also merges the
+  moments gathered by separate workers.
+* ``ObservationNormalizer`` standardizes observation columns in place,
+  ``(obs - mean) / std``, and clips the result to ``[-clip, clip]``.
+* ``RewardNormalizer`` divides every reward term by its running standard
+  deviation before weighting, so the weights set the terms' relative scale.
+  Terms are not centered: shifting rewards would change which episodes
+  lengths the agent prefers.
+
+Both update their statistics on every call unless ``frozen``, e.g. for
+evaluation, and are saved per map next to the agent's checkpoints with
+``save_normalization()``.
+"""
+import re
+from pathlib import Path
+import numpy as np
+
+OBS_CLIP = 5.0        # standardized observations are clipped to [-OBS_CLIP, OBS_CLIP]
+REWARD_CLIP = 10.0    # normalized rewards are clipped to [-REWARD_CLIP, REWARD_CLIP]
+EPSILON = 1e-8        # added to the variance
+NORMALIZATION_VERSION = 1
+
+
+class RunningMoments:
+    def __init__(self, size: int):
+        """
+        Running mean and variance of a stream of vectors of ``size`` values.
+
+        Args:
+            size (int): Length of the vectors.
+        """
+        self.size = size
+        self.count = 0
+        self.mean = np.zeros(size, dtype=np.float64)
+        self.m2 = np.zeros(size, dtype=np.float64)  # sum of squared deviations from the mean
+        self._delta = np.empty(size, dtype=np.float64)
+        self._residual = np.empty(size, dtype=np.float64)
+
+    @property
+    def var(self) -> np.ndarray:
+        """Population variance; ones before the first sample."""
+        if self.count == 0:
+            return np.ones(self.size, dtype=np.float64)
+        return self.m2 / self.count
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
+
+    def update(self, batch: np.ndarray):
+        """Add the rows of a (N, size) batch."""
+        n = len(batch)
+        if n == 1:
+            # Welford: no temporaries for the per-step case
+            x = batch[0]
+            self.count += 1
+            delta = np.subtract(x, self.mean, out=self._delta)
+            self.mean += np.multiply(delta, 1.0 / self.count, out=self._residual)
+            residual = np.subtract(x, self.mean, out=self._residual)
+            residual *= delta
+            self.m2 += residual
+        elif n > 1:
+            mean = batch.mean(axis=0, dtype=np.float64)
+            deviation = batch - mean
+            self._merge(n, mean, np.einsum("ij,ij->j", deviation, deviation))
+
+    def merge(self, other: "RunningMoments"):
+        """Add the samples of ``other``, e.g. the moments of another worker."""
+        if other.size != self.size:
+            raise ValueError(f"Cannot merge moments of size {other.size} into size {self.size}")
+        if other.count:
+            self._merge(other.count, other.mean, other.m2)
+
+    def _merge(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * (count / total)
+        self.m2 += m2 + delta * delta * (self.count * count / total)
+        self.count = total
+
+    def reset(self):
+        self.count = 0
+        self.mean[:] = 0.0
+        self.m2[:] = 0.0
+
+
+class ObservationNormalizer:
+    def __init__(self, pipeline, features=None, clip=OBS_CLIP, epsilon=EPSILON, frozen=False):
+        """
+        Args:
+            pipeline (FeaturePipeline): Layout of the observations.
+            features (iterable, optional): Names of the features to
+                standardize; the other columns are left as the pipeline
+                built them. Defaults to all of them.
+            clip (float, optional): Bound of the standardized values.
+                Defaults to OBS_CLIP.
+            epsilon (float, optional): Added to the variance. Defaults to
+                EPSILON.
+            frozen (bool, optional): Apply the statistics without updating
+                them. Defaults to False.
+
+        Raises:
+            KeyError: If a feature is not in the pipeline.
+        """
+        self.pipeline = pipeline
+        self.names = pipeline.names
+        self.clip = clip
+        self.epsilon = epsilon
+        self.frozen = frozen
+        self.moments = RunningMoments(pipeline.size)
+
+        self.mask = np.zeros(pipeline.size, dtype=bool)
+        for name in (pipeline.names if features is None else features):
+            self.mask[pipeline.slices[name]] = True
+        self._unmasked = np.flatnonzero(~self.mask)
+        # Only the standardized columns are clipped
+        self._low = np.where(self.mask, -clip, -np.inf).astype(np.float32)
+        self._high = np.where(self.mask, clip, np.inf).astype(np.float32)
+        # (obs - shift) * scale, refreshed whenever the moments change
+        self._shift = np.zeros(pipeline.size, dtype=np.float32)
+        self._scale = np.ones(pipeline.size, dtype=np.float32)
+        self._std = np.empty(pipeline.size, dtype=np.float64)
+        self._refresh()
+
+    def __call__(self, obs: np.ndarray, out: np.ndarray = None, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Update the statistics with a batch of observations, unless frozen,
+        and standardize it.
+
+        Args:
+            obs (np.ndarray): float32 array of shape (N, pipeline.size).
+            out (np.ndarray, optional): Array of the same shape to write
+                into. Defaults to ``obs`` itself, normalized in place.
+            rows (np.ndarray, optional): Boolean mask of the observations
+                to update the statistics with, e.g. those built from
+                telemetry rather than zero placeholders. Defaults to all.
+
+        Returns:
+            np.ndarray: ``out``.
+        """
+        if not self.frozen:
+            self.moments.update(obs if rows is None else obs[rows])
+            self._refresh()
+        if out is None:
+            out = obs
+        # Ufuncs on float32 operands only: each of them costs its call
+        # overhead, not the arithmetic, on a few dozen values (and np.clip
+        # costs more than maximum and minimum together)
+        np.subtract(obs, self._shift, out=out)
+        np.multiply(out, self._scale, out=out)
+        np.maximum(out, self._low, out=out)
+        np.minimum(out, self._high, out=out)
+        return out
+
+    def _refresh(self):
+        moments = self.moments
+        if moments.count == 0:
+            return
+        std = np.divide(moments.m2, moments.count, out=self._std)
+        if not std.all():
+            std[std == 0.0] = 1.0  # constant so far, e.g. a flag never set: nothing to scale by
+        std += self.epsilon
+        np.sqrt(std, out=std)
+        np.divide(1.0, std, out=self._scale, casting="same_kind")
+        np.copyto(self._shift, moments.mean, casting="same_kind")
+        if len(self._unmasked):
+            self._scale[self._unmasked] = 1.0
+            self._shift[self._unmasked] = 0.0
+
+    def merge(self, other: "ObservationNormalizer"):
+        """Add the statistics gathered by another normalizer of the same observations."""
+        if other.names != self.names:
+            raise ValueError(f"Cannot merge statistics of {other.names} into {self.names}")
+        if not np.array_equal(other.mask, self.mask):
+            raise ValueError("Cannot merge statistics of a normalizer standardizing other features")
+        self.moments.merge(other.moments)
+        self._refresh()
+
+    def observation_space(self, space):
+        """
+        Bounds of ``space`` after normalization.
+
+        Args:
+            space (spaces.Box): A space whose last axis starts with the
+                pipeline's columns, e.g. ``pipeline.observation_space`` or
+                ``TemporalObservation.observation_space``.
+
+        Returns:
+            spaces.Box: ``space`` with the standardized columns bounded by
+            ``[-clip, clip]``.
+        """
+        low, high = space.low.copy(), space.high.copy()
+        columns = np.flatnonzero(self.mask)
+        low[..., columns] = -self.clip
+        high[..., columns] = self.clip
+        return type(space)(low=low, high=high, dtype=space.dtype)
+
+
+class RewardNormalizer:
+    def __init__(self, reward_function, clip=REWARD_CLIP, epsilon=EPSILON, frozen=False):
+        """
+        Weighted sum of reward terms, each divided by its running standard
+        deviation. Called like the ``RewardFunction`` it wraps.
+
+        Args:
+            reward_function (RewardFunction): The terms and their weights.
+            clip (float, optional): Bound of the normalized reward. Defaults
+                to REWARD_CLIP.
+            epsilon (float, optional): Added to the variance. Defaults to
+                EPSILON.
+            frozen (bool, optional): Apply the statistics without updating
+                them. Defaults to False.
+        """
+        self.reward_function = reward_function
+        self.names = reward_function.names
+        self.clip = clip
+        self.epsilon = epsilon
+        self.frozen = frozen
+        self.moments = RunningMoments(len(self.names))
+        self._weights = np.array([reward_function.weights[name] for name in self.names], dtype=np.float64)
+        self._scale = self._weights.copy()  # weight / std of every term
+        self._terms = None
+
+    def __call__(self, obs: np.ndarray, prev_obs: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Normalized rewards for the transitions ``prev_obs`` -> ``obs``.
+
+        Returns:
+            np.ndarray: float64 array of shape (N,), ``out`` if given.
+        """
+        terms = self._terms
+        if terms is None or len(terms) != len(obs):
+            terms = self._terms = np.empty((len(obs), len(self.names)), dtype=np.float64)
+        self.reward_function.terms(obs, prev_obs, out=terms)
+        if not self.frozen:
+            self.moments.update(terms)
+            self._refresh()
+        out = np.matmul(terms, self._scale, out=out)
+        np.maximum(out, -self.clip, out=out)
+        return np.minimum(out, self.clip, out=out)
+
+    def _refresh(self):
+        if self.moments.count:
+            var = self.moments.var
+            var[var == 0.0] = 1.0  # a term that never varied keeps its weight
+            np.divide(self._weights, np.sqrt(var + self.epsilon), out=self._scale)
+
+    def merge(self, other: "RewardNormalizer"):
+        """Add the statistics gathered by another normalizer of the same terms."""
+        if other.names != self.names:
+            raise ValueError(f"Cannot merge statistics of {other.names} into {self.names}")
+        self.moments.merge(other.moments)
+        self._refresh()
+
+
+def normalization_path(map_id: str, directory) -> Path:
+    """Where the statistics of a map are saved in a checkpoint directory."""
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", map_id)
+    return Path(directory) / f"{safe_id}.normalization.npz"
+
+
+def save_normalization(path, observation: ObservationNormalizer = None, reward: RewardNormalizer = None):
+    """Save the statistics of the given normalizers to an .npz file."""
+    arrays = {"version": NORMALIZATION_VERSION}
+    for prefix, normalizer in (("obs", observation), ("reward", reward)):
+        if normalizer is not None:
+            arrays[f"{prefix}_names"] = np.array(normalizer.names)
+            arrays[f"{prefix}_count"] = normalizer.moments.count
+            arrays[f"{prefix}_mean"] = normalizer.moments.mean
+            arrays[f"{prefix}_m2"] = normalizer.moments.m2
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, **arrays)
+
+
+def load_normalization(path, observation: ObservationNormalizer = None, reward: RewardNormalizer = None):
+    """
+    Replace the statistics of the given normalizers with saved ones.
+
+    Raises:
+        KeyError: If the file has no statistics for a given normalizer.
+        ValueError: If the file was written by an incompatible version, or
+            for other features or reward terms.
+    """
+    with np.load(path) as data:
+        if int(data["version"]) != NORMALIZATION_VERSION:
+            raise ValueError(f"Unsupported normalization version {int(data['version'])} in {path}")
+        for prefix, normalizer in (("obs", observation), ("reward", reward)):
+            if normalizer is None:
+                continue
+            names = tuple(data[f"{prefix}_names"].tolist())
+            if names != normalizer.names:
+                raise ValueError(f"Statistics in {path} are for {names}, not {normalizer.names}")
+            moments = normalizer.moments
+            moments.count = int(data[f"{prefix}_count"])
+            moments.mean[:] = data[f"{prefix}_mean"]
+            moments.m2[:] = data[f"{prefix}_m2"]
+            normalizer._refresh()
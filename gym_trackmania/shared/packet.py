@@ -0,0 +1,630 @@
+"""
+Fixed-layout binary telemetry packet.
+
+This is the wire format used by the ``udp`` and ``tcp`` transports of
+:class:`TelemetryBridge`. Every packet is exactly ``PACKET_SIZE`` bytes,
+little-endian, with no padding:
+
+==========  =======  ====================================================
+offset      type     field
+==========  =======  ====================================================
+0           2s       magic (``b"TM"``)
+2           u8       protocol version
+3           u8       flags (see ``FLAG_*``)
+4           u32      sender sequence number
+8           3 x f32  position
+20          3 x f32  velocity
+32          3 x f32  orientation
+44          f32      speed
+48          f32      side_speed
+52          f32      rpm
+56          f32      turbo_time
+60          3 x f32  reactor_air_control
+72          f32      checkpoint progress
+76          u16      checkpoint total
+78          u16      checkpoints passed
+80          i8       gear
+81          u8       vehicle type code
+82          u8       reactor boost level code
+83          u8       reactor boost type code
+84          32 x f32 wheels, 4 wheels x ``WHEEL_FIELDS``
+212         4 x u8   ground material code per wheel
+216         4 x u8   falling state code per wheel
+==========  =======  ====================================================
+
+String fields are sent as indices into the vocabularies below, which
+follow the integer values the game itself uses, so the plugin can write
+``uint8(vis.FLGroundContactMaterial)`` directly.
+
+The same layout is available as the NumPy structured dtype ``PACKET_DTYPE``.
+The bridge keeps received frames as records of that dtype, so decoding a
+packet is a single copy and observations can be built from field views
+(e.g. ``frames["wheels"][:, :, WHEEL_ROTATION]``) without going through
+Telemetry objects. ``frame_to_telemetry`` materializes the dataclass view on
+demand.
+
+The packet above is a *keyframe*. Between keyframes the plugin may send
+*delta* packets (protocol version ``DELTA_VERSION``) carrying only the
+32-bit payload words that changed since the previous packet:
+
+==========  =======  ====================================================
+offset      type     field
+==========  =======  ====================================================
+0           2s       magic (``b"TM"``)
+2           u8       ``DELTA_VERSION``
+3           u8       flags, always sent in full
+4           u32      sender sequence number, previous packet's plus one
+8           u64      change mask, bit ``i`` set if payload word ``i`` changed
+16          n x u32  the changed words, in increasing ``i``
+==========  =======  ====================================================
+
+Payload word ``i`` is bytes ``8 + 4 * i`` to ``12 + 4 * i`` of the keyframe
+layout. A delta with an empty mask is a 16-byte *heartbeat*: the state is
+unchanged and the sender is alive. ``DeltaDecoder`` rebuilds full packets
+from a keyframe and the deltas that follow it.
+"""
+import struct
+import numpy as np
+from .schemas import CheckpointStatus, Telemetry, WheelState
+
+PACKET_MAGIC = b"TM"
+PACKET_VERSION = 1
+DELTA_VERSION = 2
+
+WHEEL_NAMES = ("front_left", "front_right", "rear_left", "rear_right")
+WHEEL_FIELDS = (
+    "steer_angle", "rotation", "slip_coef", "dirt",
+    "brake_coef", "tire_wear", "icing", "wetness",
+)
+WHEEL_STEER_ANGLE, WHEEL_ROTATION, WHEEL_SLIP_COEF, WHEEL_DIRT, \
+    WHEEL_BRAKE_COEF, WHEEL_TIRE_WEAR, WHEEL_ICING, WHEEL_WETNESS = range(len(WHEEL_FIELDS))
+
+VEHICLE_TYPES = ("CharacterPilot", "CarSport", "CarSnow", "CarRally", "CarDesert")
+FALLING_STATES = ("FallingAir", "FallingWater", "RestingGround", "RestingWater", "GlidingGround")
+REACTOR_BOOST_LEVELS = ("None", "Lvl1", "Lvl2")
+REACTOR_BOOST_TYPES = ("None", "Up", "Down", "UpAndDown")
+
+# EPlugSurfaceMaterialId, in enum order (see plugin/telemetry/material_lookup.as)
+GROUND_MATERIALS = (
+    "Concrete", "Pavement", "Grass", "Ice", "Metal", "Sand", "Dirt",
+    "Turbo_Deprecated", "DirtRoad", "Rubber", "SlidingRubber", "Test", "Rock",
+    "Water", "Wood", "Danger", "Asphalt", "WetDirtRoad", "WetAsphalt",
+    "WetPavement", "WetGrass", "Snow", "ResonantMetal", "GolfBall", "GolfWall",
+    "GolfGround", "Turbo2_Deprecated", "Bumper_Deprecated", "NotCollidable",
+    "FreeWheeling_Deprecated", "TurboRoulette_Deprecated", "WallJump",
+    "MetalTrans", "Stone", "Player", "Trunk", "TechLaser", "SlidingWood",
+    "PlayerOnly", "Tech", "TechArmor", "TechSafe", "OffZone", "Bullet",
+    "TechHook", "TechGround", "TechWall", "TechArrow", "TechHook2", "Forest",
+    "Wheat", "TechTarget", "PavementStair", "TechTeleport", "Energy",
+    "TechMagnetic", "TurboTechMagnetic_Deprecated",
+    "Turbo2TechMagnetic_Deprecated", "TurboWood_Deprecated",
+    "Turbo2Wood_Deprecated", "FreeWheelingTechMagnetic_Deprecated",
+    "FreeWheelingWood_Deprecated", "TechSuperMagnetic", "TechNucleus",
+    "TechMagneticAccel", "MetalFence", "TechGravityChange", "TechGravityReset",
+    "RubberBand", "Gravel", "Hack_NoGrip_Deprecated", "Bumper2_Deprecated",
+    "NoSteering_Deprecated", "NoBrakes_Deprecated", "RoadIce", "RoadSynthetic",
+    "Green", "Plastic", "DevDebug", "Free3", "XXX_Null",
+)
+
+# Code used for missing or unrecognised string values
+UNKNOWN_CODE = 255
+
+# Name -> code of the vocabularies, so encoding a name is a dict lookup rather than a scan
+GROUND_MATERIAL_CODES = {name: code for code, name in enumerate(GROUND_MATERIALS)}
+_FALLING_STATE_CODES = {name: code for code, name in enumerate(FALLING_STATES)}
+_VEHICLE_TYPE_CODES = {name: code for code, name in enumerate(VEHICLE_TYPES)}
+_REACTOR_BOOST_LEVEL_CODES = {name: code for code, name in enumerate(REACTOR_BOOST_LEVELS)}
+_REACTOR_BOOST_TYPE_CODES = {name: code for code, name in enumerate(REACTOR_BOOST_TYPES)}
+
+FLAG_IN_MAIN_MENU = 1 << 0
+FLAG_FINISHED = 1 << 1
+FLAG_ON_GROUND = 1 << 2
+FLAG_ENGINE_ON = 1 << 3
+FLAG_IS_TURBO = 1 << 4
+FLAG_REACTOR_GROUND_MODE = 1 << 5
+FLAG_REACTOR_INPUTS = 1 << 6
+FLAG_IN_RACE = 1 << 7  # vehicle fields are valid
+
+PACKET_STRUCT = struct.Struct("<2sBBI3f3f3f4f3ffHHbBBB32f4B4B")
+PACKET_SIZE = PACKET_STRUCT.size
+
+PACKET_DTYPE = np.dtype([
+    ("magic", "S2"),
+    ("version", "u1"),
+    ("flags", "u1"),
+    ("seq", "<u4"),
+    ("position", "<f4", (3,)),
+    ("velocity", "<f4", (3,)),
+    ("orientation", "<f4", (3,)),
+    ("speed", "<f4"),
+    ("side_speed", "<f4"),
+    ("rpm", "<f4"),
+    ("turbo_time", "<f4"),
+    ("reactor_air_control", "<f4", (3,)),
+    ("cp_progress", "<f4"),
+    ("cp_total", "<u2"),
+    ("cp_passed", "<u2"),
+    ("gear", "i1"),
+    ("vehicle_type", "u1"),
+    ("reactor_boost_level", "u1"),
+    ("reactor_boost_type", "u1"),
+    ("wheels", "<f4", (len(WHEEL_NAMES), len(WHEEL_FIELDS))),
+    ("ground_material", "u1", (len(WHEEL_NAMES),)),
+    ("falling_state", "u1", (len(WHEEL_NAMES),)),
+])
+assert PACKET_DTYPE.itemsize == PACKET_SIZE
+
+DELTA_HEADER_SIZE = 16
+DELTA_WORDS = (PACKET_SIZE - 8) // 4  # payload words a delta mask covers
+
+# Rate requests the bridge writes back to the plugin on a tcp connection:
+# magic, version, pad, send interval in ms (0 for the plugin's configured one)
+CONTROL_MAGIC = b"TC"
+CONTROL_STRUCT = struct.Struct("<2sBxH")
+CONTROL_SIZE = CONTROL_STRUCT.size
+
+_BOOL_FLAGS = (
+    ("finished", FLAG_FINISHED),
+    ("on_ground", FLAG_ON_GROUND),
+    ("engine_on", FLAG_ENGINE_ON),
+    ("is_turbo", FLAG_IS_TURBO),
+    ("reactor_ground_mode", FLAG_REACTOR_GROUND_MODE),
+    ("reactor_inputs", FLAG_REACTOR_INPUTS),
+)
+
+
+def _encode_name(codes, name):
+    code = codes.get(name)
+    if code is not None:
+        return code
+    # The plugin reports unmapped materials as "Unknown_<id>"
+    if name and name.startswith("Unknown_"):
+        code = name[len("Unknown_"):]
+        if code.isdigit() and int(code) < UNKNOWN_CODE:
+            return int(code)
+    return UNKNOWN_CODE
+
+
+def _decode_name(vocabulary, code, missing=None):
+    if code < len(vocabulary):
+        return vocabulary[code]
+    if code == UNKNOWN_CODE:
+        return missing
+    return f"Unknown_{code}"
+
+
+def encode_telemetry(telemetry: Telemetry, seq: int = 0) -> bytes:
+    """
+    Pack a Telemetry object into a binary packet.
+
+    This is the Python counterpart of ``PostTelemetryBinary`` in
+    ``send_telemetry_data.as`` and is mainly used to feed the bridge without
+    the game running.
+
+    Parameters
+    ----------
+    telemetry : Telemetry
+        The telemetry to encode. Missing values are sent as zeros.
+    seq : int, optional
+        Sender sequence number, wrapped to 32 bits. Defaults to 0.
+
+    Returns
+    -------
+    bytes
+        A packet of exactly ``PACKET_SIZE`` bytes.
+    """
+    flags = FLAG_IN_MAIN_MENU if telemetry.in_main_menu else 0
+    for name, flag in _BOOL_FLAGS:
+        if getattr(telemetry, name):
+            flags |= flag
+    if telemetry.position is not None:
+        flags |= FLAG_IN_RACE
+
+    cp = telemetry.checkpoints
+    wheel_values = []
+    materials = []
+    falling = []
+    for wheel_name in WHEEL_NAMES:
+        wheel = (telemetry.wheel_states or {}).get(wheel_name)
+        if wheel is None:
+            wheel_values.extend([0.0] * len(WHEEL_FIELDS))
+            materials.append(UNKNOWN_CODE)
+            falling.append(UNKNOWN_CODE)
+            continue
+        wheel_values.extend(getattr(wheel, f) or 0.0 for f in WHEEL_FIELDS)
+        materials.append(_encode_name(GROUND_MATERIAL_CODES, wheel.ground_material))
+        falling.append(_encode_name(_FALLING_STATE_CODES, wheel.falling_state))
+
+    return PACKET_STRUCT.pack(
+        PACKET_MAGIC, PACKET_VERSION, flags, seq & 0xFFFFFFFF,
+        *(telemetry.position or (0.0, 0.0, 0.0)),
+        *(telemetry.velocity or (0.0, 0.0, 0.0)),
+        *(telemetry.orientation or (0.0, 0.0, 0.0)),
+        telemetry.speed or 0.0,
+        telemetry.side_speed or 0.0,
+        telemetry.rpm or 0.0,
+        telemetry.turbo_time or 0.0,
+        *(telemetry.reactor_air_control or (0.0, 0.0, 0.0)),
+        cp.progress if cp else 0.0,
+        cp.total if cp else 0,
+        cp.passed if cp else 0,
+        telemetry.gear or 0,
+        _encode_name(_VEHICLE_TYPE_CODES, telemetry.vehicle_type),
+        _encode_name(_REACTOR_BOOST_LEVEL_CODES, telemetry.reactor_boost_level),
+        _encode_name(_REACTOR_BOOST_TYPE_CODES, telemetry.reactor_boost_type),
+        *wheel_values,
+        *materials,
+        *falling,
+    )
+
+
+def decode_into(data, out: np.ndarray) -> np.ndarray:
+    """
+    Validate a binary packet and copy it into a preallocated record.
+
+    Parameters
+    ----------
+    data : bytes-like
+        At least ``PACKET_SIZE`` bytes; anything after the packet is ignored.
+    out : np.ndarray
+        A contiguous ``PACKET_DTYPE`` array of shape (1,), typically a slice
+        of a larger frame buffer.
+
+    Returns
+    -------
+    np.ndarray
+        ``out``, now holding the decoded frame.
+
+    Raises
+    ------
+    ValueError
+        If the packet is too short or has the wrong magic or version.
+    """
+    if len(data) < PACKET_SIZE:
+        raise ValueError(f"Telemetry packet too short: {len(data)} < {PACKET_SIZE} bytes")
+    raw = np.frombuffer(data, dtype=np.uint8, count=PACKET_SIZE)
+    if raw[0] != PACKET_MAGIC[0] or raw[1] != PACKET_MAGIC[1]:
+        raise ValueError(f"Bad telemetry packet magic: {raw[:2].tobytes()!r}")
+    if raw[2] != PACKET_VERSION:
+        raise ValueError(f"Unsupported telemetry packet version: {raw[2]}")
+    out.view(np.uint8)[:] = raw
+    return out
+
+
+def copy_frames(frames: np.ndarray) -> np.ndarray:
+    """
+    Copy a contiguous ``PACKET_DTYPE`` array.
+
+    Copies the raw bytes: NumPy copies packed structured arrays field by
+    field, which is an order of magnitude slower for a few frames.
+    """
+    return np.frombuffer(bytearray(frames.tobytes()), dtype=PACKET_DTYPE)
+
+
+def frame_from_telemetry(telemetry: Telemetry, out: np.ndarray) -> np.ndarray:
+    """
+    Write a Telemetry object into a preallocated ``PACKET_DTYPE`` record.
+
+    This is how JSON telemetry from the HTTP transport joins the array-backed
+    path; it is not meant for the per-frame binary hot path.
+    """
+    return decode_into(encode_telemetry(telemetry), out)
+
+
+def frame_to_telemetry(frame) -> Telemetry:
+    """
+    Materialize a Telemetry object from a ``PACKET_DTYPE`` record.
+
+    Parameters
+    ----------
+    frame : np.void or np.ndarray
+        A single record, or an array of shape (1,).
+
+    Returns
+    -------
+    Telemetry
+        The decoded telemetry. Frames without ``FLAG_IN_RACE`` decode like
+        the menu-only JSON documents the plugin sends.
+    """
+    if isinstance(frame, np.ndarray):
+        frame = frame[0]
+    flags = int(frame["flags"])
+    if not flags & FLAG_IN_RACE:
+        return Telemetry.from_dict({
+            "in_main_menu": bool(flags & FLAG_IN_MAIN_MENU),
+            "finished": bool(flags & FLAG_FINISHED),
+        })
+
+    wheels = frame["wheels"].tolist()
+    materials = frame["ground_material"].tolist()
+    falling = frame["falling_state"].tolist()
+    wheel_states = {}
+    for i, wheel_name in enumerate(WHEEL_NAMES):
+        wheel_states[wheel_name] = WheelState(
+            ground_material=_decode_name(GROUND_MATERIALS, materials[i], ""),
+            falling_state=_decode_name(FALLING_STATES, falling[i], ""),
+            **dict(zip(WHEEL_FIELDS, wheels[i])),
+        )
+
+    telemetry = Telemetry(
+        position=frame["position"].tolist(),
+        velocity=frame["velocity"].tolist(),
+        orientation=frame["orientation"].tolist(),
+        speed=float(frame["speed"]),
+        side_speed=float(frame["side_speed"]),
+        rpm=float(frame["rpm"]),
+        turbo_time=float(frame["turbo_time"]),
+        reactor_air_control=frame["reactor_air_control"].tolist(),
+        checkpoints=CheckpointStatus(
+            total=int(frame["cp_total"]),
+            passed=int(frame["cp_passed"]),
+            progress=float(frame["cp_progress"]),
+        ),
+        gear=int(frame["gear"]),
+        vehicle_type=_decode_name(VEHICLE_TYPES, int(frame["vehicle_type"])),
+        reactor_boost_level=_decode_name(REACTOR_BOOST_LEVELS, int(frame["reactor_boost_level"])),
+        reactor_boost_type=_decode_name(REACTOR_BOOST_TYPES, int(frame["reactor_boost_type"])),
+        wheel_states=wheel_states,
+        in_main_menu=bool(flags & FLAG_IN_MAIN_MENU),
+    )
+    for name, flag in _BOOL_FLAGS:
+        setattr(telemetry, name, bool(flags & flag))
+    return telemetry
+
+
+def decode_packet(data) -> Telemetry:
+    """
+    Unpack a binary packet into a Telemetry object.
+
+    Parameters
+    ----------
+    data : bytes-like
+        At least ``PACKET_SIZE`` bytes; anything after the packet is ignored.
+
+    Returns
+    -------
+    Telemetry
+        The decoded telemetry.
+
+    Raises
+    ------
+    ValueError
+        If the packet is too short or has the wrong magic or version.
+    """
+    return frame_to_telemetry(decode_into(data, np.empty(1, dtype=PACKET_DTYPE)))
+
+
+def packet_length(data):
+    """
+    Total length of the packet at the start of ``data``, from its header.
+
+    Stream transports use this to split a byte stream into packets of
+    either kind.
+
+    Parameters
+    ----------
+    data : bytes-like
+        The start of a packet. ``DELTA_HEADER_SIZE`` bytes are always enough.
+
+    Returns
+    -------
+    int or None
+        ``PACKET_SIZE`` for a keyframe, the header plus changed words for a
+        delta, or None if ``data`` is too short to tell or is not a packet.
+    """
+    if len(data) < 3 or data[0] != PACKET_MAGIC[0] or data[1] != PACKET_MAGIC[1]:
+        return None
+    if data[2] == PACKET_VERSION:
+        return PACKET_SIZE
+    if data[2] == DELTA_VERSION and len(data) >= DELTA_HEADER_SIZE:
+        mask = int.from_bytes(data[8:16], "little")
+        return DELTA_HEADER_SIZE + 4 * mask.bit_count()
+    return None
+
+
+def encode_delta(previous, packet) -> bytes:
+    """
+    Encode ``packet`` as a delta against ``previous``.
+
+    This is the Python counterpart of the plugin's delta encoding, used to
+    feed the bridge and the benchmarks without the game running.
+
+    Parameters
+    ----------
+    previous : bytes-like
+        The last packet sent, keyframe layout.
+    packet : bytes-like
+        The packet to send, keyframe layout. Its flags and sequence number
+        are copied into the delta header.
+
+    Returns
+    -------
+    bytes
+        A delta packet; just the header if nothing changed.
+    """
+    old = np.frombuffer(previous, dtype="<u4", count=DELTA_WORDS, offset=8)
+    new = np.frombuffer(packet, dtype="<u4", count=DELTA_WORDS, offset=8)
+    changed = np.flatnonzero(old != new)
+    mask = int((np.uint64(1) << changed.astype(np.uint64)).sum()) if len(changed) else 0
+    header = bytes(packet[:8])
+    return (header[:2] + bytes((DELTA_VERSION,)) + header[3:8] + mask.to_bytes(8, "little")
+            + new[changed].tobytes())
+
+
+class DeltaEncoder:
+    """
+    Turns a stream of full packets into keyframes, deltas and heartbeats,
+    like the plugin does.
+
+    Parameters
+    ----------
+    keyframe_interval : int, optional
+        Packets sent between two keyframes, so a receiver that lost a delta
+        recovers. Defaults to 50.
+    heartbeat_interval : float, optional
+        Seconds an unchanged state is withheld before a heartbeat is sent.
+        Defaults to 1.0.
+    active : bool, optional
+        Send every packet, unchanged ones as heartbeats, so a frame-synchronous
+        reader sees one sequence number per tick. The plugin does this while
+        the bridge has requested a send rate, i.e. during episodes. Defaults
+        to False.
+    """
+
+    def __init__(self, keyframe_interval=50, heartbeat_interval=1.0, active=False):
+        self.keyframe_interval = keyframe_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.active = active
+        self.reset()
+
+    def reset(self):
+        """Send a keyframe next, e.g. after reconnecting."""
+        self._previous = None
+        self._since_keyframe = 0
+        self._last_sent = float("-inf")
+        self._seq = 0
+
+    def encode(self, packet, now):
+        """
+        Encode the current state for sending at time ``now``.
+
+        Parameters
+        ----------
+        packet : bytes-like
+            The current state as a full packet. Its sequence number is
+            replaced: only packets actually sent are numbered.
+        now : float
+            Current time in seconds.
+
+        Returns
+        -------
+        bytes or None
+            The packet to send, or None if the state is unchanged and no
+            heartbeat is due.
+        """
+        packet = bytearray(packet[:PACKET_SIZE])
+        packet[4:8] = self._seq.to_bytes(4, "little")
+        if self._previous is None or self._since_keyframe >= self.keyframe_interval:
+            data = bytes(packet)
+            self._since_keyframe = 0
+        else:
+            data = encode_delta(self._previous, packet)
+            if (not self.active and len(data) == DELTA_HEADER_SIZE and data[3] == self._previous[3]
+                    and now - self._last_sent < self.heartbeat_interval):
+                return None
+            self._since_keyframe += 1
+        self._previous = packet
+        self._last_sent = now
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        return data
+
+
+class DeltaDecoder:
+    """
+    Rebuilds full packets from a stream of keyframes and deltas.
+
+    A delta only applies on top of the packet right before it. After a gap
+    in sequence numbers, deltas are dropped until the next keyframe, so a
+    lost datagram never produces a wrong frame.
+
+    Attributes
+    ----------
+    keyframes, deltas, dropped : int
+        Packets of each kind received, and deltas dropped for lack of a base.
+    """
+
+    def __init__(self):
+        self.packet = bytearray(PACKET_SIZE)
+        self._words = np.frombuffer(self.packet, dtype="<u4", count=DELTA_WORDS, offset=8)
+        self._indices = {}  # change mask -> word indices
+        self.last_seq = None
+        self.keyframes = 0
+        self.deltas = 0
+        self.dropped = 0
+
+    def decode(self, data):
+        """
+        Decode one packet of either kind.
+
+        Parameters
+        ----------
+        data : bytes-like
+            A keyframe or delta packet; anything after it is ignored.
+
+        Returns
+        -------
+        bytes-like or None
+            A full keyframe-layout packet, valid until the next call, or
+            None if a delta was dropped.
+
+        Raises
+        ------
+        ValueError
+            If the packet is too short or has the wrong magic or version.
+        """
+        if len(data) < 3 or data[0] != PACKET_MAGIC[0] or data[1] != PACKET_MAGIC[1]:
+            raise ValueError(f"Bad telemetry packet magic: {bytes(data[:2])!r}")
+        seq = int.from_bytes(data[4:8], "little")
+        if data[2] == PACKET_VERSION:
+            if len(data) < PACKET_SIZE:
+                raise ValueError(f"Telemetry packet too short: {len(data)} < {PACKET_SIZE} bytes")
+            self.packet[:] = data[:PACKET_SIZE]
+            self.last_seq = seq
+            self.keyframes += 1
+            return data
+        if data[2] != DELTA_VERSION:
+            raise ValueError(f"Unsupported telemetry packet version: {data[2]}")
+
+        length = packet_length(data)
+        if length is None or len(data) < length:
+            raise ValueError(f"Telemetry delta packet too short: {len(data)} bytes")
+        if self.last_seq is None or seq != (self.last_seq + 1) & 0xFFFFFFFF:
+            self.last_seq = None
+            self.dropped += 1
+            return None
+        mask = int.from_bytes(data[8:16], "little")
+        if mask:
+            indices = self._indices.get(mask)
+            if indices is None:
+                if mask >> DELTA_WORDS:
+                    raise ValueError(f"Telemetry delta mask out of range: {mask:#x}")
+                if len(self._indices) >= 1024:
+                    self._indices.clear()
+                indices = np.flatnonzero(np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=8, offset=8),
+                                                       bitorder="little"))
+                self._indices[mask] = indices
+            self._words[indices] = np.frombuffer(data, dtype="<u4", count=len(indices), offset=DELTA_HEADER_SIZE)
+        self.packet[3] = data[3]
+        self.packet[4:8] = data[4:8]
+        self.last_seq = seq
+        self.deltas += 1
+        return self.packet
+
+
+def encode_rate_request(send_interval_ms=None) -> bytes:
+    """
+    Build the control message asking the plugin to send a packet every
+    ``send_interval_ms`` milliseconds, or at its configured rate if None.
+    """
+    return CONTROL_STRUCT.pack(CONTROL_MAGIC, PACKET_VERSION, min(send_interval_ms or 0, 0xFFFF))
+
+
+def decode_rate_request(data):
+    """
+    Unpack a control message built by ``encode_rate_request``.
+
+    Returns
+    -------
+    int or None
+        The requested send interval in milliseconds, None for the
+        configured one.
+
+    Raises
+    ------
+    ValueError
+        If ``data`` is not a control message.
+    """
+    magic, version, interval_ms = CONTROL_STRUCT.unpack_from(data)
+    if magic != CONTROL_MAGIC or version != PACKET_VERSION:
+        raise ValueError(f"Bad telemetry control message: {bytes(data[:CONTROL_SIZE])!r}")
+    return interval_ms or None
@@ -0,0 +1,257 @@
+"""
+Latency instrumentation for the hot path, from telemetry ingest to the
+action reaching the game.
+
+Timings are recorded into ``LatencyHistogram``s with HDR-style log-linear
+buckets: every power of two is split into ``2 ** SUB_BUCKET_BITS`` equal
+buckets, so any latency from a nanosecond to minutes is kept with a relative
+error below ``2 ** -SUB_BUCKET_BITS`` in a fixed array of counters.
+
+A ``PerfStats`` holds one histogram per stage and per recording thread, so
+recording never takes a lock; readers merge the threads' histograms. The
+instrumented classes (``TelemetryChannel``, ``KeyStateController``,
+``TrackmaniaEnv``) have a ``perf`` attribute that is None unless
+instrumentation is enabled, and skip all timing when it is.
+"""
+import threading
+import time
+from array import array
+import numpy as np
+
+# Stages of a step, in hot-path order
+INGEST = "ingest"                    # a received frame is written to the telemetry ring
+PARSE = "parse"                      # a JSON document is decoded into Telemetry (http transport)
+QUEUE_WAIT = "queue_wait"            # age of a frame when the env reads it
+OBS_BUILD = "obs_build"              # the observation is built from the frame
+REWARD = "reward"                    # the reward is computed
+ACTION_DISPATCH = "action_dispatch"  # an action waits for the controller to press its keys
+END_TO_END = "end_to_end"            # an action is sent until the next observation is read
+STAGES = (INGEST, PARSE, QUEUE_WAIT, OBS_BUILD, REWARD, ACTION_DISPATCH, END_TO_END)
+
+SUB_BUCKET_BITS = 7          # 128 buckets per power of two, under 1% error
+MAX_SHIFT = 34               # largest recorded value ~2**42 ns, over an hour
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+# Bucket bounds of the Prometheus exposition, in seconds
+PROMETHEUS_BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5))
+METRIC_NAME = "trackmania_stage_latency_seconds"
+
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_LINEAR_LIMIT = 2 * _SUB_BUCKETS  # values below this many nanoseconds get one bucket each
+N_BUCKETS = (MAX_SHIFT + 2) * _SUB_BUCKETS
+
+
+def _bucket_bounds():
+    index = np.arange(N_BUCKETS)
+    shift = np.maximum(index // _SUB_BUCKETS - 1, 0)
+    low = np.where(index < _LINEAR_LIMIT, index, (index - shift * _SUB_BUCKETS) << shift)
+    return low, low + (1 << shift) - 1
+
+
+# Smallest and largest value in nanoseconds of every bucket
+BUCKET_LOW, BUCKET_HIGH = _bucket_bounds()
+
+
+class LatencyHistogram:
+    def __init__(self):
+        """
+        Counts of latencies in log-linear buckets.
+
+        ``record()`` must only be called from one thread at a time; reading
+        concurrently is safe but may see a sample counted in ``count`` before
+        its bucket.
+        """
+        # An int64 array rather than a list: as fast to increment, and
+        # readable as a NumPy array without a copy
+        self.counts = array("q", bytes(8 * N_BUCKETS))
+        self._counts = np.frombuffer(self.counts, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        ns = int(seconds * 1e9)
+        if ns < _LINEAR_LIMIT:
+            index = ns if ns > 0 else 0
+        else:
+            shift = ns.bit_length() - SUB_BUCKET_BITS - 1
+            index = (shift << SUB_BUCKET_BITS) + (ns >> shift)
+            if index >= N_BUCKETS:
+                index = N_BUCKETS - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the samples of ``other`` to this histogram."""
+        self._counts += other._counts
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        self._counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Latency in seconds below which a fraction ``q`` of the samples fall,
+        within the bucket precision.
+        """
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs) -> list:
+        cumulative = np.cumsum(self._counts)
+        n = cumulative[-1]
+        if n == 0:
+            return [0.0] * len(qs)
+        index = np.minimum(np.searchsorted(cumulative, np.maximum(1, np.asarray(qs) * n)), N_BUCKETS - 1)
+        return [min(float(high) * 1e-9, self.max) for high in BUCKET_HIGH[index]]
+
+    def cumulative_counts(self, bounds) -> np.ndarray:
+        """Number of samples at most each bound in seconds, e.g. for Prometheus buckets."""
+        cumulative = np.cumsum(self._counts)
+        index = np.searchsorted(BUCKET_HIGH, np.asarray(bounds) * 1e9, side="right") - 1
+        return np.where(index >= 0, cumulative[np.maximum(index, 0)], 0)
+
+    def summary(self) -> dict:
+        """Count, mean, max and SUMMARY_QUANTILES, all latencies in seconds."""
+        summary = {"count": self.count, "mean": self.mean, "max": self.max}
+        for q, value in zip(SUMMARY_QUANTILES, self.quantiles(SUMMARY_QUANTILES)):
+            summary[f"p{q * 100:g}"] = value
+        return summary
+
+
+class PerfStats:
+    def __init__(self, stages=STAGES):
+        """
+        Per-stage latency histograms, recorded lock-free from any thread.
+
+        Each recording thread gets its own set of histograms the first time
+        it records; ``histograms()`` merges them.
+
+        Args:
+            stages (iterable, optional): Names of the stages. Defaults to
+                STAGES.
+        """
+        self.stages = tuple(stages)
+        self._local = threading.local()
+        self._threads = []  # histograms of every thread that recorded
+        self._threads_lock = threading.Lock()
+
+    def _thread_histograms(self):
+        histograms = {stage: LatencyHistogram() for stage in self.stages}
+        with self._threads_lock:
+            self._threads.append(histograms)
+        self._local.histograms = histograms
+        return histograms
+
+    def record(self, stage, seconds: float):
+        try:
+            histograms = self._local.histograms
+        except AttributeError:
+            histograms = self._thread_histograms()
+        histograms[stage].record(seconds)
+
+    def since(self, stage, start: float):
+        """Record the time elapsed since ``start``, a ``time.perf_counter()`` value."""
+        self.record(stage, time.perf_counter() - start)
+
+    def histograms(self) -> dict:
+        """Stage -> LatencyHistogram merged over all threads."""
+        merged = {stage: LatencyHistogram() for stage in self.stages}
+        with self._threads_lock:
+            threads = list(self._threads)
+        for histograms in threads:
+            for stage, histogram in histograms.items():
+                merged[stage].merge(histogram)
+        return merged
+
+    def summary(self) -> dict:
+        """Stage -> ``LatencyHistogram.summary()``, for stages with samples."""
+        return {stage: histogram.summary() for stage, histogram in self.histograms().items() if histogram.count}
+
+    def reset(self):
+        with self._threads_lock:
+            threads = list(self._threads)
+        for histograms in threads:
+            for histogram in histograms.values():
+                histogram.reset()
+
+    def to_prometheus(self, labels: dict = None) -> str:
+        """
+        The histograms in the Prometheus text exposition format, one
+        ``METRIC_NAME`` histogram with a ``stage`` label.
+
+        Args:
+            labels (dict, optional): Extra labels added to every sample,
+                e.g. ``{"instance": "0"}``.
+        """
+        extra = "".join(f',{key}="{value}"' for key, value in (labels or {}).items())
+        lines = [f"# HELP {METRIC_NAME} Latency of each hot-path stage.", f"# TYPE {METRIC_NAME} histogram"]
+        for stage, histogram in self.histograms().items():
+            for bound, n in zip(PROMETHEUS_BUCKETS, histogram.cumulative_counts(PROMETHEUS_BUCKETS)):
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}"{extra},le="{bound:g}"}} {n}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}"{extra},le="+Inf"}} {histogram.count}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"{extra}}} {histogram.total:.9g}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"{extra}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, perf: PerfStats, host="127.0.0.1", port=0):
+        """
+        Serves ``perf.to_prometheus()`` on ``http://host:port/metrics`` from
+        a background thread.
+
+        Args:
+            perf (PerfStats): The statistics to expose.
+            host (str, optional): Defaults to "127.0.0.1".
+            port (int, optional): Defaults to 0, a free port, available as
+                ``self.port`` once started.
+        """
+        self.perf = perf
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        # Imported here: http.server is slow to import and rarely needed
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        perf = self.perf
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = perf.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
@@ -0,0 +1,316 @@
+"""
+Prioritized replay buffer over preallocated arrays, written by the envs.
+
+``ReplayBuffer`` stores transitions column by column in preallocated NumPy
+arrays (``obs``, ``action``, ``reward``, ``next_obs``, ``discount``), in
+memory or, with ``path``, in memory-mapped ``.npy`` files so sessions of
+millions of transitions spill to disk instead of filling RAM. Once full, the
+oldest transitions are overwritten. ``flush()`` records the buffer's position
+next to the files, and a buffer created over a flushed directory reopens it
+and carries on where it was.
+
+Rewards are stored as n-step returns, computed when a transition is added:
+the buffer holds the last ``n_step`` steps of every stream (one per env or
+sub-env) and writes a transition once its return is complete, with
+``discount`` set to ``gamma ** n`` to bootstrap from ``next_obs``, or 0 if the
+episode terminated on the way. With ``n_step=1`` transitions are written
+straight into the storage arrays.
+
+Prioritized sampling uses a ``SumTree`` over the priorities ``p ** alpha``:
+a batch is drawn in one vectorized descent of the tree, in O(batch log n),
+with stratified sampling and importance-sampling weights normalized by the
+largest weight of the batch. New transitions get the largest priority seen
+so far, so every transition is sampled at least once with high probability.
+``alpha=0`` samples uniformly without a tree.
+"""
+import json
+from pathlib import Path
+from typing import NamedTuple
+import numpy as np
+
+PRIORITY_EPSILON = 1e-6   # added to priorities so no transition becomes unreachable
+META_FILE = "meta.json"
+
+
+class SumTree:
+    def __init__(self, capacity: int):
+        """
+        Binary tree of sums over ``capacity`` non-negative leaves, stored as
+        an array: node 1 is the root, the children of node ``i`` are ``2i``
+        and ``2i + 1``, and the leaves start at the first power of two not
+        below ``capacity``.
+        """
+        self.capacity = capacity
+        self.depth = max(0, (capacity - 1).bit_length())
+        self._leaves = 1 << self.depth
+        self._tree = np.zeros(2 * self._leaves, dtype=np.float64)
+        self._shifts = np.arange(self.depth + 1)  # node >> shifts: the node and its ancestors
+
+    @property
+    def total(self) -> float:
+        return float(self._tree[1])
+
+    def __getitem__(self, indices):
+        return self._tree[np.asarray(indices) + self._leaves]
+
+    def set(self, index: int, value: float):
+        """Set one leaf and add the change to every sum above it."""
+        node = index + self._leaves
+        self._tree[node >> self._shifts] += value - self._tree[node]
+
+    def update(self, indices: np.ndarray, values: np.ndarray):
+        """Set a batch of leaves (the last value wins for repeated indices) and update the sums above them."""
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), indices.shape)
+        # Last occurrence of every leaf: the changes must be computed once per leaf
+        leaves, last = np.unique(indices[::-1], return_index=True)
+        nodes = leaves + self._leaves
+        changes = values[::-1][last] - self._tree[nodes]
+        # Adding the changes along the paths to the root, rather than
+        # recomputing sums level by level, takes a single unbuffered add
+        paths = (nodes[:, None] >> self._shifts).ravel()
+        np.add.at(self._tree, paths, np.repeat(changes, len(self._shifts)))
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """
+        Leaves whose cumulative sum interval contains each of ``values``,
+        all in ``[0, total)``.
+        """
+        tree = self._tree
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            nodes *= 2
+            left = tree[nodes]
+            right = values >= left
+            values -= left * right
+            nodes += right
+        return nodes - self._leaves
+
+
+class ReplaySample(NamedTuple):
+    obs: np.ndarray
+    action: np.ndarray
+    reward: np.ndarray     # n-step returns
+    next_obs: np.ndarray   # observation n steps later
+    discount: np.ndarray   # gamma ** n, or 0 if the episode terminated
+    indices: np.ndarray    # slots, for update_priorities()
+    weights: np.ndarray    # importance-sampling weights, all 1 when sampling uniformly
+
+
+class ReplayBuffer:
+    def __init__(self, capacity, obs_shape, action_shape=(3,), n_step=1, gamma=0.99, alpha=0.6, streams=1,
+                 path=None):
+        """
+        Args:
+            capacity (int): Transitions kept; the oldest are overwritten.
+            obs_shape (tuple): Shape of an observation, e.g.
+                ``env.observation_space.shape``.
+            action_shape (tuple, optional): Shape of an action. Defaults to
+                (3,), steer, throttle and brake.
+            n_step (int, optional): Steps summed into every stored return.
+                Defaults to 1.
+            gamma (float, optional): Discount factor. Defaults to 0.99.
+            alpha (float, optional): Prioritization exponent; 0 samples
+                uniformly. Defaults to 0.6.
+            streams (int, optional): Independent episode streams feeding the
+                buffer, e.g. the sub-envs of a vector env. Defaults to 1.
+            path (str or Path, optional): Directory to keep the arrays in as
+                memory-mapped .npy files. If a buffer was flushed there, its
+                transitions are reopened, with their priorities reset to
+                the largest one saved. Defaults to None, in memory.
+
+        Raises:
+            ValueError: If the buffer flushed at ``path`` has another
+                capacity, shapes, ``n_step`` or ``gamma``.
+        """
+        self.capacity = capacity
+        self.obs_shape = tuple(obs_shape)
+        self.action_shape = tuple(action_shape)
+        self.n_step = n_step
+        self.gamma = gamma
+        self.alpha = alpha
+        self.path = Path(path) if path is not None else None
+        self.size = 0
+        self._next = 0  # slot written next
+
+        columns = {
+            "obs": ((capacity,) + self.obs_shape, np.float32),
+            "action": ((capacity,) + self.action_shape, np.float32),
+            "reward": ((capacity,), np.float32),
+            "next_obs": ((capacity,) + self.obs_shape, np.float32),
+            "discount": ((capacity,), np.float32),
+        }
+        meta = None
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            if (self.path / META_FILE).exists():
+                meta = json.loads((self.path / META_FILE).read_text())
+                if (meta["n_step"], meta["gamma"]) != (n_step, gamma):
+                    raise ValueError(f"Replay buffer in {self.path} has n_step={meta['n_step']} and "
+                                     f"gamma={meta['gamma']}, not n_step={n_step} and gamma={gamma}")
+        for name, (shape, dtype) in columns.items():
+            if self.path is None:
+                array = np.zeros(shape, dtype=dtype)
+            elif meta is None:
+                array = np.lib.format.open_memmap(self.path / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+            else:
+                array = np.lib.format.open_memmap(self.path / f"{name}.npy", mode="r+")
+                if array.shape != shape or array.dtype != dtype:
+                    raise ValueError(f"Replay buffer column {name} in {self.path} is {array.dtype}{array.shape}, "
+                                     f"not {np.dtype(dtype)}{shape}")
+            setattr(self, name, array)
+
+        self.tree = SumTree(capacity) if alpha > 0 else None
+        self.max_priority = 1.0
+        if meta is not None:
+            self.size = meta["size"]
+            self._next = meta["next"]
+            self.max_priority = meta.get("max_priority", 1.0)
+            if self.tree is not None:
+                self.tree.update(np.arange(self.size), self.max_priority ** alpha)
+
+        # The last n_step steps of every stream, in a ring per stream
+        self._pending_obs = np.zeros((streams, n_step) + self.obs_shape, dtype=np.float32)
+        self._pending_action = np.zeros((streams, n_step) + self.action_shape, dtype=np.float32)
+        self._pending_reward = np.zeros((streams, n_step), dtype=np.float64)
+        self._pending_start = np.zeros(streams, dtype=np.int64)
+        self._pending_count = np.zeros(streams, dtype=np.int64)
+        self._gammas = gamma ** np.arange(n_step + 1)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, obs, action, reward, next_obs, terminated, truncated=False, stream=0):
+        """
+        Add the transition a step produced.
+
+        Args:
+            obs (np.ndarray): Observation the action was taken in.
+            action (np.ndarray): The action.
+            reward (float): The step's reward.
+            next_obs (np.ndarray): Observation the step returned.
+            terminated (bool): The episode ended; nothing to bootstrap from.
+            truncated (bool, optional): The episode was cut short; the
+                returns still bootstrap from ``next_obs``. Defaults to False.
+            stream (int, optional): Episode stream the step belongs to.
+                Defaults to 0.
+        """
+        if self.n_step == 1:
+            slot = self._claim()
+            self.obs[slot] = obs
+            self.action[slot] = action
+            self.reward[slot] = reward
+            self.next_obs[slot] = next_obs
+            self.discount[slot] = 0.0 if terminated else self.gamma
+            return
+
+        n = self.n_step
+        start = self._pending_start[stream]
+        count = self._pending_count[stream]
+        i = (start + count) % n
+        self._pending_obs[stream, i] = obs
+        self._pending_action[stream, i] = action
+        self._pending_reward[stream, i] = reward
+        count += 1
+        if count == n:
+            self._emit(stream, start, count, next_obs, terminated)
+            start = (start + 1) % n
+            count -= 1
+        if terminated or truncated:
+            while count:
+                self._emit(stream, start, count, next_obs, terminated)
+                start = (start + 1) % n
+                count -= 1
+            start = 0
+        self._pending_start[stream] = start
+        self._pending_count[stream] = count
+
+    def add_batch(self, obs, actions, rewards, next_obs, terminated, truncated=None):
+        """
+        Add one step of every stream, row ``i`` belonging to stream ``i``.
+        With ``n_step=1`` the batch is written with one copy per column.
+        """
+        if self.n_step > 1:
+            if truncated is None:
+                truncated = np.zeros(len(obs), dtype=bool)
+            for i in range(len(obs)):
+                self.add(obs[i], actions[i], rewards[i], next_obs[i], terminated[i], truncated[i], stream=i)
+            return
+        slots = (self._next + np.arange(len(obs))) % self.capacity
+        self.obs[slots] = obs
+        self.action[slots] = actions
+        self.reward[slots] = rewards
+        self.next_obs[slots] = next_obs
+        self.discount[slots] = np.where(terminated, 0.0, self.gamma)
+        self._next = int(slots[-1] + 1) % self.capacity
+        self.size = min(self.capacity, self.size + len(obs))
+        if self.tree is not None:
+            self.tree.update(slots, np.full(len(slots), self.max_priority ** self.alpha))
+
+    def _emit(self, stream, start, count, next_obs, terminated):
+        """Write the pending step at ``start`` with the return of the ``count`` steps from it."""
+        order = (start + np.arange(count)) % self.n_step
+        slot = self._claim()
+        self.obs[slot] = self._pending_obs[stream, start]
+        self.action[slot] = self._pending_action[stream, start]
+        self.reward[slot] = self._pending_reward[stream, order] @ self._gammas[:count]
+        self.next_obs[slot] = next_obs
+        self.discount[slot] = 0.0 if terminated else self._gammas[count]
+
+    def _claim(self) -> int:
+        slot = self._next
+        self._next = (slot + 1) % self.capacity
+        self.size = min(self.capacity, self.size + 1)
+        if self.tree is not None:
+            self.tree.set(slot, self.max_priority ** self.alpha)
+        return slot
+
+    def sample(self, batch_size, rng: np.random.Generator, beta=0.4) -> ReplaySample:
+        """
+        Draw a batch of transitions.
+
+        Args:
+            batch_size (int): Transitions to draw, with replacement.
+            rng (np.random.Generator): Source of randomness.
+            beta (float, optional): Importance-sampling exponent, annealed
+                towards 1 over training. Defaults to 0.4.
+
+        Raises:
+            ValueError: If the buffer is empty.
+        """
+        if self.size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        if self.tree is None:
+            indices = np.sort(rng.integers(0, self.size, batch_size))
+            weights = np.ones(batch_size, dtype=np.float32)
+        else:
+            # Stratified: one draw from each of batch_size equal slices of the
+            # total, so the leaves found are already in slot order, which is
+            # also the cheapest order to read memory-mapped columns in
+            total = self.tree.total
+            values = (np.arange(batch_size) + rng.random(batch_size)) * (total / batch_size)
+            indices = np.minimum(self.tree.find(np.minimum(values, np.nextafter(total, 0))), self.size - 1)
+            probabilities = self.tree[indices] / total
+            weights = (self.size * probabilities) ** -beta
+            weights = (weights / weights.max()).astype(np.float32)
+        return ReplaySample(self.obs[indices], self.action[indices], self.reward[indices], self.next_obs[indices],
+                            self.discount[indices], indices, weights)
+
+    def update_priorities(self, indices, priorities):
+        """Set the priorities of sampled transitions, e.g. to their absolute TD errors."""
+        if self.tree is None:
+            return
+        priorities = np.abs(np.asarray(priorities, dtype=np.float64)) + PRIORITY_EPSILON
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
+
+    def flush(self):
+        """Write memory-mapped columns and the buffer's position to ``path``."""
+        if self.path is None:
+            return
+        for name in ("obs", "action", "reward", "next_obs", "discount"):
+            getattr(self, name).flush()
+        meta = {"size": self.size, "next": self._next, "n_step": self.n_step, "gamma": self.gamma,
+                "max_priority": self.max_priority}
+        (self.path / META_FILE).write_text(json.dumps(meta))
@@ -0,0 +1,191 @@
+"""
+Ground surfaces: a coarse vocabulary of surface classes and a per-map index
+of what lies where.
+
+Every frame carries the ground material of each wheel as its
+``EPlugSurfaceMaterialId`` code (``PACKET_DTYPE["ground_material"]``, uint8
+(4,)), the vocabulary the plugin and ``packet.GROUND_MATERIALS`` share.
+Most of the game's ~80 materials drive alike, so ``MATERIAL_SURFACE`` maps
+every code to one of the few ``SURFACES`` classes in a 256-entry lookup
+table: classifying a batch of frames is one ``take``, without looking at a
+string. ``SURFACE_ONE_HOT`` is the same table one-hot encoded.
+
+A ``SurfaceIndex`` is a uniform grid over the horizontal (x, z) plane of a
+map, built from recorded runs: every cell holds the surface class its
+wheels touched most often and the mean slip coefficient, icing and
+wetness measured on it. The surface and statistics of a cell are packed
+into one row of a table, so looking up any number of positions is a
+floor, a bounds check and one gather. Cells are columns: roads stacked
+above each other share them.
+"""
+import numpy as np
+from .packet import (FLAG_IN_RACE, FLAG_ON_GROUND, GROUND_MATERIAL_CODES, UNKNOWN_CODE, WHEEL_ICING,
+                     WHEEL_SLIP_COEF, WHEEL_WETNESS)
+
+SURFACES = ("none", "road", "dirt", "grass", "ice", "snow", "wet", "wood", "plastic", "other")
+SURFACE_NONE, SURFACE_ROAD, SURFACE_DIRT, SURFACE_GRASS, SURFACE_ICE, SURFACE_SNOW, SURFACE_WET, \
+    SURFACE_WOOD, SURFACE_PLASTIC, SURFACE_OTHER = range(len(SURFACES))
+N_SURFACES = len(SURFACES)
+
+# Materials of every class but "other"; codes missing from packet.GROUND_MATERIALS are "other" too
+SURFACE_MATERIALS = {
+    SURFACE_NONE: ("NotCollidable", "XXX_Null"),
+    SURFACE_ROAD: ("Concrete", "Pavement", "Asphalt", "RoadSynthetic", "PavementStair", "Stone", "Metal",
+                   "ResonantMetal", "MetalTrans", "Tech", "TechArmor", "TechSafe", "TechGround", "TechMagnetic",
+                   "TechSuperMagnetic", "TechMagneticAccel", "TechNucleus", "TechGravityChange",
+                   "TechGravityReset"),
+    SURFACE_DIRT: ("Dirt", "DirtRoad", "Sand", "Gravel", "Rock"),
+    SURFACE_GRASS: ("Grass", "Green", "Forest", "Wheat"),
+    SURFACE_ICE: ("Ice", "RoadIce"),
+    SURFACE_SNOW: ("Snow",),
+    SURFACE_WET: ("WetAsphalt", "WetPavement", "WetDirtRoad", "WetGrass", "Water"),
+    SURFACE_WOOD: ("Wood", "SlidingWood", "Trunk"),
+    SURFACE_PLASTIC: ("Plastic", "Rubber", "SlidingRubber", "RubberBand"),
+}
+
+SURFACE_STATS = ("slip_coef", "icing", "wetness")  # per-cell means kept by a SurfaceIndex
+_STAT_FIELDS = [WHEEL_SLIP_COEF, WHEEL_ICING, WHEEL_WETNESS]
+
+SURFACE_CELL_SIZE = 4.0     # meters per grid cell
+SURFACE_MARGIN = 32.0       # meters of empty cells around the recorded positions, one block
+SURFACE_INDEX_VERSION = 1
+
+_HORIZONTAL = slice(0, 3, 2)  # x and z, a view; y is up
+
+
+def _material_surface():
+    table = np.full(256, SURFACE_OTHER, dtype=np.uint8)
+    for surface, materials in SURFACE_MATERIALS.items():
+        table[[GROUND_MATERIAL_CODES[name] for name in materials]] = surface
+    table[UNKNOWN_CODE] = SURFACE_NONE  # no material reported, e.g. a wheel in the air
+    return table
+
+
+# Surface class of every ground material code
+MATERIAL_SURFACE = _material_surface()
+# One-hot surface class of every ground material code, (256, N_SURFACES)
+SURFACE_ONE_HOT = np.eye(N_SURFACES, dtype=np.float32)[MATERIAL_SURFACE]
+
+
+def surface_codes(materials: np.ndarray) -> np.ndarray:
+    """Surface classes of ground material codes, e.g. ``frames["ground_material"]``, as uint8."""
+    return MATERIAL_SURFACE.take(materials)
+
+
+class SurfaceIndex:
+    def __init__(self, origin, shape, cell_size: float = SURFACE_CELL_SIZE):
+        """
+        An empty grid of surface statistics; see ``from_frames``.
+
+        Args:
+            origin (array-like): (x, z) of the corner of the first cell.
+            shape (tuple): Number of cells along x and z.
+            cell_size (float, optional): Cell edge length in meters.
+                Defaults to SURFACE_CELL_SIZE.
+        """
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.shape = tuple(int(n) for n in shape)
+        self.cell_size = float(cell_size)
+        self.n_cells = self.shape[0] * self.shape[1]
+        self._strides = np.array([self.shape[1], 1], dtype=np.int64)
+        # Wheel contacts per surface class, and sums of SURFACE_STATS over them
+        self.counts = np.zeros((self.n_cells, N_SURFACES), dtype=np.int64)
+        self.sums = np.zeros((self.n_cells, len(SURFACE_STATS)), dtype=np.float64)
+        self._refresh()
+
+    @classmethod
+    def from_frames(cls, frames: np.ndarray, cell_size: float = SURFACE_CELL_SIZE,
+                    margin: float = SURFACE_MARGIN) -> "SurfaceIndex":
+        """
+        Index the ground under recorded runs of a map.
+
+        Args:
+            frames (np.ndarray): ``PACKET_DTYPE`` frames, e.g.
+                ``load_recording(path).frames``; only frames in a race are
+                used.
+            cell_size (float, optional): Defaults to SURFACE_CELL_SIZE.
+            margin (float, optional): Extent of the grid beyond the recorded
+                positions, in meters. Defaults to SURFACE_MARGIN.
+
+        Raises:
+            ValueError: If no frame is in a race.
+        """
+        positions = frames["position"][(frames["flags"] & FLAG_IN_RACE) != 0][:, _HORIZONTAL]
+        if len(positions) == 0:
+            raise ValueError("No frame in a race to index")
+        origin = positions.min(axis=0) - margin
+        shape = np.maximum(1, np.ceil((positions.max(axis=0) + margin - origin) / cell_size)).astype(np.int64)
+        index = cls(origin, shape, cell_size)
+        index.add(frames)
+        return index
+
+    def cells(self, positions: np.ndarray) -> np.ndarray:
+        """Flat cell of (..., 3) positions; ``n_cells`` for positions outside the grid."""
+        ij = np.floor((positions[..., _HORIZONTAL] - self.origin) / self.cell_size).astype(np.int64)
+        cells = np.asarray(ij @ self._strides)
+        cells[((ij < 0) | (ij >= self.shape)).any(axis=-1)] = self.n_cells
+        return cells
+
+    def add(self, frames: np.ndarray):
+        """Count the wheel contacts of the frames that are in a race and on the ground."""
+        frames = frames[(frames["flags"] & (FLAG_IN_RACE | FLAG_ON_GROUND)) == (FLAG_IN_RACE | FLAG_ON_GROUND)]
+        classes = MATERIAL_SURFACE.take(frames["ground_material"])
+        cells = np.broadcast_to(self.cells(frames["position"])[:, None], classes.shape)
+        contact = (classes != SURFACE_NONE) & (cells < self.n_cells)
+        cells = cells[contact]
+        self.counts += np.bincount(cells * N_SURFACES + classes[contact],
+                                   minlength=self.n_cells * N_SURFACES).reshape(self.n_cells, N_SURFACES)
+        stats = frames["wheels"][:, :, _STAT_FIELDS][contact]
+        for column in range(len(SURFACE_STATS)):
+            self.sums[:, column] += np.bincount(cells, weights=stats[:, column], minlength=self.n_cells)
+        self._refresh()
+
+    def _refresh(self):
+        contacts = self.counts.sum(axis=1)
+        seen = contacts > 0
+        self.surface = np.where(seen, self.counts.argmax(axis=1), SURFACE_NONE).astype(np.uint8)
+        self.stats = np.zeros((self.n_cells, len(SURFACE_STATS)), dtype=np.float32)
+        np.divide(self.sums, contacts[:, None], out=self.stats, where=seen[:, None], casting="unsafe")
+        # One row per cell, and a last one for positions outside the grid: what lookup() gathers
+        self._table = np.zeros((self.n_cells + 1, N_SURFACES + len(SURFACE_STATS)), dtype=np.float32)
+        self._table[:-1, :N_SURFACES] = np.eye(N_SURFACES, dtype=np.float32)[self.surface]
+        self._table[:-1, N_SURFACES:] = self.stats
+        self._table[-1, SURFACE_NONE] = 1.0
+
+    @property
+    def width(self) -> int:
+        """Values ``lookup()`` returns per position: the one-hot surface class, then SURFACE_STATS."""
+        return self._table.shape[1]
+
+    def lookup(self, positions: np.ndarray) -> np.ndarray:
+        """
+        The one-hot surface class and statistics of the cells under (..., 3)
+        positions, shape (..., ``width``) float32. Cells never driven on,
+        and positions outside the grid, are "none" with zero statistics.
+        """
+        return self._table.take(self.cells(positions), axis=0)
+
+    def surface_at(self, positions: np.ndarray) -> np.ndarray:
+        """Surface class of the cells under (..., 3) positions, as uint8."""
+        cells = self.cells(positions)
+        return np.where(cells < self.n_cells, self.surface.take(np.minimum(cells, self.n_cells - 1)),
+                        SURFACE_NONE).astype(np.uint8)
+
+    def save(self, path):
+        np.savez(path, version=SURFACE_INDEX_VERSION, origin=self.origin, shape=np.array(self.shape),
+                 cell_size=self.cell_size, counts=self.counts, sums=self.sums)
+
+    @classmethod
+    def load(cls, path) -> "SurfaceIndex":
+        """
+        Raises:
+            ValueError: If the file was written by an incompatible version.
+        """
+        with np.load(path) as data:
+            if int(data["version"]) != SURFACE_INDEX_VERSION:
+                raise ValueError(f"Unsupported surface index version {int(data['version'])} in {path}")
+            index = cls(data["origin"], data["shape"], float(data["cell_size"]))
+            index.counts[:] = data["counts"]
+            index.sums[:] = data["sums"]
+        index._refresh()
+        return index
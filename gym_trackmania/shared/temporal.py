@@ -0,0 +1,173 @@
+"""
+Stacked observations with temporal features, updated in place.
+
+``TemporalObservation`` keeps the last ``k`` observations of an env in a
+circular buffer and appends derived temporal features to each of them:
+
+* ``acceleration``: change of the forward speed per second;
+* ``yaw_rate``: turn rate of the direction of travel (the plugin's
+  ``orientation``) in the horizontal plane, in radians per second;
+* ``slip_smoothed``: mean wheel slip, exponentially smoothed over time.
+
+Each is computed from the previous observed frame alone, in O(1) per step.
+Time steps come from the arrival timestamps of the frames in the telemetry
+ring, so the features do not depend on how often the env steps or how many
+frames it skipped. Frames that arrive back to back (a burst after a network
+stall) are taken to be at least ``min_dt`` apart, and the rates are clipped
+to their ranges.
+
+The buffer is mirrored, every row written twice ``k`` rows apart, so the
+last ``k`` rows in order are always a contiguous slice of it. ``push()``
+returns one of ``k`` preallocated read-only views of that slice instead of
+concatenating a new array every step.
+"""
+import math
+import numpy as np
+from gymnasium import spaces
+from .features import N_WHEELS
+from .packet import WHEEL_SLIP_COEF
+
+# Normalization ranges, (min, max), as in shared.features
+ACCELERATION_RANGE = (-50.0, 50.0)      # m/s^2
+YAW_RATE_RANGE = (-2 * math.pi, 2 * math.pi)  # rad/s
+SLIP_TIME_CONSTANT = 0.2                # seconds of the slip smoothing
+MIN_DT = 1 / 60                         # seconds between frames at the env's ACTIVE_SEND_RATE
+KMH = 1 / 3.6                           # the plugin reports speed in km/h
+
+TEMPORAL_FEATURES = ("acceleration", "yaw_rate", "slip_smoothed")
+
+
+def _normalizer(value_range):
+    lo, hi = value_range
+    return 1.0 / (hi - lo), -lo / (hi - lo)
+
+
+class TemporalObservation:
+    def __init__(self, pipeline, k=4, temporal_features=True, min_dt=MIN_DT):
+        """
+        Args:
+            pipeline (FeaturePipeline): Builds the per-frame observations
+                that are stacked.
+            k (int, optional): Number of stacked observations. Defaults to 4.
+            temporal_features (bool, optional): Append TEMPORAL_FEATURES to
+                every observation. Defaults to True.
+            min_dt (float, optional): Shortest time step between two
+                frames, normally the plugin's send interval. Defaults to
+                MIN_DT.
+
+        Raises:
+            ValueError: If ``k`` is not positive.
+        """
+        if k < 1:
+            raise ValueError(f"k must be positive, got {k}")
+        self.pipeline = pipeline
+        self.k = k
+        self.temporal_features = temporal_features
+        self.min_dt = min_dt
+        self.names = pipeline.names + (TEMPORAL_FEATURES if temporal_features else ())
+        self.size = pipeline.size + (len(TEMPORAL_FEATURES) if temporal_features else 0)
+
+        self._buffer = np.zeros((2 * k, self.size), dtype=np.float32)
+        self._views = []
+        for head in range(k):
+            view = self._buffer[head + 1:head + 1 + k]
+            view.flags.writeable = False
+            self._views.append(view)
+        self._head = k - 1
+
+        self._acceleration = _normalizer(ACCELERATION_RANGE)
+        self._yaw_rate = _normalizer(YAW_RATE_RANGE)
+        self._temporal = np.zeros(len(TEMPORAL_FEATURES), dtype=np.float32)
+        self._previous = None  # (timestamp, speed, heading x, heading z) of the last frame
+
+    @property
+    def observation_space(self) -> spaces.Box:
+        low = self.pipeline.low
+        high = self.pipeline.high
+        if self.temporal_features:
+            low = np.concatenate([low, np.zeros(len(TEMPORAL_FEATURES), dtype=np.float32)])
+            high = np.concatenate([high, np.ones(len(TEMPORAL_FEATURES), dtype=np.float32)])
+        return spaces.Box(low=np.tile(low, (self.k, 1)), high=np.tile(high, (self.k, 1)), dtype=np.float32)
+
+    @property
+    def latest(self) -> np.ndarray:
+        """The newest stacked observation."""
+        return self._views[self._head][-1]
+
+    def reset(self, obs, frame=None, timestamp=None) -> np.ndarray:
+        """
+        Start a new episode: forget the temporal state and fill every slot
+        of the stack with ``obs``.
+
+        Args:
+            obs (np.ndarray): The pipeline's observation, shape (pipeline.size,).
+            frame (np.void, optional): The ``PACKET_DTYPE`` record ``obs``
+                was built from; None if no telemetry arrived yet.
+            timestamp (float, optional): When ``frame`` arrived.
+
+        Returns:
+            np.ndarray: Read-only (k, size) view of the stack.
+        """
+        self._previous = None
+        self._temporal[:] = 0.0
+        if self.temporal_features:
+            self._temporal[0] = self._acceleration[1]
+            self._temporal[1] = self._yaw_rate[1]
+        self.push(obs, frame, timestamp)
+        self._buffer[:] = self._buffer[self._head]
+        return self._views[self._head]
+
+    def push(self, obs, frame=None, timestamp=None) -> np.ndarray:
+        """
+        Append an observation, oldest first, and return the stack.
+
+        The returned view is overwritten by later calls; copy it to keep it.
+
+        Args:
+            obs (np.ndarray): The pipeline's observation, shape (pipeline.size,).
+            frame (np.void, optional): The ``PACKET_DTYPE`` record ``obs``
+                was built from; None if no telemetry arrived yet.
+            timestamp (float, optional): When ``frame`` arrived. The
+                temporal features keep their values while it does not
+                advance, e.g. when no fresh frame arrived since the last push.
+
+        Returns:
+            np.ndarray: Read-only (k, size) view of the stack.
+        """
+        head = self._head + 1
+        if head == self.k:
+            head = 0
+        self._head = head
+        size = self.pipeline.size
+        row = self._buffer[head]
+        row[:size] = obs
+        if self.temporal_features:
+            if frame is not None and timestamp is not None:
+                self._update_temporal(frame, timestamp)
+            row[size:] = self._temporal
+        self._buffer[head + self.k] = row
+        return self._views[head]
+
+    def _update_temporal(self, frame, timestamp):
+        # Python scalars: NumPy reductions cost more than the arithmetic on 4 values
+        speed = float(frame["speed"])
+        hx, _, hz = frame["orientation"].tolist()
+        slip = sum(frame["wheels"][:, WHEEL_SLIP_COEF].tolist()) / N_WHEELS
+        previous = self._previous
+        self._previous = (timestamp, speed, hx, hz)
+        temporal = self._temporal
+        if previous is None:
+            temporal[2] = slip
+            return
+        dt = timestamp - previous[0]
+        if dt <= 0.0:
+            return
+        dt = max(dt, self.min_dt)
+        scale, offset = self._acceleration
+        temporal[0] = min(max((speed - previous[1]) * KMH / dt * scale + offset, 0.0), 1.0)
+        # Signed angle between the previous and current heading
+        px, pz = previous[2], previous[3]
+        yaw = math.atan2(px * hz - pz * hx, px * hx + pz * hz)
+        scale, offset = self._yaw_rate
+        temporal[1] = min(max(yaw / dt * scale + offset, 0.0), 1.0)
+        temporal[2] += (1.0 - math.exp(-dt / SLIP_TIME_CONSTANT)) * (slip - temporal[2])
@@ -0,0 +1,275 @@
+"""
+Track geometry: a dense centerline for a map and continuous progress along it.
+
+The plugin's checkpoint progress only changes when a checkpoint is crossed.
+A ``TrackModel`` instead projects the car position onto a centerline
+polyline built from recorded runs of the map, giving the distance driven
+along the track for every frame.
+
+Positions are projected in 3D, but segments are indexed on a uniform grid
+over the horizontal (x, z) plane: each cell lists the segments passing
+within ``search_radius`` of it, so a projection only looks at a handful of
+nearby segments. Positions farther than that from the track fall back to
+a search over every segment.
+"""
+import re
+from pathlib import Path
+import numpy as np
+from .packet import FLAG_FINISHED, FLAG_IN_RACE
+
+CENTERLINE_SPACING = 2.0    # meters between centerline points
+SEARCH_RADIUS = 16.0        # meters around the centerline covered by the grid index
+RESPAWN_JUMP = 20.0         # meters between consecutive frames treated as a respawn
+TRACK_CACHE_DIR = Path.home() / ".cache" / "gym_trackmania" / "tracks"
+TRACK_CACHE_VERSION = 1
+
+_HORIZONTAL = [0, 2]  # x and z; y is up
+
+
+def resample_polyline(points: np.ndarray, spacing: float = None, n: int = None) -> np.ndarray:
+    """
+    Resample a polyline at uniform arc length.
+
+    Args:
+        points (np.ndarray): (k, 3) vertices.
+        spacing (float, optional): Distance between output points.
+        n (int, optional): Number of output points, instead of ``spacing``.
+
+    Returns:
+        np.ndarray: (n, 3) points from the first to the last vertex.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    arc = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    if n is None:
+        n = max(2, int(round(arc[-1] / spacing)) + 1)
+    targets = np.linspace(0.0, arc[-1], n)
+    return np.stack([np.interp(targets, arc, points[:, axis]) for axis in range(3)], axis=1)
+
+
+def traces_from_frames(frames: np.ndarray, respawn_jump: float = RESPAWN_JUMP) -> list:
+    """
+    Split recorded ``PACKET_DTYPE`` frames into the position traces of
+    finished runs.
+
+    A run starts at a respawn (the car jumping more than ``respawn_jump``
+    meters between frames, or entering the race) and ends at the first
+    finished frame. Unfinished runs are dropped since they do not cover the
+    whole track.
+
+    Returns:
+        list of np.ndarray: (k, 3) positions per finished run.
+    """
+    in_race = (frames["flags"] & FLAG_IN_RACE) != 0
+    finished = (frames["flags"] & FLAG_FINISHED) != 0
+    positions = frames["position"].astype(np.float64)
+
+    jumps = np.linalg.norm(np.diff(positions, axis=0), axis=1) > respawn_jump
+    starts = np.flatnonzero(np.concatenate([[True], jumps]) | np.concatenate([[True], ~in_race[:-1]]))
+    ends = np.concatenate([starts[1:], [len(frames)]])
+
+    traces = []
+    for start, end in zip(starts, ends):
+        run = slice(start, end)
+        done = np.flatnonzero(finished[run])
+        if in_race[start] and len(done):
+            last = start + done[0] + 1
+            trace = positions[start:last][in_race[start:last]]
+            if len(trace) >= 2:
+                traces.append(trace)
+    return traces
+
+
+class TrackModel:
+    def __init__(self, centerline: np.ndarray, search_radius: float = SEARCH_RADIUS, cell_size: float = None):
+        """
+        Args:
+            centerline (np.ndarray): (n, 3) polyline from start to finish.
+            search_radius (float, optional): Distance from the centerline
+                within which projections use the grid index. Defaults to
+                SEARCH_RADIUS.
+            cell_size (float, optional): Grid cell edge length. Defaults to
+                half of ``search_radius``.
+        """
+        self.centerline = np.ascontiguousarray(centerline, dtype=np.float64)
+        if len(self.centerline) < 2:
+            raise ValueError("A centerline needs at least two points")
+        self.search_radius = search_radius
+        self.cell_size = cell_size or search_radius / 2
+
+        self._seg_start = self.centerline[:-1]
+        self._seg_vec = np.diff(self.centerline, axis=0)
+        self._seg_len = np.linalg.norm(self._seg_vec, axis=1)
+        self._seg_len_sq = np.maximum(self._seg_len ** 2, 1e-12)
+        # Arc length at each centerline point
+        self.cumulative = np.concatenate([[0.0], np.cumsum(self._seg_len)])
+        self.length = float(self.cumulative[-1])
+        self._build_grid()
+
+    @classmethod
+    def from_traces(cls, traces, spacing: float = CENTERLINE_SPACING, **kwargs) -> "TrackModel":
+        """
+        Average several runs of a map into one centerline.
+
+        Every trace is resampled to the same number of points by arc length,
+        so point ``i`` of each trace is the same fraction of the way along
+        the track, and the points are averaged.
+
+        Args:
+            traces (list of np.ndarray): (k, 3) positions of complete runs,
+                e.g. from ``traces_from_frames``.
+            spacing (float, optional): Approximate distance between
+                centerline points. Defaults to CENTERLINE_SPACING.
+            **kwargs: Passed to the constructor.
+        """
+        if not traces:
+            raise ValueError("Need at least one trace to build a centerline")
+        lengths = [np.linalg.norm(np.diff(trace, axis=0), axis=1).sum() for trace in traces]
+        n = max(2, int(round(np.median(lengths) / spacing)) + 1)
+        resampled = np.stack([resample_polyline(trace, n=n) for trace in traces])
+        return cls(resampled.mean(axis=0), **kwargs)
+
+    def _build_grid(self):
+        horizontal = self.centerline[:, _HORIZONTAL]
+        self._origin = horizontal.min(axis=0) - self.search_radius
+        extent = horizontal.max(axis=0) + self.search_radius - self._origin
+        self._shape = np.maximum(1, np.ceil(extent / self.cell_size).astype(np.int64))
+
+        # Cells covered by each segment's bounding box, grown by search_radius
+        lo = np.minimum(horizontal[:-1], horizontal[1:]) - self.search_radius
+        hi = np.maximum(horizontal[:-1], horizontal[1:]) + self.search_radius
+        lo_cell = np.floor((lo - self._origin) / self.cell_size).astype(np.int64)
+        hi_cell = np.minimum(np.floor((hi - self._origin) / self.cell_size).astype(np.int64), self._shape - 1)
+
+        cells, segments = [], []
+        for segment, (x0, z0), (x1, z1) in zip(range(len(lo_cell)), lo_cell, hi_cell):
+            xs, zs = np.meshgrid(np.arange(x0, x1 + 1), np.arange(z0, z1 + 1), indexing="ij")
+            ids = (xs * self._shape[1] + zs).ravel()
+            cells.append(ids)
+            segments.append(np.full(len(ids), segment, dtype=np.int64))
+        cells = np.concatenate(cells)
+        segments = np.concatenate(segments)
+
+        # CSR layout: the segments of cell c are _cell_segments[_cell_start[c]:_cell_start[c + 1]]
+        order = np.argsort(cells, kind="stable")
+        self._cell_segments = segments[order]
+        self._cell_start = np.zeros(self._shape.prod() + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self._shape.prod()), out=self._cell_start[1:])
+
+    def _project_pairs(self, positions, points, segments):
+        """Arc length and squared distance of ``positions[points]`` projected on ``segments``."""
+        offset = positions[points] - self._seg_start[segments]
+        t = np.einsum("ij,ij->i", offset, self._seg_vec[segments]) / self._seg_len_sq[segments]
+        np.clip(t, 0.0, 1.0, out=t)
+        delta = offset - t[:, None] * self._seg_vec[segments]
+        return self.cumulative[segments] + t * self._seg_len[segments], np.einsum("ij,ij->i", delta, delta)
+
+    def project(self, positions: np.ndarray):
+        """
+        Project positions onto the centerline.
+
+        Args:
+            positions (np.ndarray): (m, 3) positions.
+
+        Returns:
+            tuple of np.ndarray: Arc length along the track in meters, and
+            distance from the centerline, each of shape (m,).
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        m = len(positions)
+        arc = np.empty(m)
+        dist_sq = np.full(m, np.inf)
+
+        cell_xz = np.floor((positions[:, _HORIZONTAL] - self._origin) / self.cell_size).astype(np.int64)
+        inside = ((cell_xz >= 0) & (cell_xz < self._shape)).all(axis=1)
+        cell = np.where(inside, cell_xz[:, 0] * self._shape[1] + cell_xz[:, 1], 0)
+        counts = np.where(inside, self._cell_start[cell + 1] - self._cell_start[cell], 0)
+
+        total = counts.sum()
+        if total:
+            # Every (position, candidate segment) pair, grouped by position
+            points = np.repeat(np.arange(m), counts)
+            first = np.cumsum(counts) - counts
+            index = np.arange(total) - np.repeat(first, counts) + np.repeat(self._cell_start[cell], counts)
+            candidate_arc, candidate_dist = self._project_pairs(positions, points, self._cell_segments[index])
+
+            has = counts > 0
+            best = np.minimum.reduceat(candidate_dist, first[has])
+            # First candidate per position reaching the minimum
+            hit = np.flatnonzero(candidate_dist == np.repeat(best, counts[has]))
+            hit = hit[np.concatenate([[True], points[hit][1:] != points[hit][:-1]])]
+            arc[points[hit]] = candidate_arc[hit]
+            dist_sq[points[hit]] = candidate_dist[hit]
+
+        # Far from the track: only then compare against every segment
+        far = np.flatnonzero(dist_sq > self.search_radius ** 2)
+        if len(far):
+            segments = np.arange(len(self._seg_len))
+            points = np.repeat(far, len(segments))
+            pair_arc, pair_dist = self._project_pairs(positions, points, np.tile(segments, len(far)))
+            pair_arc = pair_arc.reshape(len(far), -1)
+            pair_dist = pair_dist.reshape(len(far), -1)
+            best = pair_dist.argmin(axis=1)
+            arc[far] = pair_arc[np.arange(len(far)), best]
+            dist_sq[far] = pair_dist[np.arange(len(far)), best]
+
+        return arc, np.sqrt(dist_sq)
+
+    def progress(self, positions: np.ndarray) -> np.ndarray:
+        """Fraction of the track length driven, in [0, 1], for (m, 3) positions."""
+        return self.project(positions)[0] / self.length
+
+    def save(self, path):
+        np.savez(path, version=TRACK_CACHE_VERSION, centerline=self.centerline,
+                 search_radius=self.search_radius, cell_size=self.cell_size)
+
+    @classmethod
+    def load(cls, path) -> "TrackModel":
+        """
+        Raises:
+            ValueError: If the file was written by an incompatible version.
+        """
+        with np.load(path) as data:
+            if int(data["version"]) != TRACK_CACHE_VERSION:
+                raise ValueError(f"Unsupported track model version {int(data['version'])} in {path}")
+            return cls(data["centerline"], search_radius=float(data["search_radius"]),
+                       cell_size=float(data["cell_size"]))
+
+
+def map_id_from_path(path) -> str:
+    """Map id of a map file, e.g. "A01-Race" for assets/maps/A01-Race.Map.Gbx."""
+    return re.sub(r"\.Map\.Gbx$", "", Path(path).name, flags=re.IGNORECASE)
+
+
+def track_cache_path(map_id: str, cache_dir=TRACK_CACHE_DIR) -> Path:
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", map_id)
+    return Path(cache_dir) / f"{safe_id}.npz"
+
+
+def load_track_model(map_id: str, traces=None, cache_dir=TRACK_CACHE_DIR, rebuild=False, **kwargs) -> TrackModel:
+    """
+    The track model of a map, from the on-disk cache or built from traces.
+
+    Args:
+        map_id (str): Map identifier, see ``map_id_from_path``.
+        traces (list of np.ndarray, optional): Runs to build the model from
+            when it is not cached (or ``rebuild`` is set).
+        cache_dir (str or Path, optional): Defaults to TRACK_CACHE_DIR.
+        rebuild (bool, optional): Ignore the cache. Defaults to False.
+        **kwargs: Passed to ``TrackModel.from_traces``.
+
+    Raises:
+        FileNotFoundError: If the map is not cached and no traces are given.
+    """
+    path = track_cache_path(map_id, cache_dir)
+    if path.exists() and not rebuild:
+        try:
+            return TrackModel.load(path)
+        except ValueError:
+            if traces is None:
+                raise
+    if traces is None:
+        raise FileNotFoundError(f"No cached track model for {map_id} in {cache_dir} and no traces to build one")
+    model = TrackModel.from_traces(traces, **kwargs)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    model.save(path)
+    return model
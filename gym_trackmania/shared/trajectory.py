@@ -0,0 +1,285 @@
+"""
+Recorded trajectories per track segment, for curriculum resets.
+
+A segment is the stretch of a track between two checkpoints, numbered by
+the checkpoints passed on entering it (``cp_passed``): segment 0 starts at
+the line, segment ``k`` where the in-game respawn key puts the car back
+after checkpoint ``k``. ``TrajectoryCache.add_run()`` splits in-race frames
+(a recording, or the frames an env observed in an episode) into
+``Traversal``s of one segment each and keeps, per segment, the fastest
+complete traversal (the ghost) and the latest ``recent`` ones.
+
+The cache also keeps outcome statistics for every segment, reported by the
+env at the end of each episode: how often the car got through and how often
+the episode ended in it. ``sample_segment()`` draws the segment to start
+the next episode at with probability growing with its failure rate, so an
+agent spends its time on the sections it cannot drive yet rather than
+re-driving the opening.
+
+The number of cached frames is bounded: the least recently used traversals
+are evicted first, ghosts only when nothing else is left, those of the
+segments with the lowest priority first.
+"""
+import itertools
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import NamedTuple
+import numpy as np
+from .packet import FLAG_FINISHED, FLAG_IN_RACE
+from .track import RESPAWN_JUMP
+
+MAX_FRAMES = 200_000          # frames cached over all segments, ~45 MB
+RECENT_PER_SEGMENT = 4        # latest traversals kept per segment besides the ghost
+PRIORITY_EXPONENT = 1.0       # sampling probability ~ priority ** PRIORITY_EXPONENT
+
+
+class Traversal(NamedTuple):
+    """One pass through a segment, from entering it to leaving it or the episode ending."""
+    segment: int
+    timestamp: np.ndarray  # float64, arrival time of each frame
+    frames: np.ndarray     # PACKET_DTYPE records
+    progress: np.ndarray   # float32, progress along the track of each frame
+    completed: bool        # reached the next checkpoint or the finish
+    duration: float        # seconds from entering the segment to leaving it (or to the last frame)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def time_at(self, progress: float) -> float:
+        """Seconds into the traversal at which ``progress`` was first reached, inf if never."""
+        reached = np.maximum.accumulate(self.progress)
+        i = int(np.searchsorted(reached, progress))
+        if i == 0:
+            return 0.0
+        if i == len(reached):
+            return float("inf")
+        # Interpolated between the last frame short of it and the first one at or past it
+        t0, t1 = self.timestamp[i - 1] - self.timestamp[0], self.timestamp[i] - self.timestamp[0]
+        return float(t0 + (t1 - t0) * (progress - reached[i - 1]) / (reached[i] - reached[i - 1]))
+
+
+@dataclass
+class SegmentStats:
+    attempts: int = 0       # episodes that entered the segment
+    completions: int = 0    # ... and got through it
+    failures: int = 0       # ... and ended in it
+    best_duration: float = float("inf")
+
+    @property
+    def priority(self) -> float:
+        """Failure rate, smoothed so untried segments start at 0.5."""
+        return (self.failures + 1) / (self.attempts + 2)
+
+
+class TrajectoryCache:
+    def __init__(self, max_frames=MAX_FRAMES, recent=RECENT_PER_SEGMENT, alpha=PRIORITY_EXPONENT, track_model=None,
+                 respawn_jump=RESPAWN_JUMP):
+        """
+        Args:
+            max_frames (int, optional): Frames cached over all segments.
+                Defaults to MAX_FRAMES.
+            recent (int, optional): Latest traversals kept per segment besides
+                the ghost. Defaults to RECENT_PER_SEGMENT.
+            alpha (float, optional): Sampling probability of a segment is
+                proportional to its priority to this power; 0 samples
+                uniformly. Defaults to PRIORITY_EXPONENT.
+            track_model (TrackModel, optional): Measures the progress of
+                every frame along the centerline. Defaults to None, the
+                plugin's checkpoint progress.
+            respawn_jump (float, optional): Meters between consecutive frames
+                treated as a respawn, which starts a new traversal. Defaults
+                to RESPAWN_JUMP.
+        """
+        self.max_frames = max_frames
+        self.recent_per_segment = recent
+        self.alpha = alpha
+        self.track_model = track_model
+        self.respawn_jump = respawn_jump
+        self.n_frames = 0
+        self.stats = {}  # segment -> SegmentStats
+        self._entries = OrderedDict()  # key -> Traversal, least recently used first
+        self._recent = {}  # segment -> deque of keys, oldest first
+        self._ghosts = {}  # segment -> key
+        self._keys = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def segments(self) -> list:
+        """Segments with at least one cached traversal, in track order."""
+        return sorted(segment for segment, keys in self._recent.items() if keys or segment in self._ghosts)
+
+    def _segment_stats(self, segment) -> SegmentStats:
+        stats = self.stats.get(segment)
+        if stats is None:
+            stats = self.stats[segment] = SegmentStats()
+        return stats
+
+    def add_run(self, timestamp: np.ndarray, frames: np.ndarray) -> list:
+        """
+        Split frames into traversals and cache them. Frames outside a race
+        and after the finish are skipped; a respawn starts a new traversal.
+
+        Args:
+            timestamp (np.ndarray): float64 arrival times, shape (N,).
+            frames (np.ndarray): ``PACKET_DTYPE`` records, shape (N,), e.g.
+                ``cache.add_run(*load_recording(path))``.
+
+        Returns:
+            list of Traversal: The traversals found, in order.
+        """
+        if len(frames) == 0:
+            return []
+        in_race = (frames["flags"] & FLAG_IN_RACE) != 0
+        finished = (frames["flags"] & FLAG_FINISHED) != 0
+        checkpoint = frames["cp_passed"].astype(np.int64)
+        jumps = np.linalg.norm(np.diff(frames["position"].astype(np.float64), axis=0), axis=1) > self.respawn_jump
+        boundary = (np.diff(checkpoint) != 0) | (in_race[1:] != in_race[:-1]) | jumps
+        starts = np.concatenate([[0], np.flatnonzero(boundary) + 1])
+        ends = np.concatenate([starts[1:], [len(frames)]])
+        if self.track_model is not None:
+            progress = self.track_model.progress(frames["position"]).astype(np.float32)
+        else:
+            progress = frames["cp_progress"]
+
+        traversals = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if not in_race[start] or finished[start]:
+                continue
+            segment = int(checkpoint[start])
+            crossed = end < len(frames) and in_race[end] and not jumps[end - 1] and checkpoint[end] == segment + 1
+            completed = bool(crossed or finished[end - 1])
+            last = end if crossed else end - 1
+            traversal = Traversal(segment, timestamp[start:end].copy(), frames[start:end].copy(),
+                                  np.array(progress[start:end], dtype=np.float32), completed,
+                                  float(timestamp[last] - timestamp[start]))
+            self.add(traversal)
+            traversals.append(traversal)
+        return traversals
+
+    def add(self, traversal: Traversal):
+        """Cache a traversal, evicting others if the cache is full."""
+        segment = traversal.segment
+        key = next(self._keys)
+        self._entries[key] = traversal
+        self.n_frames += len(traversal)
+
+        recent = self._recent.setdefault(segment, deque())
+        recent.append(key)
+        if len(recent) > self.recent_per_segment:
+            oldest = recent.popleft()
+            if self._ghosts.get(segment) != oldest:
+                self._drop(oldest)
+
+        if traversal.completed:
+            stats = self._segment_stats(segment)
+            stats.best_duration = min(stats.best_duration, traversal.duration)
+            ghost = self._ghosts.get(segment)
+            if ghost is None or traversal.duration < self._entries[ghost].duration:
+                self._ghosts[segment] = key
+                if ghost is not None and ghost not in recent:
+                    self._drop(ghost)
+        self._evict()
+
+    def _evict(self):
+        while self.n_frames > self.max_frames and len(self._entries) > 1:
+            ghosts = set(self._ghosts.values())
+            victim = next((key for key in self._entries if key not in ghosts), None)
+            if victim is None:
+                # Only ghosts left: keep those of the segments that need practice
+                victim = self._ghosts[min(self._ghosts, key=lambda s: self._segment_stats(s).priority)]
+            self._drop(victim)
+
+    def _drop(self, key):
+        traversal = self._entries.pop(key)
+        self.n_frames -= len(traversal)
+        segment = traversal.segment
+        if self._ghosts.get(segment) == key:
+            del self._ghosts[segment]
+        recent = self._recent[segment]
+        if key in recent:
+            recent.remove(key)
+
+    def _use(self, key) -> Traversal:
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def ghost(self, segment) -> Traversal:
+        """The fastest complete traversal of ``segment``, or None."""
+        key = self._ghosts.get(segment)
+        return self._use(key) if key is not None else None
+
+    def recent(self, segment) -> list:
+        """The latest traversals of ``segment``, oldest first."""
+        return [self._use(key) for key in self._recent.get(segment, ())]
+
+    def start_state(self, segment) -> np.void:
+        """
+        The frame the car is in on entering ``segment``, from its ghost or
+        its latest traversal, or None if it was never entered.
+        """
+        key = self._ghosts.get(segment)
+        if key is None and self._recent.get(segment):
+            key = self._recent[segment][-1]
+        return self._use(key).frames[0] if key is not None else None
+
+    def report(self, start: int, reached: int, finished: bool = False):
+        """
+        Record the outcome of an episode that started at segment ``start``
+        and ended in segment ``reached``, or at the finish.
+        """
+        for segment in range(start, reached):
+            stats = self._segment_stats(segment)
+            stats.attempts += 1
+            stats.completions += 1
+        if not finished:
+            stats = self._segment_stats(reached)
+            stats.attempts += 1
+            stats.failures += 1
+
+    def _cached(self, segment) -> int:
+        keys = set(self._recent.get(segment, ()))
+        if segment in self._ghosts:
+            keys.add(self._ghosts[segment])
+        return len(keys)
+
+    def priority(self, segment) -> float:
+        return self._segment_stats(segment).priority
+
+    def probabilities(self, segments) -> np.ndarray:
+        """Sampling probability of each of ``segments``."""
+        priorities = np.array([self.priority(segment) for segment in segments], dtype=np.float64) ** self.alpha
+        return priorities / priorities.sum()
+
+    def sample_segment(self, rng: np.random.Generator, reachable=None) -> int:
+        """
+        Draw the segment to start the next episode at.
+
+        Args:
+            rng (np.random.Generator): E.g. the env's ``np_random``.
+            reachable (iterable, optional): Segments the game can reset to
+                right now. Defaults to the start line and every cached
+                segment.
+
+        Returns:
+            int: The segment, 0 for the start line.
+        """
+        segments = sorted(set(reachable) if reachable is not None else {0, *self.segments})
+        if len(segments) == 1:
+            return segments[0]
+        return segments[rng.choice(len(segments), p=self.probabilities(segments))]
+
+    def summary(self) -> dict:
+        """Segment -> attempts, completions, failures, best duration, priority and cached traversals."""
+        return {
+            segment: {
+                "attempts": stats.attempts,
+                "completions": stats.completions,
+                "failures": stats.failures,
+                "best_duration": stats.best_duration,
+                "priority": stats.priority,
+                "cached": self._cached(segment),
+            }
+            for segment, stats in sorted(self.stats.items())
+        }
@@ -0,0 +1,147 @@
+"""
+Image observations from captured frames, processed and stacked in place.
+
+``VisionPipeline`` turns a full RGB frame, e.g. a view into a
+``SharedFrameRing`` slot, into a small image: it crops the frame to a
+region given in fractions of its size, averages blocks of pixels down to
+``size`` and, by default, converts to grayscale. The crop, the block
+average and the color conversion are one ``np.einsum`` over a strided view
+of the frame, written into a preallocated buffer, so nothing the size of a
+frame is copied or allocated.
+
+The last ``stack`` images are kept in a mirrored buffer, as in
+``shared.temporal``: ``push()`` returns one of ``stack`` preallocated
+read-only views instead of concatenating a new array every step.
+"""
+import numpy as np
+from gymnasium import spaces
+
+IMAGE_SIZE = (64, 128)          # (height, width) of the processed image
+IMAGE_CROP = (0.25, 1.0, 0.0, 1.0)  # (top, bottom, left, right) fractions: drops the sky
+IMAGE_STACK = 4
+LUMA = (0.299, 0.587, 0.114)    # ITU-R BT.601 weights of R, G and B
+
+
+class VisionPipeline:
+    def __init__(self, size=IMAGE_SIZE, crop=IMAGE_CROP, grayscale=True, stack=IMAGE_STACK):
+        """
+        Args:
+            size (tuple, optional): (height, width) of the processed image.
+                Defaults to IMAGE_SIZE.
+            crop (tuple, optional): (top, bottom, left, right) of the region
+                kept, as fractions of the frame's height and width. Pixels
+                that do not fill a whole block at the bottom and right are
+                dropped. Defaults to IMAGE_CROP.
+            grayscale (bool, optional): Convert to luma; otherwise images keep
+                their 3 RGB channels. Defaults to True.
+            stack (int, optional): Number of stacked images. Defaults to
+                IMAGE_STACK.
+
+        Raises:
+            ValueError: If ``stack`` is not positive or the crop is empty.
+        """
+        if stack < 1:
+            raise ValueError(f"stack must be positive, got {stack}")
+        top, bottom, left, right = crop
+        if not (0.0 <= top < bottom <= 1.0 and 0.0 <= left < right <= 1.0):
+            raise ValueError(f"Invalid crop {crop}")
+        self.size = tuple(size)
+        self.crop = tuple(crop)
+        self.grayscale = grayscale
+        self.k = stack
+        self.shape = self.size if grayscale else self.size + (3,)
+
+        self._buffer = np.zeros((2 * stack,) + self.shape, dtype=np.uint8)
+        self._views = []
+        for head in range(stack):
+            view = self._buffer[head + 1:head + 1 + stack]
+            view.flags.writeable = False
+            self._views.append(view)
+        self._head = stack - 1
+        self._scratch = np.zeros(self.shape, dtype=np.float32)
+        self._plan = None  # (frame shape, rows, cols, block shape, subscripts, weights)
+
+    @property
+    def observation_space(self) -> spaces.Box:
+        return spaces.Box(low=0, high=255, shape=(self.k,) + self.shape, dtype=np.uint8)
+
+    def _prepare(self, frame_shape):
+        """Work out the crop and block size for frames of ``frame_shape``, once per shape."""
+        height, width, channels = frame_shape
+        top, bottom, left, right = self.crop
+        rows = (int(round(top * height)), int(round(bottom * height)))
+        cols = (int(round(left * width)), int(round(right * width)))
+        h, w = self.size
+        fy, fx = (rows[1] - rows[0]) // h, (cols[1] - cols[0]) // w
+        if fy < 1 or fx < 1:
+            raise ValueError(f"A {self.crop} crop of a {height}x{width} frame is smaller than {h}x{w}")
+        rows = slice(rows[0], rows[0] + fy * h)
+        cols = slice(cols[0], cols[0] + fx * w)
+        if self.grayscale:
+            subscripts, weights = "aybxc,c->ab", np.array(LUMA, dtype=np.float32)
+        else:
+            subscripts, weights = "aybxc,cd->abd", np.eye(channels, dtype=np.float32)
+        # The block average folded into the color weights
+        weights /= fy * fx
+        self._plan = (frame_shape, rows, cols, (h, fy, w, fx, channels), subscripts, weights)
+        return self._plan
+
+    def __call__(self, frame: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Process one frame.
+
+        Args:
+            frame (np.ndarray): uint8 RGB frame, shape (height, width, 3).
+            out (np.ndarray, optional): uint8 buffer of ``shape`` to write
+                into. Defaults to a new array.
+
+        Returns:
+            np.ndarray: The processed image, ``out`` if given.
+        """
+        plan = self._plan
+        if plan is None or plan[0] != frame.shape:
+            plan = self._prepare(frame.shape)
+        _, rows, cols, blocks, subscripts, weights = plan
+        # Splitting the axes of the cropped view into blocks needs no copy
+        blocks = frame[rows, cols].reshape(blocks)
+        np.einsum(subscripts, blocks, weights, out=self._scratch)
+        self._scratch += 0.5  # rounded, not truncated, by the cast
+        if out is None:
+            out = np.empty(self.shape, dtype=np.uint8)
+        np.copyto(out, self._scratch, casting="unsafe")
+        return out
+
+    @property
+    def latest(self) -> np.ndarray:
+        """The newest stacked image."""
+        return self._views[self._head][-1]
+
+    def reset(self, image: np.ndarray = None) -> np.ndarray:
+        """
+        Start a new episode: fill every slot of the stack with ``image``, a
+        processed image, or black if None.
+
+        Returns:
+            np.ndarray: Read-only (stack,) + ``shape`` view of the stack.
+        """
+        self.push(image)
+        self._buffer[:] = self._buffer[self._head]
+        return self._views[self._head]
+
+    def push(self, image: np.ndarray = None) -> np.ndarray:
+        """
+        Append a processed image, or black if None, oldest first, and return
+        the stack. The returned view is overwritten by later calls; copy it
+        to keep it.
+        """
+        head = self._head + 1
+        if head == self.k:
+            head = 0
+        self._head = head
+        row = self._buffer[head]
+        if image is None:
+            row[...] = 0
+        else:
+            row[...] = image
+        self._buffer[head + self.k] = row
+        return self._views[head]
@@ -1,20 +1,180 @@
+import functools
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 import time
-from bridge.bridge import TelemetryBridge
-from core.instance import TrackmaniaGameInstance
-from shared.schemas import Telemetry
+from .core.backend import RESPAWN_KEY
+from .core.controller import KeyStateController
+from .core.scheduler import ControlScheduler
+from .shared.features import (DEFAULT_FEATURES, FeaturePipeline, RewardFunction, surface_lookahead_stage,
+                               track_progress_stage)
+from .shared.normalization import ObservationNormalizer, RewardNormalizer
+from .shared.perf import END_TO_END, OBS_BUILD, QUEUE_WAIT, REWARD, PerfStats
+from .shared.packet import FLAG_FINISHED, FLAG_IN_RACE, PACKET_DTYPE
+from .shared.temporal import MIN_DT, TemporalObservation
+from .shared.vision import VisionPipeline
 
 TELEMETRY_PORT = 5000
 TELEMETRY_HOST = "127.0.0.1"
 EPISODE_DURATION = 60
-speed_weight = 0.1
-checkpoint_weight = 1.0
+STEP_INTERVAL = 0.05          # seconds slept per step when not frame-synchronous
+STEP_TIMEOUT = 0.25           # max seconds a synchronous step waits for fresh frames
+FIRST_RESET_TIMEOUT = 15.0    # max seconds to wait for the race to load
+RESET_TIMEOUT = 5.0           # max seconds to wait for the car to respawn
+RESTART_SPEED_THRESHOLD = 1.0
+ACTIVE_SEND_RATE = 60.0       # telemetry frames per second worth asking the plugin for during episodes
+REWARD_WEIGHTS = {"speed_gain": 0.5, "progress": 1.0}
+TRACK_REWARD_WEIGHTS = {"speed_gain": 0.5, "track_progress": 1.0}
+
+
+def in_race(frames):
+    return (frames["flags"] & FLAG_IN_RACE) != 0
+
+
+def at_race_start(frames):
+    return at_checkpoint(frames, 0)
+
+
+def at_checkpoint(frames, checkpoint):
+    """Standing at the start of segment ``checkpoint``, after a restart (0) or a respawn."""
+    return (in_race(frames) & (frames["cp_passed"] == checkpoint)
+            & (np.abs(frames["speed"]) < RESTART_SPEED_THRESHOLD))
+
+
+def finished(frames):
+    return (frames["flags"] & FLAG_FINISHED) != 0
+
+
+def make_pipeline(features=None, reward_weights=None, track_model=None, surface_index=None):
+    """
+    Observation pipeline and reward function shared by the envs.
+
+    Returns:
+        tuple: (FeaturePipeline, RewardFunction). With a track model the
+        observation gains a ``track_progress`` column, which the default
+        reward uses instead of the plugin's checkpoint progress. With a
+        surface index it gains the ``surface_lookahead`` columns.
+    """
+    features = list(DEFAULT_FEATURES if features is None else features)
+    if track_model is not None and "track_progress" not in features:
+        features.append(track_progress_stage(track_model))
+    if surface_index is not None and "surface_lookahead" not in features:
+        features.append(surface_lookahead_stage(surface_index))
+    pipeline = FeaturePipeline(features)
+    if reward_weights is None:
+        reward_weights = TRACK_REWARD_WEIGHTS if track_model is not None else REWARD_WEIGHTS
+    return pipeline, RewardFunction(pipeline, reward_weights)
 
 
 class TrackmaniaEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, telemetry_bridge=None, game_instance=None, sync_frames=0, step_timeout=STEP_TIMEOUT,
+                 controller=None, track_model=None, features=None, reward_weights=None, perf=False,
+                 send_rate=None, frame_stack=None, temporal_features=False, normalize_obs=False,
+                 normalize_reward=False, curriculum=None, replay_buffer=None, vision=False, frame_capture=None,
+                 scheduler=None, surface_index=None):
+        """
+        Args:
+            telemetry_bridge (TelemetryBridge, optional): An already started
+                bridge to use. By default one is created on TELEMETRY_PORT by
+                ``start()``.
+            game_instance (GameBackend, optional): The game to control, e.g.
+                a ReplayGameInstance to run headless. By default Trackmania is
+                launched by ``start()``.
+            sync_frames (int, optional): If positive, ``step()`` blocks until
+                this many fresh telemetry frames arrived after the action
+                (frame-synchronous mode), and ``reset()`` waits for the
+                race-start state instead of sleeping. If 0, each step sleeps
+                STEP_INTERVAL. Defaults to 0.
+            step_timeout (float, optional): Maximum seconds a synchronous step
+                waits for fresh frames. Defaults to STEP_TIMEOUT.
+            controller (KeyStateController, optional): Turns actions into held
+                keys. By default an analog controller driving
+                ``game_instance`` is created and started.
+            track_model (TrackModel, optional): Centerline of the map. If
+                given, a ``track_progress`` feature is appended to the
+                observation and the progress reward uses the continuous
+                distance along the centerline instead of the plugin's
+                checkpoint progress.
+            features (list, optional): Names of registered features or
+                FeatureStage objects making up the observation. Defaults to
+                DEFAULT_FEATURES.
+            reward_weights (dict, optional): Reward term name -> weight.
+                Defaults to REWARD_WEIGHTS, or TRACK_REWARD_WEIGHTS with a
+                track model.
+            perf (bool or PerfStats, optional): Record the latency of every
+                hot-path stage, from telemetry ingest in the bridge to key
+                dispatch in the controller, see ``get_perf_stats()``. A
+                PerfStats may be passed to share it between envs. Defaults to
+                False, which times nothing.
+            send_rate (float, optional): Telemetry frames per second to ask
+                the plugin for from the first reset on, e.g. ACTIVE_SEND_RATE;
+                ``close()`` hands it back to the plugin's configured idle
+                rate. See ``TelemetryBridge.set_send_rate()``. Defaults to
+                None, leaving the rate alone.
+            frame_stack (int, optional): Return the last ``frame_stack``
+                observations as a (frame_stack, size) array, kept in a
+                TemporalObservation and updated in place. The returned array
+                is a read-only view that later steps overwrite; copy it to
+                keep it. Defaults to None, a single (size,) observation.
+            temporal_features (bool, optional): Append acceleration, yaw
+                rate and smoothed wheel slip (see ``shared.temporal``) to
+                every stacked observation; implies a stack of 1 without
+                ``frame_stack``. Defaults to False.
+            normalize_obs (bool or ObservationNormalizer, optional):
+                Standardize the pipeline's columns of every observation with
+                running statistics, see ``shared.normalization``. An
+                ObservationNormalizer may be passed to share, load or freeze
+                the statistics. Defaults to False.
+            normalize_reward (bool or RewardNormalizer, optional): Divide
+                every reward term by its running standard deviation. A
+                RewardNormalizer may be passed as for ``normalize_obs``.
+                Defaults to False.
+            curriculum (TrajectoryCache, optional): Collects the frames of
+                every episode and its outcome per checkpoint segment, and
+                picks where ``reset()`` starts the next one: at the line, or
+                at the last checkpoint passed with the respawn key, sampled
+                by the segments' failure rates (see ``shared.trajectory``).
+                ``reset(options={"segment": k})`` picks it explicitly. The
+                reset info then holds the ``segment`` started at. Defaults to
+                None, always restarting at the line.
+            replay_buffer (ReplayBuffer, optional): Every step writes its
+                transition, as the agent sees it, into this buffer (see
+                ``shared.replay_buffer``). Defaults to None.
+            vision (bool or VisionPipeline, optional): Add the game's pixels
+                to the observation, which becomes a Dict of a stacked uint8
+                ``image`` (see ``shared.vision``) and the ``telemetry``
+                observation. The image is the newest captured frame tagged
+                at or before the observed telemetry frame; the step info
+                holds its tag as ``image_seq``. A VisionPipeline may be
+                passed to set the size, crop, color and stack. Defaults to
+                False.
+            frame_capture (FrameCapture or SharedFrameRing, optional): Where
+                the pixels come from: a FrameCapture, which ``start()``
+                starts and ``close()`` stops, or a SharedFrameRing filled by
+                a capture in another process. Defaults to a FrameCapture of
+                the game window (see ``core.capture``), created by
+                ``start()``.
+            scheduler (bool or ControlScheduler, optional): Pace the steps
+                with a real-time schedule instead of ``sync_frames`` and
+                STEP_INTERVAL: a deadline timer, an action repeat in
+                telemetry frames and a policy for late actions (see
+                ``core.scheduler``). The reward is then the sum of the
+                per-frame rewards over every frame since the previous
+                observation. The step info holds ``late`` and
+                ``missed_deadline``, and the scheduler's ``stats()`` as
+                ``schedule`` when an episode ends. True uses a
+                ControlScheduler at STEP_INTERVAL. Defaults to None.
+            surface_index (SurfaceIndex, optional): Ground surfaces of the
+                map, built from recorded runs (see ``shared.surface``). If
+                given, a ``surface_lookahead`` feature is appended to the
+                observation: the surface class and friction statistics at
+                the car's position LOOKAHEAD_HORIZONS seconds ahead.
+
+        Constructing the env does no I/O: the default bridge and game are
+        only created by ``start()``, which the first ``reset()`` calls, so
+        tools and tests can build an env, or inject their own parts, without
+        binding a port or launching the game.
+        """
         super().__init__()
 
         # Action space: [steer, throttle, brake]
@@ -22,131 +182,424 @@ class TrackmaniaEnv(gym.Env):
                                        high=np.array([1, 1, 1]),
                                        dtype=np.float32)
 
-        # Observation space
-        self.observation_space = spaces.Box(low=0.0, high=1.0, shape=(15,), dtype=np.float32)
-
-        # Setup the telemetry bridge
-        self.telemetry_bridge = TelemetryBridge(host=TELEMETRY_HOST, port=TELEMETRY_PORT)
-        self.telemetry_bridge.start()
-
-        # Launch Trackmania
-        self.game_instance = TrackmaniaGameInstance(telemetry_bridge=self.telemetry_bridge)
-
+        # Observation space, derived from the feature pipeline
+        self.pipeline, self.reward_function = make_pipeline(features, reward_weights, track_model, surface_index)
+        self.observation_space = self.pipeline.observation_space
+        self.temporal = None
+        if frame_stack is not None or temporal_features:
+            self.temporal = TemporalObservation(self.pipeline, frame_stack or 1, temporal_features,
+                                                min_dt=1.0 / send_rate if send_rate else MIN_DT)
+            self.observation_space = self.temporal.observation_space
+        if normalize_obs is True:
+            normalize_obs = ObservationNormalizer(self.pipeline)
+        self.obs_normalizer = normalize_obs or None
+        if self.obs_normalizer is not None:
+            self.observation_space = self.obs_normalizer.observation_space(self.observation_space)
+        if normalize_reward is True:
+            normalize_reward = RewardNormalizer(self.reward_function)
+        self.reward_normalizer = normalize_reward or None
+        self._reward_fn = self.reward_normalizer or self.reward_function
+
+        # Buffers reused every step: the observed frame and the last two observations
+        self._frame = np.zeros(1, dtype=PACKET_DTYPE)
+        self._obs = np.zeros((1, self.pipeline.size), dtype=np.float32)
+        self._prev_obs = np.zeros((1, self.pipeline.size), dtype=np.float32)
+        self._reward = np.zeros(1, dtype=np.float64)
+        self._normalized_obs = np.zeros((1, self.pipeline.size), dtype=np.float32)
+
+        # The bridge, the game and its controller; missing ones are created by start()
+        self.telemetry_bridge = telemetry_bridge
+        self.game_instance = game_instance
+        self.controller = controller
+        self.track_model = track_model
+
+        self.sync_frames = sync_frames
+        self.step_timeout = step_timeout
+        self.send_rate = send_rate
         self.max_episode_duration = EPISODE_DURATION
         self.episode_start_time = None
-        self.last_checkpoint_progress = 0.0
         self.first_reset_done = False
-
+        self.last_step_time = None
+        self.obs_seq = -1
+        self.obs_timestamp = None
+        self.track_progress = None
+
+        # Curriculum resets: the segment the episode started at and the frames seen since
+        self.curriculum = curriculum
+        self.start_segment = 0
+        self._episode_timestamps = []
+        self._episode_frames = []
+
+        # Transitions written to the replay buffer: the last observation returned and the action taken in it
+        self.replay_buffer = replay_buffer
+        self._buffer_obs = np.zeros(self.observation_space.shape, dtype=np.float32)
+        self._action = np.zeros(self.action_space.shape, dtype=np.float32)
+
+        # Pixels: the frame ring is set up by start(), the image processed into a buffer of its own
+        if vision is True:
+            vision = VisionPipeline()
+        self.vision = vision or None
+        self.frame_capture = frame_capture
+        self.frame_ring = None
+        self.image_seq = -1
+        self._owns_capture = False
+        if self.vision is not None:
+            if replay_buffer is not None:
+                raise ValueError("The replay buffer stores flat observations; it cannot be used with vision")
+            self.observation_space = spaces.Dict({"image": self.vision.observation_space,
+                                                  "telemetry": self.observation_space})
+            self._image = np.zeros(self.vision.shape, dtype=np.uint8)
+            self._process_image = functools.partial(self.vision, out=self._image)
+
+        # Real-time control schedule
+        if scheduler is True:
+            scheduler = ControlScheduler(STEP_INTERVAL)
+        self.scheduler = scheduler or None
+
+        # Latency instrumentation, shared with the bridge and the controller
+        if perf is True:
+            perf = PerfStats()
+        self.perf = perf or None
+        if self.game_instance is not None:
+            self._start_controller()
+        self._attach_perf()
+
+    def start(self):
+        """
+        Create the default bridge and launch the game, if they were not
+        passed to the constructor. Called by ``reset()``; call it earlier to
+        pay the start-up cost up front. Does nothing once started.
+        """
+        if self.telemetry_bridge is None:
+            # Imported here: the bridge pulls in the networking stack
+            from .bridge.bridge import TelemetryBridge
+            self.telemetry_bridge = TelemetryBridge(host=TELEMETRY_HOST, port=TELEMETRY_PORT)
+            self.telemetry_bridge.start()
+        if self.game_instance is None:
+            from .core.instance import TrackmaniaGameInstance
+            self.game_instance = TrackmaniaGameInstance(telemetry_bridge=self.telemetry_bridge)
+        self._start_controller()
+        self._attach_perf()
+        if self.vision is not None and self.frame_ring is None:
+            self._start_capture()
+
+    def _start_capture(self):
+        capture = self.frame_capture
+        if capture is None:
+            from .core.capture import FrameCapture, WindowFrameSource
+            capture = self.frame_capture = FrameCapture(WindowFrameSource(self.game_instance.game_window),
+                                                        self.telemetry_bridge)
+            self._owns_capture = True
+        # A FrameCapture holds its ring; anything else is the ring itself
+        self.frame_ring = getattr(capture, "ring", capture)
+        if self.frame_ring is not capture:
+            capture.start()
+
+    def _start_controller(self):
+        if self.controller is None:
+            self.controller = KeyStateController(self.game_instance)
+            self.controller.start()
+
+    def _attach_perf(self):
+        # Latency instrumentation, shared with the bridge and the controller
+        if self.perf is None:
+            return
+        for part in (self.telemetry_bridge, self.controller):
+            if part is not None:
+                part.perf = self.perf
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
+        self.start()
 
         self.episode_start_time = time.time()
-        self.last_checkpoint_progress = 0.0
-        self.last_speed = 0.0
 
         if not self.first_reset_done:
-            print("[TrackmaniaEnv] First reset: waiting 15s to skip ghost prompt...")
-            time.sleep(15)
-            self.game_instance.press_key("enter")
-            self.first_reset_done = True
-
-        # Restart the race
-        self.game_instance.press_key("backspace")
-        time.sleep(1)
-
-        obs = self._get_obs()
-        return obs, {}
+            if self.sync_frames:
+                print("[TrackmaniaEnv] First reset: waiting for the race to load to skip ghost prompt...")
+                if self.telemetry_bridge.wait_for_frame(in_race, timeout=FIRST_RESET_TIMEOUT) < 0:
+                    print("[TrackmaniaEnv] Race not detected in time, continuing anyway.")
+            else:
+                print("[TrackmaniaEnv] First reset: waiting 15s to skip ghost prompt...")
+                time.sleep(15)
+            self._skip_ghost_prompt()
+
+        restart_seq = self._restart_race(self._reset_segment(options))
+        if self.sync_frames:
+            if self.telemetry_bridge.wait_for_frame(self._at_start, after_seq=restart_seq, timeout=RESET_TIMEOUT) < 0:
+                print("[TrackmaniaEnv] Restart not detected in time, continuing anyway.")
+        else:
+            time.sleep(1)
+
+        return self._finish_reset()
+
+    def _skip_ghost_prompt(self):
+        self.game_instance.press_key("enter")
+        self.first_reset_done = True
+
+    def _reset_segment(self, options) -> int:
+        """
+        Report the episode that just ended to the curriculum and pick the
+        segment the next one starts at.
+
+        Raises:
+            ValueError: If ``options["segment"]`` is neither the start line
+                nor the last checkpoint passed, the only places the game can
+                put the car back at.
+        """
+        done = bool(finished(self._frame)[0])
+        current = int(self._frame["cp_passed"][0]) if in_race(self._frame)[0] else 0
+        segment = None
+        if options and "segment" in options:
+            segment = int(options["segment"])
+            if segment not in (0, current) or (segment and done):
+                raise ValueError(f"Can only reset to the start line or the last checkpoint passed ({current}), "
+                                 f"not to segment {segment}")
+
+        if self.curriculum is not None and self._episode_frames:
+            self.curriculum.add_run(np.array(self._episode_timestamps), np.array(self._episode_frames))
+            self.curriculum.report(self.start_segment, current, done)
+        self._episode_timestamps.clear()
+        self._episode_frames.clear()
+
+        if segment is None:
+            segment = 0
+            if self.curriculum is not None and not done:
+                segment = self.curriculum.sample_segment(self.np_random, reachable=(0, current))
+        return segment
+
+    def _restart_race(self, segment=0) -> int:
+        """
+        Release all keys and restart the race, or respawn at the last
+        checkpoint passed if ``segment`` is not 0; returns the last sequence
+        number before the restart.
+        """
+        self.controller.release_all()
+        if self.send_rate:
+            self.telemetry_bridge.set_send_rate(self.send_rate)
+        restart_seq = self.telemetry_bridge.latest_seq
+        self.start_segment = segment
+        self.game_instance.press_key(RESPAWN_KEY if segment else "backspace")
+        return restart_seq
+
+    def _at_start(self, frames):
+        return at_checkpoint(frames, self.start_segment)
+
+    def _finish_reset(self):
+        self.last_step_time = None
+        obs = self._get_obs(reset=True)
+        self._prev_obs[:] = self._obs
+        if self.scheduler is not None:
+            self.scheduler.reset(self.obs_seq)
+        if self.replay_buffer is not None:
+            self._buffer_obs[...] = obs
+        return obs, ({"segment": self.start_segment} if self.curriculum is not None else {})
 
     def step(self, action):
+        action_seq, action_time = self._send_action(action)
+
+        if self.scheduler is not None:
+            target, timeout = self.scheduler.begin(action_seq)
+            if target is None:
+                time.sleep(timeout)
+            else:
+                self.telemetry_bridge.wait_for_seq(target, timeout=timeout)
+        elif self.sync_frames:
+            # Block until enough frames were produced after the action was sent
+            self.telemetry_bridge.wait_for_seq(action_seq + self.sync_frames, timeout=self.step_timeout)
+        else:
+            time.sleep(STEP_INTERVAL)  # simulate ~20Hz control loop
+
+        return self._finish_step(action_seq, action_time)
+
+    def _send_action(self, action):
+        """
+        Send an action to the game.
+
+        Returns:
+            tuple: The last sequence number before the action, and the
+            ``time.perf_counter()`` it was sent at if instrumented.
+        """
         steer, throttle, brake = action
+        if self.replay_buffer is not None:
+            self._action[:] = action
+        action_time = time.perf_counter() if self.perf is not None else None
+        action_seq = self.telemetry_bridge.latest_seq
         self._send_control(steer, throttle, brake)
+        self.game_instance.advance()
+        return action_seq, action_time
 
-        time.sleep(0.05)  # simulate ~20Hz control loop
-
+    def _finish_step(self, action_seq, action_time):
+        """Observe, reward and check for the end of the episode once the step has waited for telemetry."""
+        perf = self.perf
+        since_seq = self.obs_seq
         obs = self._get_obs()
-        reward = self._compute_reward(obs)
-        done = self._check_done(obs)
-
-        return obs, reward, done, False, {}
-
-
-    def _get_obs(self):
-        telemetry = self.telemetry_bridge.get_latest_telemetry()
-        return self._process_telemetry(telemetry)
-
-    def _process_telemetry(self, telemetry: Telemetry) -> np.ndarray:
-        if telemetry is None:
-            return np.zeros(self.observation_space.shape, dtype=np.float32)
-
-        def norm(x, min_val, max_val):
-            return (x - min_val) / (max_val - min_val) if max_val > min_val else 0.0
-
-        wheel_rot = np.mean([
-            telemetry.wheel_states["front_left"].rotation,
-            telemetry.wheel_states["front_right"].rotation,
-            telemetry.wheel_states["rear_left"].rotation,
-            telemetry.wheel_states["rear_right"].rotation,
-        ])
-        wheel_slip = np.mean([
-            telemetry.wheel_states["front_left"].slip_coef,
-            telemetry.wheel_states["front_right"].slip_coef,
-            telemetry.wheel_states["rear_left"].slip_coef,
-            telemetry.wheel_states["rear_right"].slip_coef,
-        ])
-
-        obs = np.array([
-            norm(telemetry.rpm or 0, 0, 10000),
-            norm(wheel_rot, 0, 3000),
-            norm(wheel_slip, 0, 1),
-            float(telemetry.on_ground),
-            float(telemetry.finished),
-            *(telemetry.orientation if telemetry.orientation else [0.0, 0.0, 0.0]),
-            norm(telemetry.side_speed or 0, -100, 100),
-            *(telemetry.velocity if telemetry.velocity else [0.0, 0.0, 0.0]),
-            float(telemetry.is_turbo),
-            norm(telemetry.speed or 0, 0, 300),
-            telemetry.checkpoints.progress if telemetry.checkpoints else 0.0
-        ], dtype=np.float32)
-
+        missed_deadline = None
+        if self.scheduler is not None:
+            missed_deadline = self.scheduler.end(self.obs_seq, self.obs_timestamp)
+        if perf is not None:
+            perf.since(END_TO_END, action_time)
+            reward_start = time.perf_counter()
+        reward = self._compute_reward(since_seq if self.scheduler is not None else None)
+        if perf is not None:
+            perf.since(REWARD, reward_start)
+        terminated, truncated = self._check_done()
+        if self.game_instance.needs_reset():
+            # The game was swapped for another one: the transition is not real,
+            # and the new game needs its ghost prompt skipped again
+            truncated = True
+            reward = 0.0
+            self.first_reset_done = False
+
+        if self.replay_buffer is not None:
+            self.replay_buffer.add(self._buffer_obs, self._action, reward, obs, terminated, truncated)
+            self._buffer_obs[...] = obs
+
+        info = self._step_info(action_seq)
+        if self.scheduler is not None:
+            info["late"] = self.scheduler.last_step_late
+            info["missed_deadline"] = missed_deadline
+            if terminated or truncated:
+                info["schedule"] = self.scheduler.stats()
+        if (terminated or truncated) and perf is not None:
+            info["perf"] = self.get_perf_stats()
+        return obs, reward, terminated, truncated, info
+
+    def get_perf_stats(self, reset=False) -> dict:
+        """
+        Latency of every instrumented stage since the env was created (or
+        the last reset of the statistics), also added to the step ``info``
+        as ``info["perf"]`` when an episode ends.
+
+        Args:
+            reset (bool, optional): Clear the statistics after reading them.
+
+        Returns:
+            dict: Stage (see ``shared.perf.STAGES``) -> count, mean, max and
+            percentiles in seconds. Empty if instrumentation is disabled.
+        """
+        if self.perf is None:
+            return {}
+        stats = self.perf.summary()
+        if reset:
+            self.perf.reset()
+        return stats
+
+    def _step_info(self, action_seq):
+        """
+        Timing information for the step that just finished.
+
+        ``fresh_frames`` counts telemetry frames received between sending the
+        action and reading the observation; ``obs_staleness`` is the age of
+        the observed frame in seconds.
+        """
+        now = time.monotonic()
+        steps_per_second = 1.0 / (now - self.last_step_time) if self.last_step_time is not None else None
+        self.last_step_time = now
+        info = {
+            "obs_seq": self.obs_seq,
+            "fresh_frames": self.obs_seq - action_seq,
+            "obs_staleness": now - self.obs_timestamp if self.obs_timestamp is not None else None,
+            "steps_per_second": steps_per_second,
+            "track_progress": self.track_progress,
+        }
+        if self.vision is not None:
+            info["image_seq"] = self.image_seq
+        return info
+
+
+    def _get_obs(self, reset=False):
+        window = self.telemetry_bridge.get_window(1)
+        if len(window.seq) == 0:
+            self._frame[:] = 0
+            self._obs[:] = 0.0
+            return self._observation(reset, received=False)
+        self.obs_seq = int(window.seq[0])
+        self.obs_timestamp = float(window.timestamp[0])
+        perf = self.perf
+        if perf is not None:
+            perf.record(QUEUE_WAIT, time.monotonic() - self.obs_timestamp)
+            start = time.perf_counter()
+        self._frame[0] = window.frames[0]  # element-wise: slice assignment copies field by field
+        self.pipeline(self._frame, out=self._obs)
+        if perf is not None:
+            perf.since(OBS_BUILD, start)
+        if self.track_model is not None:
+            self.track_progress = float(self.pipeline.view(self._obs, "track_progress")[0, 0])
+        if self.curriculum is not None:
+            self._episode_timestamps.append(self.obs_timestamp)
+            self._episode_frames.append(self._frame[0].copy())
+        return self._observation(reset)
+
+    def _observation(self, reset, received=True):
+        """The observation returned to the agent, from the one just built in ``self._obs``."""
+        obs = self._obs
+        # Without telemetry the zeros are left as they are, outside the statistics
+        if self.obs_normalizer is not None and received:
+            # Into a copy: the reward terms read the pipeline's own values
+            obs = self.obs_normalizer(self._obs, out=self._normalized_obs)
+        if self.temporal is None:
+            obs = obs[0].copy()
+        else:
+            frame, timestamp = (self._frame[0], self.obs_timestamp) if received else (None, None)
+            if reset:
+                obs = self.temporal.reset(obs[0], frame, timestamp)
+            else:
+                obs = self.temporal.push(obs[0], frame, timestamp)
+        if self.vision is not None:
+            return {"image": self._image_observation(reset), "telemetry": obs}
         return obs
 
-    def _send_control(self, steer, throttle, brake):        
-        if steer < -0.5:
-            self.game_instance.press_key("left")
-        elif steer > 0.5:
-            self.game_instance.press_key("right")
-
-        if throttle > 0.5:
-            self.game_instance.press_key("up")
-
-        if brake > 0.5:
-            self.game_instance.press_key("down")
-
-    def _compute_reward(self, obs):
-        current_speed = obs[11]
-        progress = obs[-2]
-
-        # Reward for high speed
-        speed_delta = max(0.0, current_speed - self.last_speed)
-        speed_reward = speed_delta * 0.5
-        
-        self.last_speed = current_speed
-        # Reward for checkpoint progress
-        checkpoint_reward = max(0.0, progress - self.last_checkpoint_progress)
-        self.last_checkpoint_progress = progress    
-
-        total_reward = speed_reward + checkpoint_reward
-        return total_reward
-    
-    def _check_done(self, obs):
-        # Check if agent finished the track
-        finished = obs[-1] == 1.0
+    def _image_observation(self, reset):
+        """Stack the image of the newest frame captured at or before the observed telemetry frame."""
+        tag = self.frame_ring.read(self.obs_seq, self._process_image)
+        # Black until the first frame is captured
+        image = self._image if tag is not None else None
+        self.image_seq = tag if tag is not None else -1
+        if reset:
+            return self.vision.reset(image)
+        return self.vision.push(image)
+
+    def _send_control(self, steer, throttle, brake):
+        # Queued for the controller's dispatch thread; does not block
+        self.controller.set_action(steer, throttle, brake)
+
+    def _compute_reward(self, since_seq=None):
+        # Weighted reward terms over the transition from the previous observation
+        if since_seq is not None and since_seq >= 0 and self.obs_seq - since_seq > 1:
+            # Per frame over every frame received since the previous observation, summed
+            window = self.telemetry_bridge.get_since(since_seq)
+            n = int(np.searchsorted(window.seq, self.obs_seq, side="right"))
+            if n > 1:
+                obs = self.pipeline(window.frames[:n])
+                rewards = self._reward_fn(obs, np.concatenate([self._prev_obs, obs[:-1]]))
+                self._prev_obs[:] = self._obs
+                return float(rewards.sum())
+        self._reward_fn(self._obs, self._prev_obs, out=self._reward)
+        self._prev_obs[:] = self._obs
+        return float(self._reward[0])
+
+    def _check_done(self):
+        """(terminated, truncated): the track was finished, or the episode ran out of time before that."""
+        # Check if agent finished the track, from the frame itself
+        terminated = bool(finished(self._frame)[0])
 
         # Check time limit
-        exceeded_time = (time.time() - self.episode_start_time) > self.max_episode_duration
+        truncated = not terminated and (time.time() - self.episode_start_time) > self.max_episode_duration
 
-        if exceeded_time:
+        if truncated:
             print("[TrackmaniaEnv] Episode timed out.")
 
-        return finished or exceeded_time
+        return terminated, truncated
+
+    def close(self):
+        if self.send_rate and self.telemetry_bridge is not None:
+            self.telemetry_bridge.set_send_rate(None)
+        if self.controller is not None:
+            self.controller.stop()
+        if self.frame_ring is not None and self.frame_ring is not self.frame_capture:
+            if self._owns_capture:
+                self.frame_capture.close()
+            else:
+                self.frame_capture.stop()
+        super().close()
@@ -0,0 +1,299 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+from .bridge.multiplex import MultiplexTelemetryBridge
+from .core.controller import KeyStateController
+from .core.instance import TrackmaniaGameInstance
+from .shared.normalization import ObservationNormalizer, RewardNormalizer
+from .shared.packet import PACKET_DTYPE
+from .trackmania_env import (EPISODE_DURATION, FIRST_RESET_TIMEOUT, RESET_TIMEOUT, STEP_INTERVAL, STEP_TIMEOUT,
+                             TELEMETRY_HOST, at_race_start, finished, in_race, make_pipeline)
+
+BASE_PORT = 5001
+
+
+class TrackmaniaVectorEnv(VectorEnv):
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, num_envs, bridge=None, game_instances=None, sync_frames=1, step_timeout=STEP_TIMEOUT,
+                 base_port=BASE_PORT, track_model=None, features=None, reward_weights=None, normalize_obs=False,
+                 normalize_reward=False, replay_buffer=None, surface_index=None):
+        """
+        Steps several Trackmania instances in lockstep as one batched env.
+
+        All instances stream telemetry to one MultiplexTelemetryBridge, each
+        on its own port; each step sends every action, waits for fresh frames from all
+        instances under a single deadline, and builds the whole observation
+        batch with one vectorized call. Finished sub-envs are restarted in the
+        background as soon as they end and return their reset observation on
+        the following step (gymnasium's NEXT_STEP autoreset), so one slow
+        respawn does not stall the others.
+
+        Args:
+            num_envs (int): Number of game instances.
+            bridge (MultiplexTelemetryBridge, optional): An already started
+                bridge whose first ``num_envs`` channels are the instances'.
+                By default one is created listening on ``base_port + i`` for
+                instance ``i``.
+            game_instances (list of GameBackend, optional): One game per
+                instance. By default Trackmania is launched, which only
+                works for ``num_envs=1``: its key input is machine-wide, so
+                at most one of the games may be a real one (see
+                ``GameBackend.shares_input``).
+                With an InstancePool, pass ``pool.bridge`` and
+                ``pool.leases``; sub-envs whose game was swapped are
+                truncated.
+            sync_frames (int, optional): Fresh frames each step waits for per
+                instance. If 0, each step sleeps STEP_INTERVAL. Defaults to 1.
+            step_timeout (float, optional): Maximum seconds a step waits for
+                all instances. Defaults to STEP_TIMEOUT.
+            base_port (int, optional): First port of the default bridge,
+                the plugin's ``binary_port``; its ``binary_port_count`` must
+                be at least ``num_envs``. Defaults to BASE_PORT.
+            track_model (TrackModel, optional): Centerline of the map, as in
+                TrackmaniaEnv.
+            features (list, optional): Observation features, as in
+                TrackmaniaEnv.
+            reward_weights (dict, optional): Reward term weights, as in
+                TrackmaniaEnv.
+            normalize_obs (bool or ObservationNormalizer, optional): As in
+                TrackmaniaEnv; the statistics are updated with the whole
+                batch at once. Defaults to False.
+            normalize_reward (bool or RewardNormalizer, optional): As in
+                TrackmaniaEnv. Defaults to False.
+            replay_buffer (ReplayBuffer, optional): As in TrackmaniaEnv,
+                with one stream per sub-env (``streams=num_envs``). The
+                autoreset steps, which are no transitions, are skipped.
+                Defaults to None.
+            surface_index (SurfaceIndex, optional): Ground surfaces of the
+                map, as in TrackmaniaEnv. Defaults to None.
+        """
+        self.num_envs = num_envs
+
+        # Action space: [steer, throttle, brake]
+        self.single_action_space = spaces.Box(low=np.array([-1, 0, 0]),
+                                              high=np.array([1, 1, 1]),
+                                              dtype=np.float32)
+        self.pipeline, self.reward_function = make_pipeline(features, reward_weights, track_model, surface_index)
+        self.single_observation_space = self.pipeline.observation_space
+        if normalize_obs is True:
+            normalize_obs = ObservationNormalizer(self.pipeline)
+        self.obs_normalizer = normalize_obs or None
+        if self.obs_normalizer is not None:
+            self.single_observation_space = self.obs_normalizer.observation_space(self.single_observation_space)
+        if normalize_reward is True:
+            normalize_reward = RewardNormalizer(self.reward_function)
+        self.reward_normalizer = normalize_reward or None
+        self._reward_fn = self.reward_normalizer or self.reward_function
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+
+        # Keys held for one real game reach every game on the machine
+        if game_instances is None and num_envs > 1:
+            raise ValueError("Trackmania's key input is machine-wide: one machine drives one game, pass "
+                             "game_instances to run more than one sub-env")
+        if game_instances is not None and sum(game.shares_input for game in game_instances) > 1:
+            raise ValueError("More than one game instance with machine-wide key input: keys held for one "
+                             "would reach the others")
+
+        # Setup the telemetry bridge
+        self._owns_bridge = bridge is None
+        if bridge is None:
+            bridge = MultiplexTelemetryBridge(num_envs, host=TELEMETRY_HOST, base_port=base_port)
+            bridge.start()
+        if bridge.num_instances < num_envs:
+            raise ValueError(f"Bridge has {bridge.num_instances} instances, expected at least {num_envs}")
+        self.bridge = bridge
+
+        # Launch one Trackmania per instance
+        if game_instances is None:
+            game_instances = [self._launch_instance(i) for i in range(num_envs)]
+        if len(game_instances) != num_envs:
+            raise ValueError(f"Expected {num_envs} game instances, got {len(game_instances)}")
+        self.game_instances = list(game_instances)
+        self.controllers = [KeyStateController(game_instance) for game_instance in self.game_instances]
+        for controller in self.controllers:
+            controller.start()
+
+        self.sync_frames = sync_frames
+        self.step_timeout = step_timeout
+        self.max_episode_duration = EPISODE_DURATION
+
+        # Batch buffers, reused every step
+        self._frames = np.zeros(num_envs, dtype=PACKET_DTYPE)
+        self._seqs = np.full(num_envs, -1, dtype=np.int64)
+        self._timestamps = np.full(num_envs, np.nan, dtype=np.float64)
+        self._obs = np.zeros((num_envs, self.pipeline.size), dtype=np.float32)
+        self._prev_obs = np.zeros((num_envs, self.pipeline.size), dtype=np.float32)
+        self._rewards = np.zeros(num_envs, dtype=np.float64)
+        self._action_seqs = np.empty(num_envs, dtype=np.int64)
+        self.replay_buffer = replay_buffer
+        self._buffer_obs = np.zeros(self.observation_space.shape, dtype=np.float32)
+
+        self.episode_start_time = np.zeros(num_envs, dtype=np.float64)
+        self.first_reset_done = np.zeros(num_envs, dtype=bool)
+
+        # Sub-envs that ended on the previous step and are restarting
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+        self._pending_resets = [None] * num_envs
+        self._executor = ThreadPoolExecutor(max_workers=num_envs, thread_name_prefix="TrackmaniaReset")
+
+    def _launch_instance(self, i):
+        """Launch the game of instance ``i``, making sure its telemetry connects to port ``i``."""
+        self.bridge.claim(i)
+        try:
+            return TrackmaniaGameInstance(telemetry_bridge=self.bridge.channel(i),
+                                          address=(self.bridge.host, self.bridge.ports[i]))
+        finally:
+            self.bridge.release_claim(i)
+
+    def _reset_instance(self, i):
+        """Restart the race on instance ``i`` and wait for the respawn."""
+        channel = self.bridge.channel(i)
+        game_instance = self.game_instances[i]
+
+        if not self.first_reset_done[i]:
+            if self.sync_frames:
+                if channel.wait_for_frame(in_race, timeout=FIRST_RESET_TIMEOUT) < 0:
+                    print(f"[TrackmaniaVectorEnv] Instance {i}: race not detected in time, continuing anyway.")
+            else:
+                time.sleep(15)
+            game_instance.press_key("enter")
+            self.first_reset_done[i] = True
+
+        self.controllers[i].release_all()
+        restart_seq = channel.latest_seq
+        game_instance.press_key("backspace")
+        if self.sync_frames:
+            if channel.wait_for_frame(at_race_start, after_seq=restart_seq, timeout=RESET_TIMEOUT) < 0:
+                print(f"[TrackmaniaVectorEnv] Instance {i}: restart not detected in time, continuing anyway.")
+        else:
+            time.sleep(1)
+
+        self.episode_start_time[i] = time.time()
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed, options=options)
+
+        for future in self._pending_resets:
+            if future is not None:
+                future.result()
+        # Restart all instances concurrently
+        list(self._executor.map(self._reset_instance, range(self.num_envs)))
+        self._autoreset[:] = False
+        self._pending_resets = [None] * self.num_envs
+
+        obs = self._get_obs()
+        self._prev_obs[:] = obs
+        observation = self._observation(obs)
+        if self.replay_buffer is not None:
+            self._buffer_obs[:] = observation
+        return observation, self._infos(self._seqs)
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        channels = self.bridge.channels
+        active = ~self._autoreset
+
+        for i in np.flatnonzero(active):
+            self._action_seqs[i] = channels[i].latest_seq
+            self.controllers[i].set_action(*actions[i])
+            self.game_instances[i].advance()
+
+        if self.sync_frames:
+            # One shared deadline: a lagging instance cannot stretch the step
+            # by more than step_timeout in total.
+            deadline = time.monotonic() + self.step_timeout
+            for i in np.flatnonzero(active):
+                channels[i].wait_for_seq(self._action_seqs[i] + self.sync_frames,
+                                         timeout=max(0.0, deadline - time.monotonic()))
+        else:
+            time.sleep(STEP_INTERVAL)  # simulate ~20Hz control loop
+
+        for i in np.flatnonzero(self._autoreset):
+            self._pending_resets[i].result()
+            self._pending_resets[i] = None
+            self._action_seqs[i] = self._seqs[i]
+
+        obs = self._get_obs()
+        # Sub-envs reset on this step only report their first observation,
+        # which is also the baseline of their next reward
+        self._prev_obs[self._autoreset] = obs[self._autoreset]
+        rewards = self._compute_rewards(obs)
+        terminated, truncated = self._check_done()
+        for i in np.flatnonzero(active):
+            if self.game_instances[i].needs_reset():
+                # Swapped for another game, see TrackmaniaEnv
+                truncated[i] = True
+                rewards[i] = 0.0
+                self.first_reset_done[i] = False
+
+        rewards[self._autoreset] = 0.0
+        terminated[self._autoreset] = False
+        truncated[self._autoreset] = False
+
+        self._autoreset = terminated | truncated
+        for i in np.flatnonzero(self._autoreset):
+            self._pending_resets[i] = self._executor.submit(self._reset_instance, i)
+
+        observation = self._observation(obs)
+        if self.replay_buffer is not None:
+            for i in np.flatnonzero(active):
+                self.replay_buffer.add(self._buffer_obs[i], actions[i], rewards[i], observation[i], terminated[i],
+                                       truncated[i], stream=i)
+            self._buffer_obs[:] = observation
+        return observation, rewards.copy(), terminated, truncated, self._infos(self._action_seqs)
+
+    def _infos(self, action_seqs):
+        """
+        Per-instance timing information, as gymnasium vector infos.
+
+        ``fresh_frames`` counts telemetry frames received between sending the
+        action and reading the observation; ``obs_staleness`` is the age of
+        the observed frame in seconds.
+        """
+        now = time.monotonic()
+        received = self._seqs >= 0
+        return {
+            "obs_seq": self._seqs.copy(),
+            "_obs_seq": received,
+            "fresh_frames": self._seqs - action_seqs,
+            "_fresh_frames": received.copy(),
+            "obs_staleness": now - self._timestamps,
+            "_obs_staleness": received.copy(),
+        }
+
+    def _get_obs(self):
+        self.bridge.gather_latest(self._frames, self._seqs, self._timestamps)
+        self.pipeline(self._frames, out=self._obs)
+        self._obs[self._seqs < 0] = 0.0
+        return self._obs
+
+    def _observation(self, obs):
+        """The batch returned to the agent: a copy, normalized if enabled."""
+        if self.obs_normalizer is None:
+            return obs.copy()
+        # Sub-envs without telemetry yet hold zeros, which are not observations
+        return self.obs_normalizer(obs, out=np.empty_like(obs), rows=self._seqs >= 0)
+
+    def _compute_rewards(self, obs):
+        # Same terms as TrackmaniaEnv._compute_reward, for the whole batch
+        self._reward_fn(obs, self._prev_obs, out=self._rewards)
+        self._prev_obs[:] = obs
+        return self._rewards
+
+    def _check_done(self):
+        # Same conditions as TrackmaniaEnv._check_done, for the whole batch
+        terminated = finished(self._frames)
+        truncated = ~terminated & ((time.time() - self.episode_start_time) > self.max_episode_duration)
+        return terminated, truncated
+
+    def close_extras(self, **kwargs):
+        self._executor.shutdown(wait=True)
+        for controller in self.controllers:
+            controller.stop()
+        if self._owns_bridge:
+            self.bridge.stop()
@@ -7,12 +7,65 @@ Version="1.0"
 // Constants
 const string CONFIG_FILENAME = "Plugins/TelemetryConfig.json";
 const string DEFAULT_BRIDGE_URL = "http://127.0.0.1:5000/telemetry";
-const uint SEND_INTERVAL_MS = 100;  // 10Hz telemetry
+const uint DEFAULT_SEND_INTERVAL_MS = 100;  // 10Hz telemetry
+const uint DEFAULT_HEARTBEAT_INTERVAL_MS = 1000; // Unchanged state is re-sent this often while idle
+const uint DEFAULT_KEYFRAME_INTERVAL = 50; // Delta packets between two full packets
 const uint CONFIG_CHECK_INTERVAL = 5000; // Check for config changes every 5 seconds
 const float MIN_VELOCITY_FOR_ORIENTATION = 0.1f;
+const string DEFAULT_TRANSPORT = "http";
+const string DEFAULT_BINARY_HOST = "127.0.0.1";
+const uint16 DEFAULT_BINARY_PORT = 5001;
+const uint DEFAULT_BINARY_PORT_COUNT = 1;  // ports tried from BinaryPort, one per game instance
+const uint CONNECT_TIMEOUT_MS = 2000;      // a port not accepting a connection by then is skipped
+
+// Binary packet layout, see gym_trackmania/shared/packet.py
+const uint PACKET_SIZE = 220;
+const uint8 PACKET_VERSION = 1;
+const uint8 FLAG_IN_MAIN_MENU = 1 << 0;
+const uint8 FLAG_FINISHED = 1 << 1;
+const uint8 FLAG_ON_GROUND = 1 << 2;
+const uint8 FLAG_ENGINE_ON = 1 << 3;
+const uint8 FLAG_IS_TURBO = 1 << 4;
+const uint8 FLAG_REACTOR_GROUND_MODE = 1 << 5;
+const uint8 FLAG_REACTOR_INPUTS = 1 << 6;
+const uint8 FLAG_IN_RACE = 1 << 7;
+
+// Delta packets: header, change mask over the payload words, changed words
+const uint8 DELTA_VERSION = 2;
+const uint DELTA_HEADER_SIZE = 16;
+const uint DELTA_WORDS = 53;  // (PACKET_SIZE - 8) / 4
+// Rate requests from the bridge: "TC", version, pad, send interval in ms (0 = configured)
+const uint CONTROL_SIZE = 6;
 
 // Configurable settings
 string BridgeURL = DEFAULT_BRIDGE_URL;
+string Transport = DEFAULT_TRANSPORT;   // "http" (JSON POST) or "tcp" (binary packets)
+string BinaryHost = DEFAULT_BINARY_HOST;
+uint16 BinaryPort = DEFAULT_BINARY_PORT;
+uint BinaryPortCount = DEFAULT_BINARY_PORT_COUNT;
+uint SendIntervalMs = DEFAULT_SEND_INTERVAL_MS;
+uint HeartbeatIntervalMs = DEFAULT_HEARTBEAT_INTERVAL_MS;
+uint KeyframeInterval = DEFAULT_KEYFRAME_INTERVAL;
+bool DeltaEncoding = true;
+
+// Send interval requested by the bridge during episodes, 0 if none
+uint RequestedIntervalMs = 0;
+
+// Binary transport state
+Net::Socket@ telemetrySocket = null;
+bool telemetryConnected = false;  // Connect() only starts connecting: writable once it is done
+uint connectStartTime = 0;
+uint packetSeq = 0;
+// Port of the range being tried, and whether the bridge confirmed it as ours
+uint portOffset = 0;
+bool portConfirmed = false;
+
+// Delta encoding state: the payload of the last packet sent
+array<uint> previousWords(DELTA_WORDS);
+uint8 previousFlags = 0;
+bool hasPrevious = false;
+uint sinceKeyframe = 0;
+uint lastPacketTime = 0;
 
 // Race state tracking
 uint totalCheckpoints = 0;
@@ -45,6 +98,32 @@ void LoadConfig() {
                     BridgeURL = config["bridge_url"];
                     trace("Loaded Bridge URL from config: " + BridgeURL);
                 }
+                if (config.HasKey("transport") && config["transport"].GetType() == Json::Type::String) {
+                    Transport = config["transport"];
+                }
+                if (config.HasKey("binary_host") && config["binary_host"].GetType() == Json::Type::String) {
+                    BinaryHost = config["binary_host"];
+                }
+                if (config.HasKey("binary_port") && config["binary_port"].GetType() == Json::Type::Number) {
+                    BinaryPort = uint16(int(config["binary_port"]));
+                }
+                if (config.HasKey("binary_port_count") && config["binary_port_count"].GetType() == Json::Type::Number) {
+                    BinaryPortCount = uint(Math::Max(1, int(config["binary_port_count"])));
+                }
+                if (config.HasKey("send_interval_ms") && config["send_interval_ms"].GetType() == Json::Type::Number) {
+                    SendIntervalMs = uint(int(config["send_interval_ms"]));
+                } else if (config.HasKey("send_interval") && config["send_interval"].GetType() == Json::Type::Number) {
+                    SendIntervalMs = uint(int(config["send_interval"]));
+                }
+                if (config.HasKey("heartbeat_interval_ms") && config["heartbeat_interval_ms"].GetType() == Json::Type::Number) {
+                    HeartbeatIntervalMs = uint(int(config["heartbeat_interval_ms"]));
+                }
+                if (config.HasKey("keyframe_interval") && config["keyframe_interval"].GetType() == Json::Type::Number) {
+                    KeyframeInterval = uint(int(config["keyframe_interval"]));
+                }
+                if (config.HasKey("delta_encoding") && config["delta_encoding"].GetType() == Json::Type::Boolean) {
+                    DeltaEncoding = bool(config["delta_encoding"]);
+                }
             }
         } else {
             // Create default config file if it doesn't exist
@@ -53,6 +132,7 @@ void LoadConfig() {
     } catch {
         warn("Failed to load config file, using defaults");
         BridgeURL = DEFAULT_BRIDGE_URL;
+        Transport = DEFAULT_TRANSPORT;
     }
 }
 
@@ -60,7 +140,14 @@ void CreateDefaultConfig() {
     try {
         auto config = Json::Object();
         config["bridge_url"] = DEFAULT_BRIDGE_URL;
-        config["send_interval_ms"] = SEND_INTERVAL_MS;
+        config["transport"] = DEFAULT_TRANSPORT;
+        config["binary_host"] = DEFAULT_BINARY_HOST;
+        config["binary_port"] = DEFAULT_BINARY_PORT;
+        config["binary_port_count"] = DEFAULT_BINARY_PORT_COUNT;
+        config["send_interval_ms"] = DEFAULT_SEND_INTERVAL_MS;
+        config["heartbeat_interval_ms"] = DEFAULT_HEARTBEAT_INTERVAL_MS;
+        config["keyframe_interval"] = DEFAULT_KEYFRAME_INTERVAL;
+        config["delta_encoding"] = true;
         config["debug_mode"] = false;
         
         string json = Json::Write(config, true); // pretty-print
@@ -294,11 +381,254 @@ void PostTelemetry(const string &in json) {
         while (!req.Finished()) {
             yield();
         }
+
+        // The bridge returns the send interval it wants, if any
+        if (req.ResponseCode() == 200) {
+            auto response = Json::Parse(req.String());
+            if (response.GetType() == Json::Type::Object && response.HasKey("send_interval_ms")) {
+                RequestedIntervalMs = uint(int(response["send_interval_ms"]));
+            } else {
+                RequestedIntervalMs = 0;
+            }
+        }
     } catch {
         warn("Failed to send telemetry to " + BridgeURL);
     }
 }
 
+// --------------------------
+// Binary Transport
+// --------------------------
+
+void WriteVec3(MemoryBuffer@ buf, vec3 vec) {
+    buf.Write(vec.x); buf.Write(vec.y); buf.Write(vec.z);
+}
+
+void WriteWheelFloats(MemoryBuffer@ buf, CSceneVehicleVisState@ vis, int index, WheelType type) {
+    switch (type) {
+        case WheelType::FL:
+            buf.Write(vis.FLSteerAngle); buf.Write(vis.FLWheelRot); buf.Write(vis.FLSlipCoef);
+            buf.Write(VehicleState::GetWheelDirt(vis, index));
+            buf.Write(vis.FLBreakNormedCoef); buf.Write(vis.FLTireWear01); buf.Write(vis.FLIcing01);
+            break;
+        case WheelType::FR:
+            buf.Write(vis.FRSteerAngle); buf.Write(vis.FRWheelRot); buf.Write(vis.FRSlipCoef);
+            buf.Write(VehicleState::GetWheelDirt(vis, index));
+            buf.Write(vis.FRBreakNormedCoef); buf.Write(vis.FRTireWear01); buf.Write(vis.FRIcing01);
+            break;
+        case WheelType::RL:
+            buf.Write(vis.RLSteerAngle); buf.Write(vis.RLWheelRot); buf.Write(vis.RLSlipCoef);
+            buf.Write(VehicleState::GetWheelDirt(vis, index));
+            buf.Write(vis.RLBreakNormedCoef); buf.Write(vis.RLTireWear01); buf.Write(vis.RLIcing01);
+            break;
+        case WheelType::RR:
+            buf.Write(vis.RRSteerAngle); buf.Write(vis.RRWheelRot); buf.Write(vis.RRSlipCoef);
+            buf.Write(VehicleState::GetWheelDirt(vis, index));
+            buf.Write(vis.RRBreakNormedCoef); buf.Write(vis.RRTireWear01); buf.Write(vis.RRIcing01);
+            break;
+    }
+    buf.Write(vis.WetnessValue01);
+}
+
+void WritePacketHeader(MemoryBuffer@ buf, uint8 flags) {
+    buf.Write(uint8(0x54)); buf.Write(uint8(0x4D)); // "TM"
+    buf.Write(PACKET_VERSION);
+    buf.Write(flags);
+    buf.Write(packetSeq);  // only incremented for packets actually sent, see SendPacket
+}
+
+MemoryBuffer@ BuildMenuPacket(bool inMainMenu) {
+    MemoryBuffer@ buf = MemoryBuffer(PACKET_SIZE);
+    WritePacketHeader(buf, inMainMenu ? FLAG_IN_MAIN_MENU : 0);
+    while (buf.GetPosition() < PACKET_SIZE) buf.Write(uint8(0));
+    return buf;
+}
+
+MemoryBuffer@ BuildTelemetryPacket(CSceneVehicleVisState@ vis, bool inMainMenu) {
+    MemoryBuffer@ buf = MemoryBuffer(PACKET_SIZE);
+
+    uint8 flags = FLAG_IN_RACE;
+    if (inMainMenu) flags |= FLAG_IN_MAIN_MENU;
+    if (finishedRace) flags |= FLAG_FINISHED;
+    if (IsVehicleOnGround(vis)) flags |= FLAG_ON_GROUND;
+    if (vis.EngineOn) flags |= FLAG_ENGINE_ON;
+    if (vis.IsTurbo) flags |= FLAG_IS_TURBO;
+    if (vis.IsReactorGroundMode) flags |= FLAG_REACTOR_GROUND_MODE;
+    if (vis.ReactorInputsX) flags |= FLAG_REACTOR_INPUTS;
+    WritePacketHeader(buf, flags);
+
+    WriteVec3(buf, vis.Position);
+    WriteVec3(buf, vis.WorldVel);
+    WriteVec3(buf, vis.WorldVel.Length() > MIN_VELOCITY_FOR_ORIENTATION ? vis.WorldVel.Normalized() : vec3(1, 0, 0));
+    buf.Write(vis.FrontSpeed);
+    buf.Write(VehicleState::GetSideSpeed(vis));
+    buf.Write(VehicleState::GetRPM(vis));
+    buf.Write(vis.TurboTime);
+    WriteVec3(buf, vis.ReactorAirControl);
+
+    buf.Write(maxCheckpointCount > 0 ? float(currentCheckpointCount) / float(maxCheckpointCount) : 0.0f);
+    buf.Write(uint16(maxCheckpointCount));
+    buf.Write(uint16(currentCheckpointCount));
+
+    buf.Write(int8(vis.CurGear));
+    buf.Write(uint8(VehicleState::GetVehicleType(vis)));
+    buf.Write(uint8(vis.ReactorBoostLvl));
+    buf.Write(uint8(vis.ReactorBoostType));
+
+    WriteWheelFloats(buf, vis, 0, WheelType::FL);
+    WriteWheelFloats(buf, vis, 1, WheelType::FR);
+    WriteWheelFloats(buf, vis, 2, WheelType::RL);
+    WriteWheelFloats(buf, vis, 3, WheelType::RR);
+
+    buf.Write(uint8(vis.FLGroundContactMaterial));
+    buf.Write(uint8(vis.FRGroundContactMaterial));
+    buf.Write(uint8(vis.RLGroundContactMaterial));
+    buf.Write(uint8(vis.RRGroundContactMaterial));
+    for (int i = 0; i < 4; i++) {
+        buf.Write(uint8(VehicleState::GetWheelFalling(vis, i)));
+    }
+    return buf;
+}
+
+uint16 TelemetryPort() {
+    return uint16(BinaryPort + portOffset % BinaryPortCount);
+}
+
+// Several game instances share this config: each one tries the ports of
+// [BinaryPort, BinaryPort + BinaryPortCount) in turn, and the bridge accepts
+// one stream per port, confirming it with a control message. A refused,
+// timed out or dropped connection moves on to the next port until one was
+// confirmed; that port is then kept for good, across reconnects.
+void DropTelemetrySocket() {
+    if (telemetrySocket !is null) telemetrySocket.Close();
+    @telemetrySocket = null;
+    telemetryConnected = false;
+    if (!portConfirmed) portOffset = (portOffset + 1) % BinaryPortCount;
+}
+
+// Start connecting if there is no socket, and tell whether it can be written
+// to. A socket still connecting is kept, and nothing is sent meanwhile.
+bool TelemetrySocketReady() {
+    if (telemetrySocket is null) {
+        @telemetrySocket = Net::Socket();
+        telemetryConnected = false;
+        connectStartTime = Time::Now;
+        if (!telemetrySocket.Connect(BinaryHost, TelemetryPort())) {
+            warn("Failed to connect to telemetry bridge at " + BinaryHost + ":" + TelemetryPort());
+            DropTelemetrySocket();
+            return false;
+        }
+    }
+    if (telemetryConnected) return true;
+    if (telemetrySocket.IsHungUp()) {
+        warn("Telemetry bridge refused the connection on port " + TelemetryPort());
+        DropTelemetrySocket();
+        return false;
+    }
+    if (telemetrySocket.CanWrite()) {
+        telemetryConnected = true;
+        return true;
+    }
+    if (Time::Now - connectStartTime >= CONNECT_TIMEOUT_MS) {
+        warn("Timed out connecting to telemetry bridge at " + BinaryHost + ":" + TelemetryPort());
+        DropTelemetrySocket();
+    }
+    return false;
+}
+
+bool PostTelemetryBinary(MemoryBuffer@ buf, uint size) {
+    // Keep one persistent connection open instead of a request per frame
+    if (!TelemetrySocketReady()) return false;
+
+    buf.Seek(0);
+    if (!telemetrySocket.Write(buf, size)) {
+        warn("Lost connection to telemetry bridge, reconnecting");
+        DropTelemetrySocket();
+        return false;
+    }
+    return true;
+}
+
+// Send a full packet as a keyframe or as a delta against the last one sent.
+// Unchanged states are skipped, with a heartbeat every HeartbeatIntervalMs,
+// unless the bridge requested a rate: then every tick is sent.
+void SendPacket(MemoryBuffer@ buf, uint now) {
+    // A new connection starts from a keyframe
+    if (!telemetryConnected) hasPrevious = false;
+    bool keyframe = !DeltaEncoding || !hasPrevious || sinceKeyframe >= KeyframeInterval;
+
+    buf.Seek(3);
+    uint8 flags = buf.ReadUInt8();
+    buf.Seek(8);
+    array<uint> words(DELTA_WORDS);
+    array<uint> changed;
+    uint64 mask = 0;
+    for (uint i = 0; i < DELTA_WORDS; i++) {
+        words[i] = buf.ReadUInt32();
+        if (words[i] != previousWords[i]) {
+            mask |= uint64(1) << i;
+            changed.InsertLast(words[i]);
+        }
+    }
+
+    if (!keyframe && mask == 0 && flags == previousFlags && RequestedIntervalMs == 0
+            && now - lastPacketTime < HeartbeatIntervalMs) {
+        return;
+    }
+
+    MemoryBuffer@ out = buf;
+    uint size = PACKET_SIZE;
+    if (keyframe) {
+        buf.Seek(4);
+        buf.Write(packetSeq);
+    } else {
+        size = DELTA_HEADER_SIZE + 4 * changed.Length;
+        @out = MemoryBuffer(size);
+        out.Write(uint8(0x54)); out.Write(uint8(0x4D)); // "TM"
+        out.Write(DELTA_VERSION);
+        out.Write(flags);
+        out.Write(packetSeq);
+        out.Write(mask);
+        for (uint i = 0; i < changed.Length; i++) out.Write(changed[i]);
+    }
+
+    if (!PostTelemetryBinary(out, size)) {
+        hasPrevious = false;
+        return;
+    }
+    packetSeq++;
+    previousWords = words;
+    previousFlags = flags;
+    hasPrevious = true;
+    sinceKeyframe = keyframe ? 0 : sinceKeyframe + 1;
+    lastPacketTime = now;
+}
+
+// Apply the rate requests the bridge wrote back on the telemetry connection
+void ReadControlMessages() {
+    if (telemetrySocket is null || !telemetryConnected) return;
+    if (telemetrySocket.IsHungUp()) {
+        // Closed by the bridge: refused if the port was never confirmed
+        DropTelemetrySocket();
+        return;
+    }
+    while (telemetrySocket.Available() >= int(CONTROL_SIZE)) {
+        string magic = telemetrySocket.ReadRaw(2);
+        uint8 version = telemetrySocket.ReadUint8();
+        telemetrySocket.ReadUint8(); // padding
+        uint16 intervalMs = telemetrySocket.ReadUint16();
+        if (magic != "TC" || version != PACKET_VERSION) {
+            warn("Bad control message from telemetry bridge, reconnecting");
+            DropTelemetrySocket();
+            return;
+        }
+        if (!portConfirmed) trace("Telemetry bridge accepted this game on port " + TelemetryPort());
+        portConfirmed = true;
+        RequestedIntervalMs = intervalMs;
+        trace("Telemetry bridge requested a send interval of " + intervalMs + " ms");
+    }
+}
+
 // --------------------------
 // Main Plugin Loop
 // --------------------------
@@ -309,6 +639,7 @@ void Main() {
     
     uint lastSendTime = Time::Now;
     uint lastConfigCheckTime = Time::Now;
+    uint lastMenuPostTime = 0;
     Json::Value telemetry = Json::Object();
             
     while (true) {
@@ -320,16 +651,25 @@ void Main() {
             lastConfigCheckTime = now;
         }
         
-        // Send telemetry at configured interval
-        if (now - lastSendTime >= SEND_INTERVAL_MS) {
+        if (Transport == "tcp") ReadControlMessages();
+
+        // Send telemetry at the requested or configured interval
+        uint sendInterval = RequestedIntervalMs > 0 ? RequestedIntervalMs : SendIntervalMs;
+        if (now - lastSendTime >= sendInterval) {
             lastSendTime = now;
             auto app = cast<CTrackMania>(GetApp());
             bool inMainMenu = app is null || app.RootMap is null;
 
             if (!IsInRaceMode()) {
                 if (inMainMenu) {
-                    telemetry["in_main_menu"] = inMainMenu;
-                    PostTelemetry(Json::Write(telemetry));
+                    if (Transport == "tcp") {
+                        SendPacket(BuildMenuPacket(inMainMenu), now);
+                    } else if (now - lastMenuPostTime >= HeartbeatIntervalMs) {
+                        // The menu state does not change, a heartbeat is enough
+                        lastMenuPostTime = now;
+                        telemetry["in_main_menu"] = inMainMenu;
+                        PostTelemetry(Json::Write(telemetry));
+                    }
                 }
                 yield(); continue;
             }
@@ -347,6 +687,11 @@ void Main() {
             if (vis is null) { yield(); continue; }
 
             UpdateCheckpointProgress(player, playground);
+
+            if (Transport == "tcp") {
+                SendPacket(BuildTelemetryPacket(vis, inMainMenu), now);
+                yield(); continue;
+            }
             
             // Prepare telemetry data
             telemetry["checkpoints"] = CreateCheckpointJson(maxCheckpointCount, currentCheckpointCount);
@@ -0,0 +1,103 @@
+import asyncio
+import socket
+import threading
+import numpy as np
+import pytest
+from gym_trackmania.bridge.async_bridge import AsyncTelemetryBridge
+from gym_trackmania.shared.packet import encode_telemetry
+from gym_trackmania.shared.schemas import Telemetry
+
+
+def _packet(rpm):
+    return encode_telemetry(Telemetry(position=[0.0, 0.0, 0.0], rpm=float(rpm), in_main_menu=False))
+
+
+def _bridge(tmp_path, **kwargs):
+    return AsyncTelemetryBridge(port=0, log_path=str(tmp_path / "bridge.log"), **kwargs)
+
+
+@pytest.mark.parametrize("transport", ["udp", "tcp"])
+def test_next_frame_over_socket(transport, tmp_path):
+    async def main():
+        async with _bridge(tmp_path, transport=transport) as bridge:
+            kind = socket.SOCK_DGRAM if transport == "udp" else socket.SOCK_STREAM
+            with socket.socket(socket.AF_INET, kind) as sock:
+                sock.connect((bridge.host, bridge.port))
+                sock.sendall(_packet(1000) + (_packet(2000) if transport == "tcp" else b""))
+                first = await bridge.next_frame(timeout=2.0)
+                if transport == "udp":
+                    sock.sendall(_packet(2000))
+                second = await bridge.next_frame(first[0], timeout=2.0)
+            return first, second
+
+    (seq0, frame0), (seq1, frame1) = asyncio.run(main())
+    assert (seq0, seq1) == (0, 1)
+    assert frame0["rpm"] == 1000 and frame1["rpm"] == 2000
+
+
+def test_next_frame_predicate_timeout_and_other_threads(tmp_path):
+    async def main():
+        async with _bridge(tmp_path) as bridge:
+            assert await bridge.next_frame(timeout=0.05) == (-1, None)
+
+            def feed():
+                for rpm in range(0, 5000, 1000):
+                    bridge.ingest_packet(_packet(rpm))
+            threading.Thread(target=feed).start()
+            return await bridge.next_frame(predicate=lambda f: f["rpm"] >= 3000, timeout=2.0)
+
+    seq, frame = asyncio.run(main())
+    assert seq == 3 and frame["rpm"] == 3000
+
+
+def test_stream_counts_frames_overwritten_before_read(tmp_path):
+    async def main():
+        async with _bridge(tmp_path, history=8) as bridge:
+            stream = bridge.stream()
+            for rpm in range(20):
+                bridge.ingest_packet(_packet(rpm))
+            seq, frame = await stream.__anext__()
+            return stream, seq, frame
+
+    stream, seq, frame = asyncio.run(main())
+    assert seq == frame["rpm"] == 13
+    assert stream.dropped == 13
+
+
+def test_tcp_stream_backpressure_loses_nothing(tmp_path):
+    n = 2000
+
+    async def main():
+        async with _bridge(tmp_path, transport="tcp", history=64, max_lag=32) as bridge:
+            received = []
+            stream = bridge.stream()
+
+            def send():
+                with socket.create_connection((bridge.host, bridge.port)) as sock:
+                    sock.sendall(b"".join(_packet(rpm) for rpm in range(n)))
+            sender = threading.Thread(target=send)
+            sender.start()
+            async for seq, frame in stream:
+                received.append(frame["rpm"])
+                if len(received) % 100 == 0:
+                    await asyncio.sleep(0.001)  # a slow consumer
+                if len(received) == n:
+                    break
+            sender.join()
+            return received, stream.dropped
+
+    received, dropped = asyncio.run(main())
+    assert dropped == 0
+    assert np.array_equal(received, np.arange(n))
+
+
+def test_sync_start_stop_wrapper(tmp_path):
+    bridge = _bridge(tmp_path)
+    bridge.start()
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(_packet(4000), (bridge.host, bridge.port))
+        assert bridge.wait_for_seq(0, timeout=2.0)
+        assert bridge.get_latest_telemetry().rpm == 4000
+    finally:
+        bridge.stop()
@@ -0,0 +1,33 @@
+import asyncio
+import numpy as np
+from gym_trackmania.async_env import AsyncTrackmaniaEnv
+from gym_trackmania.bridge.async_bridge import AsyncTelemetryBridge
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+
+
+def test_one_loop_drives_many_envs(tmp_path):
+    async def main():
+        envs, sources = [], []
+        for i in range(3):
+            bridge = await AsyncTelemetryBridge(port=0, log_path=str(tmp_path / f"bridge{i}.log")).open()
+            source = SimulatedTelemetrySource(address=(bridge.host, bridge.port), rate=200.0)
+            envs.append(AsyncTrackmaniaEnv(bridge, game_instance=SimulatedGameInstance(source)))
+            sources.append(source)
+            source.start()
+        try:
+            await asyncio.gather(*(env.reset() for env in envs))
+            for _ in range(10):
+                results = await asyncio.gather(*(env.step(np.array([0.0, 1.0, 0.0])) for env in envs))
+        finally:
+            for env, source in zip(envs, sources):
+                source.stop()
+                env.close()
+                await env.telemetry_bridge.close()
+        return envs, sources, results
+
+    envs, sources, results = asyncio.run(main())
+    for env, source, (obs, reward, done, truncated, info) in zip(envs, sources, results):
+        assert obs.shape == env.observation_space.shape
+        assert info["fresh_frames"] >= 1
+        assert source.speed > 0
+        assert env.game_instance.keys_pressed.count("backspace") == 1
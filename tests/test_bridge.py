@@ -1,5 +1,11 @@
+import socket
+import threading
+import time
+import numpy as np
 import pytest
 from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.shared.packet import (CONTROL_SIZE, PACKET_DTYPE, DeltaEncoder, decode_rate_request,
+                                          encode_telemetry)
 from gym_trackmania.shared.schemas import Telemetry
 
 def test_bridge_receives_and_stores_telemetry(monkeypatch):
@@ -19,4 +25,117 @@ def test_bridge_receives_and_stores_telemetry(monkeypatch):
     telemetry = Telemetry.from_dict(dummy_data)
     bridge.latest_telemetry = telemetry
 
-    assert bridge.get_latest_telemetry().in_main_menu is True
\ No newline at end of file
+    assert bridge.get_latest_telemetry().in_main_menu is True
+
+def _wait_for_telemetry(bridge, timeout=2.0):
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        telemetry = bridge.get_latest_telemetry()
+        if telemetry is not None:
+            return telemetry
+        time.sleep(0.01)
+    return None
+
+
+@pytest.mark.parametrize("transport", ["udp", "tcp"])
+def test_bridge_binary_transports(transport, tmp_path):
+    bridge = TelemetryBridge(port=0, log_path=str(tmp_path / "bridge.log"), transport=transport)
+    bridge.start()
+    try:
+        packet = encode_telemetry(Telemetry(position=[1.0, 2.0, 3.0], rpm=5000.0, in_main_menu=False))
+        kind = socket.SOCK_DGRAM if transport == "udp" else socket.SOCK_STREAM
+        with socket.socket(socket.AF_INET, kind) as sock:
+            sock.connect((bridge.host, bridge.port))
+            sock.sendall(packet)
+            telemetry = _wait_for_telemetry(bridge)
+    finally:
+        bridge.stop()
+
+    assert telemetry is not None
+    assert telemetry.in_main_menu is False
+    assert telemetry.rpm == pytest.approx(5000.0)
+    assert telemetry.position == pytest.approx([1.0, 2.0, 3.0])
+
+
+@pytest.mark.parametrize("transport", ["udp", "tcp"])
+def test_bridge_decodes_delta_packets(transport, tmp_path):
+    bridge = TelemetryBridge(port=0, log_path=str(tmp_path / "bridge.log"), transport=transport)
+    bridge.start()
+    encoder = DeltaEncoder(active=True)
+    try:
+        kind = socket.SOCK_DGRAM if transport == "udp" else socket.SOCK_STREAM
+        with socket.socket(socket.AF_INET, kind) as sock:
+            sock.connect((bridge.host, bridge.port))
+            for i in range(5):
+                packet = encode_telemetry(Telemetry(position=[float(i), 2.0, 3.0], rpm=5000.0, in_main_menu=False))
+                sock.sendall(encoder.encode(packet, now=float(i)))
+                assert bridge.wait_for_seq(i, timeout=2.0)
+    finally:
+        bridge.stop()
+
+    window = bridge.get_window(5)
+    assert window.frames["position"][:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert window.frames["rpm"].tolist() == [5000.0] * 5
+    assert bridge.decoder.deltas == (4 if transport == "udp" else 0)  # tcp decodes per connection
+
+
+def test_tcp_bridge_sends_rate_requests(tmp_path):
+    bridge = TelemetryBridge(port=0, log_path=str(tmp_path / "bridge.log"), transport="tcp")
+    bridge.start()
+    try:
+        with socket.create_connection((bridge.host, bridge.port), timeout=2.0) as sock:
+            sock.sendall(encode_telemetry(Telemetry(in_main_menu=True)))
+            assert bridge.wait_for_seq(0, timeout=2.0)
+            assert bridge.set_send_rate(60)
+            assert decode_rate_request(sock.recv(CONTROL_SIZE, socket.MSG_WAITALL)) == 17
+            assert bridge.set_send_rate(None)
+            assert decode_rate_request(sock.recv(CONTROL_SIZE, socket.MSG_WAITALL)) is None
+    finally:
+        bridge.stop()
+
+
+def test_bridge_rejects_unknown_transport(tmp_path):
+    with pytest.raises(ValueError):
+        TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="carrier-pigeon")
+
+
+def test_bridge_frame_and_lazy_telemetry_view(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    assert bridge.get_latest_frame() is None
+
+    bridge.ingest_packet(encode_telemetry(Telemetry(position=[1.0, 2.0, 3.0], speed=42.0)))
+    assert bridge.latest_telemetry is None  # not materialized until asked for
+
+    out = np.zeros(1, dtype=PACKET_DTYPE)
+    assert bridge.get_latest_frame(out=out) is out
+    assert out["speed"][0] == pytest.approx(42.0)
+    assert bridge.get_latest_telemetry().speed == pytest.approx(42.0)
+
+
+def test_bridge_keeps_history_of_frames(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp", history=16)
+    for i in range(5):
+        bridge.ingest_packet(encode_telemetry(Telemetry(position=[0.0, 0.0, 0.0], speed=float(i))))
+
+    assert bridge.get_window(3).frames["speed"].tolist() == [2.0, 3.0, 4.0]
+    assert bridge.get_since(3).seq.tolist() == [4]
+
+
+def test_wait_for_seq_and_frame(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    assert bridge.latest_seq == -1
+    assert bridge.wait_for_seq(0, timeout=0.01) is False
+
+    def feed():
+        for i in range(5):
+            time.sleep(0.01)
+            bridge.ingest_packet(encode_telemetry(Telemetry(position=[0.0, 0.0, 0.0], speed=float(i))))
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    assert bridge.wait_for_seq(1, timeout=2.0) is True
+    seq = bridge.wait_for_frame(lambda f: f["speed"] >= 3.0, timeout=2.0)
+    feeder.join()
+
+    assert seq == 3
+    assert bridge.wait_for_frame(lambda f: f["speed"] > 100.0, after_seq=seq, timeout=0.01) == -1
@@ -0,0 +1,70 @@
+import time
+import pytest
+from gym_trackmania.core.controller import RecordingController
+
+
+def _settle(controller, seconds=0.05):
+    time.sleep(seconds)
+    return [(key, is_down) for _, key, is_down in controller.events]
+
+
+def test_unchanged_action_emits_no_transitions():
+    controller = RecordingController()
+    controller.start()
+    try:
+        for _ in range(10):
+            controller.set_action(0.0, 1.0, 0.0)
+        assert _settle(controller) == [("up", True)]
+        controller.set_action(1.0, 1.0, 0.0)
+        assert _settle(controller) == [("up", True), ("right", True)]
+    finally:
+        controller.stop()
+
+    # Stopping releases everything still held
+    assert sorted(_settle(controller, 0)[2:]) == [("right", False), ("up", False)]
+    assert controller.held == set()
+    assert controller.transitions == 4
+    assert len(controller.dispatch_latencies) == 11
+
+
+def test_digital_mode_uses_threshold():
+    controller = RecordingController(analog=False)
+    controller.start()
+    try:
+        controller.set_action(0.4, 0.6, 0.2)
+        events = _settle(controller)
+    finally:
+        controller.stop()
+    assert events == [("up", True)]
+
+
+def test_pwm_duty_cycles_partial_inputs():
+    controller = RecordingController(pwm_period=0.02)
+    controller.start()
+    try:
+        controller.set_action(0.0, 0.5, 0.0)
+        time.sleep(0.3)
+        controller.release_all()
+        time.sleep(0.02)
+    finally:
+        controller.stop()
+
+    events = [(t, is_down) for t, key, is_down in controller.events if key == "up"]
+    downs = sum(is_down for _, is_down in events)
+    assert 10 <= downs <= 17
+    held = sum(t_up - t_down for (t_down, down), (t_up, up) in zip(events[::2], events[1::2]))
+    assert held / (events[-1][0] - events[0][0]) == pytest.approx(0.5, abs=0.15)
+
+
+def test_set_action_does_not_block_on_slow_input():
+    controller = RecordingController(key_latency=0.05)
+    controller.start()
+    try:
+        start = time.perf_counter()
+        for steer in (-1.0, 1.0, -1.0, 1.0):
+            controller.set_action(steer, 1.0, 1.0)
+        elapsed = time.perf_counter() - start
+    finally:
+        controller.stop()
+    assert elapsed < 0.01
+    assert controller.held == set()
@@ -1,9 +1,21 @@
+import subprocess
+import sys
+import time
 import pytest
 import numpy as np
 from gym_trackmania.trackmania_env import TrackmaniaEnv
+from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.bridge.ring import TelemetryRing
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.shared.packet import FLAG_FINISHED, encode_telemetry
 from gym_trackmania.shared.schemas import Telemetry, WheelState
 
 class DummyBridge:
+    def get_window(self, n):
+        ring = TelemetryRing(capacity=2)
+        ring.write(encode_telemetry(self.get_latest_telemetry()), timestamp=0.0)
+        return ring.get_window(n)
+
     def get_latest_telemetry(self):
         return Telemetry(
             rpm=3000,
@@ -26,4 +38,89 @@ def test_process_telemetry_vector_shape(monkeypatch):
     env.telemetry_bridge = DummyBridge()
     obs = env._get_obs()
     assert isinstance(obs, np.ndarray)
-    assert obs.shape == env.observation_space.shape
\ No newline at end of file
+    assert obs.shape == env.observation_space.shape
+
+def _simulated_env(tmp_path, rate=200.0, sync_frames=1):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = SimulatedTelemetrySource(bridge, rate=rate)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source),
+                        sync_frames=sync_frames)
+    return env, source
+
+
+def test_sync_step_waits_for_fresh_frames(tmp_path):
+    env, source = _simulated_env(tmp_path)
+    source.start()
+    try:
+        env.reset()
+        for _ in range(5):
+            obs, reward, done, truncated, info = env.step(np.array([0.0, 1.0, 0.0]))
+    finally:
+        source.stop()
+
+    assert obs.shape == env.observation_space.shape
+    assert info["fresh_frames"] >= 1
+    assert 0.0 <= info["obs_staleness"] < env.step_timeout
+    assert info["steps_per_second"] > 1.0 / env.step_timeout
+
+
+def test_sync_reset_waits_for_race_start(tmp_path):
+    env, source = _simulated_env(tmp_path)
+    source.start()
+    try:
+        env.reset()
+        for _ in range(20):
+            env.step(np.array([0.0, 1.0, 0.0]))
+        assert env.telemetry_bridge.get_latest_telemetry().speed > 0
+        env.reset()
+    finally:
+        source.stop()
+
+    assert env.game_instance.keys_pressed.count("backspace") == 2
+    assert env.telemetry_bridge.get_latest_telemetry().checkpoints.passed == 0
+    assert abs(env.telemetry_bridge.get_latest_telemetry().speed) < 1.0
+
+
+def test_sync_step_times_out_when_telemetry_stops(tmp_path):
+    env, source = _simulated_env(tmp_path)
+    source.start()
+    env.reset()
+    source.stop()
+
+    env.step_timeout = 0.05
+    start = time.monotonic()
+    obs, _, _, _, info = env.step(np.array([0.0, 0.0, 0.0]))
+    assert time.monotonic() - start >= env.step_timeout
+    assert info["fresh_frames"] == 0
+    assert obs.shape == env.observation_space.shape
+
+
+def test_done_reads_finished_flag_not_progress(tmp_path):
+    env, source = _simulated_env(tmp_path)
+    source.start()
+    try:
+        env.reset()
+        env._frame["cp_progress"] = 1.0
+        assert env._check_done() == (False, False)
+        # The time limit truncates the episode, finishing the track terminates it
+        env.max_episode_duration = 0.0
+        assert env._check_done() == (False, True)
+        env._frame["flags"] |= FLAG_FINISHED
+        assert env._check_done() == (True, False)
+    finally:
+        source.stop()
+
+
+def test_construction_is_lazy():
+    env = TrackmaniaEnv()
+    assert env.telemetry_bridge is None
+    assert env.game_instance is None
+    assert env.controller is None
+    env.close()
+
+
+def test_import_does_not_load_web_stack():
+    script = ("import sys, gym_trackmania.trackmania_env\n"
+              "print(sorted({'flask', 'waitress', 'http.server'} & set(sys.modules)))")
+    out = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,126 @@
+import json
+from pathlib import Path
+import numpy as np
+import pytest
+from gym_trackmania.shared.features import (DEFAULT_FEATURES, FEATURES, FeaturePipeline, RewardFunction,
+                                            track_progress_stage)
+from gym_trackmania.shared.packet import FLAG_FINISHED, FLAG_ON_GROUND, PACKET_DTYPE, frame_from_telemetry
+from gym_trackmania.shared.schemas import Telemetry
+from gym_trackmania.shared.track import TrackModel
+
+FIXTURE = Path(__file__).parent / "fixtures" / "example_telemetry.json"
+
+
+def _random_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = np.zeros(n, dtype=PACKET_DTYPE)
+    frames["rpm"] = rng.uniform(0, 10000, n)
+    frames["speed"] = rng.uniform(0, 300, n)
+    frames["side_speed"] = rng.uniform(-100, 100, n)
+    frames["velocity"] = rng.uniform(-50, 50, (n, 3))
+    frames["wheels"] = rng.uniform(0, 1, frames["wheels"].shape)
+    frames["cp_progress"] = rng.uniform(0, 1, n)
+    frames["flags"] = rng.integers(0, 256, n)
+    return frames
+
+
+def test_pipeline_layout_and_space():
+    pipeline = FeaturePipeline(["speed", "orientation", "wheel_slip_per_wheel", "finished"])
+    assert pipeline.size == 1 + 3 + 4 + 1
+    assert pipeline.slices["orientation"] == slice(1, 4)
+    assert pipeline.index("finished") == 8
+    with pytest.raises(ValueError):
+        pipeline.index("orientation")
+
+    space = pipeline.observation_space
+    assert space.shape == (9,)
+    assert (space.low[1:4] == -1).all() and (space.high[1:4] == 1).all()
+    assert (space.low[4:] == 0).all() and (space.high[4:] == 1).all()
+
+
+def test_pipeline_rejects_unknown_and_duplicate_features():
+    with pytest.raises(KeyError):
+        FeaturePipeline(["speed", "no_such_feature"])
+    with pytest.raises(ValueError):
+        FeaturePipeline(["speed", "speed"])
+
+
+def test_batched_matches_per_frame():
+    pipeline = FeaturePipeline(list(FEATURES))
+    frames = _random_frames(64)
+    # Words of the integer fields that read as NaN if taken for float32
+    frames["seq"] = 0x7fc00000
+    frames["ground_material"] = 0xff
+    batch = pipeline(frames)
+    for i in range(len(frames)):
+        assert pipeline(frames[i:i + 1])[0] == pytest.approx(batch[i])
+
+
+def test_default_features_match_telemetry_fields():
+    telemetry = Telemetry.from_dict(json.loads(FIXTURE.read_text()))
+    frames = np.zeros(1, dtype=PACKET_DTYPE)
+    frame_from_telemetry(telemetry, frames)
+
+    obs = FeaturePipeline(DEFAULT_FEATURES)(frames)[0]
+    wheel_rot = np.mean([w.rotation for w in telemetry.wheel_states.values()])
+    expected = [
+        telemetry.rpm / 10000, wheel_rot / 3000, 0.0, 1.0, 0.0,
+        *telemetry.orientation, (telemetry.side_speed + 100) / 200,
+        *telemetry.velocity, 0.0, telemetry.speed / 300, 0.0,
+    ]
+    assert obs.dtype == np.float32
+    assert obs == pytest.approx(expected, rel=1e-5)
+
+
+def test_normalized_values_stay_in_bounds():
+    pipeline = FeaturePipeline(DEFAULT_FEATURES)
+    obs = pipeline(_random_frames(256))
+    bounded = np.isfinite(pipeline.low)
+    assert (obs[:, bounded] >= pipeline.low[bounded] - 1e-6).all()
+    assert (obs[:, bounded] <= pipeline.high[bounded] + 1e-6).all()
+
+
+def test_flag_features_are_zero_or_one():
+    frames = np.zeros(3, dtype=PACKET_DTYPE)
+    frames["flags"] = [0, FLAG_FINISHED, FLAG_FINISHED | FLAG_ON_GROUND]
+    pipeline = FeaturePipeline(["finished", "on_ground"])
+    assert pipeline(frames).tolist() == [[0, 0], [1, 0], [1, 1]]
+
+
+def test_out_buffer_is_reused():
+    pipeline = FeaturePipeline(DEFAULT_FEATURES)
+    out = np.full((8, pipeline.size), np.nan, dtype=np.float32)
+    first = _random_frames(8, seed=1)
+    second = _random_frames(8, seed=2)
+    assert pipeline(first, out=out) is out
+    assert pipeline(second, out=out) is out
+    assert out == pytest.approx(pipeline(second))
+
+
+def test_track_progress_stage():
+    centerline = np.stack([np.linspace(0, 100, 51), np.zeros(51), np.zeros(51)], axis=1)
+    pipeline = FeaturePipeline(["speed", track_progress_stage(TrackModel(centerline))])
+    frames = np.zeros(2, dtype=PACKET_DTYPE)
+    frames["position"] = [[25.0, 0.0, 1.0], [75.0, 0.0, -1.0]]
+    assert pipeline.view(pipeline(frames), "track_progress")[:, 0] == pytest.approx([0.25, 0.75], abs=1e-3)
+
+
+def test_reward_terms_by_name():
+    pipeline = FeaturePipeline(DEFAULT_FEATURES)
+    prev = np.zeros(3, dtype=PACKET_DTYPE)
+    frames = np.zeros(3, dtype=PACKET_DTYPE)
+    prev["speed"] = [0.0, 150.0, 150.0]
+    frames["speed"] = [150.0, 150.0, 0.0]
+    frames["cp_progress"] = [0.0, 0.5, 0.0]
+
+    reward = RewardFunction(pipeline, {"speed_gain": 0.5, "progress": 1.0})
+    rewards = reward(pipeline(frames), pipeline(prev))
+    assert rewards.dtype == np.float64
+    assert rewards == pytest.approx([0.25, 0.5, 0.0])
+
+
+def test_reward_requires_features():
+    with pytest.raises(ValueError):
+        RewardFunction(FeaturePipeline(["speed"]), {"progress": 1.0})
+    with pytest.raises(KeyError):
+        RewardFunction(FeaturePipeline(["speed"]), {"no_such_term": 1.0})
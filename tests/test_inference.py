@@ -0,0 +1,86 @@
+import multiprocessing
+import threading
+import numpy as np
+import pytest
+from gymnasium import spaces
+from gym_trackmania.shared.inference import InferenceServer, MLPPolicy
+
+
+def test_mlp_policy_is_batched_and_bounded():
+    action_space = spaces.Box(low=np.array([-1, 0, 0]), high=np.array([1, 1, 1]), dtype=np.float32)
+    policy = MLPPolicy(5, hidden=(16, 16), action_space=action_space)
+    obs = np.random.default_rng(0).standard_normal((8, 5)).astype(np.float32) * 10
+    actions = policy(obs)
+    assert actions.shape == (8, 3) and actions.dtype == np.float32
+    np.testing.assert_allclose(actions[3], policy(obs[3:4])[0], rtol=1e-5)
+    assert all(action_space.contains(action) for action in actions)
+
+
+def test_server_batches_requests_from_threads():
+    policy = MLPPolicy(4, hidden=(8,))
+    server = InferenceServer(policy, 4, 3, workers=6, deadline=0.05)
+    errors = []
+    barrier = threading.Barrier(6)
+
+    def work(worker):
+        client = server.client(worker)
+        try:
+            for step in range(5):
+                obs = np.full(4, worker + step / 10, dtype=np.float32)
+                barrier.wait()
+                np.testing.assert_allclose(client.act(obs), policy(obs[None])[0], rtol=1e-5)
+        except Exception as error:  # noqa: BLE001
+            errors.append(error)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(6)]
+    server.start()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        server.close()
+    assert not errors
+    stats = server.stats()
+    assert stats["requests"] == 30
+    # Every step's requests arrive together and the server waits for all six
+    assert stats["batches"] < 30 and stats["max_batch_size"] == 6
+    assert stats["queue_wait"]["count"] == 30 and stats["forward"]["count"] == stats["batches"]
+    with pytest.raises(ValueError):
+        server.client(6)
+
+
+def _act_in_child(client, results):
+    results.put(client.act(np.arange(4, dtype=np.float32)).tolist())
+
+
+def test_server_answers_worker_processes_and_times_out():
+    policy = MLPPolicy(4, hidden=(8,))
+    server = InferenceServer(policy, 4, 3, workers=2, deadline=0.0)
+    try:
+        client = server.client(0)
+        with pytest.raises(TimeoutError):
+            client.act(np.zeros(4, dtype=np.float32), timeout=0.05)
+        # The late answer to the request that timed out is not taken for the next one
+        assert server.serve_batch(timeout=1) == 1
+        obs = np.ones(4, dtype=np.float32)
+        thread = threading.Thread(target=server.serve_batch, kwargs={"timeout": 5})
+        thread.start()
+        action = client.act(obs, timeout=5)
+        thread.join()
+        np.testing.assert_allclose(action, policy(obs[None])[0], rtol=1e-5)
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        child = context.Process(target=_act_in_child, args=(server.client(1), results))
+        server.start()
+        child.start()
+        action = results.get(timeout=10)
+        child.join(timeout=10)
+    finally:
+        server.close()
+    assert child.exitcode == 0
+    np.testing.assert_allclose(action, policy(np.arange(4, dtype=np.float32)[None])[0], rtol=1e-5)
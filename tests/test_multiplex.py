@@ -0,0 +1,118 @@
+import socket
+import time
+import pytest
+import numpy as np
+from gym_trackmania.bridge.multiplex import MultiplexTelemetryBridge
+from gym_trackmania.core.simulated import SimulatedTelemetrySource
+from gym_trackmania.shared.packet import CONTROL_SIZE, PACKET_DTYPE, decode_rate_request, encode_delta, encode_telemetry
+from gym_trackmania.shared.schemas import Telemetry
+
+
+def _consecutive_ports_bridge(tmp_path, n):
+    """A started tcp bridge on ``n`` consecutive ports, like the plugin's port range needs."""
+    for base in range(23000, 60000, 211):
+        bridge = MultiplexTelemetryBridge(n, base_port=base, log_path=str(tmp_path / "bridge.log"))
+        try:
+            bridge.start()
+        except OSError:
+            bridge.stop()
+            continue
+        return bridge
+    pytest.skip("No consecutive free ports")
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_multiplex_routes_packets_by_port(tmp_path):
+    bridge = MultiplexTelemetryBridge(3, ports=[0, 0, 0], log_path=str(tmp_path / "bridge.log"), transport="udp")
+    bridge.start()
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for i in (0, 2):
+            sock.sendto(encode_telemetry(Telemetry(rpm=1000.0 * (i + 1), in_main_menu=False)),
+                        (bridge.host, bridge.ports[i]))
+        sock.sendto(b"garbage", (bridge.host, bridge.ports[1]))
+        sock.close()
+        assert bridge.channel(0).wait_for_seq(0, timeout=2.0)
+        assert bridge.channel(2).wait_for_seq(0, timeout=2.0)
+
+        frames = np.zeros(3, dtype=PACKET_DTYPE)
+        seqs = np.empty(3, dtype=np.int64)
+        timestamps = np.empty(3, dtype=np.float64)
+        bridge.gather_latest(frames, seqs, timestamps)
+    finally:
+        bridge.stop()
+
+    assert list(seqs) == [0, -1, 0]
+    assert frames["rpm"][0] == 1000.0
+    assert frames["rpm"][2] == 3000.0
+    assert np.isnan(timestamps[1])
+
+
+def test_multiplex_rejects_wrong_port_count(tmp_path):
+    with pytest.raises(ValueError):
+        MultiplexTelemetryBridge(2, ports=[5001], log_path=str(tmp_path / "bridge.log"))
+
+
+def test_multiplex_tcp_streams_claim_ports_like_the_plugin(tmp_path):
+    bridge = _consecutive_ports_bridge(tmp_path, 3)
+    sources = []
+    try:
+        # Every source scans the same range; a claim decides which port the next one gets
+        for port_index, rate in [(2, 100.0), (0, 110.0), (None, 120.0)]:
+            if port_index is not None:
+                assert bridge.claim(port_index, timeout=1.0)
+            source = SimulatedTelemetrySource(address=(bridge.host, bridge.ports[0]), rate=rate, delta=True,
+                                              transport="tcp", port_count=3)
+            source.hold("up", True)  # a moving car: every tick is a delta
+            source.start()
+            sources.append(source)
+            assert _wait(lambda: source.port is not None)
+        assert [source.port for source in sources] == [bridge.ports[2], bridge.ports[0], bridge.ports[1]]
+        assert all(bridge.is_connected(i) for i in range(3))
+        assert all(bridge.channel(i).wait_for_seq(5, timeout=2.0) for i in range(3))
+
+        # A busy port turns a second stream away
+        intruder = socket.create_connection((bridge.host, bridge.ports[1]))
+        intruder.settimeout(2.0)
+        assert intruder.recv(CONTROL_SIZE) == b""
+        intruder.close()
+
+        # Rate requests go back on every stream
+        assert bridge.set_send_rate(50.0)
+        assert _wait(lambda: all(source.requested_interval_ms == 20 for source in sources))
+
+        sources[1].stop()
+        assert _wait(lambda: not bridge.is_connected(0))
+    finally:
+        for source in sources:
+            source.stop()
+        bridge.stop()
+
+
+def test_multiplex_tcp_reassembles_split_packets(tmp_path):
+    bridge = MultiplexTelemetryBridge(1, ports=[0], log_path=str(tmp_path / "bridge.log"))
+    bridge.start()
+    try:
+        conn = socket.create_connection((bridge.host, bridge.ports[0]))
+        conn.settimeout(2.0)
+        assert decode_rate_request(conn.recv(CONTROL_SIZE)) is None
+        keyframe = encode_telemetry(Telemetry(rpm=1000.0, in_main_menu=False), seq=0)
+        delta = encode_delta(keyframe, encode_telemetry(Telemetry(rpm=2000.0, in_main_menu=False), seq=1))
+        data = keyframe + delta
+        # Arbitrary chunking: the header and payload of both packets are cut
+        for start in range(0, len(data), 7):
+            conn.sendall(data[start:start + 7])
+            time.sleep(0.001)
+        assert bridge.channel(0).wait_for_seq(1, timeout=2.0)
+        assert list(bridge.channel(0).get_window(2).frames["rpm"]) == [1000.0, 2000.0]
+        conn.close()
+    finally:
+        bridge.stop()
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.shared.features import FeaturePipeline, RewardFunction
+from gym_trackmania.shared.normalization import (ObservationNormalizer, RewardNormalizer, RunningMoments,
+                                                 load_normalization, normalization_path, save_normalization)
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+
+def test_running_moments_match_numpy_across_batches_and_merges():
+    data = np.random.default_rng(0).normal(3.0, 2.0, (500, 4)).astype(np.float32)
+    first, second = RunningMoments(4), RunningMoments(4)
+    for row in data[:100]:
+        first.update(row[None])
+    for start in range(100, 500, 37):
+        second.update(data[start:start + 37])
+    first.merge(second)
+
+    assert first.count == 500
+    np.testing.assert_allclose(first.mean, data.mean(axis=0, dtype=np.float64), rtol=1e-6)
+    np.testing.assert_allclose(first.var, data.var(axis=0, dtype=np.float64), rtol=1e-6)
+    with pytest.raises(ValueError):
+        first.merge(RunningMoments(3))
+
+
+def test_observation_normalizer_in_place_frozen_and_space():
+    pipeline = FeaturePipeline(["speed", "velocity", "progress"])
+    normalizer = ObservationNormalizer(pipeline, features=["speed", "velocity"], clip=3.0)
+    rng = np.random.default_rng(1)
+    batch = rng.normal(10.0, 4.0, (1000, pipeline.size)).astype(np.float32)
+    progress = batch[:, 4].copy()
+
+    out = normalizer(batch)
+    assert out is batch
+    assert np.abs(out[:, :4].mean(axis=0)).max() < 0.05
+    assert (np.abs(out[:, :4]) <= 3.0).all()
+    np.testing.assert_array_equal(out[:, 4], progress)
+
+    normalizer.frozen = True
+    before = normalizer.moments.mean.copy()
+    normalizer(np.full((1, pipeline.size), 100.0, dtype=np.float32))
+    np.testing.assert_array_equal(normalizer.moments.mean, before)
+
+    normalizer.frozen = False
+    count = normalizer.moments.count
+    normalizer(np.zeros((3, pipeline.size), dtype=np.float32), rows=np.array([True, False, False]))
+    assert normalizer.moments.count == count + 1
+
+    normalizer.merge(ObservationNormalizer(pipeline, features=["speed", "velocity"]))
+    with pytest.raises(ValueError):
+        normalizer.merge(ObservationNormalizer(pipeline))
+
+    space = normalizer.observation_space(pipeline.observation_space)
+    assert space.low[:4].tolist() == [-3.0] * 4 and space.high[:4].tolist() == [3.0] * 4
+    assert (space.low[4], space.high[4]) == (0.0, 1.0)
+
+
+def test_reward_normalizer_scales_terms_by_their_std():
+    pipeline = FeaturePipeline(["speed", "progress"])
+    reward_function = RewardFunction(pipeline, {"speed": 2.0, "progress": 1.0})
+    normalizer = RewardNormalizer(reward_function)
+    obs = np.zeros((200, 2), dtype=np.float32)
+    obs[:, 0] = np.tile([1.0, 3.0], 100)  # speed: std 1
+    obs[:, 1] = np.linspace(0.0, 1.0, 200)
+    normalizer(obs, obs)
+    np.testing.assert_allclose(normalizer.moments.std[0], 1.0)
+
+    normalizer.frozen = True
+    rewards = normalizer(obs[:2], np.zeros_like(obs[:2]))
+    # progress never increased: its term keeps its weight instead of blowing up
+    expected = (2.0 * obs[:2, 0] + 1.0 * obs[:2, 1]) / np.sqrt(1.0 + normalizer.epsilon)
+    np.testing.assert_allclose(rewards, expected, rtol=1e-6)
+
+
+def test_save_and_load_per_map(tmp_path):
+    pipeline = FeaturePipeline(["speed", "velocity"])
+    normalizer = ObservationNormalizer(pipeline)
+    normalizer(np.random.default_rng(2).normal(size=(50, pipeline.size)).astype(np.float32))
+    rewards = RewardNormalizer(RewardFunction(pipeline, {"speed_gain": 1.0}))
+
+    path = normalization_path("Summer 2024 - 01", tmp_path / "checkpoints")
+    assert path.name == "Summer_2024_-_01.normalization.npz"
+    save_normalization(path, normalizer, rewards)
+
+    restored = ObservationNormalizer(pipeline, frozen=True)
+    load_normalization(path, restored, RewardNormalizer(RewardFunction(pipeline, {"speed_gain": 1.0})))
+    assert restored.moments.count == 50
+    np.testing.assert_array_equal(restored.moments.m2, normalizer.moments.m2)
+    normalizer.frozen = True
+    obs = np.ones((1, pipeline.size), dtype=np.float32)
+    np.testing.assert_array_equal(restored(obs.copy()), normalizer(obs.copy()))
+
+    with pytest.raises(ValueError):
+        load_normalization(path, ObservationNormalizer(FeaturePipeline(["speed"])))
+
+
+def test_env_normalizes_observations_not_rewards_inputs(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = SimulatedTelemetrySource(bridge, rate=200.0)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source), sync_frames=1,
+                        normalize_obs=True)
+    assert env.observation_space.high.max() == env.obs_normalizer.clip
+    source.start()
+    try:
+        env.reset()
+        for _ in range(10):
+            obs, reward, *_ = env.step(np.array([0.0, 1.0, 0.0]))
+    finally:
+        source.stop()
+        env.close()
+    assert env.observation_space.contains(obs)
+    assert env.obs_normalizer.moments.count == 11
+    # The pipeline's raw values, which the reward reads, are left alone
+    assert not np.array_equal(obs, env._obs[0])
+    assert reward >= 0.0
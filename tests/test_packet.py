@@ -0,0 +1,106 @@
+import json
+import pytest
+from pathlib import Path
+from gym_trackmania.shared.packet import (DELTA_HEADER_SIZE, PACKET_SIZE, DeltaDecoder, DeltaEncoder,
+                                          decode_packet, decode_rate_request, encode_delta, encode_rate_request,
+                                          encode_telemetry, packet_length)
+from gym_trackmania.shared.schemas import Telemetry
+
+FIXTURE = Path(__file__).parent / "fixtures" / "example_telemetry.json"
+
+
+def test_packet_roundtrip_matches_json_telemetry():
+    telemetry = Telemetry.from_dict(json.loads(FIXTURE.read_text()))
+    packet = encode_telemetry(telemetry, seq=7)
+    assert len(packet) == PACKET_SIZE
+
+    decoded = decode_packet(packet)
+    assert decoded.position == pytest.approx(telemetry.position)
+    assert decoded.rpm == pytest.approx(telemetry.rpm)
+    assert decoded.gear == 3
+    assert decoded.vehicle_type == "CarSport"
+    assert decoded.on_ground is True
+    assert decoded.checkpoints.total == 2
+    assert decoded.wheel_states["rear_right"].rotation == pytest.approx(923.863)
+    assert decoded.wheel_states["front_left"].ground_material == "Asphalt"
+    assert decoded.wheel_states["front_left"].falling_state == "GlidingGround"
+
+
+def test_menu_packet_decodes_without_vehicle_state():
+    decoded = decode_packet(encode_telemetry(Telemetry(in_main_menu=True)))
+    assert decoded.in_main_menu is True
+    assert decoded.position is None
+    assert decoded.checkpoints is None
+
+
+def test_unknown_material_keeps_its_id():
+    telemetry = Telemetry.from_dict({
+        "position": [0.0, 0.0, 0.0],
+        "wheel_states": {"front_left": {
+            "steer_angle": 0.0, "rotation": 0.0, "slip_coef": 0.0, "dirt": 0.0,
+            "brake_coef": 0.0, "tire_wear": 0.0, "icing": 0.0,
+            "ground_material": "Unknown_200", "falling_state": "", "wetness": 0.0
+        }},
+    })
+    wheel = decode_packet(encode_telemetry(telemetry)).wheel_states["front_left"]
+    assert wheel.ground_material == "Unknown_200"
+    assert wheel.falling_state == ""
+
+
+def test_decode_rejects_bad_packets():
+    packet = bytearray(encode_telemetry(Telemetry()))
+    with pytest.raises(ValueError):
+        decode_packet(packet[:-1])
+    packet[0:2] = b"XX"
+    with pytest.raises(ValueError):
+        decode_packet(packet)
+
+
+def _driving(n):
+    return [encode_telemetry(Telemetry(position=[float(i), 0.0, 5.0], speed=float(i % 3), rpm=3000.0,
+                                       in_main_menu=False), seq=i) for i in range(n)]
+
+
+def test_delta_roundtrip_reconstructs_full_packets():
+    packets = _driving(5)
+    encoder = DeltaEncoder(keyframe_interval=3, active=True)
+    decoder = DeltaDecoder()
+    sizes = []
+    for i, packet in enumerate(packets):
+        data = encoder.encode(packet, now=float(i))
+        sizes.append(len(data))
+        assert packet_length(data) == len(data)
+        assert bytes(decoder.decode(data)) == packet
+    assert sizes[0] == sizes[4] == PACKET_SIZE  # keyframes
+    assert max(sizes[1:4]) < 30
+    assert decoder.keyframes == 2 and decoder.deltas == 3
+
+
+def test_unchanged_state_only_sends_heartbeats():
+    menu = encode_telemetry(Telemetry(in_main_menu=True))
+    encoder = DeltaEncoder(heartbeat_interval=1.0)
+    sent = [encoder.encode(menu, now=i * 0.1) for i in range(21)]
+    sent = [data for data in sent if data is not None]
+    assert len(sent) == 3
+    assert [len(data) for data in sent[1:]] == [DELTA_HEADER_SIZE] * 2
+    decoder = DeltaDecoder()
+    assert bytes(decoder.decode(sent[0])) == menu
+    assert bytes(decoder.decode(sent[1]))[4:8] == (1).to_bytes(4, "little")
+
+
+def test_delta_after_gap_is_dropped_until_keyframe():
+    first, second, third = _driving(3)
+    decoder = DeltaDecoder()
+    assert decoder.decode(encode_delta(first, second)) is None  # no base yet
+    decoder.decode(first)
+    assert decoder.decode(encode_delta(second, third)) is None  # second was lost
+    assert decoder.dropped == 2
+    with pytest.raises(ValueError):
+        decoder.decode(encode_delta(first, second)[:-1])
+
+
+def test_rate_request_roundtrip():
+    assert decode_rate_request(encode_rate_request(16)) == 16
+    assert decode_rate_request(encode_rate_request(None)) is None
+    with pytest.raises(ValueError):
+        decode_rate_request(b"XX\x01\x00\x10\x00")
@@ -0,0 +1,96 @@
+import threading
+import urllib.request
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.shared.perf import (BUCKET_HIGH, BUCKET_LOW, METRIC_NAME, STAGES, SUB_BUCKET_BITS,
+                                        LatencyHistogram, PerfStats)
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+
+def test_buckets_are_contiguous():
+    assert BUCKET_LOW[0] == 0
+    assert (BUCKET_LOW[1:] == BUCKET_HIGH[:-1] + 1).all()
+
+
+def test_histogram_quantiles_within_bucket_precision():
+    rng = np.random.default_rng(0)
+    samples = rng.lognormal(mean=np.log(1e-3), sigma=1.0, size=20000)
+    histogram = LatencyHistogram()
+    for sample in samples:
+        histogram.record(sample)
+
+    assert histogram.count == len(samples)
+    assert histogram.mean == pytest.approx(samples.mean())
+    assert histogram.max == samples.max()
+    for q in (0.5, 0.9, 0.99):
+        assert histogram.quantile(q) == pytest.approx(np.quantile(samples, q), rel=2 ** -SUB_BUCKET_BITS * 2)
+
+
+def test_perf_stats_merges_threads_without_locks():
+    perf = PerfStats()
+
+    def record():
+        for _ in range(1000):
+            perf.record("ingest", 1e-5)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = perf.summary()
+    assert list(summary) == ["ingest"]
+    assert summary["ingest"]["count"] == 4000
+    assert summary["ingest"]["p50"] == pytest.approx(1e-5, rel=0.01)
+    perf.reset()
+    assert perf.summary() == {}
+
+
+def test_prometheus_text():
+    perf = PerfStats()
+    perf.record("reward", 3e-6)
+    perf.record("reward", 2e-3)
+    text = perf.to_prometheus(labels={"instance": "0"})
+    assert f"# TYPE {METRIC_NAME} histogram" in text
+    assert f'{METRIC_NAME}_bucket{{stage="reward",instance="0",le="5e-06"}} 1' in text
+    assert f'{METRIC_NAME}_bucket{{stage="reward",instance="0",le="0.0025"}} 2' in text
+    assert f'{METRIC_NAME}_count{{stage="reward",instance="0"}} 2' in text
+
+
+def test_env_perf_stats(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), port=0, transport="udp")
+    bridge.start()
+    source = SimulatedTelemetrySource(address=(bridge.host, bridge.port), rate=200.0)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source), sync_frames=1,
+                        perf=True)
+    source.start()
+    try:
+        env.reset()
+        for _ in range(10):
+            env.step(np.array([0.0, 1.0, 0.0]))
+        server = bridge.start_metrics_server()
+        with urllib.request.urlopen(f"http://{bridge.host}:{server.port}/metrics") as response:
+            text = response.read().decode()
+    finally:
+        source.stop()
+        env.close()
+        bridge.stop()
+
+    stats = env.get_perf_stats()
+    for stage in ("ingest", "queue_wait", "obs_build", "reward", "action_dispatch", "end_to_end"):
+        assert stage in STAGES
+        assert stats[stage]["count"] > 0
+        assert 0.0 <= stats[stage]["p50"] <= stats[stage]["max"]
+    assert stats["end_to_end"]["count"] == 10
+    assert f'{METRIC_NAME}_count{{stage="end_to_end"}} 10' in text
+
+
+def test_perf_disabled_by_default(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(SimulatedTelemetrySource(bridge)))
+    env.close()
+    assert env.perf is None and bridge.perf is None and env.controller.perf is None
+    assert env.get_perf_stats() == {}
@@ -0,0 +1,150 @@
+import time
+import numpy as np
+import pytest
+from gym_trackmania.bridge.multiplex import MultiplexTelemetryBridge
+from gym_trackmania.core.instance import NAVIGATION_KEYS, TrackmaniaGameInstance
+from gym_trackmania.core.pool import InstancePool
+from gym_trackmania.core.simulated import FakePlatform
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+FAST = dict(key_interval=0.01, launch_timeout=1.0, window_timeout=1.0, menu_timeout=2.0, race_timeout=2.0,
+            menu_settle=0.05)
+
+
+def _pool(tmp_path, size=2, standby=1, timeouts=FAST, **platform_kwargs):
+    platform = FakePlatform(boot_time=0.05, window_time=0.02, **platform_kwargs)
+    bridge = MultiplexTelemetryBridge(size + standby, ports=[0] * (size + standby),
+                                      log_path=str(tmp_path / "bridge.log"))
+    bridge.start()
+    factory = lambda channel, address: TrackmaniaGameInstance(channel, platform=platform, address=address,  # noqa: E731
+                                                              **timeouts)
+    pool = InstancePool(bridge, factory, size, standby=standby, stale_timeout=0.3, check_interval=0.02)
+    return pool, platform
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_game_instance_launches_and_navigates_on_fake_platform(tmp_path):
+    platform = FakePlatform(boot_time=0.05, window_time=0.02)
+    bridge = MultiplexTelemetryBridge(1, ports=[0], log_path=str(tmp_path / "bridge.log"))
+    bridge.start()
+    try:
+        start = time.monotonic()
+        instance = TrackmaniaGameInstance(bridge.channel(0), platform=platform,
+                                          address=(bridge.host, bridge.ports[0]), **FAST)
+        elapsed = time.monotonic() - start
+        process = platform.processes[instance.game_pid]
+        assert process.source.in_race
+        assert process.keys_pressed[:len(NAVIGATION_KEYS)] == list(NAVIGATION_KEYS)
+        assert elapsed < 1.0  # no fixed sleeps
+        instance.close()
+        assert not instance.is_alive()
+    finally:
+        bridge.stop()
+
+
+def test_game_instance_lets_the_main_menu_settle_before_navigating(tmp_path):
+    platform = FakePlatform(boot_time=0.05, window_time=0.02)
+    bridge = MultiplexTelemetryBridge(1, ports=[0], log_path=str(tmp_path / "bridge.log"))
+    bridge.start()
+    try:
+        start = time.monotonic()
+        instance = TrackmaniaGameInstance(bridge.channel(0), platform=platform,
+                                          address=(bridge.host, bridge.ports[0]), **dict(FAST, menu_settle=0.5))
+        assert time.monotonic() - start >= 0.55
+        assert platform.processes[instance.game_pid].source.in_race
+        instance.close()
+    finally:
+        bridge.stop()
+
+
+def test_game_instance_times_out_and_terminates_a_wedged_game(tmp_path):
+    platform = FakePlatform(boot_time=0.05, window_time=0.02, fail_launches=1)
+    bridge = MultiplexTelemetryBridge(1, ports=[0], log_path=str(tmp_path / "bridge.log"))
+    bridge.start()
+    try:
+        with pytest.raises(TimeoutError):
+            TrackmaniaGameInstance(bridge.channel(0), platform=platform, address=(bridge.host, bridge.ports[0]),
+                                   **dict(FAST, menu_timeout=0.2))
+        assert not platform.is_alive(1000)
+    finally:
+        bridge.stop()
+
+
+def test_pool_swaps_dead_instance_for_standby(tmp_path):
+    pool, platform = _pool(tmp_path)
+    try:
+        pool.start(timeout=5.0)
+        assert _wait(lambda: pool.standby_ready == 1)
+        lease = pool.leases[0]
+        dead = lease.instance
+        channel = pool.channel(0)
+        platform.terminate(dead.game_pid)
+
+        assert _wait(lambda: lease.instance is not dead)
+        assert pool.swaps == 1
+        assert lease.needs_reset()
+        assert not lease.needs_reset()
+        # The env's channel now receives the standby's telemetry
+        seq = channel.latest_seq
+        assert channel.wait_for_seq(seq + 1, timeout=1.0)
+        # The dead instance is relaunched as the new standby
+        assert _wait(lambda: pool.standby_ready == 1)
+        assert platform.launches == 4
+    finally:
+        pool.stop()
+        pool.bridge.stop()
+
+
+def test_pool_detects_hung_instance_by_stale_telemetry(tmp_path):
+    pool, platform = _pool(tmp_path, size=1)
+    try:
+        pool.start(timeout=5.0)
+        assert _wait(lambda: pool.standby_ready == 1)
+        hung = pool.leases[0].instance
+        platform.processes[hung.game_pid].hang()
+        assert _wait(lambda: pool.swaps == 1)
+        assert not platform.is_alive(hung.game_pid)
+    finally:
+        pool.stop()
+        pool.bridge.stop()
+
+
+def test_pool_retries_failed_launches(tmp_path):
+    pool, platform = _pool(tmp_path, size=1, standby=0, timeouts=dict(FAST, menu_timeout=0.3), fail_launches=1)
+    try:
+        pool.start(timeout=10.0)
+        assert pool.failures == 1
+        assert pool.leases[0].is_alive()
+    finally:
+        pool.stop()
+        pool.bridge.stop()
+
+
+def test_env_truncates_episode_when_instance_is_swapped(tmp_path):
+    pool, platform = _pool(tmp_path, size=1)
+    try:
+        pool.start(timeout=5.0)
+        assert _wait(lambda: pool.standby_ready == 1)
+        env = TrackmaniaEnv(telemetry_bridge=pool.channel(0), game_instance=pool.leases[0], sync_frames=1)
+        env.reset()
+        action = np.array([0.0, 1.0, 0.0])
+        assert not env.step(action)[3]
+        platform.terminate(pool.leases[0].instance.game_pid)
+        assert _wait(lambda: pool.swaps == 1)
+        obs, reward, done, truncated, info = env.step(action)
+        assert truncated and reward == 0.0
+        assert not env.first_reset_done
+        env.reset()
+        assert not env.step(action)[3]
+        env.close()
+    finally:
+        pool.stop()
+        pool.bridge.stop()
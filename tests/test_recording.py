@@ -0,0 +1,78 @@
+import json
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge, TelemetryChannel
+from gym_trackmania.bridge.recording import TelemetryDataset, TelemetryEpisode, load_recording
+from gym_trackmania.shared.packet import encode_telemetry
+from gym_trackmania.shared.schemas import Telemetry, WheelState
+
+
+def _telemetry(rpm, material="Asphalt"):
+    wheel = WheelState(0, 0, 0, 0, 0, 0, 0, material, "RestingGround", 0)
+    return Telemetry(position=[rpm, 0.0, 0.0], rpm=rpm, in_main_menu=False,
+                     wheel_states={k: wheel for k in ("front_left", "front_right", "rear_left", "rear_right")})
+
+
+def test_bridge_records_received_frames(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    bridge.ingest_packet(encode_telemetry(_telemetry(1.0)))
+    bridge.start_recording(tmp_path / "episode", flush_interval=0.01)
+    for rpm in (2.0, 3.0, 4.0):
+        bridge.ingest_packet(encode_telemetry(_telemetry(rpm, material="Grass" if rpm == 3.0 else "Asphalt")))
+    bridge.ingest_packet(b"garbage")
+    assert bridge.stop_recording() == 3
+    bridge.ingest_packet(encode_telemetry(_telemetry(5.0)))
+
+    episode = TelemetryEpisode(tmp_path / "episode")
+    assert len(episode) == 3
+    assert isinstance(episode.column("rpm"), np.memmap)
+    assert list(episode["rpm"]) == [2.0, 3.0, 4.0]
+    assert list(episode["bridge_seq"]) == [1, 2, 3]
+    assert list(episode.decode("ground_material")[:, 0]) == ["Asphalt", "Grass", "Asphalt"]
+    assert (np.diff(episode["timestamp"]) >= 0).all()
+    assert bridge.stop_recording() == 0
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_recording_chunks_and_datasets(tmp_path, compress):
+    channel = TelemetryChannel(history=64)
+    for i, path in enumerate(("a", "b")):
+        channel.start_recording(tmp_path / path, chunk_size=16, compress=compress, flush_interval=0.01)
+        for rpm in range(40):
+            channel.ingest_packet(encode_telemetry(_telemetry(float(rpm + 100 * i))))
+        channel.stop_recording()
+
+    meta = json.loads((tmp_path / "a" / "meta.json").read_text())
+    assert meta["chunks"] == [16, 16, 8]
+    assert meta["vocabularies"]["ground_material"][16] == "Asphalt"
+
+    dataset = TelemetryDataset(tmp_path)
+    assert len(dataset) == 2
+    rpm = dataset.column("rpm")
+    np.testing.assert_array_equal(rpm, np.concatenate([np.arange(40), np.arange(100, 140)]))
+    assert sum(len(chunk) for chunk in dataset.iter_column("rpm")) == 80
+    (tmp_path / "empty").mkdir()
+    position = TelemetryDataset(tmp_path / "empty").column("position")
+    assert position.shape == (0, 3) and position.dtype == dataset.column("position").dtype
+
+    recording = load_recording(tmp_path / "b")
+    assert len(recording) == 40
+    assert recording.frames["magic"][0] == b"TM"
+    assert recording.frames["position"][0, 0] == 100.0
+
+
+def test_recorder_counts_frames_lost_to_ring_wraparound(tmp_path):
+    channel = TelemetryChannel(history=8)
+    channel.start_recording(tmp_path / "episode", flush_interval=60.0)
+    # Far more frames than the ring holds before the writer's first poll
+    for rpm in range(20):
+        channel.ingest_packet(encode_telemetry(_telemetry(float(rpm))))
+    recorder = channel.recorder
+    assert channel.stop_recording() == 7
+    assert recorder.frames_dropped == 13
+    assert list(TelemetryEpisode(tmp_path / "episode")["rpm"]) == list(range(13, 20))
+
+
+def test_episode_rejects_other_directories(tmp_path):
+    with pytest.raises(ValueError):
+        TelemetryEpisode(tmp_path)
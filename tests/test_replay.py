@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge, TelemetryChannel
+from gym_trackmania.core.replay import ReplayGameInstance, ReplayTelemetrySource
+from gym_trackmania.shared.packet import PACKET_DTYPE, frame_from_telemetry
+from gym_trackmania.shared.schemas import CheckpointStatus, Telemetry
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+N_FRAMES = 50
+
+
+def _write_recording(path):
+    """A menu frame followed by a car accelerating through N_FRAMES race frames."""
+    frame = np.zeros(1, dtype=PACKET_DTYPE)
+    channel = TelemetryChannel()
+    channel.start_recording(path)
+    frame_from_telemetry(Telemetry(in_main_menu=True), frame)
+    channel.ingest_frame(frame[0])
+    for i in range(N_FRAMES):
+        telemetry = Telemetry(position=[float(i), 0.0, 0.0], velocity=[i / 3.6, 0.0, 0.0], speed=float(i),
+                              checkpoints=CheckpointStatus(4, 0, i / N_FRAMES), in_main_menu=False)
+        frame_from_telemetry(telemetry, frame)
+        channel.ingest_frame(frame[0])
+    channel.stop_recording()
+    return path
+
+
+def _replay_env(tmp_path, **source_kwargs):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = ReplayTelemetrySource(_write_recording(tmp_path / "run"), bridge=bridge, **source_kwargs)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=ReplayGameInstance(source), sync_frames=1)
+    source.start()
+    return env, source
+
+
+def _rollout(tmp_path, steps):
+    env, source = _replay_env(tmp_path)
+    observations = [env.reset()[0]]
+    for _ in range(steps):
+        obs, _, _, _, info = env.step(np.array([0.0, 1.0, 0.0]))
+        assert info["fresh_frames"] == 1
+        observations.append(obs)
+    return np.array(observations), source
+
+
+def test_lockstep_replay_is_deterministic(tmp_path):
+    (tmp_path / "first").mkdir()
+    (tmp_path / "second").mkdir()
+    first, source = _rollout(tmp_path / "first", steps=2 * N_FRAMES)
+    second, _ = _rollout(tmp_path / "second", steps=2 * N_FRAMES)
+
+    np.testing.assert_array_equal(first, second)
+    # Playback starts after the menu frame and loops back to the race start
+    speeds = first[:, 13] * 300.0
+    np.testing.assert_allclose(speeds[:3], [0.0, 1.0, 2.0], atol=1e-4)
+    assert speeds[N_FRAMES] == pytest.approx(0.0, abs=1e-4)
+    # Besides the steps: the first frame, the respawn of the ghost-prompt key and the restart
+    assert source.frames_sent == 2 * N_FRAMES + 3
+
+
+def test_replay_without_loop_repeats_last_frame(tmp_path):
+    env, source = _replay_env(tmp_path, loop=False)
+    env.reset()
+    for _ in range(N_FRAMES + 5):
+        obs, _, _, _, _ = env.step(np.array([0.0, 0.0, 0.0]))
+    assert obs[13] * 300.0 == pytest.approx(N_FRAMES - 1, abs=1e-3)
+
+
+def test_free_running_replay(tmp_path):
+    env, source = _replay_env(tmp_path, rate=500.0)
+    try:
+        env.reset()
+        _, _, _, _, info = env.step(np.array([0.0, 1.0, 0.0]))
+    finally:
+        source.stop()
+    assert info["fresh_frames"] >= 1
+    assert env.game_instance.key_presses["backspace"] == 1
+
+
+def test_replay_rejects_empty_recording(tmp_path):
+    channel = TelemetryChannel()
+    channel.start_recording(tmp_path / "empty")
+    channel.stop_recording()
+    with pytest.raises(ValueError):
+        ReplayTelemetrySource(tmp_path / "empty", address=("127.0.0.1", 0))
+
+
+def test_game_instance_module_imports_without_windows():
+    from gym_trackmania.core.instance import TrackmaniaGameInstance
+    with pytest.raises(RuntimeError):
+        TrackmaniaGameInstance(telemetry_bridge=None)
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.shared.replay_buffer import ReplayBuffer, SumTree
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+
+def _obs(value, size=2):
+    return np.full(size, value, dtype=np.float32)
+
+
+def test_sum_tree_sums_and_finds_leaves():
+    rng = np.random.default_rng(0)
+    tree = SumTree(100)
+    values = rng.random(100)
+    tree.update(np.arange(100), values)
+    tree.set(7, 5.0)
+    values[7] = 5.0
+    tree.update([3, 3, 50], [1.0, 2.0, 0.0])  # the last value wins
+    values[[3, 50]] = [2.0, 0.0]
+    assert tree.total == pytest.approx(values.sum())
+
+    bounds = np.cumsum(values)
+    queries = rng.random(1000) * tree.total
+    np.testing.assert_array_equal(tree.find(queries), np.searchsorted(bounds, queries, side="right"))
+    assert 50 not in tree.find(queries)
+
+
+def test_n_step_returns_at_insertion():
+    buffer = ReplayBuffer(16, (2,), action_shape=(1,), n_step=3, gamma=0.5, alpha=0.0)
+    for t, reward in enumerate([1.0, 2.0, 4.0, 8.0]):
+        buffer.add(_obs(t), [t], reward, _obs(t + 1), terminated=t == 3)
+    # Two complete 3-step returns, then the rest flushed at the end of the episode
+    assert len(buffer) == 4
+    np.testing.assert_allclose(buffer.reward[:4], [1 + 1 + 1, 2 + 2 + 2, 4 + 4, 8])
+    np.testing.assert_allclose(buffer.discount[:4], [0.125, 0.0, 0.0, 0.0])
+    np.testing.assert_array_equal(buffer.next_obs[:4, 0], [3, 4, 4, 4])
+    np.testing.assert_array_equal(buffer.action[:4, 0], [0, 1, 2, 3])
+
+    # Truncated episodes still bootstrap, separately per stream
+    buffer.add(_obs(10), [0], 1.0, _obs(11), terminated=False, truncated=True)
+    assert buffer.reward[4] == 1.0 and buffer.discount[4] == 0.5
+
+
+def test_prioritized_sampling_and_weights(tmp_path):
+    buffer = ReplayBuffer(8, (2,), alpha=1.0, path=tmp_path / "buffer")
+    buffer.add_batch(np.stack([_obs(i) for i in range(10)]), np.zeros((10, 3)), np.arange(10.0),
+                     np.stack([_obs(i + 1) for i in range(10)]), np.zeros(10, dtype=bool))
+    assert len(buffer) == 8
+    assert buffer.obs[:2, 0].tolist() == [8.0, 9.0]  # wrapped around
+
+    buffer.update_priorities(np.arange(8), np.full(8, 0.01))
+    buffer.update_priorities([5], [10.0])
+    rng = np.random.default_rng(0)
+    sample = buffer.sample(512, rng)
+    assert (sample.indices == 5).mean() > 0.9
+    assert sample.weights[sample.indices == 5].max() < sample.weights.max() == 1.0
+    np.testing.assert_array_equal(sample.obs[:, 0], buffer.obs[sample.indices, 0])
+
+    buffer.flush()
+    assert np.load(tmp_path / "buffer" / "obs.npy", mmap_mode="r")[5, 0] == 5.0
+
+    # A new buffer over the same directory carries on where this one was
+    reopened = ReplayBuffer(8, (2,), alpha=1.0, path=tmp_path / "buffer")
+    assert len(reopened) == 8 and reopened.max_priority == buffer.max_priority
+    np.testing.assert_array_equal(reopened.obs, buffer.obs)
+    reopened.add(_obs(20), np.zeros(3), 0.0, _obs(21), terminated=False)
+    assert reopened.obs[2, 0] == 20.0
+    for kwargs in (dict(capacity=16), dict(obs_shape=(3,)), dict(gamma=0.9), dict(n_step=2)):
+        with pytest.raises(ValueError):
+            ReplayBuffer(**dict(dict(capacity=8, obs_shape=(2,), path=tmp_path / "buffer"), **kwargs))
+    with pytest.raises(ValueError):
+        ReplayBuffer(4, (2,)).sample(1, rng)
+
+
+def test_env_writes_transitions(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = SimulatedTelemetrySource(bridge, rate=200.0)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source), sync_frames=1)
+    env.replay_buffer = buffer = ReplayBuffer(100, env.observation_space.shape)
+    source.start()
+    try:
+        observations = [env.reset()[0]]
+        rewards = []
+        for _ in range(5):
+            obs, reward, *_ = env.step(np.array([0.0, 1.0, 0.0]))
+            observations.append(obs)
+            rewards.append(reward)
+    finally:
+        source.stop()
+        env.close()
+    assert len(buffer) == 5
+    np.testing.assert_array_equal(buffer.obs[:5], observations[:-1])
+    np.testing.assert_array_equal(buffer.next_obs[:5], observations[1:])
+    np.testing.assert_allclose(buffer.reward[:5], rewards, rtol=1e-6)
+    assert buffer.action[:5].tolist() == [[0.0, 1.0, 0.0]] * 5
+
+
+def test_env_stores_time_limits_as_truncated(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = SimulatedTelemetrySource(bridge, rate=200.0)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source), sync_frames=1)
+    env.replay_buffer = buffer = ReplayBuffer(10, env.observation_space.shape, gamma=0.9)
+    source.start()
+    try:
+        env.reset()
+        env.max_episode_duration = 0.0
+        _, _, terminated, truncated, _ = env.step(np.array([0.0, 1.0, 0.0]))
+    finally:
+        source.stop()
+        env.close()
+    assert (terminated, truncated) == (False, True)
+    # Still bootstraps from the next observation
+    assert len(buffer) == 1 and buffer.discount[0] == pytest.approx(0.9)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from gym_trackmania.bridge.ring import TelemetryRing
+from gym_trackmania.shared.packet import encode_telemetry
+from gym_trackmania.shared.schemas import Telemetry
+
+
+def _packet(i):
+    return encode_telemetry(Telemetry(position=[0.0, 0.0, 0.0], rpm=float(i)), seq=i)
+
+
+def test_window_is_contiguous_view_across_wraparound():
+    ring = TelemetryRing(capacity=8)
+    for i in range(13):
+        ring.write(_packet(i), timestamp=float(i))
+
+    window = ring.get_window(5)
+    assert window.frames.base is not None  # a view, not a copy
+    assert np.shares_memory(window.frames, ring.frames)
+    assert window.seq.tolist() == [8, 9, 10, 11, 12]
+    assert window.frames["rpm"].tolist() == [8, 9, 10, 11, 12]
+    assert window.timestamp.tolist() == [8, 9, 10, 11, 12]
+
+
+def test_window_is_limited_to_intact_frames():
+    ring = TelemetryRing(capacity=4)
+    assert len(ring.get_window(3).frames) == 0
+    for i in range(10):
+        ring.write(_packet(i), timestamp=0.0)
+    assert ring.get_window(100).seq.tolist() == [7, 8, 9]
+    assert not ring.is_intact(6)
+    assert ring.is_intact(7)
+
+
+def test_get_since_returns_only_newer_frames():
+    ring = TelemetryRing(capacity=16)
+    for i in range(5):
+        ring.write(_packet(i), timestamp=0.0)
+    assert ring.get_since(-1).seq.tolist() == [0, 1, 2, 3, 4]
+    assert ring.get_since(2).seq.tolist() == [3, 4]
+    assert len(ring.get_since(4).seq) == 0
+
+
+def test_latest_copies_most_recent_frame():
+    ring = TelemetryRing(capacity=4)
+    assert ring.latest() == (-1, None)
+    for i in range(6):
+        ring.write(_packet(i), timestamp=0.0)
+    seq, frame = ring.latest()
+    assert seq == 5
+    assert frame["rpm"][0] == 5
+    assert not np.shares_memory(frame, ring.frames)
+
+
+def test_malformed_packet_is_not_published():
+    ring = TelemetryRing(capacity=4)
+    with pytest.raises(ValueError):
+        ring.write(b"garbage", timestamp=0.0)
+    assert ring.next_seq == 0
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.core.scheduler import HOLD, SKIP, ControlScheduler
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+RATE = 128.0      # telemetry frames per second, a power of two so times add up exactly
+PERIOD = 1 / 16
+
+
+class SimulatedClock:
+    """Telemetry frame ``seq`` arrives at ``(seq + 1) / RATE``, until ``stall_at`` if set."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.stall_at = None
+
+    def __call__(self):
+        return self.now
+
+    def latest_seq(self):
+        seq = int(self.now * RATE) - 1
+        return seq if self.stall_at is None else min(seq, self.stall_at)
+
+    def arrival(self, seq):
+        return (seq + 1) / RATE
+
+    def wait(self, target, timeout):
+        if target is None or (self.stall_at is not None and target > self.stall_at):
+            self.now += timeout
+            return
+        self.now = max(self.now, min(self.arrival(target), self.now + timeout))
+
+
+def run_steps(scheduler, clock, decision_times):
+    """Step with an agent taking ``decision_times`` seconds to act; returns the clock time every step ended at."""
+    ends = []
+    for decision in decision_times:
+        clock.now += decision
+        target, timeout = scheduler.begin(clock.latest_seq())
+        clock.wait(target, timeout)
+        seq = clock.latest_seq()
+        scheduler.end(seq, clock.arrival(seq))
+        ends.append(clock.now)
+    return ends
+
+
+def test_time_mode_keeps_a_fixed_rate_and_skips_or_holds_late_steps():
+    for late, expected in [(SKIP, [1, 2, 3, 6, 7]), (HOLD, [1, 2, 3, 6.5, 7.5])]:
+        clock = SimulatedClock()
+        scheduler = ControlScheduler(PERIOD, late=late, clock=clock)
+        scheduler.reset()
+        # The decision cost is part of the period, not added to it; the fourth decision misses a deadline
+        ends = run_steps(scheduler, clock, [PERIOD / 4, PERIOD / 2, 0.0, 2.5 * PERIOD, PERIOD / 4])
+        assert ends == [n * PERIOD for n in expected]
+        stats = scheduler.stats()
+        assert (stats["steps"], stats["late_steps"], stats["missed_deadlines"], stats["overrun"]) == (5, 1, 1, 2)
+        assert stats["frames_per_step"] == pytest.approx(RATE * ends[-1] / 5, abs=1)
+        assert stats["jitter"]["max"] == 0.0
+
+
+def test_frame_mode_repeats_actions_and_handles_late_agents():
+    k = 4
+    for late, expected_seqs in [(SKIP, [3, 7, 11, 19, 23]), (HOLD, [3, 7, 11, 20, 24])]:
+        clock = SimulatedClock()
+        scheduler = ControlScheduler(PERIOD, action_repeat=k, late=late, clock=clock)
+        scheduler.reset(-1)
+        seqs = []
+        for decision in [0.0, 0.0, 0.0, 5.5 / RATE, 0.0]:
+            clock.now += decision
+            target, timeout = scheduler.begin(clock.latest_seq())
+            clock.wait(target, timeout)
+            seqs.append(clock.latest_seq())
+            scheduler.end(seqs[-1], clock.arrival(seqs[-1]))
+        # Skipping keeps steps on every k-th frame; holding gives the late action k frames of its own
+        assert seqs == expected_seqs
+        assert scheduler.late_steps == 1 and scheduler.overrun == 2
+
+    clock = SimulatedClock()
+    scheduler = ControlScheduler(PERIOD, action_repeat=k, clock=clock)
+    scheduler.reset(-1)
+    clock.stall_at = 5
+    run_steps(scheduler, clock, [0.0, 0.0, 0.0])
+    # The second step times out at its deadline, the next one counts k frames from the last that arrived
+    assert scheduler.missed_deadlines == 2 and scheduler.late_steps == 0
+    assert scheduler.target == 5 + k
+    assert scheduler.stats()["jitter"]["count"] == 3
+
+
+def test_scheduler_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        ControlScheduler(0.0)
+    with pytest.raises(ValueError):
+        ControlScheduler(action_repeat=-1)
+    with pytest.raises(ValueError):
+        ControlScheduler(late="catch_up")
+
+
+def test_env_repeats_actions_and_sums_rewards(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = SimulatedTelemetrySource(bridge, rate=200.0)
+    scheduler = ControlScheduler(period=0.25, action_repeat=4)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source), sync_frames=1,
+                        reward_weights={"speed": 1.0}, scheduler=scheduler)
+    source.start()
+    try:
+        env.reset()
+        for _ in range(6):
+            since_seq = env.obs_seq
+            _, reward, _, _, info = env.step(np.array([0.0, 1.0, 0.0]))
+            window = bridge.get_since(since_seq)
+            n = int(np.searchsorted(window.seq, info["obs_seq"], side="right"))
+            speeds = env.pipeline.view(env.pipeline(window.frames[:n]), "speed")
+            assert reward == pytest.approx(float(speeds.sum()))
+            assert not info["missed_deadline"]
+    finally:
+        source.stop()
+        env.close()
+    stats = scheduler.stats()
+    assert stats["steps"] == 6 and stats["missed_deadlines"] == 0
+    assert stats["frames_per_step"] >= 4
@@ -0,0 +1,157 @@
+import multiprocessing
+import threading
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import SharedTelemetryChannel, TelemetryBridge
+from gym_trackmania.bridge.multiplex import MultiplexTelemetryBridge
+from gym_trackmania.bridge.shm_ring import SharedTelemetryRing, unlink_owned
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.shared.packet import encode_telemetry
+from gym_trackmania.shared.schemas import Telemetry
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+
+def _packet(i):
+    return encode_telemetry(Telemetry(position=[0.0, 0.0, 0.0], rpm=float(i)), seq=i)
+
+
+def _read_in_child(name, results):
+    ring = SharedTelemetryRing.attach(name)
+    window = ring.get_window(5)
+    results.put((window.seq.tolist(), window.frames["rpm"].tolist()))
+    results.put(ring.copy_since(-1).seq.tolist())
+
+
+def test_frames_are_readable_from_another_process():
+    ring = SharedTelemetryRing(capacity=8)
+    try:
+        for i in range(13):
+            ring.write(_packet(i), timestamp=float(i))
+        results = multiprocessing.get_context("fork").Queue()
+        child = multiprocessing.get_context("fork").Process(target=_read_in_child, args=(ring.name, results))
+        child.start()
+        seqs, rpm = results.get(timeout=10)
+        copied = results.get(timeout=10)
+        child.join(timeout=10)
+    finally:
+        ring.close()
+    assert child.exitcode == 0
+    assert seqs == [8, 9, 10, 11, 12]
+    assert rpm == [8, 9, 10, 11, 12]
+    assert copied == [6, 7, 8, 9, 10, 11, 12]
+
+
+def test_attached_ring_shares_memory_and_sees_new_frames():
+    ring = SharedTelemetryRing(capacity=4)
+    try:
+        reader = SharedTelemetryRing.attach(ring.name)
+        assert reader.capacity == 4
+        assert reader.latest() == (-1, None)
+        for i in range(6):
+            ring.write(_packet(i), timestamp=0.0)
+        seq, frame = reader.latest()
+        assert seq == 5 and frame["rpm"][0] == 5
+        assert reader.get_since(2).seq.tolist() == [3, 4, 5]
+    finally:
+        ring.close()
+
+
+def test_close_unmaps_and_keeps_the_last_frames():
+    ring = SharedTelemetryRing(capacity=4)
+    reader = SharedTelemetryRing.attach(ring.name)
+    for i in range(3):
+        ring.write(_packet(i), timestamp=0.0)
+    reader.close()
+    ring.close()
+    assert ring.shm.buf is None and reader.shm.buf is None
+    assert ring.latest()[1]["rpm"][0] == 2
+    assert reader.get_since(0).seq.tolist() == [1, 2]
+    with pytest.raises(FileNotFoundError):
+        SharedTelemetryRing.attach(ring.name)
+
+
+def test_latest_waits_for_the_writer_to_finish_the_slot():
+    ring = SharedTelemetryRing(capacity=4)
+    try:
+        for i in range(3):
+            ring.write(_packet(i), timestamp=0.0)
+        # The writer thread is midway through rewriting the newest slot
+        ring.versions[2] += 1
+        threading.Timer(0.05, lambda: ring.versions.__setitem__(2, ring.versions[2] + 1)).start()
+        seq, frame = ring.latest()
+        assert seq == 2 and frame["rpm"][0] == 2
+    finally:
+        ring.close()
+
+
+def test_copy_since_drops_frames_torn_by_the_writer():
+    ring = SharedTelemetryRing(capacity=8)
+    try:
+        for i in range(6):
+            ring.write(_packet(i), timestamp=0.0)
+        # The writer is midway through reusing slot 2
+        ring.versions[2] += 1
+        assert ring.copy_since(-1).seq.tolist() == [3, 4, 5]
+        ring.versions[2] += 1
+        assert ring.copy_since(-1).seq.tolist() == [0, 1, 2, 3, 4, 5]
+    finally:
+        ring.close()
+
+
+def test_malformed_packet_leaves_slot_readable():
+    ring = SharedTelemetryRing(capacity=4)
+    try:
+        ring.write(_packet(0), timestamp=0.0)
+        with pytest.raises(ValueError):
+            ring.write(b"short", timestamp=0.0)
+        assert ring.next_seq == 1
+        assert ring.versions.tolist() == [2, 2, 0, 0]
+    finally:
+        ring.close()
+
+
+def test_attach_rejects_missing_or_foreign_segments():
+    with pytest.raises(FileNotFoundError):
+        SharedTelemetryRing.attach("tm_ring_does_not_exist")
+    from multiprocessing import shared_memory
+    other = shared_memory.SharedMemory(create=True, size=4096)
+    try:
+        with pytest.raises(ValueError):
+            SharedTelemetryRing.attach(other.name)
+    finally:
+        other.close()
+        unlink_owned(other)
+
+
+def test_env_steps_on_shared_channel(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp", shared_memory=True)
+    channel = SharedTelemetryChannel(bridge.ring.name)
+    source = SimulatedTelemetrySource(bridge, rate=200.0)
+    env = TrackmaniaEnv(telemetry_bridge=channel, game_instance=SimulatedGameInstance(source), sync_frames=1)
+    source.start()
+    try:
+        env.reset()
+        for _ in range(5):
+            obs, reward, done, truncated, info = env.step(np.array([0.0, 1.0, 0.0]))
+    finally:
+        source.stop()
+        env.close()
+        bridge.stop()
+
+    assert obs.shape == env.observation_space.shape
+    assert info["fresh_frames"] >= 1
+    assert channel.latest_seq == bridge.latest_seq
+    with pytest.raises(RuntimeError):
+        channel.ingest_packet(_packet(0))
+
+
+def test_multiplex_shares_every_channel(tmp_path):
+    bridge = MultiplexTelemetryBridge(2, ports=[0, 0], log_path=str(tmp_path / "bridge.log"), shared_memory=True)
+    try:
+        bridge.channel(1).ingest_packet(_packet(7))
+        reader = SharedTelemetryChannel(bridge.channel(1).ring.name)
+        assert reader.get_latest_frame()["rpm"][0] == 7
+        assert reader.wait_for_seq(0, timeout=0.1)
+        assert not reader.wait_for_seq(1, timeout=0.01)
+    finally:
+        bridge.stop()
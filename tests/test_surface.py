@@ -0,0 +1,88 @@
+import re
+from pathlib import Path
+import numpy as np
+import pytest
+from gym_trackmania.shared.features import FeaturePipeline, surface_lookahead_stage
+from gym_trackmania.shared.packet import (FLAG_IN_RACE, FLAG_ON_GROUND, GROUND_MATERIAL_CODES, GROUND_MATERIALS,
+                                          PACKET_DTYPE, UNKNOWN_CODE, WHEEL_ICING, WHEEL_SLIP_COEF)
+from gym_trackmania.shared.surface import (N_SURFACES, SURFACE_GRASS, SURFACE_ICE, SURFACE_NONE, SURFACE_OTHER,
+                                           SURFACE_ROAD, SURFACE_STATS, SurfaceIndex, surface_codes)
+from gym_trackmania.trackmania_env import make_pipeline
+
+MATERIAL_LOOKUP = Path(__file__).resolve().parents[1] / "plugin" / "telemetry" / "material_lookup.as"
+
+
+def _drive(n=200, materials=("Asphalt", "Ice")):
+    """A car driving along x from 0 to 99 m: on the first material below x = 50, on the second beyond."""
+    frames = np.zeros(n, dtype=PACKET_DTYPE)
+    frames["flags"] = FLAG_IN_RACE | FLAG_ON_GROUND
+    frames["position"][:, 0] = np.linspace(0.0, 99.0, n)
+    frames["position"][:, 2] = 10.0
+    frames["velocity"][:, 0] = 20.0
+    beyond = frames["position"][:, 0] >= 50.0
+    frames["ground_material"] = np.where(beyond, GROUND_MATERIAL_CODES[materials[1]],
+                                         GROUND_MATERIAL_CODES[materials[0]])[:, None]
+    frames["wheels"][:, :, WHEEL_SLIP_COEF] = np.where(beyond, 0.8, 0.1)[:, None]
+    frames["wheels"][:, :, WHEEL_ICING] = np.where(beyond, 1.0, 0.0)[:, None]
+    return frames
+
+
+def test_material_vocabulary_matches_the_plugin():
+    names = re.findall(r'case EPlugSurfaceMaterialId::(\w+): return "(\w+)";', MATERIAL_LOOKUP.read_text())
+    assert [enum for enum, _ in names] == [name for _, name in names]
+    assert tuple(name for name, _ in names) == GROUND_MATERIALS
+
+    codes = np.array([[GROUND_MATERIAL_CODES["Asphalt"], GROUND_MATERIAL_CODES["WetGrass"],
+                       GROUND_MATERIAL_CODES["Danger"], 200, UNKNOWN_CODE]], dtype=np.uint8)
+    assert surface_codes(codes).tolist() == [[SURFACE_ROAD, 6, SURFACE_OTHER, SURFACE_OTHER, SURFACE_NONE]]
+    assert surface_codes(codes).dtype == np.uint8
+
+
+def test_surface_feature_counts_wheels_per_class():
+    frames = np.zeros(2, dtype=PACKET_DTYPE)
+    frames["ground_material"][0] = [GROUND_MATERIAL_CODES[name] for name in ("Asphalt", "Concrete", "Grass")] + [
+        UNKNOWN_CODE]
+    frames["ground_material"][1] = GROUND_MATERIAL_CODES["Ice"]
+    obs = FeaturePipeline(["surface"])(frames)
+    expected = np.zeros((2, N_SURFACES), dtype=np.float32)
+    expected[0, [SURFACE_ROAD, SURFACE_GRASS, SURFACE_NONE]] = [0.5, 0.25, 0.25]
+    expected[1, SURFACE_ICE] = 1.0
+    np.testing.assert_allclose(obs, expected)
+
+
+def test_surface_index_aggregates_runs(tmp_path):
+    frames = _drive()
+    airborne = _drive(50, materials=("Grass", "Grass"))
+    airborne["flags"] = FLAG_IN_RACE
+    index = SurfaceIndex.from_frames(np.concatenate([frames, airborne]), cell_size=5.0, margin=10.0)
+
+    positions = np.array([[20.0, 0.0, 10.0], [80.0, 5.0, 10.0], [500.0, 0.0, 10.0], [52.0, 0.0, 40.0]])
+    assert index.surface_at(positions).tolist() == [SURFACE_ROAD, SURFACE_ICE, SURFACE_NONE, SURFACE_NONE]
+    values = index.lookup(positions)
+    assert values.shape == (4, index.width) and index.width == N_SURFACES + len(SURFACE_STATS)
+    np.testing.assert_allclose(values[:2, N_SURFACES:], [[0.1, 0.0, 0.0], [0.8, 1.0, 0.0]], rtol=1e-6)
+    assert values[2, SURFACE_NONE] == 1.0 and not values[2, N_SURFACES:].any()
+
+    index.save(tmp_path / "surface.npz")
+    loaded = SurfaceIndex.load(tmp_path / "surface.npz")
+    np.testing.assert_array_equal(loaded.lookup(positions), values)
+
+    with pytest.raises(ValueError):
+        SurfaceIndex.from_frames(np.zeros(3, dtype=PACKET_DTYPE))
+
+
+def test_lookahead_features_at_projected_position():
+    index = SurfaceIndex.from_frames(_drive(), cell_size=5.0)
+    frames = _drive(3)
+    frames["position"][:, 0] = [10.0, 35.0, 90.0]  # 20 m/s: 10 and 20 m ahead
+    stage = surface_lookahead_stage(index, horizons=(0.5, 1.0))
+    pipeline = FeaturePipeline(["speed", stage])
+    obs = pipeline(frames)
+    ahead = pipeline.view(obs, "surface_lookahead").reshape(3, 2, index.width)
+    assert ahead[:, :, :N_SURFACES].argmax(axis=2).tolist() == [[SURFACE_ROAD, SURFACE_ROAD],
+                                                                [SURFACE_ROAD, SURFACE_ICE],
+                                                                [SURFACE_ICE, SURFACE_NONE]]
+    assert pipeline.observation_space.contains(obs[0])
+
+    pipeline, _ = make_pipeline(surface_index=index)
+    assert "surface_lookahead" in pipeline
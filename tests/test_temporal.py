@@ -0,0 +1,94 @@
+import math
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.shared.features import FeaturePipeline
+from gym_trackmania.shared.packet import PACKET_DTYPE, WHEEL_SLIP_COEF
+from gym_trackmania.shared.temporal import ACCELERATION_RANGE, SLIP_TIME_CONSTANT, YAW_RATE_RANGE, TemporalObservation
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+
+def _frame(speed=0.0, heading=0.0, slip=0.0):
+    frame = np.zeros(1, dtype=PACKET_DTYPE)
+    frame["speed"] = speed
+    frame["orientation"] = [math.cos(heading), 0.0, math.sin(heading)]
+    frame["wheels"][:, :, WHEEL_SLIP_COEF] = slip
+    return frame[0]
+
+
+def test_stack_is_updated_in_place_oldest_first():
+    pipeline = FeaturePipeline(["speed"])
+    stack = TemporalObservation(pipeline, k=3, temporal_features=False)
+    assert stack.observation_space.shape == (3, 1)
+
+    first = stack.reset(np.array([1.0], dtype=np.float32))
+    assert first[:, 0].tolist() == [1.0, 1.0, 1.0]
+    views = set()
+    for value in (2.0, 3.0, 4.0, 5.0):
+        obs = stack.push(np.array([value], dtype=np.float32))
+        views.add(id(obs))
+        assert obs.base is first.base  # no new buffers
+    assert obs[:, 0].tolist() == [3.0, 4.0, 5.0]
+    assert len(views) == 3
+    with pytest.raises(ValueError):
+        obs[0, 0] = 0.0
+
+
+def test_temporal_features_from_consecutive_frames():
+    pipeline = FeaturePipeline(["speed"])
+    stack = TemporalObservation(pipeline, k=2)
+    assert stack.size == 4
+
+    obs = np.zeros(1, dtype=np.float32)
+    stack.reset(obs, _frame(speed=36.0, slip=0.0), timestamp=0.0)
+    latest = stack.push(obs, _frame(speed=72.0, heading=0.1, slip=1.0), timestamp=0.5)[-1]
+
+    acceleration = (72.0 - 36.0) / 3.6 / 0.5
+    lo, hi = ACCELERATION_RANGE
+    assert latest[1] == pytest.approx((acceleration - lo) / (hi - lo))
+    lo, hi = YAW_RATE_RANGE
+    assert latest[2] == pytest.approx((0.1 / 0.5 - lo) / (hi - lo))
+    assert latest[3] == pytest.approx(1.0 - math.exp(-0.5 / SLIP_TIME_CONSTANT))
+
+    # The same frame again: no time passed, nothing new to derive
+    again = stack.push(obs, _frame(speed=72.0, heading=0.1, slip=1.0), timestamp=0.5)
+    assert again[-1].tolist() == latest.tolist()
+
+
+def test_back_to_back_frames_stay_in_range():
+    stack = TemporalObservation(FeaturePipeline(["speed"]), k=1, min_dt=0.01)
+    obs = np.zeros(1, dtype=np.float32)
+    stack.reset(obs, _frame(speed=100.0), timestamp=0.0)
+    # 0.1 ms apart: a burst after a stall, not a 3000 m/s^2 braking
+    latest = stack.push(obs, _frame(speed=0.0, heading=-0.3), timestamp=0.0001)[-1]
+    assert latest[1:3].tolist() == [0.0, 0.0]
+    assert stack.observation_space.contains(stack.latest[None])
+
+    stack.reset(obs, _frame(speed=100.0), timestamp=0.0)
+    latest = stack.push(obs, _frame(speed=99.0), timestamp=0.0001)[-1]
+    acceleration = -1.0 / 3.6 / 0.01
+    lo, hi = ACCELERATION_RANGE
+    assert latest[1] == pytest.approx((acceleration - lo) / (hi - lo))
+
+
+def test_env_frame_stack_observation_space(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = SimulatedTelemetrySource(bridge, rate=200.0)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source), sync_frames=1,
+                        frame_stack=4, temporal_features=True)
+    assert env.observation_space.shape == (4, env.pipeline.size + 3)
+    source.start()
+    try:
+        obs, _ = env.reset()
+        assert obs.shape == env.observation_space.shape
+        for _ in range(5):
+            obs, *_ = env.step(np.array([0.0, 1.0, 0.0]))
+    finally:
+        source.stop()
+        env.close()
+    assert obs.shape == env.observation_space.shape
+    assert not obs.flags.writeable
+    # Rows are consecutive observations, the newest last
+    speed = env.pipeline.index("speed")
+    assert obs[-1, speed] >= obs[0, speed] > 0.0
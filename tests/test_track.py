@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from gym_trackmania.shared.packet import FLAG_FINISHED, FLAG_IN_RACE, PACKET_DTYPE
+from gym_trackmania.shared.track import (TrackModel, load_track_model, map_id_from_path, resample_polyline,
+                                         traces_from_frames)
+
+
+def _loop_track(n=400, radius=100.0):
+    """Three quarters of a circle in the horizontal plane, climbing slowly."""
+    angle = np.linspace(0.0, 1.5 * np.pi, n)
+    return np.stack([radius * np.cos(angle), angle * 2.0, radius * np.sin(angle)], axis=1)
+
+
+def _brute_force(model, positions):
+    best = []
+    for p in positions:
+        start, vec = model.centerline[:-1], np.diff(model.centerline, axis=0)
+        t = np.clip(((p - start) * vec).sum(axis=1) / (vec ** 2).sum(axis=1), 0.0, 1.0)
+        dist = np.linalg.norm(start + t[:, None] * vec - p, axis=1)
+        i = dist.argmin()
+        best.append((model.cumulative[i] + t[i] * np.linalg.norm(vec[i]), dist[i]))
+    return np.array(best).T
+
+
+def test_projection_matches_brute_force():
+    model = TrackModel(_loop_track(), search_radius=16.0)
+    rng = np.random.default_rng(0)
+    near = model.centerline[rng.integers(0, len(model.centerline), 500)] + rng.normal(0.0, 5.0, (500, 3))
+    far = rng.uniform(-300.0, 300.0, (50, 3))
+    positions = np.concatenate([near, far])
+
+    arc, dist = model.project(positions)
+    expected_arc, expected_dist = _brute_force(model, positions)
+    np.testing.assert_allclose(dist, expected_dist, atol=1e-9)
+    np.testing.assert_allclose(arc[:500], expected_arc[:500], atol=1e-6)
+    assert model.progress(model.centerline[[0, -1]]) == pytest.approx([0.0, 1.0])
+
+
+def test_straight_line_progress_is_continuous():
+    model = TrackModel(np.array([[0.0, 0.0, 0.0], [100.0, 0.0, 0.0], [100.0, 0.0, 50.0]]))
+    positions = np.array([[25.0, 1.0, 3.0], [100.0, 0.0, 25.0], [50.0, 0.0, -400.0]])
+    arc, dist = model.project(positions)
+    np.testing.assert_allclose(arc, [25.0, 125.0, 50.0])
+    np.testing.assert_allclose(dist, [np.sqrt(10.0), 0.0, 400.0])
+    assert model.length == 150.0
+
+
+def test_centerline_from_noisy_traces():
+    truth = _loop_track()
+    rng = np.random.default_rng(1)
+    traces = []
+    for _ in range(8):
+        trace = resample_polyline(truth, n=int(rng.integers(300, 600)))
+        trace[:, [0, 2]] += rng.normal(0.0, 1.0, (len(trace), 2))
+        traces.append(trace)
+
+    model = TrackModel.from_traces(traces, spacing=2.0)
+    _, dist = TrackModel(truth).project(model.centerline)
+    assert dist.max() < 1.5
+    assert model.length == pytest.approx(TrackModel(truth).length, rel=0.05)
+
+
+def test_traces_from_frames_keeps_finished_runs():
+    frames = np.zeros(30, dtype=PACKET_DTYPE)
+    frames["flags"] = FLAG_IN_RACE
+    frames["position"][:, 0] = np.concatenate([np.arange(10), np.arange(10), np.arange(10)])
+    frames["flags"][9] |= FLAG_FINISHED       # first run finishes
+    frames["flags"][27] |= FLAG_FINISHED      # third run finishes before its last frames
+    frames["flags"][5] &= ~np.uint8(FLAG_IN_RACE)
+
+    traces = traces_from_frames(frames, respawn_jump=5.0)
+    assert [len(trace) for trace in traces] == [4, 8]
+    assert traces[1][-1, 0] == 7.0
+
+
+def test_track_model_cache(tmp_path):
+    traces = [_loop_track()]
+    with pytest.raises(FileNotFoundError):
+        load_track_model("A01-Race", cache_dir=tmp_path)
+    built = load_track_model(map_id_from_path("assets/maps/A01-Race.Map.Gbx"), traces, cache_dir=tmp_path)
+    assert (tmp_path / "A01-Race.npz").exists()
+    cached = load_track_model("A01-Race", cache_dir=tmp_path)
+    np.testing.assert_array_equal(cached.centerline, built.centerline)
+    assert cached.search_radius == built.search_radius
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge, TelemetryChannel
+from gym_trackmania.bridge.recording import TelemetryRecording, load_recording
+from gym_trackmania.core.replay import ReplayGameInstance, ReplayTelemetrySource
+from gym_trackmania.shared.packet import FLAG_FINISHED, FLAG_IN_RACE, PACKET_DTYPE
+from gym_trackmania.shared.trajectory import TrajectoryCache
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+SEGMENT_FRAMES = 20
+
+
+def _run(segments=3, dt=0.1, finish=True, crash_in=None):
+    """A run through ``segments`` checkpoint segments of SEGMENT_FRAMES frames, one meter per frame."""
+    n = segments * SEGMENT_FRAMES
+    frames = np.zeros(n, dtype=PACKET_DTYPE)
+    frames["flags"] = FLAG_IN_RACE
+    frames["cp_passed"] = np.arange(n) // SEGMENT_FRAMES
+    frames["cp_progress"] = frames["cp_passed"] / segments
+    frames["position"][:, 0] = np.arange(n)
+    frames["speed"] = np.arange(n) % SEGMENT_FRAMES  # standing at every checkpoint, as after a respawn
+    if crash_in is not None:
+        frames = frames[:crash_in * SEGMENT_FRAMES + SEGMENT_FRAMES // 2]
+    elif finish:
+        frames[-1]["flags"] |= FLAG_FINISHED
+        frames[-1]["cp_passed"] = segments
+    return np.arange(len(frames)) * dt, frames
+
+
+def test_add_run_splits_segments_and_keeps_ghosts():
+    cache = TrajectoryCache(recent=2)
+    slow = cache.add_run(*_run(dt=0.2))
+    assert [(t.segment, t.completed) for t in slow] == [(0, True), (1, True), (2, True)]
+    assert slow[0].duration == pytest.approx(SEGMENT_FRAMES * 0.2)
+    fast = cache.add_run(*_run(dt=0.1))
+    cache.add_run(*_run(dt=0.3, crash_in=1))
+    cache.add_run(*_run(dt=0.3, crash_in=1))
+
+    assert cache.segments == [0, 1, 2]
+    assert cache.ghost(0) is fast[0] and cache.ghost(2) is fast[2]
+    # The ghost survives being pushed out of the recent traversals
+    assert cache.ghost(1) is fast[1]
+    assert [t.completed for t in cache.recent(1)] == [False, False]
+    assert cache.start_state(1)["cp_passed"] == 1 and cache.start_state(1)["speed"] == 0
+    assert cache.ghost(0).time_at(0.0) == 0.0
+    assert cache.ghost(0).time_at(0.5) == float("inf")
+
+
+def test_add_run_from_a_recording(tmp_path):
+    channel = TelemetryChannel()
+    channel.start_recording(tmp_path / "run")
+    for frame in _run()[1]:
+        channel.ingest_frame(frame)
+    channel.stop_recording()
+
+    cache = TrajectoryCache()
+    traversals = cache.add_run(*load_recording(tmp_path / "run"))
+    assert [t.segment for t in traversals] == [0, 1, 2]
+    assert cache.n_frames == 3 * SEGMENT_FRAMES - 1  # the finish frame starts no segment
+
+
+def test_eviction_is_lru_and_spares_ghosts():
+    cache = TrajectoryCache(max_frames=3 * SEGMENT_FRAMES + SEGMENT_FRAMES // 2, recent=4)
+    ghosts = cache.add_run(*_run(dt=0.1))
+    for _ in range(3):
+        cache.add_run(*_run(dt=0.3, crash_in=2))
+    assert cache.n_frames <= cache.max_frames
+    assert [cache.ghost(segment) for segment in range(3)] == ghosts
+    # Only the newest crash is left next to the ghosts
+    assert len(cache.recent(2)) == 2
+
+
+def test_sampling_follows_failure_rates():
+    cache = TrajectoryCache(alpha=2.0)
+    for _ in range(20):
+        cache.report(0, 2)        # always crashes in segment 2
+    cache.report(0, 3, finished=True)
+    summary = cache.summary()
+    assert summary[0]["completions"] == 21 and summary[2]["failures"] == 20
+
+    rng = np.random.default_rng(0)
+    draws = [cache.sample_segment(rng, reachable=(0, 2)) for _ in range(200)]
+    assert draws.count(2) > 150
+    assert cache.sample_segment(rng, reachable=(0,)) == 0
+
+
+def test_env_respawns_at_the_last_checkpoint(tmp_path):
+    timestamp, frames = _run(segments=3, finish=False)
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = ReplayTelemetrySource(TelemetryRecording(timestamp, frames), bridge=bridge, loop=False)
+    cache = TrajectoryCache()
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=ReplayGameInstance(source), sync_frames=1,
+                        curriculum=cache)
+    source.start()
+    try:
+        _, info = env.reset()
+        assert info == {"segment": 0}
+        for _ in range(2 * SEGMENT_FRAMES + 5):
+            env.step(np.array([0.0, 1.0, 0.0]))
+        assert env._frame["cp_passed"][0] == 2
+
+        with pytest.raises(ValueError):
+            env.reset(options={"segment": 1})
+        _, info = env.reset(options={"segment": 2})
+        assert info == {"segment": 2}
+        assert env._frame["cp_passed"][0] == 2 and env._frame["speed"][0] == 0.0
+        assert source.position == 2 * SEGMENT_FRAMES + 1
+    finally:
+        env.close()
+
+    summary = cache.summary()
+    assert summary[0]["completions"] == 1 and summary[1]["completions"] == 1
+    assert summary[2]["failures"] == 1
+    assert cache.segments == [0, 1, 2]
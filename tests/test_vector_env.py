@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from gym_trackmania.bridge.multiplex import MultiplexTelemetryBridge
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.vector_env import TrackmaniaVectorEnv
+
+
+def _simulated_vector_env(tmp_path, num_envs=3, rate=200.0, track_lengths=None):
+    bridge = MultiplexTelemetryBridge(num_envs, ports=[0] * num_envs, log_path=str(tmp_path / "bridge.log"))
+    bridge.start()
+    track_lengths = track_lengths or [400.0] * num_envs
+    sources = [SimulatedTelemetrySource(address=(bridge.host, port), rate=rate, track_length=length, transport="tcp")
+               for port, length in zip(bridge.ports, track_lengths)]
+    env = TrackmaniaVectorEnv(num_envs, bridge=bridge,
+                              game_instances=[SimulatedGameInstance(source) for source in sources])
+    for source in sources:
+        source.start()
+    return env, bridge, sources
+
+
+def _close(env, bridge, sources):
+    for source in sources:
+        source.stop()
+    env.close()
+    bridge.stop()
+
+
+def test_vector_env_batched_step(tmp_path):
+    env, bridge, sources = _simulated_vector_env(tmp_path)
+    try:
+        obs, info = env.reset()
+        assert obs.shape == (3, env.single_observation_space.shape[0])
+        for _ in range(5):
+            obs, rewards, terminated, truncated, info = env.step(np.tile([0.0, 1.0, 0.0], (3, 1)))
+    finally:
+        _close(env, bridge, sources)
+
+    assert env.observation_space.contains(obs)
+    assert rewards.shape == terminated.shape == truncated.shape == (3,)
+    assert (info["fresh_frames"] >= 1).all()
+    assert all(source.speed > 0 for source in sources)
+
+
+def test_vector_env_autoresets_finished_instance(tmp_path):
+    # Instance 0 reaches the finish line after a couple of steps, the others do not
+    env, bridge, sources = _simulated_vector_env(tmp_path, track_lengths=[0.5, 400.0, 400.0])
+    try:
+        env.reset()
+        actions = np.tile([0.0, 1.0, 0.0], (3, 1))
+        for _ in range(50):
+            obs, rewards, terminated, truncated, info = env.step(actions)
+            if terminated[0]:
+                break
+        assert terminated[0] and not terminated[1:].any()
+
+        obs, rewards, terminated, truncated, info = env.step(actions)
+    finally:
+        _close(env, bridge, sources)
+
+    # The finished instance was restarted in the background and reports its
+    # first observation; the others were left running.
+    assert env.game_instances[0].keys_pressed.count("backspace") == 2
+    assert env.game_instances[1].keys_pressed.count("backspace") == 1
+    assert rewards[0] == 0.0 and not terminated[0]
+
+
+class _MachineWideInput(SimulatedGameInstance):
+    shares_input = True
+
+
+def test_vector_env_drives_at_most_one_game_with_machine_wide_input(tmp_path):
+    with pytest.raises(ValueError):
+        TrackmaniaVectorEnv(2)
+    bridge = MultiplexTelemetryBridge(2, ports=[0, 0], log_path=str(tmp_path / "bridge.log"))
+    sources = [SimulatedTelemetrySource(bridge=bridge.channel(i)) for i in range(2)]
+    with pytest.raises(ValueError):
+        TrackmaniaVectorEnv(2, bridge=bridge, game_instances=[_MachineWideInput(source) for source in sources])
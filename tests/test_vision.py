@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+import numpy as np
+import pytest
+from gym_trackmania.bridge.bridge import TelemetryBridge
+from gym_trackmania.bridge.frame_ring import SharedFrameRing
+from gym_trackmania.core.capture import FrameCapture, SyntheticFrameSource
+from gym_trackmania.core.simulated import SimulatedGameInstance, SimulatedTelemetrySource
+from gym_trackmania.shared.vision import LUMA, VisionPipeline
+from gym_trackmania.trackmania_env import TrackmaniaEnv
+
+
+def test_pipeline_crops_averages_and_converts():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (100, 130, 3), dtype=np.uint8)
+    pipeline = VisionPipeline(size=(12, 20), crop=(0.5, 1.0, 0.0, 1.0), stack=3)
+    image = pipeline(frame)
+
+    # 50 rows and 130 columns kept, in blocks of 4x6: the rest is dropped
+    expected = frame[50:98, :120].astype(np.float64).reshape(12, 4, 20, 6, 3).mean(axis=(1, 3)) @ LUMA
+    assert image.dtype == np.uint8 and image.shape == (12, 20)
+    assert np.abs(image - expected).max() <= 0.5 + 1e-3
+
+    color = VisionPipeline(size=(10, 13), crop=(0.0, 1.0, 0.0, 1.0), grayscale=False)(frame)
+    assert color.shape == (10, 13, 3)
+    np.testing.assert_allclose(color, frame.reshape(10, 10, 13, 10, 3).mean(axis=(1, 3)), atol=0.5 + 1e-3)
+
+    with pytest.raises(ValueError):
+        pipeline(frame[:10])
+
+
+def test_pipeline_stacks_in_place():
+    pipeline = VisionPipeline(size=(2, 2), crop=(0.0, 1.0, 0.0, 1.0), stack=3)
+    stack = pipeline.reset(np.full((2, 2), 1, dtype=np.uint8))
+    assert stack[:, 0, 0].tolist() == [1, 1, 1]
+    for value in (2, 3):
+        stack = pipeline.push(np.full((2, 2), value, dtype=np.uint8))
+    assert stack[:, 0, 0].tolist() == [1, 2, 3]
+    assert pipeline.push()[:, 0, 0].tolist() == [2, 3, 0]
+    assert not stack.flags.writeable
+    assert pipeline.observation_space.shape == (3, 2, 2)
+
+
+def _read_in_child(name, results):
+    ring = SharedFrameRing.attach(name)
+    results.put((ring.shape, ring.read(None, lambda frame: results.put(int(frame[0, 0, 0])))))
+
+
+def test_frame_ring_aligns_frames_with_telemetry():
+    ring = SharedFrameRing((4, 4, 3), capacity=3)
+    try:
+        assert ring.find() == -1 and ring.read(5, lambda frame: None) is None
+        for i, tag in enumerate([-1, 2, 2, 5, 9]):
+            ring.write(np.full((4, 4, 3), i, dtype=np.uint8), tag, timestamp=float(i))
+        seen = []
+        assert ring.read(4, lambda frame: seen.append(int(frame[0, 0, 0]))) == 2
+        assert seen == [2]
+        assert ring.read(None, lambda frame: None) == 9
+        assert ring.find(1) == -1  # the frames tagged before 2 were overwritten
+
+        slot = ring.begin()
+        ring.abort(slot)
+        assert ring.read(100, lambda frame: None) == 9
+
+        # A slot the writer is still in is retried until it is done with it
+        newest = ring.find()
+        ring.versions[newest] += 1
+        threading.Timer(0.05, lambda: ring.versions.__setitem__(newest, ring.versions[newest] + 1)).start()
+        assert ring.read(None, lambda frame: None) == 9
+
+        results = multiprocessing.get_context("fork").Queue()
+        child = multiprocessing.get_context("fork").Process(target=_read_in_child, args=(ring.name, results))
+        child.start()
+        value = results.get(timeout=10)
+        shape, tag = results.get(timeout=10)
+        child.join(timeout=10)
+    finally:
+        ring.close()
+    assert child.exitcode == 0
+    assert (value, shape, tag) == (4, (4, 4, 3), 9)
+
+
+def test_env_returns_images_aligned_with_telemetry(tmp_path):
+    bridge = TelemetryBridge(log_path=str(tmp_path / "bridge.log"), transport="udp")
+    source = SimulatedTelemetrySource(bridge, rate=200.0)
+    frames = SyntheticFrameSource((72, 128, 3))
+    frames.base[:] = 0  # every pixel is the tag of the frame, modulo 256
+    capture = FrameCapture(frames, bridge, rate=200.0)
+    vision = VisionPipeline(size=(8, 16), crop=(0.0, 1.0, 0.0, 1.0), stack=2)
+    env = TrackmaniaEnv(telemetry_bridge=bridge, game_instance=SimulatedGameInstance(source), sync_frames=1,
+                        vision=vision, frame_capture=capture)
+    assert set(env.observation_space.spaces) == {"image", "telemetry"}
+    source.start()
+    try:
+        obs, _ = env.reset()
+        assert env.observation_space.contains(obs)
+        assert capture.running
+        for _ in range(10):
+            obs, _, _, _, info = env.step(np.array([0.0, 1.0, 0.0]))
+            assert 0 <= info["image_seq"] <= info["obs_seq"]
+            assert (obs["image"][-1] == info["image_seq"] % 256).all()
+        assert obs["telemetry"].shape == env.pipeline.observation_space.shape
+    finally:
+        source.stop()
+        env.close()
+        capture.close()
+    assert not capture.running
+    assert capture.frames_captured > 0 and capture.frames_failed == 0